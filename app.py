@@ -1,21 +1,50 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
-from datetime import datetime, timedelta, time
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context
+from datetime import datetime, timedelta, time, date
 from camada_dados.usuario_dao import UsuarioDAO
 from camada_dados.agendamento_dao  import AgendamentoDAO
 from modelos.usuario import Aluno, Funcionario, Admin, Servidor
 from camada_negocio.servicos import ServicoLogin, ServicoAdmin, ServicoBolsista
+from camada_negocio.grade_semanal import montar_grade_semanal
+from camada_negocio.cache_grade import cache_grade_semanal
+from camada_negocio.exportacao import FORMATOS as FORMATOS_EXPORTACAO, nome_arquivo as nome_arquivo_exportacao
 
 from camada_dados.agendamento_dao import buscar_quadras_por_ginasio, verificar_disponibilidade,get_ginasio_por_id,  criar_agendamento,  verificar_usuario_existe, buscar_ginasios
 
 from camada_dados.mongo_config import conectar_mongo
-import re
+from camada_dados.notificacoes import ler_versao_quadra
+from camada_dados.sessoes import InterfaceSessaoMongo, obter_chave_secreta
+from camada_dados.instrumentacao import MiddlewareConsultasMongo, definir_rota, MONGO_INSTRUMENTACAO_CABECALHOS
+import io
 import os
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
-app.config['SESSION_TYPE'] = 'filesystem'
+# Chave estável (SECRET_KEY ou a compartilhada no banco) e sessões no
+# MongoDB: qualquer worker ou máquina atende qualquer usuário logado
+app.secret_key = obter_chave_secreta()
+app.session_interface = InterfaceSessaoMongo()
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=1)
 
+# Conta os comandos MongoDB de cada requisição (sessão incluída); em modo
+# debug ou com MONGO_INSTRUMENTACAO_CABECALHOS=1 responde os cabeçalhos X-Mongo-*
+app.wsgi_app = MiddlewareConsultasMongo(
+    app.wsgi_app, exibir_cabecalhos=lambda: app.debug or MONGO_INSTRUMENTACAO_CABECALHOS)
+
+
+@app.before_request
+def marcar_rota_instrumentacao():
+    if request.endpoint:
+        definir_rota(request.endpoint)
+
+# Cria os índices do MongoDB na inicialização (idempotente).
+# Pode ser desativado com CRIAR_INDICES_NA_INICIALIZACAO=0 quando os
+# índices forem gerenciados via "python -m camada_dados.indices".
+if os.environ.get('CRIAR_INDICES_NA_INICIALIZACAO', '1') == '1':
+    from camada_dados.indices import garantir_indices
+    try:
+        garantir_indices()
+    except Exception as e:
+        print(f"❌ Não foi possível criar os índices na inicialização: {e}")
+
 servico_login = ServicoLogin()
 servico_admin = ServicoAdmin()
 servico_bolsista = ServicoBolsista()
@@ -35,24 +64,19 @@ def get_form_value(key, default=None, cast_type=None):
     return value
 
 def eh_bolsista():
-    """Verifica se o usuário logado é bolsista"""
+    """
+    Verifica se o usuário logado é bolsista. O papel vem do cache de perfis
+    (memória), sem consulta ao banco a cada requisição; se o perfil não
+    puder ser lido, vale o que foi gravado na sessão (assinada) no login.
+    """
     usuario_info = session.get('usuario_logado', {})
     if usuario_info.get('tipo') != "aluno":
         return False
-    
-    # Buscar informações completas do usuário
-    # Instancia DAO localmente para garantir conexão fresca se necessário
-    dao_local = UsuarioDAO()
-    usuario_completo = dao_local.buscar_por_cpf(usuario_info['cpf'])
-    
-    # Verifica a flag is_bolsista que adicionamos na classe Aluno ou a categoria string
-    eh = False
-    if hasattr(usuario_completo, 'is_bolsista'):
-        eh = usuario_completo.is_bolsista
-    elif hasattr(usuario_completo, 'categoria'):
-        eh = (str(usuario_completo.categoria).lower() == 'bolsista')
-        
-    return eh
+
+    perfil = usuario_dao.buscar_perfil(usuario_info['cpf'])
+    if perfil is None:
+        return bool(usuario_info.get('eh_bolsista'))
+    return perfil['eh_bolsista']
 
 
 @app.route('/')
@@ -87,6 +111,10 @@ def login():
             elif hasattr(usuario, 'categoria'):
                 eh_bolsista_flag = (str(usuario.categoria).lower() == "bolsista")
             
+            # Sessão nova a cada login: um identificador plantado antes do
+            # login (fixação de sessão) não herda o usuário autenticado
+            session.clear()
+            session.regenerar()
             session['usuario_logado'] = {
                 'cpf': usuario.cpf,
                 'nome': usuario.nome,
@@ -321,6 +349,30 @@ def bolsista_relatorios():
                          ginasios=ginasios, 
                          relatorio=relatorio)
 
+@app.route('/bolsista/relatorios/exportar')
+def bolsista_exportar_relatorio():
+    """
+    Exporta o relatório de uso com os filtros de /bolsista/relatorios:
+    ?data_inicio=AAAA-MM-DD&data_fim=AAAA-MM-DD&id_ginasio=&formato=csv|ndjson&por_dia=1
+    """
+    if not eh_bolsista():
+        flash('Acesso restrito a bolsistas.', 'error')
+        return redirect(url_for('index'))
+
+    data_inicio = request.args.get('data_inicio')
+    data_fim = request.args.get('data_fim')
+    id_ginasio = request.args.get('id_ginasio') or None
+    formato = request.args.get('formato', 'csv')
+    por_dia = request.args.get('por_dia') == '1'
+    try:
+        if not data_inicio or not data_fim:
+            raise ValueError("Período obrigatório.")
+        gerador = servico_bolsista.exportar_relatorio_uso(data_inicio, data_fim, id_ginasio, formato, por_dia)
+    except (ValueError, RuntimeError):
+        flash('Período, ginásio ou formato de exportação inválidos.', 'error')
+        return redirect(url_for('bolsista_relatorios'))
+    return _resposta_exportacao(gerador, 'uso_por_dia' if por_dia else 'relatorio_uso', formato)
+
 @app.route('/admin/usuarios', methods=['GET', 'POST'])
 def admin_gerenciar_usuarios():
     if session.get('usuario_logado', {}).get('tipo') != 'admin':
@@ -359,6 +411,33 @@ def admin_gerenciar_usuarios():
     return render_template('admin_gerenciar_usuarios.html', usuarios=lista_de_usuarios)
 
 
+def _filtros_listagem_admin(args):
+    """
+    Lê os filtros da listagem de agendamentos (query string).
+    Retorna (valores_do_formulario, filtros_para_o_dao); ValueError se inválidos.
+    """
+    filtros_form = {campo: args.get(campo, '').strip()
+                    for campo in ('data_inicio', 'data_fim', 'id_ginasio', 'num_quadra', 'status', 'cpf_usuario')}
+    filtros = {
+        'data_inicio': date.fromisoformat(filtros_form['data_inicio']) if filtros_form['data_inicio'] else None,
+        'data_fim': date.fromisoformat(filtros_form['data_fim']) if filtros_form['data_fim'] else None,
+        'id_ginasio': int(filtros_form['id_ginasio']) if filtros_form['id_ginasio'] else None,
+        'num_quadra': int(filtros_form['num_quadra']) if filtros_form['num_quadra'] else None,
+        'status': filtros_form['status'] or None,
+        'cpf_usuario': filtros_form['cpf_usuario'] or None,
+    }
+    return filtros_form, filtros
+
+
+def _resposta_exportacao(gerador, prefixo, formato):
+    """Resposta HTTP em streaming para um gerador de exportacao."""
+    return Response(
+        stream_with_context(gerador),
+        content_type=FORMATOS_EXPORTACAO[formato],
+        headers={'Content-Disposition': f'attachment; filename="{nome_arquivo_exportacao(prefixo, formato)}"'},
+    )
+
+
 @app.route('/admin/agendamentos', methods=['GET', 'POST'])
 def admin_ver_agendamentos():
     if session.get('usuario_logado', {}).get('tipo') != 'admin':
@@ -372,10 +451,75 @@ def admin_ver_agendamentos():
             flash(f'Agendamento ID {id_agendamento} cancelado com sucesso!', 'success')
         else:
             flash('Erro ao cancelar o agendamento.', 'error')
+        # Volta para a mesma página/filtros em que o admin estava
+        return redirect(url_for('admin_ver_agendamentos', **request.args))
+
+    try:
+        filtros_form, filtros = _filtros_listagem_admin(request.args)
+    except ValueError:
+        flash('Filtros inválidos.', 'error')
         return redirect(url_for('admin_ver_agendamentos'))
 
-    lista_de_agendamentos = servico_admin.listar_todos_agendamentos()
-    return render_template('admin_ver_agendamentos.html', agendamentos=lista_de_agendamentos)
+    cursor = request.args.get('cursor')
+    lista_de_agendamentos, proximo_cursor = servico_admin.listar_agendamentos_paginados(filtros, cursor)
+    filtros_ativos = {campo: valor for campo, valor in filtros_form.items() if valor}
+    return render_template('admin_ver_agendamentos.html',
+                           agendamentos=lista_de_agendamentos,
+                           proximo_cursor=proximo_cursor,
+                           primeira_pagina=not cursor,
+                           filtros=filtros_form,
+                           filtros_ativos=filtros_ativos,
+                           ginasios=buscar_ginasios())
+
+@app.route('/admin/agendamentos/exportar')
+def admin_exportar_agendamentos():
+    """
+    Exporta (CSV ou NDJSON, em streaming) os agendamentos com os mesmos
+    filtros de /admin/agendamentos: ?formato=csv|ndjson&data_inicio=...
+    """
+    if session.get('usuario_logado', {}).get('tipo') != 'admin':
+        flash('Acesso negado.', 'error')
+        return redirect(url_for('index'))
+
+    formato = request.args.get('formato', 'csv')
+    try:
+        _, filtros = _filtros_listagem_admin(request.args)
+        gerador = servico_admin.exportar_agendamentos(filtros, formato)
+    except ValueError:
+        flash('Filtros ou formato de exportação inválidos.', 'error')
+        return redirect(url_for('admin_ver_agendamentos'))
+    return _resposta_exportacao(gerador, 'agendamentos', formato)
+
+@app.route('/agendamentos/lote', methods=['POST'])
+def reservar_agendamentos_em_lote():
+    """
+    Reserva em lote (JSON), para administradores e bolsistas:
+        {"cpf_usuario": "...", "motivo": "Treino do time",
+         "pedidos": [{"id_ginasio": 1, "num_quadra": 2,
+                      "inicio": "2025-03-10T18:00", "fim": "2025-03-10T20:00"}, ...]}
+    Responde com o resultado de cada pedido (aceito ou recusado, com as
+    ocupações conflitantes).
+    """
+    usuario_info = session.get('usuario_logado', {})
+    eh_admin = usuario_info.get('tipo') == 'admin'
+    if not eh_admin and not eh_bolsista():
+        return jsonify({"erro": "Acesso negado."}), 403
+
+    dados = request.get_json(silent=True) or {}
+    pedidos = dados.get('pedidos')
+    if not dados.get('cpf_usuario') or not isinstance(pedidos, list):
+        return jsonify({"erro": "Informe cpf_usuario e a lista de pedidos."}), 400
+
+    try:
+        resultado = servico_admin.reservar_em_lote(
+            dados['cpf_usuario'], pedidos, dados.get('motivo'),
+            cpf_bolsista_operador=None if eh_admin else usuario_info.get('cpf')
+        )
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"erro": str(e)}), 503
+    return jsonify(resultado)
 
 @app.route('/admin/quadras', methods=['GET', 'POST'])
 def admin_gerenciar_quadras():
@@ -464,6 +608,38 @@ def admin_adicionar_usuario():
 
 
 
+@app.route('/admin/usuarios/importar', methods=['GET', 'POST'])
+def admin_importar_usuarios():
+    """
+    Importação de usuários em lote a partir de um arquivo CSV ou JSON.
+    Mostra o relatório com as linhas rejeitadas.
+    """
+    if session.get('usuario_logado', {}).get('tipo') != 'admin':
+        flash('Acesso negado.', 'error')
+        return redirect(url_for('index'))
+
+    relatorio = None
+    if request.method == 'POST':
+        arquivo = request.files.get('arquivo')
+        if not arquivo or not arquivo.filename:
+            flash('Selecione um arquivo para importar.', 'error')
+            return redirect(url_for('admin_importar_usuarios'))
+
+        formato = 'csv' if arquivo.filename.lower().endswith('.csv') else 'json'
+        # O upload é lido em streaming, sem carregar o arquivo inteiro
+        texto = io.TextIOWrapper(arquivo.stream, encoding='utf-8-sig', newline='')
+        try:
+            relatorio = servico_admin.importar_usuarios(texto, formato)
+        except (ValueError, UnicodeDecodeError) as e:
+            flash(f'Arquivo inválido: {e}', 'error')
+            return redirect(url_for('admin_importar_usuarios'))
+
+        categoria = 'success' if not relatorio['rejeitados'] else 'error'
+        flash(f"{relatorio['inseridos']} de {relatorio['total']} usuários importados.", categoria)
+
+    return render_template('admin_importar_usuarios.html', relatorio=relatorio)
+
+
 @app.route('/admin/materiais', methods=['GET', 'POST'])
 def admin_gerenciar_materiais():
     # Proteção da rota
@@ -537,7 +713,7 @@ def admin_form_material(id_material):
     material_existente = None
     if id_material:
         todos_materiais = servico_admin.listar_materiais()
-        material_existente = next((m for m in todos_materiais if m.get('id_material') == id_material), None)
+        material_existente = next((m for m in todos_materiais if str(m.get('id_material')) == id_material), None)
 
     lista_de_ginasios = servico_admin.listar_ginasios()
     status_possiveis = ['bom', 'danificado', 'manutencao']
@@ -720,6 +896,41 @@ def admin_gerenciar_eventos():
     lista_de_eventos = servico_admin.listar_eventos()
     return render_template('admin_gerenciar_eventos.html', eventos=lista_de_eventos)
 
+def _dados_tempo_evento(form):
+    """Dados de tempo do formulário de eventos, no formato de ServicoAdmin.adicionar_evento."""
+    dados_tempo = {}
+    tipo_evento = form.get('tipo_evento')
+    if tipo_evento == 'extraordinario':
+        dados_tempo['inicio'] = form.get('data_hora_inicio')
+        dados_tempo['fim'] = form.get('data_hora_fim')
+    elif tipo_evento == 'recorrente':
+        # Passa os dados brutos do formulário recorrente
+        dados_tempo['dia_semana'] = form.get('dia_semana')
+        dados_tempo['hora_inicio_recorrente'] = form.get('hora_inicio_recorrente')
+        dados_tempo['hora_fim_recorrente'] = form.get('hora_fim_recorrente')
+        dados_tempo['data_fim'] = form.get('data_fim_recorrencia')
+    return dados_tempo
+
+@app.route('/admin/eventos/verificar_conflitos', methods=['POST'])
+def admin_verificar_conflitos_evento():
+    """
+    Simulação da criação de um evento (mesmos campos do formulário):
+    responde com todas as ocupações que conflitam, sem gravar nada.
+    """
+    if session.get('usuario_logado', {}).get('tipo') != 'admin':
+        return jsonify({"erro": "Acesso negado."}), 403
+
+    try:
+        resultado = servico_admin.verificar_conflitos_evento(
+            request.form.get('tipo_evento'), _dados_tempo_evento(request.form),
+            request.form.getlist('quadras_selecionadas')
+        )
+    except ValueError as e:
+        return jsonify({"erro": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"erro": str(e)}), 503
+    return jsonify(resultado)
+
 @app.route('/admin/eventos/novo', methods=['GET', 'POST'])
 def admin_form_evento():
     # Proteção da rota
@@ -734,23 +945,7 @@ def admin_form_evento():
         desc_evento = request.form.get('descricao')
         tipo_evento = request.form.get('tipo_evento')
         lista_quadras = request.form.getlist('quadras_selecionadas')
-        
-        dados_tempo = {}
-        # Lógica para construir os dados de tempo
-        if tipo_evento == 'extraordinario':
-            dados_tempo['inicio'] = request.form.get('data_hora_inicio')
-            dados_tempo['fim'] = request.form.get('data_hora_fim')
-        elif tipo_evento == 'recorrente':
-            # Coleta os dados específicos do formulário recorrente
-            dia_semana = request.form.get('dia_semana')
-            hora_inicio_rec = request.form.get('hora_inicio_recorrente')
-            hora_fim_rec = request.form.get('hora_fim_recorrente')
-            
-            # Passa os dados brutos para o dicionário 'dados_tempo'
-            dados_tempo['dia_semana'] = dia_semana
-            dados_tempo['hora_inicio_recorrente'] = hora_inicio_rec
-            dados_tempo['hora_fim_recorrente'] = hora_fim_rec
-            dados_tempo['data_fim'] = request.form.get('data_fim_recorrencia')
+        dados_tempo = _dados_tempo_evento(request.form)
 
         # Chama o serviço passando todos os dados
         sucesso = servico_admin.adicionar_evento(
@@ -773,6 +968,13 @@ def admin_form_evento():
                            quadras=todas_as_quadras,
                            admins=lista_de_admins)
 
+@app.route('/admin/cache/grade')
+def admin_estatisticas_cache_grade():
+    """Contadores do cache da grade semanal (acertos, falhas, memória)."""
+    if session.get('usuario_logado', {}).get('tipo') != 'admin':
+        return jsonify({"erro": "Acesso negado."}), 403
+    return jsonify(cache_grade_semanal.estatisticas())
+
 @app.route('/novo_agendamento/<int:ginasio_id>/<int:quadra_id>')
 @app.route('/tabela_agendamento/<int:ginasio_id>/<int:quadra_id>')
 def tabela_agendamento(ginasio_id, quadra_id):
@@ -786,88 +988,69 @@ def tabela_agendamento(ginasio_id, quadra_id):
     # Fim: 00:00:00 do dia *após* o domingo (cobre o domingo inteiro até 23:59:59)
     data_fim_semana_dt = datetime.combine(dias_da_semana[-1] + timedelta(days=1), time.min)
 
-    # 2. Busca de dados combinada (agora com datetime)
-    dao = AgendamentoDAO()
-    ocupacoes = dao.buscar_agendamentos_por_quadra(ginasio_id, quadra_id, data_inicio_semana_dt, data_fim_semana_dt)
-
-    # 3. Processamento dos dados
-    horarios = [f"{h:02d}:00" for h in range(7, 23)]
-    agendamentos_por_dia = {dia: {hora: None for hora in horarios} for dia in dias_da_semana}
-
-    dias_pt = { 'Monday': 'Toda Segunda-feira', 'Tuesday': 'Toda Terça-feira', 'Wednesday': 'Toda Quarta-feira', 'Thursday': 'Toda Quinta-feira', 'Friday': 'Toda Sexta-feira', 'Saturday': 'Todo Sábado', 'Sunday': 'Todo Domingo' }
-    dias_map_num = { 'Monday': 0, 'Tuesday': 1, 'Wednesday': 2, 'Thursday': 3, 'Friday': 4, 'Saturday': 5, 'Sunday': 6 }
-
-    print("--- DEBUG: Processando Ocupações ---")
-    for ocup in ocupacoes:
-        print(f"Analisando: {ocup}")
-        
-        # Lógica para eventos recorrentes (verificada PRIMEIRO)
-        if ocup['status'] == 'recorrente':
-            regra = ocup['regra_recorrencia']
-            
-            match = re.search(r"Tod[oa] ([\w\s-]+), das (\d{2}:\d{2}) às (\d{2}:\d{2})", regra)
-            
-            if match:
-                dia_evento_pt, hora_ini_str, hora_fim_str = match.groups()
-                dia_semana_en = next((key for key, val in dias_pt.items() if dia_evento_pt in val), None)
-                
-                if dia_semana_en:
-                    dia_semana_num = dias_map_num.get(dia_semana_en)
-                    if dia_semana_num is not None:
-                        # Data em que o evento ocorreria nesta semana específica
-                        data_do_evento_na_semana = dias_da_semana[dia_semana_num]
-                        
-                        # Data em que o documento do evento foi criado no MongoDB
-                        if '_id' in ocup and hasattr(ocup['_id'], 'generation_time'):
-                            data_criacao_evento = ocup['_id'].generation_time.date()
-                            if data_do_evento_na_semana < data_criacao_evento:
-                                continue
-
-                        hora_ini_evento = int(hora_ini_str[:2])
-                        hora_fim_evento = int(hora_fim_str[:2])
-                        if hora_fim_evento == 0: hora_fim_evento = 24
-                        
-                        for hora in range(hora_ini_evento, hora_fim_evento):
-                            hora_str_loop = f"{hora:02d}:00"
-                            if hora_str_loop in agendamentos_por_dia[data_do_evento_na_semana]:
-                                # Para garantir que o nome seja exibido, criamos uma cópia
-                                # e garantimos que a chave 'nome_evento' tenha o valor correto.
-                                ocup_para_exibir = ocup.copy()
-                                ocup_para_exibir['nome_evento'] = ocup.get('nome')
-                                agendamentos_por_dia[data_do_evento_na_semana][hora_str_loop] = ocup_para_exibir
-
-        # Lógica para agendamentos e eventos extraordinários
-        elif ocup['hora_ini'] is not None and ocup['hora_fim'] is not None:
-            
-            # Verificação de segurança: só processa se o fim for depois do início
-            if ocup['hora_fim'] <= ocup['hora_ini']:
-                continue # Pula para a próxima ocupação no loop
-            
-            hora_atual = ocup['hora_ini']
-            while hora_atual < ocup['hora_fim']:
-                data = hora_atual.date()
-                hora_str = f"{hora_atual.hour:02d}:00"
-                if data in agendamentos_por_dia and hora_str in agendamentos_por_dia[data]:
-                    agendamentos_por_dia[data][hora_str] = ocup
-                hora_atual += timedelta(hours=1)
-    
-    print("--- FIM DEBUG ---")
+    # 2. Grade da semana: vem do cache (invalidado pelas escritas na quadra)
+    # ou é montada a partir das ocupações buscadas no banco
+    chave_cache = cache_grade_semanal.chave(ginasio_id, quadra_id, data_inicio_semana_dt)
+    versao = ler_versao_quadra(ginasio_id, quadra_id)
+    grade = cache_grade_semanal.obter(chave_cache, versao)
+    if grade is None:
+        geracao = cache_grade_semanal.geracao(ginasio_id, quadra_id)
+        dao = AgendamentoDAO()
+        ocupacoes = dao.buscar_agendamentos_por_quadra(ginasio_id, quadra_id, data_inicio_semana_dt, data_fim_semana_dt)
+
+        # 3. Processamento dos dados: cada ocupação vira um intervalo de slots
+        # da grade (horário de funcionamento e granularidade configuráveis)
+        if ocupacoes is None:
+            # Falha na consulta: a grade vazia é exibida, mas não vai para o cache
+            flash('Não foi possível carregar os horários ocupados desta quadra. Tente novamente.', 'error')
+            grade = montar_grade_semanal(dias_da_semana, [])
+        else:
+            grade = montar_grade_semanal(dias_da_semana, ocupacoes)
+            cache_grade_semanal.guardar(chave_cache, grade, geracao, versao)
+            print(f"DEBUG[Grade]: {len(ocupacoes)} ocupações distribuídas na semana {chave_cache[2:]}.")
+    horarios, agendamentos_por_dia, fim_horarios = grade
 
     # 4. Busca de dados adicionais
     from camada_dados.agendamento_dao import get_ginasio_por_id
     ginasio = get_ginasio_por_id(ginasio_id)
     nome_ginasio = ginasio.nome if ginasio else f"Ginásio {ginasio_id}"
     
-    from camada_dados.material_dao import MaterialDAO
-    material_dao = MaterialDAO()
-    # Chama o novo método para buscar materiais APENAS do ginásio atual
-    materiais_disponiveis = material_dao.buscar_por_ginasio(ginasio_id)
+    # 5. Materiais: com um horário selecionado (?slot_data=&slot_hora=), a
+    # disponibilidade real no intervalo; sem seleção, o estoque do catálogo
+    slot_data = request.args.get('slot_data')
+    slot_hora = request.args.get('slot_hora')
+    slot_selecionado = None
+    if slot_data and slot_hora in fim_horarios:
+        try:
+            inicio_slot = datetime.fromisoformat(f"{slot_data}T{slot_hora}")
+            fim_slot = datetime.fromisoformat(f"{slot_data}T{fim_horarios[slot_hora]}")
+            slot_selecionado = {"data": slot_data, "hora_ini": slot_hora, "hora_fim": fim_horarios[slot_hora],
+                                "inicio": inicio_slot}
+        except ValueError:
+            slot_selecionado = None
+
+    if slot_selecionado:
+        from camada_dados.reserva_materiais import disponibilidade_materiais
+        db = conectar_mongo()
+        try:
+            materiais_disponiveis = (disponibilidade_materiais(db, ginasio_id, inicio_slot, fim_slot)
+                                     if db is not None else [])
+        except Exception as e:
+            print(f"Erro ao calcular a disponibilidade de materiais: {e}")
+            materiais_disponiveis = []
+    else:
+        from camada_dados.material_dao import MaterialDAO
+        material_dao = MaterialDAO()
+        # Chama o novo método para buscar materiais APENAS do ginásio atual
+        materiais_disponiveis = material_dao.buscar_por_ginasio(ginasio_id)
 
     return render_template('tabela_agendamento.html', 
                          ginasio_id=ginasio_id, quadra_id=quadra_id, dias=dias_da_semana,
                          horarios=horarios, agendamentos_por_dia=agendamentos_por_dia,
+                         fim_horarios=fim_horarios,
                          semana_offset=semana_offset, nome_ginasio=nome_ginasio,
-                         materiais_disponiveis=materiais_disponiveis)
+                         materiais_disponiveis=materiais_disponiveis,
+                         slot_selecionado=slot_selecionado)
     
 @app.route('/fazer_agendamento', methods=['POST'])
 def fazer_agendamento():
@@ -896,20 +1079,35 @@ def fazer_agendamento():
         id_ginasio = int(id_ginasio)
         num_quadra = int(num_quadra)
         
-        # Verificar disponibilidade
-        from camada_dados.agendamento_dao import verificar_disponibilidade, criar_agendamento
-        disponivel = verificar_disponibilidade(id_ginasio, num_quadra, data, hora_ini, hora_fim)
+        # Materiais pedidos no painel lateral: campos material_<id_material>
+        materiais = {campo[len('material_'):]: valor for campo, valor in request.form.items()
+                     if campo.startswith('material_') and valor}
+
+        # Verifica a disponibilidade e reserva em uma única operação atômica
+        from camada_dados.agendamento_dao import (
+            reservar_agendamento, buscar_proximo_horario_livre, RESERVA_CONFIRMADA, RESERVA_INDISPONIVEL,
+            RESERVA_MATERIAIS_INDISPONIVEIS
+        )
+        resultado = reservar_agendamento(cpf_usuario, id_ginasio, num_quadra, data, hora_ini, hora_fim,
+                                         nome_usuario=usuario.get('nome'), materiais=materiais)
         
-        if disponivel:
-            # Criar agendamento
-            sucesso = criar_agendamento(cpf_usuario, id_ginasio, num_quadra, data, hora_ini, hora_fim)
-            
-            if sucesso:
-                flash('Agendamento realizado com sucesso!', 'success')
+        if resultado == RESERVA_CONFIRMADA:
+            flash('Agendamento realizado com sucesso!', 'success')
+        elif resultado == RESERVA_MATERIAIS_INDISPONIVEIS:
+            flash('Não há unidades suficientes dos materiais pedidos nesse horário.', 'error')
+            return redirect(url_for('tabela_agendamento', ginasio_id=id_ginasio, quadra_id=num_quadra,
+                                    slot_data=data, slot_hora=hora_ini))
+        elif resultado == RESERVA_INDISPONIVEL:
+            # Sugere o próximo horário livre com a mesma duração (índice em memória)
+            inicio = datetime.fromisoformat(f"{data}T{hora_ini}")
+            duracao = datetime.fromisoformat(f"{data}T{hora_fim}") - inicio
+            proximo = buscar_proximo_horario_livre(id_ginasio, num_quadra, inicio, duracao)
+            if proximo:
+                flash(f'Horário indisponível. Próximo horário livre: {proximo.strftime("%d/%m %H:%M")}.', 'error')
             else:
-                flash('Erro ao realizar agendamento.', 'error')
+                flash('Horário indisponível.', 'error')
         else:
-            flash('Horário indisponível.', 'error')
+            flash('Erro ao realizar agendamento.', 'error')
         
         return redirect(url_for('tabela_agendamento', ginasio_id=id_ginasio, quadra_id=num_quadra))
         
@@ -1013,18 +1211,16 @@ def bolsista_agendamentos():
     
     usuario_info = session.get('usuario_logado', {})
     
-    # Buscar todos os agendamentos do bolsista
-    agendamentos = servico_bolsista.buscar_todos_agendamentos_bolsista(usuario_info['cpf'])
-    
-    # Separar agendamentos por status
-    agendamentos_ativos = [a for a in agendamentos if a['status_agendamento'] == 'confirmado']
-    agendamentos_cancelados = [a for a in agendamentos if a['status_agendamento'] == 'cancelado']
-    agendamentos_realizados = [a for a in agendamentos if a['status_agendamento'] == 'realizado']
+    # Agendamentos do bolsista, já separados por status e paginados por seção
+    paginas = {status: request.args.get(f'pagina_{status}', type=int)
+               for status in ('confirmado', 'realizado', 'cancelado')}
+    secoes = servico_bolsista.buscar_agendamentos_bolsista_por_status(usuario_info['cpf'], paginas)
     
     return render_template('bolsista_agendamentos.html',
-                         agendamentos_ativos=agendamentos_ativos,
-                         agendamentos_cancelados=agendamentos_cancelados,
-                         agendamentos_realizados=agendamentos_realizados)
+                         secoes=secoes,
+                         agendamentos_ativos=secoes['confirmado']['itens'],
+                         agendamentos_cancelados=secoes['cancelado']['itens'],
+                         agendamentos_realizados=secoes['realizado']['itens'])
 
 # =========================================================================
 # CORREÇÃO PRINCIPAL AQUI: Mudado de <int:id_agendamento> para <string:id_agendamento>
@@ -0,0 +1,175 @@
+# asgi.py
+"""
+Modo de execução ASGI.
+
+    uvicorn asgi:aplicacao --workers 4
+
+As rotas de leitura mais acessadas são servidas de forma assíncrona, com as
+consultas independentes em paralelo (camada_dados.agendamento_dao_async):
+
+    GET /api/grade/<id_ginasio>/<num_quadra>?semana=N[&slot_data=AAAA-MM-DD&slot_hora=HH:MM]
+        grade semanal (agendamentos, eventos extraordinários e recorrentes),
+        ginásio e materiais (com a disponibilidade no horário, se informado)
+    GET /api/materiais/<id_ginasio>?inicio=<ISO>&fim=<ISO>
+        disponibilidade dos materiais do ginásio em [inicio, fim)
+
+Todo o resto (páginas HTML, formulários, escritas) continua no app Flask,
+executado em threads via asgiref (WsgiToAsgi). O modo WSGI (app.py,
+"flask run", gunicorn app:app) não muda.
+"""
+
+import json
+import re
+from datetime import date, datetime, time, timedelta
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+from bson import ObjectId
+
+from app import app
+from camada_dados.agendamento_dao_async import AgendamentoDAOAsync
+from camada_dados.mongo_async import gerenciador_conexao_async
+from camada_dados.mongo_config import gerenciador_conexao
+from camada_negocio.cache_grade import cache_grade_semanal
+from camada_negocio.grade_semanal import montar_grade_semanal
+
+aplicacao_wsgi = WsgiToAsgi(app)
+dao_async = AgendamentoDAOAsync()
+
+
+def _para_json(valor):
+    """Converte datas, ObjectIds e namedtuples (RefOcupacao) em tipos JSON."""
+    if isinstance(valor, dict):
+        return {str(k) if not isinstance(k, (date, datetime)) else k.isoformat(): _para_json(v)
+                for k, v in valor.items()}
+    if hasattr(valor, '_asdict'):
+        return _para_json(valor._asdict())
+    if isinstance(valor, (list, tuple, set)):
+        return [_para_json(v) for v in valor]
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    if isinstance(valor, ObjectId):
+        return str(valor)
+    return valor
+
+
+async def _responder_json(send, corpo, status=200):
+    dados = json.dumps(_para_json(corpo), ensure_ascii=False).encode('utf-8')
+    await send({"type": "http.response.start", "status": status,
+                "headers": [(b"content-type", b"application/json; charset=utf-8"),
+                            (b"content-length", str(len(dados)).encode())]})
+    await send({"type": "http.response.body", "body": dados})
+
+
+def _parametros(scope):
+    consulta = parse_qs(scope.get('query_string', b'').decode('utf-8'))
+    return {chave: valores[-1] for chave, valores in consulta.items()}
+
+
+def _semana(semana_offset):
+    """Dias da semana (segunda a domingo) e o intervalo [inicio, fim) da semana, como no app Flask."""
+    hoje = datetime.now() + timedelta(weeks=semana_offset)
+    segunda_feira = hoje - timedelta(days=hoje.weekday())
+    dias = [segunda_feira.date() + timedelta(days=i) for i in range(7)]
+    return dias, datetime.combine(dias[0], time.min), datetime.combine(dias[-1] + timedelta(days=1), time.min)
+
+
+async def api_grade(parametros, id_ginasio, num_quadra):
+    dias, inicio_semana, fim_semana = _semana(int(parametros.get('semana', 0)))
+
+    chave_cache = cache_grade_semanal.chave(id_ginasio, num_quadra, inicio_semana)
+    versao = await dao_async.versao_quadra(id_ginasio, num_quadra)
+    grade = cache_grade_semanal.obter(chave_cache, versao)
+    geracao = cache_grade_semanal.geracao(id_ginasio, num_quadra) if grade is None else None
+
+    # O horário selecionado só é conhecido depois da grade (fim do slot),
+    # mas depende apenas da configuração: uma grade vazia basta para achá-lo
+    slot = None
+    slot_data, slot_hora = parametros.get('slot_data'), parametros.get('slot_hora')
+    if slot_data and slot_hora:
+        fim_horarios = (grade or montar_grade_semanal(dias, []))[2]
+        if slot_hora not in fim_horarios:
+            raise ValueError(f"Horário fora da grade: {slot_hora}")
+        slot = (datetime.fromisoformat(f"{slot_data}T{slot_hora}"),
+                datetime.fromisoformat(f"{slot_data}T{fim_horarios[slot_hora]}"))
+
+    dados = await dao_async.buscar_dados_grade(id_ginasio, num_quadra, inicio_semana, fim_semana,
+                                               slot=slot, incluir_ocupacoes=grade is None)
+    if grade is None:
+        if dados['ocupacoes'] is None:
+            # Nada de grade vazia no cache: a próxima requisição consulta de novo
+            raise RuntimeError("Não foi possível consultar as ocupações da quadra.")
+        grade = montar_grade_semanal(dias, dados['ocupacoes'])
+        cache_grade_semanal.guardar(chave_cache, grade, geracao, versao)
+        print(f"DEBUG[Grade-Async]: {len(dados['ocupacoes'])} ocupações distribuídas na semana {chave_cache[2:]}.")
+
+    horarios, agendamentos_por_dia, fim_horarios = grade
+    return {
+        "ginasio": dados['ginasio'],
+        "num_quadra": num_quadra,
+        "dias": dias,
+        "horarios": horarios,
+        "fim_horarios": fim_horarios,
+        "agendamentos_por_dia": agendamentos_por_dia,
+        "materiais": dados['materiais'],
+        "slot": slot,
+    }
+
+
+async def api_materiais(parametros, id_ginasio):
+    if not parametros.get('inicio') or not parametros.get('fim'):
+        raise ValueError("Informe 'inicio' e 'fim'.")
+    inicio = datetime.fromisoformat(parametros['inicio'])
+    fim = datetime.fromisoformat(parametros['fim'])
+    if fim <= inicio:
+        raise ValueError("'fim' deve ser depois de 'inicio'.")
+    return {"materiais": await dao_async.disponibilidade_materiais(id_ginasio, inicio, fim)}
+
+
+# (método, padrão do caminho, tratador). Os grupos do padrão viram argumentos inteiros.
+ROTAS_ASSINCRONAS = [
+    ("GET", re.compile(r"^/api/grade/(\d+)/(\d+)/?$"), api_grade),
+    ("GET", re.compile(r"^/api/materiais/(\d+)/?$"), api_materiais),
+]
+
+
+def _rota_assincrona(scope):
+    for metodo, padrao, tratador in ROTAS_ASSINCRONAS:
+        encontrado = padrao.match(scope['path'])
+        if encontrado and scope['method'] == metodo:
+            return tratador, [int(g) for g in encontrado.groups()]
+    return None, None
+
+
+async def _ciclo_de_vida(receive, send):
+    while True:
+        mensagem = await receive()
+        if mensagem['type'] == 'lifespan.startup':
+            await send({"type": "lifespan.startup.complete"})
+        elif mensagem['type'] == 'lifespan.shutdown':
+            await gerenciador_conexao_async.fechar()
+            gerenciador_conexao.fechar()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def aplicacao(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        await _ciclo_de_vida(receive, send)
+        return
+
+    tratador, argumentos = _rota_assincrona(scope) if scope['type'] == 'http' else (None, None)
+    if tratador is None:
+        await aplicacao_wsgi(scope, receive, send)
+        return
+
+    try:
+        corpo = await tratador(_parametros(scope), *argumentos)
+    except ValueError as e:
+        await _responder_json(send, {"erro": str(e)}, status=400)
+        return
+    except Exception as e:
+        print(f"Erro na rota assíncrona {scope['path']}: {e}")
+        await _responder_json(send, {"erro": "Erro interno ao consultar o banco."}, status=503)
+        return
+    await _responder_json(send, corpo)
@@ -1,9 +1,499 @@
 from camada_dados.mongo_config import conectar_mongo
 import psycopg2.extras
 from bson import ObjectId
+from pymongo import InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from modelos.ginasio import Ginasio
 from modelos.quadra import Quadra
-from datetime import datetime
+from modelos.recorrencia import Recorrencia, segmentos_diarios
+from camada_dados.evento_dao import (
+    filtro_recorrentes_da_quadra,
+    filtro_recorrentes_sobrepostos,
+    condicoes_recorrentes_no_intervalo,
+)
+from camada_dados.notificacoes import registrar_ouvinte, notificar_alteracao_quadra, ler_versao_quadra
+from camada_dados.indice_intervalos import GerenciadorIndicesIntervalos, IndiceIntervalosQuadra
+from camada_dados.catalogo import obter_catalogo
+from camada_dados.uso_diario import registrar_insercao, registrar_insercoes, registrar_transicao, registrar_remocao
+from camada_dados.reserva_materiais import (
+    MateriaisIndisponiveisError, montar_materiais_solicitados, reservar_materiais, liberar_materiais,
+)
+from datetime import datetime, timedelta
+import base64
+import os
+
+# Status que efetivamente ocupam a quadra. As consultas usam "$in" nesta lista
+# (em vez de "$ne": "cancelado") para casar com o índice parcial criado em
+# camada_dados/indices.py, que exclui os agendamentos cancelados.
+STATUS_QUE_OCUPAM = ['pendente', 'confirmado', 'realizado', 'nao_compareceu']
+
+
+def filtro_agendamentos_sobrepostos(id_ginasio, num_quadra, inicio, fim):
+    """
+    Monta o filtro de agendamentos ativos que se sobrepõem a [inicio, fim)
+    em uma quadra. Compartilhado entre as DAOs e a verificação de índices.
+    """
+    return {
+        "id_ginasio": int(id_ginasio),
+        "num_quadra": int(num_quadra),
+        "status_agendamento": {"$in": STATUS_QUE_OCUPAM},
+        # Lógica de sobreposição de horários do MongoDB:
+        # Início do conflito < Fim do novo E Fim do conflito > Início do novo
+        "hora_ini": {"$lt": fim},
+        "hora_fim": {"$gt": inicio}
+    }
+
+
+def filtro_eventos_extraordinarios_sobrepostos(id_ginasio, num_quadra, inicio, fim):
+    """
+    Monta o filtro de eventos extraordinários que bloqueiam a quadra
+    em algum momento de [inicio, fim).
+    """
+    return {
+        "tipo": "extraordinario",
+        "quadras_bloqueadas": {
+            "$elemMatch": {"id_ginasio": int(id_ginasio), "num_quadra": int(num_quadra)}
+        },
+        "data_hora_inicio": {"$lt": fim},
+        "data_hora_fim": {"$gt": inicio}
+    }
+
+
+def filtro_eventos_sobrepostos(id_ginasio, num_quadra, inicio, fim):
+    """
+    Monta o filtro de eventos (extraordinários ou recorrentes) que bloqueiam
+    a quadra em algum momento de [inicio, fim). Os recorrentes são
+    consultados por trecho diário, respeitando as exceções da regra.
+    """
+    ramos = [filtro_eventos_extraordinarios_sobrepostos(id_ginasio, num_quadra, inicio, fim)]
+    for dia, dia_semana, minuto_ini, minuto_fim in segmentos_diarios(inicio, fim):
+        data = datetime.combine(dia, datetime.min.time())
+        ramo = filtro_recorrentes_sobrepostos(id_ginasio, num_quadra, dia_semana, minuto_ini, minuto_fim, data, data)
+        ramo["recorrencia.excecoes"] = {"$ne": data}
+        ramos.append(ramo)
+    return {"$or": ramos}
+
+
+def consultas_ocupacoes(id_ginasio, num_quadra, data_inicio, data_fim):
+    """
+    As consultas que compõem as ocupações de uma quadra em [data_inicio,
+    data_fim): [(tipo, coleção, filtro, projeção)], com tipo 'agendamento',
+    'extraordinario' ou 'recorrente'. Compartilhadas pela DAO síncrona e
+    pela assíncrona.
+    """
+    # Eventos recorrentes: a validade fica em campos indexados de
+    # 'recorrencia'; cada regra é expandida depois em ocorrências concretas.
+    filtro_recorrentes = filtro_recorrentes_da_quadra(id_ginasio, num_quadra)
+    filtro_recorrentes.update({
+        "recorrencia.data_inicio": {"$lt": data_fim},
+        "recorrencia.data_fim": {"$gte": datetime.combine(data_inicio.date(), datetime.min.time())}
+    })
+    return [
+        ("agendamento", "agendamentos",
+         filtro_agendamentos_sobrepostos(id_ginasio, num_quadra, data_inicio, data_fim), None),
+        ("extraordinario", "eventos",
+         filtro_eventos_extraordinarios_sobrepostos(id_ginasio, num_quadra, data_inicio, data_fim), None),
+        ("recorrente", "eventos", filtro_recorrentes, {"nome": 1, "regra_recorrencia": 1, "recorrencia": 1}),
+    ]
+
+
+def converter_ocupacoes(tipo, docs, data_inicio, data_fim):
+    """Converte os documentos de uma das consultas_ocupacoes no formato de ocupação da grade."""
+    ocupacoes = []
+    for doc in docs:
+        if tipo == 'agendamento':
+            doc['tipo_ocupacao'] = 'agendamento'
+            doc['status'] = doc.get('status_agendamento')
+            ocupacoes.append(doc)
+        elif tipo == 'extraordinario':
+            doc['tipo_ocupacao'] = 'evento'
+            doc['status'] = 'bloqueado'
+            doc['hora_ini'] = doc.get('data_hora_inicio')
+            doc['hora_fim'] = doc.get('data_hora_fim')
+            doc['nome_evento'] = doc.get('nome')
+            ocupacoes.append(doc)
+        else:
+            regra = Recorrencia.do_documento(doc['recorrencia'])
+            for hora_ini, hora_fim in regra.expandir(data_inicio, data_fim):
+                ocupacoes.append({
+                    '_id': doc['_id'],
+                    'tipo_ocupacao': 'evento',
+                    'status': 'recorrente',
+                    'nome_evento': doc.get('nome'),
+                    'regra_recorrencia': doc.get('regra_recorrencia'),
+                    'hora_ini': hora_ini,
+                    'hora_fim': hora_fim
+                })
+    return ocupacoes
+
+
+# --- Reserva atômica de horários ---
+# Cada agendamento ativo guarda em 'slots_reservados' uma chave por fatia de
+# GRANULARIDADE_SLOT_MINUTOS minutos que ele ocupa ("gin:quadra:AAAAMMDDHHMM").
+# O índice único multikey sobre esse campo (camada_dados/indices.py) faz o
+# próprio servidor decidir, no insert_one, se o horário está livre: dois
+# agendamentos sobrepostos na mesma quadra compartilham ao menos uma chave e
+# o segundo recebe DuplicateKeyError. Ao cancelar, o campo é removido ($unset),
+# liberando as chaves; ao reativar um agendamento cancelado, as chaves são
+# gravadas de novo no mesmo update, sob o mesmo índice.
+GRANULARIDADE_SLOT_MINUTOS = 15
+
+RESERVA_CONFIRMADA = 'confirmada'
+RESERVA_INDISPONIVEL = 'indisponivel'
+RESERVA_ERRO = 'erro'
+RESERVA_MATERIAIS_INDISPONIVEIS = 'materiais_indisponiveis'
+
+
+def calcular_slots_reserva(id_ginasio, num_quadra, inicio, fim):
+    """
+    Retorna as chaves de reserva de todas as fatias de tempo que o
+    intervalo [inicio, fim) toca na quadra informada.
+    """
+    passo = timedelta(minutes=GRANULARIDADE_SLOT_MINUTOS)
+    minutos_no_dia = inicio.hour * 60 + inicio.minute
+    fatia = inicio.replace(second=0, microsecond=0) - timedelta(minutes=minutos_no_dia % GRANULARIDADE_SLOT_MINUTOS)
+
+    slots = []
+    while fatia < fim:
+        slots.append(f"{int(id_ginasio)}:{int(num_quadra)}:{fatia.strftime('%Y%m%d%H%M')}")
+        fatia += passo
+    return slots
+
+
+def montar_update_status(novo_status, slots_reservados=None):
+    """
+    Monta o update de mudança de status. Ao cancelar, libera as chaves de
+    reserva para que o horário volte a ficar disponível. Com
+    'slots_reservados' (reativação), grava as chaves junto com o status.
+    """
+    update = {"$set": {"status_agendamento": novo_status}}
+    if novo_status not in STATUS_QUE_OCUPAM:
+        update["$unset"] = {"slots_reservados": ""}
+    elif slots_reservados is not None:
+        update["$set"]["slots_reservados"] = slots_reservados
+    return update
+
+
+def ocupado_fora_do_indice_de_slots(db, id_ginasio, num_quadra, inicio, fim):
+    """
+    [MongoDB] O que o índice único de slots não enxerga e precisa ser
+    verificado antes da inserção: eventos (extraordinários e recorrentes)
+    e agendamentos antigos ainda sem 'slots_reservados' (ver
+    preencher_slots_reservados). Retorna True se [inicio, fim) está ocupado.
+    """
+    if db.eventos.find_one(filtro_eventos_sobrepostos(id_ginasio, num_quadra, inicio, fim), {"_id": 1}):
+        print("DEBUG[DAO-Mongo]: Horário bloqueado por um evento.")
+        return True
+
+    filtro_legados = filtro_agendamentos_sobrepostos(id_ginasio, num_quadra, inicio, fim)
+    filtro_legados["slots_reservados"] = {"$exists": False}
+    if db.agendamentos.find_one(filtro_legados, {"_id": 1}):
+        print("DEBUG[DAO-Mongo]: Horário ocupado por um agendamento sem slots reservados.")
+        return True
+    return False
+
+
+def inserir_com_reserva(db, documento):
+    """
+    Insere um agendamento reservando atomicamente os seus slots e o soma
+    aos contadores de uso diário. Retorna o _id inserido, ou None se algum slot já estiver ocupado.
+
+    Se o documento tiver 'materiais_solicitados', os materiais são reservados
+    antes (reserva_materiais.reservar_materiais, com o _id do agendamento) e
+    liberados se o horário estiver ocupado; sem estoque no intervalo, levanta
+    MateriaisIndisponiveisError e nada é gravado.
+    """
+    documento['slots_reservados'] = calcular_slots_reserva(
+        documento['id_ginasio'], documento['num_quadra'], documento['hora_ini'], documento['hora_fim']
+    )
+    materiais = documento.get('materiais_solicitados')
+    if materiais:
+        documento.setdefault('_id', ObjectId())
+        reservar_materiais(db, documento['id_ginasio'], materiais, documento['hora_ini'], documento['hora_fim'],
+                           documento['_id'])
+    try:
+        inserted_id = db.agendamentos.insert_one(documento).inserted_id
+    except DuplicateKeyError:
+        print(f"DEBUG[DAO-Mongo]: Horário já reservado na quadra {documento['num_quadra']} (Gin. {documento['id_ginasio']}).")
+        if materiais:
+            liberar_materiais(db, documento['_id'])
+        return None
+    except Exception:
+        if materiais:
+            liberar_materiais(db, documento['_id'])
+        raise
+    registrar_insercao(db, documento)
+    notificar_alteracao_quadra(documento['id_ginasio'], documento['num_quadra'], documento['hora_ini'], documento['hora_fim'])
+    return inserted_id
+
+
+def inserir_lote_com_reserva(db, documentos):
+    """
+    Versão em lote de inserir_com_reserva: todos os documentos vão em um
+    único bulk_write(ordered=False), e o índice único de slots decide cada
+    um individualmente. Retorna uma lista, na ordem dos documentos, com o
+    _id inserido ou None para os que encontraram o horário já reservado.
+    Outros erros de escrita são propagados, depois de registrar no uso
+    diário e avisar as alterações dos documentos que chegaram a ser gravados
+    (com ordered=False o servidor continua o lote após um erro).
+    """
+    if not documentos:
+        return []
+    operacoes = []
+    for documento in documentos:
+        documento.setdefault('_id', ObjectId())
+        documento['slots_reservados'] = calcular_slots_reserva(
+            documento['id_ginasio'], documento['num_quadra'], documento['hora_ini'], documento['hora_fim']
+        )
+        operacoes.append(InsertOne(documento))
+
+    recusados = set()
+    try:
+        db.agendamentos.bulk_write(operacoes, ordered=False)
+    except BulkWriteError as e:
+        erros = e.details.get('writeErrors', [])
+        recusados = {erro['index'] for erro in erros}
+        if any(erro.get('code') != 11000 for erro in erros):
+            inseridos = _registrar_lote_inserido(db, documentos, recusados)
+            print(f"ERRO[DAO-Mongo]: lote de {len(documentos)} agendamentos com erros de escrita; "
+                  f"{len(inseridos)} inseridos (nInserted={e.details.get('nInserted')}).")
+            raise
+
+    inseridos = _registrar_lote_inserido(db, documentos, recusados)
+    print(f"DEBUG[DAO-Mongo]: lote de {len(documentos)} agendamentos: {len(inseridos)} inseridos, {len(recusados)} já reservados.")
+    return [None if i in recusados else doc['_id'] for i, doc in enumerate(documentos)]
+
+
+def _registrar_lote_inserido(db, documentos, com_erro):
+    """
+    Soma ao uso diário e avisa a alteração das quadras dos documentos do
+    lote que foram gravados (todos menos os índices em 'com_erro').
+    Retorna a lista dos documentos gravados.
+    """
+    inseridos = [doc for i, doc in enumerate(documentos) if i not in com_erro]
+    registrar_insercoes(db, inseridos)
+    for doc in inseridos:
+        notificar_alteracao_quadra(doc['id_ginasio'], doc['num_quadra'], doc['hora_ini'], doc['hora_fim'])
+    return inseridos
+
+
+# Campos que os avisos de alteração (e a liberação de materiais) precisam
+# saber do agendamento alterado
+_PROJECAO_QUADRA_HORARIO = {"id_ginasio": 1, "num_quadra": 1, "hora_ini": 1, "hora_fim": 1, "status_agendamento": 1,
+                            "materiais_solicitados": 1}
+
+
+def _reativar_agendamento(db, filtro, novo_status):
+    """
+    Volta um agendamento que não ocupa a quadra (ex.: cancelado) a um status
+    que ocupa, gravando de novo as suas chaves de reserva no mesmo update.
+    Se outro agendamento reservou o horário nesse meio tempo, o índice único
+    recusa (DuplicateKeyError) e nada muda.
+
+    Os materiais_solicitados, liberados no cancelamento, são reservados de
+    novo antes (reservar_materiais, que grava e depois confere o estoque) e
+    liberados se a reativação não acontecer; sem estoque no intervalo, a
+    reativação é recusada.
+    Retorna o documento ANTES da alteração, ou None se não encontrado ou
+    recusado.
+    """
+    anterior = db.agendamentos.find_one(filtro, _PROJECAO_QUADRA_HORARIO)
+    if anterior is None or anterior.get('status_agendamento') in STATUS_QUE_OCUPAM:
+        return None
+
+    materiais = anterior.get('materiais_solicitados')
+    if materiais:
+        try:
+            reservar_materiais(db, anterior['id_ginasio'], materiais, anterior['hora_ini'], anterior['hora_fim'],
+                               anterior['_id'])
+        except MateriaisIndisponiveisError as e:
+            print(f"DEBUG[DAO-Mongo]: Reativação do agendamento {anterior['_id']} recusada: {e}")
+            return None
+
+    slots = calcular_slots_reserva(anterior['id_ginasio'], anterior['num_quadra'], anterior['hora_ini'], anterior['hora_fim'])
+    resultado = None
+    try:
+        # O status lido entra no filtro: se mudou desde a leitura, não aplica
+        resultado = db.agendamentos.update_one(
+            {"_id": anterior['_id'], "status_agendamento": anterior.get('status_agendamento')},
+            montar_update_status(novo_status, slots)
+        )
+    except DuplicateKeyError:
+        print(f"DEBUG[DAO-Mongo]: Reativação do agendamento {anterior['_id']} recusada: horário já reservado.")
+    finally:
+        if materiais and (resultado is None or not resultado.modified_count):
+            liberar_materiais(db, anterior['_id'])
+    return anterior if resultado is not None and resultado.modified_count else None
+
+
+def alterar_status_agendamento(db, filtro, novo_status):
+    """
+    Aplica a mudança de status (montar_update_status) ao agendamento do
+    filtro e avisa a alteração da quadra. Usa find_one_and_update para saber,
+    na mesma operação, qual quadra/horário foi afetado. Ao cancelar, libera
+    também os materiais reservados; ao reativar um agendamento cancelado,
+    reserva de novo o horário e os materiais (_reativar_agendamento).
+    Retorna o documento ANTES da alteração, ou None se não encontrado ou se
+    a reativação foi recusada (horário já reservado ou materiais sem estoque).
+    """
+    filtro_update = filtro
+    if novo_status in STATUS_QUE_OCUPAM:
+        # Entre status que ocupam a quadra as chaves de reserva não mudam;
+        # vindo de um status que não ocupa, é uma reativação.
+        filtro_update = {"$and": [filtro, {"status_agendamento": {"$in": STATUS_QUE_OCUPAM}}]}
+    anterior = db.agendamentos.find_one_and_update(
+        filtro_update, montar_update_status(novo_status),
+        projection=_PROJECAO_QUADRA_HORARIO, return_document=ReturnDocument.BEFORE
+    )
+    if anterior is None and novo_status in STATUS_QUE_OCUPAM:
+        anterior = _reativar_agendamento(db, filtro, novo_status)
+    if anterior is not None and anterior.get('status_agendamento') != novo_status:
+        if anterior.get('materiais_solicitados') and novo_status not in STATUS_QUE_OCUPAM:
+            liberar_materiais(db, anterior['_id'])
+        registrar_transicao(db, anterior, novo_status)
+        notificar_alteracao_quadra(anterior['id_ginasio'], anterior['num_quadra'], anterior['hora_ini'], anterior['hora_fim'])
+    return anterior
+
+# --- Listagem administrativa paginada ---
+# Paginação por chave (keyset) sobre (hora_ini, _id), do mais novo para o
+# mais antigo: cada página continua a partir do último documento da anterior
+# ("hora_ini < h OU (hora_ini == h E _id < id)"), então o custo de uma página
+# não depende de quantas vieram antes. Os filtros casam com os índices
+# agendamentos_horario_id, agendamentos_quadra_horario_id,
+# agendamentos_status_horario_id e agendamentos_usuario_horario.
+LISTAGEM_TAMANHO_PAGINA = int(os.environ.get('LISTAGEM_TAMANHO_PAGINA', 50))
+LISTAGEM_MAX_TAMANHO_PAGINA = 200
+
+ORDENACAO_LISTAGEM = [("hora_ini", -1), ("_id", -1)]
+
+# Apenas os campos que admin_ver_agendamentos.html exibe
+_PROJECAO_LISTAGEM = {
+    "hora_ini": 1, "id_ginasio": 1, "num_quadra": 1, "status_agendamento": 1,
+    "usuario_info.nome": 1, "local_info.nome_ginasio": 1,
+}
+
+_PROJECAO_EXPORTACAO = dict(
+    _PROJECAO_LISTAGEM, hora_fim=1, cpf_usuario=1, motivo=1, data_solicitacao=1,
+    id_bolsista_operador=1,
+)
+
+
+def montar_filtro_listagem(data_inicio=None, data_fim=None, id_ginasio=None, num_quadra=None,
+                           status=None, cpf_usuario=None):
+    """
+    Filtro da listagem administrativa. data_inicio/data_fim são datas
+    (inclusivas). Ginásio sem quadra é expandido para as quadras do
+    catálogo, para que o índice por quadra ainda entregue a ordenação.
+    """
+    filtro = {}
+    if id_ginasio is not None:
+        filtro["id_ginasio"] = int(id_ginasio)
+        if num_quadra is not None:
+            filtro["num_quadra"] = int(num_quadra)
+        else:
+            catalogo = obter_catalogo()
+            quadras = catalogo.quadras_do_ginasio(id_ginasio) if catalogo else []
+            if quadras:
+                filtro["num_quadra"] = {"$in": [q.get('num_quadra') for q in quadras]}
+    if status:
+        filtro["status_agendamento"] = status
+    if cpf_usuario:
+        filtro["cpf_usuario"] = cpf_usuario
+
+    faixa = {}
+    if data_inicio is not None:
+        faixa["$gte"] = datetime.combine(data_inicio, datetime.min.time())
+    if data_fim is not None:
+        faixa["$lt"] = datetime.combine(data_fim + timedelta(days=1), datetime.min.time())
+    if faixa:
+        filtro["hora_ini"] = faixa
+    return filtro
+
+
+def codificar_cursor_listagem(doc):
+    """Cursor opaco (seguro para URL) com a posição (hora_ini, _id) do documento."""
+    _id = doc['_id']
+    if isinstance(_id, ObjectId):
+        chave = f"o:{_id}"
+    elif isinstance(_id, int):
+        chave = f"i:{_id}"
+    else:
+        chave = f"s:{_id}"
+    bruto = f"{doc['hora_ini'].isoformat()}|{chave}"
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor_listagem(cursor):
+    """Inverso de codificar_cursor_listagem. Levanta ValueError se inválido."""
+    try:
+        bruto = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        hora_ini, chave = bruto.split("|", 1)
+        tipo, valor = chave.split(":", 1)
+        _id = {"o": ObjectId, "i": int, "s": str}[tipo](valor)
+        return datetime.fromisoformat(hora_ini), _id
+    except Exception as e:
+        raise ValueError(f"Cursor de paginação inválido: {cursor!r}") from e
+
+
+def filtro_apos_cursor(hora_ini, _id):
+    """Documentos que vêm depois de (hora_ini, _id) na ORDENACAO_LISTAGEM."""
+    return {"$or": [
+        {"hora_ini": {"$lt": hora_ini}},
+        {"hora_ini": hora_ini, "_id": {"$lt": _id}},
+    ]}
+
+
+def pipeline_conflitos(quadras, ramos_agendamentos, ramos_extraordinarios, ramos_recorrentes):
+    """
+    Agregação (sobre 'agendamentos') que junta, via $unionWith em 'eventos',
+    as ocupações que casam com algum dos ramos de filtro: agendamentos,
+    eventos extraordinários e eventos recorrentes. Cada ocupação sai com
+    tipo_ocupacao, id_ginasio, num_quadra, hora_ini/hora_fim (ou recorrencia)
+    e nome. Usada por buscar_conflitos_em_lote e buscar_conflitos_por_pedido.
+    """
+    # Um evento pode bloquear quadras que não estão sendo verificadas:
+    # após o $unwind, só ficam as quadras pedidas.
+    quadras_pedidas = {"$or": [
+        {"quadras_bloqueadas.id_ginasio": id_ginasio, "quadras_bloqueadas.num_quadra": num_quadra}
+        for id_ginasio, num_quadra in quadras
+    ]}
+    # Filtro que não casa nada (resolvido pelo índice de _id)
+    nenhum = {"_id": None}
+
+    pipeline = [
+        {"$match": {"$or": ramos_agendamentos} if ramos_agendamentos else nenhum},
+        {"$project": {
+            "tipo_ocupacao": {"$literal": "agendamento"},
+            "id_ginasio": 1, "num_quadra": 1, "hora_ini": 1, "hora_fim": 1,
+            "nome": {"$ifNull": ["$motivo", "$usuario_info.nome"]}
+        }},
+        {"$unionWith": {"coll": "eventos", "pipeline": [
+            {"$match": {"$or": ramos_extraordinarios} if ramos_extraordinarios else nenhum},
+            {"$unwind": "$quadras_bloqueadas"},
+            {"$match": quadras_pedidas},
+            {"$project": {
+                "tipo_ocupacao": {"$literal": "evento"},
+                "id_ginasio": "$quadras_bloqueadas.id_ginasio",
+                "num_quadra": "$quadras_bloqueadas.num_quadra",
+                "hora_ini": "$data_hora_inicio", "hora_fim": "$data_hora_fim",
+                "nome": 1
+            }}
+        ]}},
+        {"$unionWith": {"coll": "eventos", "pipeline": [
+            {"$match": {"$or": ramos_recorrentes} if ramos_recorrentes else nenhum},
+            {"$unwind": "$quadras_bloqueadas"},
+            {"$match": quadras_pedidas},
+            {"$project": {
+                "tipo_ocupacao": {"$literal": "evento_recorrente"},
+                "id_ginasio": "$quadras_bloqueadas.id_ginasio",
+                "num_quadra": "$quadras_bloqueadas.num_quadra",
+                "recorrencia": 1, "regra_recorrencia": 1,
+                "nome": 1
+            }}
+        ]}},
+    ]
+    return pipeline
+
 
 class AgendamentoDAO:
     
@@ -265,16 +755,8 @@ class AgendamentoDAO:
             return True # Assume conflito por segurança se não puder conectar
 
         try:
-            # Filtro para encontrar conflitos em AGENDAMENTOS
-            filtro_agendamento = {
-                "id_ginasio": int(id_ginasio),
-                "num_quadra": int(num_quadra),
-                "status_agendamento": {"$ne": "cancelado"}, # Onde o status NÃO SEJA 'cancelado'
-                # Lógica de sobreposição de horários do MongoDB:
-                # Início do conflito < Fim do novo E Fim do conflito > Início do novo
-                "hora_ini": {"$lt": fim},
-                "hora_fim": {"$gt": inicio}
-            }
+            # Filtro para encontrar conflitos em AGENDAMENTOS (apenas os que ocupam a quadra)
+            filtro_agendamento = filtro_agendamentos_sobrepostos(id_ginasio, num_quadra, inicio, fim)
             
             # Busca se existe pelo menos UM agendamento que bate com o filtro
             conflito_agendamento = db.agendamentos.find_one(filtro_agendamento)
@@ -284,14 +766,7 @@ class AgendamentoDAO:
                 return True
 
             # Filtro para encontrar conflitos em EVENTOS EXTRAORDINÁRIOS
-            filtro_evento = {
-                "tipo": "extraordinario",
-                "quadras_bloqueadas": {
-                    "$elemMatch": {"id_ginasio": int(id_ginasio), "num_quadra": int(num_quadra)}
-                },
-                "data_hora_inicio": {"$lt": fim},
-                "data_hora_fim": {"$gt": inicio}
-            }
+            filtro_evento = filtro_eventos_extraordinarios_sobrepostos(id_ginasio, num_quadra, inicio, fim)
             
             # Busca se existe pelo menos UM evento que bate com o filtro
             conflito_evento = db.eventos.find_one(filtro_evento)
@@ -308,6 +783,117 @@ class AgendamentoDAO:
             print(f"Erro ao verificar conflito de horário no MongoDB: {e}")
             return True # Em caso de erro, assume conflito por segurança
 
+    def buscar_conflitos_em_lote(self, quadras, intervalos=None, recorrencia=None):
+        """
+        [MongoDB] Verifica de uma só vez várias quadras contra vários intervalos
+        de tempo. Recebe a lista de quadras [(id_ginasio, num_quadra), ...] e
+        OU uma lista de intervalos [(inicio, fim), ...] OU uma Recorrencia
+        (expandida aqui em ocorrências).
+
+        Uma única agregação percorre 'agendamentos' e, via $unionWith, os
+        eventos extraordinários e recorrentes de 'eventos'; cada ramo do $or é
+        resolvido pelos índices de quadra/horário. Retorna a lista de
+        ocupações conflitantes (vazia se estiver tudo livre) ou None em caso
+        de erro, que deve ser tratado como conflito.
+        """
+        quadras = [(int(id_ginasio), int(num_quadra)) for id_ginasio, num_quadra in quadras]
+        if recorrencia is not None:
+            intervalos = recorrencia.expandir(recorrencia.data_inicio, recorrencia.data_fim + timedelta(days=1))
+        intervalos = list(intervalos or [])
+        if not quadras or (not intervalos and recorrencia is None):
+            return []
+
+        db = conectar_mongo()
+        if db is None:
+            return None
+
+        ramos_agendamentos = [
+            filtro_agendamentos_sobrepostos(id_ginasio, num_quadra, inicio, fim)
+            for id_ginasio, num_quadra in quadras for inicio, fim in intervalos
+        ]
+        ramos_extraordinarios = [
+            filtro_eventos_extraordinarios_sobrepostos(id_ginasio, num_quadra, inicio, fim)
+            for id_ginasio, num_quadra in quadras for inicio, fim in intervalos
+        ]
+        if recorrencia is not None:
+            ramos_recorrentes = [
+                filtro_recorrentes_sobrepostos(
+                    id_ginasio, num_quadra, recorrencia.dia_semana,
+                    recorrencia.minuto_inicio, recorrencia.minuto_fim,
+                    recorrencia.data_inicio, recorrencia.data_fim
+                )
+                for id_ginasio, num_quadra in quadras
+            ]
+        else:
+            condicoes = [c for inicio, fim in intervalos for c in condicoes_recorrentes_no_intervalo(inicio, fim)]
+            ramos_recorrentes = [
+                dict(filtro_recorrentes_da_quadra(id_ginasio, num_quadra), **{"$or": condicoes})
+                for id_ginasio, num_quadra in quadras
+            ]
+
+        pipeline = pipeline_conflitos(quadras, ramos_agendamentos, ramos_extraordinarios, ramos_recorrentes)
+
+        try:
+            conflitos = list(db.agendamentos.aggregate(pipeline))
+            print(f"DEBUG[DAO-Mongo]: {len(conflitos)} conflito(s) em {len(quadras)} quadra(s) x {len(intervalos)} intervalo(s).")
+            return conflitos
+        except Exception as e:
+            print(f"Erro ao buscar conflitos em lote no MongoDB: {e}")
+            return None
+
+    def buscar_conflitos_por_pedido(self, pedidos):
+        """
+        [MongoDB] Como buscar_conflitos_em_lote, mas para pedidos independentes
+        [(id_ginasio, num_quadra, inicio, fim), ...]: cada quadra só é comparada
+        com os seus próprios intervalos, tudo na mesma agregação.
+        Retorna uma lista, na ordem dos pedidos, com as ocupações que
+        conflitam com cada um; None em caso de erro.
+        """
+        pedidos = [(int(g), int(q), inicio, fim) for g, q, inicio, fim in pedidos]
+        if not pedidos:
+            return []
+
+        db = conectar_mongo()
+        if db is None:
+            return None
+
+        intervalos_por_quadra = {}
+        for g, q, inicio, fim in pedidos:
+            intervalos_por_quadra.setdefault((g, q), []).append((inicio, fim))
+
+        ramos_agendamentos = [filtro_agendamentos_sobrepostos(g, q, inicio, fim) for g, q, inicio, fim in pedidos]
+        ramos_extraordinarios = [filtro_eventos_extraordinarios_sobrepostos(g, q, inicio, fim) for g, q, inicio, fim in pedidos]
+        ramos_recorrentes = [
+            dict(filtro_recorrentes_da_quadra(g, q), **{"$or": [
+                c for inicio, fim in intervalos for c in condicoes_recorrentes_no_intervalo(inicio, fim)
+            ]})
+            for (g, q), intervalos in intervalos_por_quadra.items()
+        ]
+        pipeline = pipeline_conflitos(list(intervalos_por_quadra), ramos_agendamentos,
+                                      ramos_extraordinarios, ramos_recorrentes)
+        try:
+            ocupacoes = list(db.agendamentos.aggregate(pipeline))
+        except Exception as e:
+            print(f"Erro ao buscar conflitos por pedido no MongoDB: {e}")
+            return None
+
+        por_quadra = {}
+        for ocupacao in ocupacoes:
+            por_quadra.setdefault((ocupacao.get('id_ginasio'), ocupacao.get('num_quadra')), []).append(ocupacao)
+
+        conflitos = []
+        for g, q, inicio, fim in pedidos:
+            do_pedido = []
+            for ocupacao in por_quadra.get((g, q), []):
+                if ocupacao['tipo_ocupacao'] == 'evento_recorrente':
+                    if ocupacao.get('recorrencia') and Recorrencia.do_documento(ocupacao['recorrencia']).expandir(inicio, fim):
+                        do_pedido.append(ocupacao)
+                elif ocupacao['hora_ini'] < fim and ocupacao['hora_fim'] > inicio:
+                    do_pedido.append(ocupacao)
+            conflitos.append(do_pedido)
+        print(f"DEBUG[DAO-Mongo]: {len(ocupacoes)} ocupação(ões) conflitante(s) para {len(pedidos)} pedido(s).")
+        return conflitos
+
     def buscar_todos_os_agendamentos(self):
         """
         [MongoDB] Busca todos os documentos da coleção 'agendamentos'.
@@ -334,72 +920,119 @@ class AgendamentoDAO:
             print(f"Erro ao buscar todos os agendamentos no MongoDB: {e}")
             
         return agendamentos
+
+    def buscar_pagina_agendamentos(self, filtros=None, cursor=None, tamanho=None):
+        """
+        [MongoDB] Uma página da listagem administrativa, do mais novo para o
+        mais antigo. 'filtros' são os argumentos de montar_filtro_listagem;
+        'cursor' é o proximo_cursor devolvido pela página anterior.
+        Retorna (agendamentos, proximo_cursor); proximo_cursor é None na
+        última página. Em caso de erro, retorna ([], None).
+        """
+        db = conectar_mongo()
+        if db is None:
+            return [], None
+
+        tamanho = LISTAGEM_TAMANHO_PAGINA if not tamanho else min(int(tamanho), LISTAGEM_MAX_TAMANHO_PAGINA)
+        try:
+            filtro = montar_filtro_listagem(**(filtros or {}))
+            if cursor:
+                filtro.update(filtro_apos_cursor(*decodificar_cursor_listagem(cursor)))
+
+            # Um documento a mais só para saber se existe próxima página
+            docs = list(db.agendamentos.find(filtro, _PROJECAO_LISTAGEM)
+                        .sort(ORDENACAO_LISTAGEM).limit(tamanho + 1))
+        except Exception as e:
+            print(f"Erro ao buscar página de agendamentos no MongoDB: {e}")
+            return [], None
+
+        proximo_cursor = codificar_cursor_listagem(docs[tamanho - 1]) if len(docs) > tamanho else None
+        agendamentos = []
+        for doc in docs[:tamanho]:
+            agendamentos.append({
+                "id_agendamento": doc['_id'],
+                "hora_ini": doc.get('hora_ini'),
+                "id_ginasio": doc.get('id_ginasio'),
+                "num_quadra": doc.get('num_quadra'),
+                "status_agendamento": doc.get('status_agendamento'),
+                "nome_usuario": doc.get('usuario_info', {}).get('nome', 'N/A'),
+                "nome_ginasio": doc.get('local_info', {}).get('nome_ginasio', 'N/A'),
+            })
+        print(f"DEBUG[DAO-Mongo]: página com {len(agendamentos)} agendamento(s) (mais páginas: {proximo_cursor is not None}).")
+        return agendamentos, proximo_cursor
+
+    def iterar_agendamentos(self, filtros=None, tamanho_lote=1000):
+        """
+        [MongoDB] Gerador com todos os agendamentos que casam com os filtros
+        da listagem administrativa (montar_filtro_listagem), na mesma ordem.
+        O cursor busca 'tamanho_lote' documentos por vez, então a memória
+        não cresce com o total. Erros do banco são propagados: quem exporta
+        precisa saber que a saída ficou incompleta.
+        """
+        db = conectar_mongo()
+        if db is None:
+            raise RuntimeError("Sem conexão com o MongoDB.")
+
+        cursor = (db.agendamentos.find(montar_filtro_listagem(**(filtros or {})), _PROJECAO_EXPORTACAO)
+                  .sort(ORDENACAO_LISTAGEM).batch_size(tamanho_lote))
+        try:
+            for doc in cursor:
+                yield {
+                    "id_agendamento": doc['_id'],
+                    "hora_ini": doc.get('hora_ini'),
+                    "hora_fim": doc.get('hora_fim'),
+                    "status_agendamento": doc.get('status_agendamento'),
+                    "id_ginasio": doc.get('id_ginasio'),
+                    "nome_ginasio": doc.get('local_info', {}).get('nome_ginasio'),
+                    "num_quadra": doc.get('num_quadra'),
+                    "cpf_usuario": doc.get('cpf_usuario'),
+                    "nome_usuario": doc.get('usuario_info', {}).get('nome'),
+                    "motivo": doc.get('motivo'),
+                    "data_solicitacao": doc.get('data_solicitacao'),
+                    "id_bolsista_operador": doc.get('id_bolsista_operador'),
+                }
+        finally:
+            cursor.close()
     
     def buscar_agendamentos_por_quadra(self, id_ginasio, num_quadra, data_inicio, data_fim):
         """
         [MongoDB] Busca tanto AGENDAMENTOS quanto EVENTOS para uma quadra específica
-        dentro de um intervalo de datas.
+        dentro de um intervalo de datas. Dentro da janela do índice de
+        intervalos em memória a resposta vem dele, sem ir ao banco.
+        Retorna None se o banco estiver indisponível ou a consulta falhar
+        (diferente de [], quadra livre), para que a grade não seja guardada
+        em cache como se estivesse vazia.
         """
+        indice = indices_intervalos.obter(id_ginasio, num_quadra, data_inicio, data_fim)
+        if indice is not None:
+            # Cópias rasas: o chamador pode anotar os dicionários sem afetar o índice
+            return [dict(o) for o in indice.ocupacoes_sobrepostas(data_inicio, data_fim)]
+
         db = conectar_mongo()
         if db is None:
-            return []
-            
-        ocupacoes = []
+            return None
+
         try:
-            # --- Busca Agendamentos ---
-            filtro_agendamento = {
-                "id_ginasio": int(id_ginasio),
-                "num_quadra": int(num_quadra),
-                "status_agendamento": {"$ne": "cancelado"},
-                "hora_ini": {"$lt": data_fim}, # Começa antes do fim do intervalo
-                "hora_fim": {"$gt": data_inicio} # Termina depois do início do intervalo
-            }
-            agendamentos = db.agendamentos.find(filtro_agendamento)
-            
-            for doc in agendamentos:
-                doc['tipo_ocupacao'] = 'agendamento'
-                doc['status'] = doc.get('status_agendamento')
-                ocupacoes.append(doc)
-            
-            # --- Busca Eventos Extraordinários ---
-            filtro_evento_extra = {
-                "tipo": "extraordinario",
-                "quadras_bloqueadas": {"$elemMatch": {"id_ginasio": int(id_ginasio), "num_quadra": int(num_quadra)}},
-                "data_hora_inicio": {"$lt": data_fim},
-                "data_hora_fim": {"$gt": data_inicio}
-            }
-            eventos_extra = db.eventos.find(filtro_evento_extra)
-            
-            for doc in eventos_extra:
-                doc['tipo_ocupacao'] = 'evento'
-                doc['status'] = 'bloqueado'
-                doc['hora_ini'] = doc.get('data_hora_inicio')
-                doc['hora_fim'] = doc.get('data_hora_fim')
-                doc['nome_evento'] = doc.get('nome')
-                ocupacoes.append(doc)
-
-            # --- Busca Eventos Recorrentes (lógica permanece em Python na rota) ---
-            # Adicionamos os recorrentes aqui para que a rota possa processá-los
-            filtro_evento_rec = {
-                "tipo": "recorrente",
-                "quadras_bloqueadas": {"$elemMatch": {"id_ginasio": int(id_ginasio), "num_quadra": int(num_quadra)}},
-                "data_fim_recorrencia": {"$gte": data_inicio}
-            }
-            eventos_rec = db.eventos.find(filtro_evento_rec)
-
-            for doc in eventos_rec:
-                 doc['tipo_ocupacao'] = 'evento'
-                 doc['status'] = 'recorrente'
-                 # A chave 'nome_evento' já existe como 'nome' no documento 'doc'.
-                 # Vamos apenas garantir que ela seja chamada de 'nome_evento' para o template.
-                 doc['nome_evento'] = doc.get('nome')
-                 ocupacoes.append(doc)
-                 
+            ocupacoes = self.buscar_ocupacoes_no_banco(db, id_ginasio, num_quadra, data_inicio, data_fim)
             print(f"DEBUG[DAO-Mongo]: Encontradas {len(ocupacoes)} ocupações (agendamentos + eventos).")
-                
+            return ocupacoes
         except Exception as e:
             print(f"Erro ao buscar ocupações por quadra no MongoDB: {e}")
-            
+            return None
+
+    def buscar_ocupacoes_no_banco(self, db, id_ginasio, num_quadra, data_inicio, data_fim):
+        """
+        [MongoDB] Consulta as ocupações da quadra diretamente no banco
+        (agendamentos ativos, eventos extraordinários e ocorrências dos
+        recorrentes). Levanta exceção em caso de erro; usada também para
+        carregar o índice de intervalos.
+        """
+        # As três consultas são independentes; a versão assíncrona
+        # (agendamento_dao_async) as executa em paralelo.
+        ocupacoes = []
+        for tipo, colecao, filtro, projecao in consultas_ocupacoes(id_ginasio, num_quadra, data_inicio, data_fim):
+            docs = db[colecao].find(filtro, projecao)
+            ocupacoes.extend(converter_ocupacoes(tipo, docs, data_inicio, data_fim))
         return ocupacoes
 
     def admin_atualizar_status(self, id_agendamento, novo_status):
@@ -420,17 +1053,14 @@ class AgendamentoDAO:
                 # Converte a string do ID para um objeto ObjectId do MongoDB
                 obj_id = ObjectId(id_agendamento)
                 
-                # Comando Mongo: db.<colecao>.update_one({filtro}, {operador_de_update})
-                resultado = db.agendamentos.update_one(
-                    {"_id": obj_id}, # Filtro para encontrar o agendamento pelo seu _id
-                    {"$set": {"status_agendamento": novo_status}} # Define o novo status
-                )
+                # Define o novo status (e libera os slots se cancelado)
+                anterior = alterar_status_agendamento(db, {"_id": obj_id}, novo_status)
                 
-                if resultado.modified_count > 0:
+                if anterior is not None and anterior.get('status_agendamento') != novo_status:
                     sucesso = True
                     print(f"DEBUG[DAO-Mongo]: Status do agendamento ID {id_agendamento} atualizado para '{novo_status}'.")
                 else:
-                    print(f"DEBUG[DAO-Mongo]: Nenhum agendamento com ID {id_agendamento} foi encontrado para atualizar.")
+                    print(f"DEBUG[DAO-Mongo]: Agendamento ID {id_agendamento} não encontrado, ou horário já reservado por outro agendamento.")
 
             except Exception as e:
                 print(f"Erro ao atualizar status do agendamento (admin) no MongoDB: {e}")
@@ -466,93 +1096,78 @@ class AgendamentoDAO:
 
 
 # --- Funções Auxiliares criadas pelo José ---
+def _carregar_indice_intervalos(id_ginasio, num_quadra, inicio, fim):
+    db = conectar_mongo()
+    if db is None:
+        raise RuntimeError("Sem conexão com o MongoDB.")
+    return AgendamentoDAO().buscar_ocupacoes_no_banco(db, id_ginasio, num_quadra, inicio, fim)
+
+
+def _indice_da_quadra(id_ginasio, num_quadra, inicio, fim):
+    """
+    Índice de intervalos que cobre [inicio, fim): o da janela em memória ou,
+    fora dela, um montado na hora com as mesmas três consultas (agendamentos,
+    extraordinários e ocorrências dos recorrentes), para que a resposta não
+    dependa de a data cair dentro da janela. Levanta exceção se o banco falhar.
+    """
+    indice = indices_intervalos.obter(id_ginasio, num_quadra, inicio, fim)
+    if indice is not None:
+        return indice
+    return IndiceIntervalosQuadra(_carregar_indice_intervalos(id_ginasio, num_quadra, inicio, fim), inicio, fim)
+
+
+def alinhar_ao_slot(instante):
+    """Arredonda para cima até o início de uma fatia de GRANULARIDADE_SLOT_MINUTOS (como calcular_slots_reserva)."""
+    passo = timedelta(minutes=GRANULARIDADE_SLOT_MINUTOS)
+    meia_noite = datetime.combine(instante.date(), datetime.min.time())
+    return meia_noite - ((meia_noite - instante) // passo) * passo
+
+
+# Índice de intervalos por quadra, invalidado pelos avisos de escrita
+# (protocolo descrito em camada_dados/indice_intervalos.py)
+indices_intervalos = GerenciadorIndicesIntervalos(_carregar_indice_intervalos, ler_versao_quadra)
+registrar_ouvinte(indices_intervalos.invalidar)
+
+
+def _ginasio_do_documento(doc):
+    return Ginasio(
+        id_ginasio=doc.get('_id'),
+        nome=doc.get('nome'),
+        endereco=doc.get('endereco'),
+        capacidade=doc.get('capacidade')
+    )
+
+
 def get_ginasio_por_id(id_ginasio):  # --- Refatorada para o MongoDB
     """
-    [MongoDB] Busca um único ginásio pelo seu _id.
+    [MongoDB] Busca um único ginásio pelo seu _id (via catálogo em memória).
     Retorna um objeto Ginasio para manter a compatibilidade.
     """
-    db = conectar_mongo()
-    if db is None:
-        return None
-        
-    try:
-        # Busca o documento na coleção 'ginasios' pelo _id (convertido para int)
-        doc = db.ginasios.find_one({"_id": int(id_ginasio)})
-        
-        if doc:
-            # Reconstrói o objeto Ginasio a partir do dicionário
-            return Ginasio(
-                id_ginasio=doc.get('_id'),
-                nome=doc.get('nome'),
-                endereco=doc.get('endereco'),
-                capacidade=doc.get('capacidade')
-            )
-    except Exception as e:
-        print(f"Erro ao buscar ginásio por ID no MongoDB: {e}")
-        
-    return None
+    catalogo = obter_catalogo()
+    doc = catalogo.ginasio(id_ginasio) if catalogo else None
+    return _ginasio_do_documento(doc) if doc else None
 
 def buscar_ginasios():  # --- Refatorada para o MongoDB
     """
-    [MongoDB] Busca todos os ginásios na coleção 'ginasios'.
+    [MongoDB] Busca todos os ginásios, ordenados por nome (via catálogo em memória).
     Retorna uma lista de objetos Ginasio para manter a compatibilidade
     com o código existente.
     """
-    db = conectar_mongo()
-    if db is None:
-        return []
-        
-    ginasios_obj = []
-    try:
-        # Busca todos os documentos na coleção e ordena por nome
-        resultados = db.ginasios.find({}).sort("nome", 1)
-        
-        # Converte cada dicionário do Mongo em um objeto Ginasio
-        for doc in resultados:
-            ginasios_obj.append(
-                Ginasio(
-                    id_ginasio=doc.get('_id'),
-                    nome=doc.get('nome'),
-                    endereco=doc.get('endereco'),
-                    capacidade=doc.get('capacidade')
-                )
-            )
-        print(f"DEBUG[DAO-Mongo]: {len(ginasios_obj)} ginásios encontrados.")
-    except Exception as e:
-        print(f"Erro ao buscar ginásios no MongoDB: {e}")
-        
-    return ginasios_obj
+    catalogo = obter_catalogo()
+    return [_ginasio_do_documento(doc) for doc in catalogo.ginasios()] if catalogo else []
 
 def buscar_quadras_por_ginasio(id_ginasio):  # --- Refatorada para o MongoDB
     """
-    [MongoDB] Busca as quadras embutidas de um ginásio específico.
+    [MongoDB] Busca as quadras embutidas de um ginásio específico (via catálogo em memória).
     Retorna uma lista de objetos Quadra para manter a compatibilidade.
     """
-    db = conectar_mongo()
-    if db is None:
+    catalogo = obter_catalogo()
+    if not catalogo:
         return []
-
-    quadras_obj = []
-    try:
-        # Busca o documento do ginásio e projeta apenas o campo 'quadras'
-        ginasio_doc = db.ginasios.find_one(
-            {"_id": int(id_ginasio)},
-            {"quadras": 1, "_id": 0} 
-        )
-        
-        if ginasio_doc and 'quadras' in ginasio_doc:
-            # Para cada dicionário de quadra no array, cria um objeto Quadra
-            for quadra_dict in ginasio_doc['quadras']:
-                quadras_obj.append(
-                    Quadra(
-                        num_quadra=quadra_dict.get('num_quadra'),
-                        capacidade=quadra_dict.get('capacidade')
-                    )
-                )
-    except Exception as e:
-        print(f"Erro ao buscar quadras por ginásio no MongoDB: {e}")
-        
-    return quadras_obj
+    return [
+        Quadra(num_quadra=quadra_dict.get('num_quadra'), capacidade=quadra_dict.get('capacidade'))
+        for quadra_dict in catalogo.quadras_do_ginasio(id_ginasio)
+    ]
 
 def inserir_agendamento(cpf_usuario, id_ginasio, num_quadra, hora_ini, hora_fim):
     """
@@ -574,9 +1189,9 @@ def inserir_agendamento(cpf_usuario, id_ginasio, num_quadra, hora_ini, hora_fim)
             "data_solicitacao": datetime.now()
         }
 
-        result = db.agendamentos.insert_one(novo)
-        print(f"DEBUG[Mongo]: Agendamento criado → ID = {result.inserted_id}")
-        return True
+        inserted_id = inserir_com_reserva(db, novo)
+        print(f"DEBUG[Mongo]: Agendamento criado → ID = {inserted_id}")
+        return inserted_id is not None
 
     except Exception as e:
         print(f"Erro ao inserir agendamento no MongoDB: {e}")
@@ -593,13 +1208,11 @@ def atualizar_status_agendamento(id_agendamento, novo_status):
         return False
 
     try:
-        result = db.agendamentos.update_one(
-            {"_id": ObjectId(id_agendamento)},
-            {"$set": {"status_agendamento": novo_status}}
-        )
+        anterior = alterar_status_agendamento(db, {"_id": ObjectId(id_agendamento)}, novo_status)
+        atualizado = anterior is not None and anterior.get('status_agendamento') != novo_status
 
-        print(f"DEBUG[Mongo]: Status atualizado? {result.modified_count > 0}")
-        return result.modified_count > 0
+        print(f"DEBUG[Mongo]: Status atualizado? {atualizado}")
+        return atualizado
     
     except Exception as e:
         print(f"Erro ao atualizar status no MongoDB: {e}")
@@ -616,9 +1229,17 @@ def excluir_agendamento(id_agendamento):
         return False
 
     try:
-        result = db.agendamentos.delete_one({"_id": ObjectId(id_agendamento)})
-        print(f"DEBUG[Mongo]: Registros apagados = {result.deleted_count}")
-        return result.deleted_count > 0
+        removido = db.agendamentos.find_one_and_delete(
+            {"_id": ObjectId(id_agendamento)}, projection=_PROJECAO_QUADRA_HORARIO
+        )
+        print(f"DEBUG[Mongo]: Registro apagado = {removido is not None}")
+        if removido is None:
+            return False
+        registrar_remocao(db, removido)
+        if removido.get('materiais_solicitados'):
+            liberar_materiais(db, removido['_id'])
+        notificar_alteracao_quadra(removido['id_ginasio'], removido['num_quadra'], removido['hora_ini'], removido['hora_fim'])
+        return True
     
     except Exception as e:
         print("Erro ao excluir agendamento no Mongo:", e)
@@ -651,33 +1272,64 @@ def verificar_disponibilidade(id_ginasio, num_quadra, data, hora_ini, hora_fim):
     [MongoDB] Verifica se a quadra está disponível no horário solicitado,
     considerando agendamentos e eventos extraordinários.
     """
-    db = conectar_mongo()
-    if db is None:
-        return False # Se não conectar, não permite agendar por segurança
-
     try:
         # Converte as strings de data e hora para objetos datetime
         timestamp_ini = datetime.fromisoformat(f"{data}T{hora_ini}")
         timestamp_fim = datetime.fromisoformat(f"{data}T{hora_fim}")
 
-        # Reutiliza o método já migrado da classe AgendamentoDAO
-        dao = AgendamentoDAO()
-        # O método já retorna True se houver conflito, então retornamos o inverso
-        tem_conflito = dao.verificar_conflito_de_horario(id_ginasio, num_quadra, timestamp_ini, timestamp_fim)
-        
-        return not tem_conflito # Retorna True se NÃO houver conflito (está disponível)
+        # Dentro da janela do índice em memória, responde sem ir ao banco;
+        # fora dela, as mesmas ocupações (recorrentes incluídos) vêm do banco
+        indice = _indice_da_quadra(id_ginasio, num_quadra, timestamp_ini, timestamp_fim)
+        return not indice.tem_sobreposicao(timestamp_ini, timestamp_fim)
 
     except Exception as e:
         print(f"Erro ao verificar disponibilidade no MongoDB: {e}")
         return False
 
+def buscar_lacunas_livres(id_ginasio, num_quadra, inicio, fim, duracao_minima=None):
+    """
+    Trechos livres [(ini, fim), ...] da quadra dentro de [inicio, fim),
+    calculados pelo índice de intervalos. Retorna None fora da janela indexada.
+    """
+    indice = indices_intervalos.obter(id_ginasio, num_quadra, inicio, fim)
+    if indice is None:
+        return None
+    return indice.lacunas_livres(inicio, fim, duracao_minima)
+
+
+def buscar_proximo_horario_livre(id_ginasio, num_quadra, a_partir_de, duracao, horizonte=timedelta(weeks=1)):
+    """
+    Início do próximo trecho livre da quadra com a duração pedida
+    (timedelta), alinhado às fatias de reserva (alinhar_ao_slot), ou None se
+    não houver até o fim da janela indexada (fora dela, até 'horizonte'
+    depois de a_partir_de) ou se o banco falhar.
+    """
+    cursor = alinhar_ao_slot(a_partir_de)
+    try:
+        indice = _indice_da_quadra(id_ginasio, num_quadra, cursor, cursor + max(duracao, horizonte))
+    except Exception as e:
+        print(f"Erro ao buscar o próximo horário livre no MongoDB: {e}")
+        return None
+
+    while True:
+        livre = indice.proximo_horario_livre(cursor, duracao)
+        if livre is None:
+            return None
+        alinhado = alinhar_ao_slot(livre)
+        # O trecho livre pode começar fora da grade de fatias; o horário
+        # alinhado só serve se ainda couber antes da próxima ocupação
+        if alinhado + duracao <= indice.janela_fim and not indice.tem_sobreposicao(alinhado, alinhado + duracao):
+            return alinhado
+        cursor = alinhado
+
+
 def verificar_usuario_existe(cpf: str) -> bool:
     """
     Verifica se um usuário existe no sistema pelo CPF (que é o _id da coleção).
     Conversão direta da versão em PostgreSQL -> MongoDB.
     """
     db = conectar_mongo()
-    if not db:
+    if db is None:
         return False
 
     try:
@@ -796,22 +1448,45 @@ def verificar_estrutura_agendamento():
         print(f"Erro ao verificar estrutura completa de agendamento: {e}")
 
 
-def criar_agendamento(cpf_usuario, id_ginasio, num_quadra, data, hora_ini, hora_fim, motivo_evento=None): # --- Refatorada para o MongoDB
+def reservar_agendamento(cpf_usuario, id_ginasio, num_quadra, data, hora_ini, hora_fim, motivo_evento=None,
+                         nome_usuario=None, nome_ginasio=None, materiais=None):
     """
-    [MongoDB] Cria um novo documento de agendamento na coleção 'agendamentos'.
+    [MongoDB] Verifica a disponibilidade e cria o agendamento em uma única
+    operação atômica no servidor (insert_one sob o índice único de slots).
+    Substitui a sequência verificar_disponibilidade + criar_agendamento,
+    que permitia reservas duplicadas sob concorrência.
+
+    nome_usuario / nome_ginasio podem ser passados pelo chamador (ex.: da
+    sessão) para evitar as consultas de desnormalização.
+    materiais: {id_material: quantidade} a reservar junto com o horário.
+    Retorna RESERVA_CONFIRMADA, RESERVA_INDISPONIVEL,
+    RESERVA_MATERIAIS_INDISPONIVEIS ou RESERVA_ERRO.
     """
     db = conectar_mongo()
     if db is None:
-        return False
+        return RESERVA_ERRO
 
     try:
-        # Busca informações para embutir no documento
-        usuario_info = db.usuarios.find_one({"_id": cpf_usuario}, {"nome": 1})
-        ginasio_info = db.ginasios.find_one({"_id": int(id_ginasio)}, {"nome": 1})
-
-        if not usuario_info or not ginasio_info:
+        inicio = datetime.fromisoformat(f"{data}T{hora_ini}")
+        fim = datetime.fromisoformat(f"{data}T{hora_fim}")
+        if fim <= inicio:
+            print("ERRO[DAO-Mongo]: Horário de fim deve ser posterior ao de início.")
+            return RESERVA_ERRO
+
+        # Busca informações para embutir no documento (apenas as que faltarem)
+        if nome_usuario is None:
+            usuario_info = db.usuarios.find_one({"_id": cpf_usuario}, {"nome": 1})
+            nome_usuario = usuario_info.get('nome') if usuario_info else None
+        if nome_ginasio is None:
+            ginasio = get_ginasio_por_id(id_ginasio)
+            nome_ginasio = ginasio.nome if ginasio else None
+
+        if not nome_usuario or not nome_ginasio:
             print("ERRO[DAO-Mongo]: Usuário ou Ginásio não encontrado para criar agendamento.")
-            return False
+            return RESERVA_ERRO
+
+        if ocupado_fora_do_indice_de_slots(db, id_ginasio, num_quadra, inicio, fim):
+            return RESERVA_INDISPONIVEL
 
         # Monta o documento de agendamento
         novo_agendamento = {
@@ -819,21 +1494,122 @@ def criar_agendamento(cpf_usuario, id_ginasio, num_quadra, data, hora_ini, hora_
             "id_ginasio": int(id_ginasio),
             "num_quadra": int(num_quadra),
             "data_solicitacao": datetime.now(),
-            "hora_ini": datetime.fromisoformat(f"{data}T{hora_ini}"),
-            "hora_fim": datetime.fromisoformat(f"{data}T{hora_fim}"),
+            "hora_ini": inicio,
+            "hora_fim": fim,
             "status_agendamento": "confirmado",
-            "usuario_info": {"nome": usuario_info.get('nome')},
-            "local_info": {"nome_ginasio": ginasio_info.get('nome')}
+            "usuario_info": {"nome": nome_usuario},
+            "local_info": {"nome_ginasio": nome_ginasio}
         }
 
         if motivo_evento:
             novo_agendamento['motivo'] = f"Evento: {motivo_evento}"
 
-        # Insere o novo documento na coleção
-        resultado = db.agendamentos.insert_one(novo_agendamento)
-        
-        return resultado.inserted_id is not None
+        materiais_solicitados = montar_materiais_solicitados(id_ginasio, materiais or {})
+        if materiais_solicitados:
+            novo_agendamento['materiais_solicitados'] = materiais_solicitados
+
+        # Insere o documento; o índice único decide se o horário está livre
+        try:
+            if inserir_com_reserva(db, novo_agendamento) is None:
+                return RESERVA_INDISPONIVEL
+        except MateriaisIndisponiveisError as e:
+            print(f"DEBUG[DAO-Mongo]: {e}")
+            return RESERVA_MATERIAIS_INDISPONIVEIS
+        return RESERVA_CONFIRMADA
 
     except Exception as e:
-        print(f"Erro ao criar agendamento no MongoDB: {e}")
-        return False
\ No newline at end of file
+        print(f"Erro ao reservar agendamento no MongoDB: {e}")
+        return RESERVA_ERRO
+
+
+def criar_agendamento(cpf_usuario, id_ginasio, num_quadra, data, hora_ini, hora_fim, motivo_evento=None): # --- Refatorada para o MongoDB
+    """
+    [MongoDB] Cria um novo documento de agendamento na coleção 'agendamentos'.
+    Retorna True apenas se o horário foi efetivamente reservado.
+    """
+    resultado = reservar_agendamento(cpf_usuario, id_ginasio, num_quadra, data, hora_ini, hora_fim, motivo_evento)
+    return resultado == RESERVA_CONFIRMADA
+
+
+def preencher_slots_reservados(db=None):
+    """
+    [MongoDB] Migração: preenche 'slots_reservados' nos agendamentos ativos
+    criados antes da reserva atômica. Agendamentos que já estavam em conflito
+    (reservas duplicadas antigas) não recebem as chaves e são listados.
+    Retorna (quantidade_atualizada, lista_de_ids_em_conflito).
+    """
+    db = db if db is not None else conectar_mongo()
+    if db is None:
+        return 0, []
+
+    atualizados = 0
+    conflitos = []
+    filtro = {
+        "status_agendamento": {"$in": STATUS_QUE_OCUPAM},
+        "slots_reservados": {"$exists": False},
+        "hora_ini": {"$type": "date"},
+        "hora_fim": {"$type": "date"}
+    }
+    projecao = {"id_ginasio": 1, "num_quadra": 1, "hora_ini": 1, "hora_fim": 1}
+    for doc in db.agendamentos.find(filtro, projecao).sort("hora_ini", 1):
+        slots = calcular_slots_reserva(doc['id_ginasio'], doc['num_quadra'], doc['hora_ini'], doc['hora_fim'])
+        try:
+            db.agendamentos.update_one({"_id": doc['_id']}, {"$set": {"slots_reservados": slots}})
+            atualizados += 1
+        except DuplicateKeyError:
+            conflitos.append(doc['_id'])
+            print(f"AVISO[Migração]: Agendamento {doc['_id']} conflita com outro já existente; slots não preenchidos.")
+
+    print(f"DEBUG[Migração]: {atualizados} agendamentos receberam slots; {len(conflitos)} em conflito.")
+    return atualizados, conflitos
+
+
+def preencher_dados_embutidos(db=None, tamanho_lote=500):
+    """
+    [MongoDB] Migração: embute usuario_info.nome e local_info.nome_ginasio
+    nos agendamentos que não os têm (ex.: criados por bolsistas antes de
+    fazer_agendamento_em_nome_de embuti-los), para que as listagens não
+    precisem de $lookup. Retorna a quantidade de documentos atualizados.
+    """
+    db = db if db is not None else conectar_mongo()
+    if db is None:
+        return 0
+
+    filtro = {"$or": [
+        {"usuario_info.nome": {"$in": [None, ""]}},
+        {"local_info.nome_ginasio": {"$in": [None, ""]}},
+    ]}
+    nomes_usuarios = {}
+    nomes_ginasios = {}
+    atualizados = 0
+    lote = []
+
+    def gravar(lote):
+        if not lote:
+            return 0
+        return db.agendamentos.bulk_write(lote, ordered=False).modified_count
+
+    for doc in db.agendamentos.find(filtro, {"cpf_usuario": 1, "id_ginasio": 1}):
+        cpf = doc.get('cpf_usuario')
+        if cpf not in nomes_usuarios:
+            usuario = db.usuarios.find_one({"_id": cpf}, {"nome": 1})
+            nomes_usuarios[cpf] = usuario.get('nome') if usuario else None
+        id_ginasio = doc.get('id_ginasio')
+        if id_ginasio not in nomes_ginasios:
+            ginasio = get_ginasio_por_id(id_ginasio)
+            nomes_ginasios[id_ginasio] = ginasio.nome if ginasio else None
+
+        alteracoes = {}
+        if nomes_usuarios[cpf]:
+            alteracoes["usuario_info.nome"] = nomes_usuarios[cpf]
+        if nomes_ginasios[id_ginasio]:
+            alteracoes["local_info.nome_ginasio"] = nomes_ginasios[id_ginasio]
+        if alteracoes:
+            lote.append(UpdateOne({"_id": doc['_id']}, {"$set": alteracoes}))
+        if len(lote) >= tamanho_lote:
+            atualizados += gravar(lote)
+            lote = []
+    atualizados += gravar(lote)
+
+    print(f"DEBUG[Migração]: {atualizados} agendamentos receberam os nomes embutidos.")
+    return atualizados
@@ -0,0 +1,156 @@
+# camada_dados/agendamento_dao_async.py
+"""
+Versão assíncrona (asyncio) das leituras da AgendamentoDAO, usada pelo modo
+ASGI (asgi.py). As consultas são as mesmas da DAO síncrona (filtros e
+conversões vêm de agendamento_dao e reserva_materiais); a diferença é que
+consultas independentes rodam em paralelo com asyncio.gather, então o tempo
+de uma leitura composta é o da consulta mais lenta, não a soma de todas.
+
+As escritas continuam só na DAO síncrona: a reserva atômica, os contadores
+de uso e os avisos de alteração (notificacoes) têm um único caminho.
+"""
+
+import asyncio
+
+from .mongo_async import conectar_mongo_async
+from .agendamento_dao import consultas_ocupacoes, converter_ocupacoes
+from .catalogo import obter_catalogo
+from .notificacoes import id_versao_quadra
+from .reserva_materiais import (
+    PROJECAO_RESERVAS, agrupar_por_material, aplicar_disponibilidade, filtro_reservas_sobrepostas,
+)
+
+
+async def _listar(colecao, filtro, projecao=None, ordenacao=None):
+    cursor = colecao.find(filtro, projecao)
+    if ordenacao:
+        cursor = cursor.sort(ordenacao)
+    return await cursor.to_list(None)
+
+
+async def obter_catalogo_async():
+    """
+    Catálogo em memória. Só a primeira carga do processo vai ao banco (de
+    forma síncrona), então ela roda em uma thread para não travar o loop.
+    """
+    return await asyncio.to_thread(obter_catalogo)
+
+
+class AgendamentoDAOAsync:
+
+    async def buscar_ocupacoes_no_banco(self, db, id_ginasio, num_quadra, data_inicio, data_fim):
+        """
+        [MongoDB] Agendamentos ativos, eventos extraordinários e ocorrências
+        dos recorrentes da quadra em [data_inicio, data_fim), com as três
+        consultas em paralelo. Levanta exceção em caso de erro.
+        """
+        consultas = consultas_ocupacoes(id_ginasio, num_quadra, data_inicio, data_fim)
+        resultados = await asyncio.gather(*(
+            _listar(db[colecao], filtro, projecao) for _, colecao, filtro, projecao in consultas
+        ))
+        ocupacoes = []
+        for (tipo, _, _, _), docs in zip(consultas, resultados):
+            ocupacoes.extend(converter_ocupacoes(tipo, docs, data_inicio, data_fim))
+        return ocupacoes
+
+    async def versao_quadra(self, id_ginasio, num_quadra):
+        """
+        [MongoDB] Como notificacoes.ler_versao_quadra: versão compartilhada
+        da ocupação da quadra, ou None se o banco não responder.
+        """
+        db = conectar_mongo_async()
+        if db is None:
+            return None
+        try:
+            doc = await db.metadados.find_one({"_id": id_versao_quadra(id_ginasio, num_quadra)}, {"versao": 1})
+        except Exception as e:
+            print(f"Erro ao ler a versão da quadra no MongoDB (assíncrono): {e}")
+            return None
+        return doc.get('versao', 0) if doc else 0
+
+    async def buscar_agendamentos_por_quadra(self, id_ginasio, num_quadra, data_inicio, data_fim):
+        """
+        [MongoDB] Como AgendamentoDAO.buscar_agendamentos_por_quadra (sem o
+        índice em memória): None se o banco estiver indisponível ou a
+        consulta falhar.
+        """
+        db = conectar_mongo_async()
+        if db is None:
+            return None
+        try:
+            ocupacoes = await self.buscar_ocupacoes_no_banco(db, id_ginasio, num_quadra, data_inicio, data_fim)
+            print(f"DEBUG[DAO-Mongo-Async]: Encontradas {len(ocupacoes)} ocupações (agendamentos + eventos).")
+            return ocupacoes
+        except Exception as e:
+            print(f"Erro ao buscar ocupações por quadra no MongoDB (assíncrono): {e}")
+            return None
+
+    async def disponibilidade_materiais(self, id_ginasio, inicio, fim):
+        """
+        [MongoDB] Materiais do ginásio com a disponibilidade real em
+        [inicio, fim) (ver reserva_materiais.disponibilidade_materiais).
+        """
+        catalogo = await obter_catalogo_async()
+        materiais = catalogo.materiais_do_ginasio(id_ginasio) if catalogo else []
+        db = conectar_mongo_async()
+        if not materiais or db is None:
+            return materiais
+        try:
+            reservas = await _listar(
+                db.reservas_materiais,
+                filtro_reservas_sobrepostas(id_ginasio, [m.get('id_material') for m in materiais], inicio, fim),
+                PROJECAO_RESERVAS,
+            )
+        except Exception as e:
+            print(f"Erro ao calcular a disponibilidade de materiais (assíncrono): {e}")
+            return []
+        return aplicar_disponibilidade(materiais, agrupar_por_material(reservas), inicio, fim)
+
+    async def buscar_agendamentos_por_usuario(self, cpf_usuario):
+        """[MongoDB] Como AgendamentoDAO.buscar_agendamentos_por_usuario."""
+        db = conectar_mongo_async()
+        if db is None:
+            return []
+        try:
+            docs = await _listar(db.agendamentos, {"cpf_usuario": cpf_usuario}, ordenacao=[("hora_ini", -1)])
+        except Exception as e:
+            print(f"Erro ao buscar agendamentos por usuário no MongoDB (assíncrono): {e}")
+            return []
+        for doc in docs:
+            doc['id_agendamento'] = doc.pop('_id')
+            doc['ginasio'] = doc.get('local_info', {}).get('nome_ginasio')
+            doc['quadra'] = doc.get('num_quadra')
+        return docs
+
+    async def buscar_dados_grade(self, id_ginasio, num_quadra, data_inicio, data_fim, slot=None,
+                                 incluir_ocupacoes=True):
+        """
+        Tudo o que a grade semanal precisa, em paralelo: ocupações da quadra
+        (três consultas; puladas com incluir_ocupacoes=False, quando a grade
+        veio do cache), o ginásio (catálogo) e, se 'slot' = (inicio, fim)
+        for informado, a disponibilidade de materiais nesse horário; sem
+        slot, os materiais do catálogo.
+        Retorna {"ocupacoes", "ginasio", "materiais"} (ocupacoes None se
+        puladas ou se a consulta falhou).
+        """
+        async def ocupacoes():
+            if not incluir_ocupacoes:
+                return None
+            return await self.buscar_agendamentos_por_quadra(id_ginasio, num_quadra, data_inicio, data_fim)
+
+        async def materiais():
+            if slot is not None:
+                return await self.disponibilidade_materiais(id_ginasio, *slot)
+            catalogo = await obter_catalogo_async()
+            return catalogo.materiais_do_ginasio(id_ginasio) if catalogo else []
+
+        async def ginasio():
+            catalogo = await obter_catalogo_async()
+            return catalogo.ginasio(id_ginasio) if catalogo else None
+
+        lista_ocupacoes, doc_ginasio, lista_materiais = await asyncio.gather(
+            ocupacoes(),
+            ginasio(),
+            materiais(),
+        )
+        return {"ocupacoes": lista_ocupacoes, "ginasio": doc_ginasio, "materiais": lista_materiais}
@@ -0,0 +1,57 @@
+# camada_dados/cache_ttl.py
+"""
+Cache LRU com tempo de validade (TTL) por entrada, seguro para threads.
+
+Usado para dados pequenos e muito lidos que podem ficar alguns segundos
+defasados entre processos (ex.: perfis de usuário). Dentro do processo, as
+escritas correspondentes devem chamar invalidar() logo após gravar.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_AUSENTE = object()
+
+
+class CacheTTL:
+
+    def __init__(self, max_entradas, validade_segundos):
+        self.max_entradas = max_entradas
+        self.validade_segundos = validade_segundos
+        self._entradas = OrderedDict()  # chave -> (valor, expira_em)
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+
+    def obter(self, chave, padrao=None):
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(chave, _AUSENTE)
+            if entrada is not _AUSENTE and entrada[1] > agora:
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada[0]
+            if entrada is not _AUSENTE:
+                del self._entradas[chave]
+            self.falhas += 1
+            return padrao
+
+    def guardar(self, chave, valor):
+        with self._lock:
+            self._entradas[chave] = (valor, time.monotonic() + self.validade_segundos)
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, chave):
+        with self._lock:
+            self._entradas.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def estatisticas(self):
+        with self._lock:
+            return {"acertos": self.acertos, "falhas": self.falhas, "entradas": len(self._entradas)}
@@ -0,0 +1,236 @@
+# camada_dados/catalogo.py
+"""
+Catálogo em memória dos dados de referência: ginásios (com as quadras e os
+materiais esportivos embutidos) e esportes.
+
+Esses dados quase nunca mudam, mas eram lidos do MongoDB em quase toda
+página. O catálogo é carregado uma vez por processo e servido a partir de
+dicionários. Cada carga gera um snapshot imutável (Catalogo); a troca do
+snapshot é uma única atribuição, então os leitores nunca veem um catálogo
+pela metade e nunca esperam por uma recarga (exceto a primeira).
+
+Versionamento:
+- As escritas administrativas das DAOs (GinasioDAO, QuadraDAO, MaterialDAO,
+  EsporteDAO) chamam registrar_alteracao_catalogo(), que incrementa a versão
+  no documento {_id: 'catalogo'} da coleção 'metadados' e recarrega o
+  snapshot na própria requisição que escreveu.
+- Os demais processos comparam a versão do banco com a do snapshot a cada
+  CATALOGO_VERIFICACAO_SEGUNDOS, em uma thread de fundo, e recarregam
+  quando ela muda.
+"""
+
+import functools
+import os
+import threading
+import time
+from pymongo import ReturnDocument
+
+from .mongo_config import conectar_mongo
+
+CATALOGO_VERIFICACAO_SEGUNDOS = int(os.environ.get('CATALOGO_VERIFICACAO_SEGUNDOS', 5))
+
+_ID_VERSAO = 'catalogo'
+
+
+class Catalogo:
+    """Snapshot somente leitura do catálogo em uma versão."""
+
+    def __init__(self, versao, ginasios, esportes):
+        self.versao = versao
+        # Ginásios e esportes chegam ordenados por nome; dicts preservam a ordem
+        self._ginasios = {g['_id']: g for g in ginasios}
+        self._esportes = {str(e['_id']): e for e in esportes}
+
+        self._quadras_planas = []
+        self._materiais_planos = []
+        for g in ginasios:
+            for q in g.get('quadras', []):
+                self._quadras_planas.append({
+                    "id_ginasio": g['_id'],
+                    "nome_ginasio": g.get('nome'),
+                    "num_quadra": q.get('num_quadra'),
+                    "tipo_piso": q.get('tipo_piso'),
+                    "cobertura": q.get('cobertura'),
+                    "status": q.get('status'),
+                })
+            for m in g.get('materiais_esportivos', []):
+                self._materiais_planos.append({
+                    "id_material": m.get('id_material'),
+                    "nome": m.get('nome'),
+                    "descricao": m.get('descricao'),
+                    "marca": m.get('marca'),
+                    "status": m.get('status'),
+                    "qnt_total": m.get('qnt_total'),
+                    "qnt_disponivel": m.get('qnt_disponivel'),
+                    "id_ginasio": g['_id'],
+                    "nome_ginasio": g.get('nome'),
+                })
+
+    # As consultas devolvem cópias rasas: quem chama pode alterar o resultado
+    # sem corromper o snapshot compartilhado.
+
+    def ginasio(self, id_ginasio):
+        try:
+            doc = self._ginasios.get(int(id_ginasio))
+        except (TypeError, ValueError):
+            return None
+        return dict(doc) if doc else None
+
+    def ginasios(self):
+        return [dict(g) for g in self._ginasios.values()]
+
+    def quadras_do_ginasio(self, id_ginasio):
+        doc = self._ginasios.get(int(id_ginasio))
+        return [dict(q) for q in doc.get('quadras', [])] if doc else []
+
+    def quadra(self, id_ginasio, num_quadra):
+        for q in self.quadras_do_ginasio(id_ginasio):
+            if q.get('num_quadra') == int(num_quadra):
+                return q
+        return None
+
+    def todas_as_quadras(self):
+        return [dict(q) for q in self._quadras_planas]
+
+    def materiais_do_ginasio(self, id_ginasio):
+        doc = self._ginasios.get(int(id_ginasio))
+        return [dict(m) for m in doc.get('materiais_esportivos', [])] if doc else []
+
+    def todos_os_materiais(self):
+        return [dict(m) for m in self._materiais_planos]
+
+    def esportes(self):
+        return [dict(e) for e in self._esportes.values()]
+
+    def esporte(self, id_esporte):
+        doc = self._esportes.get(str(id_esporte))
+        return dict(doc) if doc else None
+
+
+def _ler_versao(db):
+    doc = db.metadados.find_one({"_id": _ID_VERSAO}, {"versao": 1})
+    return doc.get('versao', 0) if doc else 0
+
+
+class GerenciadorCatalogo:
+    """Publica o snapshot atual e cuida das recargas por versão."""
+
+    def __init__(self, intervalo_verificacao=None):
+        self.intervalo_verificacao = (CATALOGO_VERIFICACAO_SEGUNDOS if intervalo_verificacao is None
+                                      else intervalo_verificacao)
+        self._catalogo = None
+        self._ultima_verificacao = 0.0
+        self._lock_primeira_carga = threading.Lock()
+        self._lock_troca = threading.Lock()
+        self._verificando = threading.Lock()
+
+    def obter(self):
+        """
+        Snapshot atual do catálogo. Só a primeira chamada do processo espera
+        a carga; depois disso, a verificação de versão roda em segundo plano.
+        Retorna None se o catálogo não puder ser carregado.
+        """
+        catalogo = self._catalogo
+        if catalogo is None:
+            with self._lock_primeira_carga:
+                if self._catalogo is None:
+                    self.recarregar()
+            return self._catalogo
+
+        if time.monotonic() - self._ultima_verificacao > self.intervalo_verificacao:
+            self._verificar_em_segundo_plano()
+        return catalogo
+
+    def recarregar(self, db=None):
+        """Carrega um snapshot novo e o publica (troca atômica da referência)."""
+        db = db if db is not None else conectar_mongo()
+        if db is None:
+            return None
+        try:
+            # A versão é lida ANTES dos dados: se uma escrita acontecer durante
+            # a carga, a próxima verificação verá uma versão maior e recarrega.
+            versao = _ler_versao(db)
+            ginasios = list(db.ginasios.find({}).sort("nome", 1))
+            esportes = list(db.esportes.find({}).sort("nome", 1))
+        except Exception as e:
+            print(f"Erro ao carregar o catálogo do MongoDB: {e}")
+            return None
+
+        novo = Catalogo(versao, ginasios, esportes)
+        with self._lock_troca:
+            atual = self._catalogo
+            if atual is None or novo.versao >= atual.versao:
+                self._catalogo = novo
+            self._ultima_verificacao = time.monotonic()
+        print(f"DEBUG[Catálogo]: versão {versao} carregada ({len(ginasios)} ginásios, {len(esportes)} esportes).")
+        return self._catalogo
+
+    def _verificar_em_segundo_plano(self):
+        if not self._verificando.acquire(blocking=False):
+            return  # Já existe uma verificação em andamento
+        self._ultima_verificacao = time.monotonic()
+
+        def verificar():
+            try:
+                db = conectar_mongo()
+                if db is not None and _ler_versao(db) != self._catalogo.versao:
+                    self.recarregar(db)
+            except Exception as e:
+                print(f"Erro ao verificar a versão do catálogo: {e}")
+            finally:
+                self._verificando.release()
+
+        threading.Thread(target=verificar, name="verificacao-catalogo", daemon=True).start()
+
+    def registrar_alteracao(self, db=None):
+        """
+        Chamado pelas DAOs após uma escrita administrativa bem-sucedida:
+        incrementa a versão no banco e recarrega o snapshot.
+        """
+        db = db if db is not None else conectar_mongo()
+        if db is None:
+            return
+        try:
+            doc = db.metadados.find_one_and_update(
+                {"_id": _ID_VERSAO}, {"$inc": {"versao": 1}},
+                upsert=True, return_document=ReturnDocument.AFTER
+            )
+            print(f"DEBUG[Catálogo]: alteração registrada, nova versão {doc.get('versao')}.")
+        except Exception as e:
+            print(f"Erro ao registrar alteração do catálogo: {e}")
+        self.recarregar(db)
+
+    def descartar_apos_fork(self):
+        """Travas herdadas de um fork podem estar presas; o snapshot pode ser mantido."""
+        self._lock_primeira_carga = threading.Lock()
+        self._lock_troca = threading.Lock()
+        self._verificando = threading.Lock()
+
+
+gerenciador_catalogo = GerenciadorCatalogo()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=gerenciador_catalogo.descartar_apos_fork)
+
+
+def obter_catalogo():
+    """Snapshot atual do catálogo (ou None se o banco estiver indisponível)."""
+    return gerenciador_catalogo.obter()
+
+
+def registrar_alteracao_catalogo(db=None):
+    gerenciador_catalogo.registrar_alteracao(db)
+
+
+def altera_catalogo(metodo):
+    """
+    Decorador dos métodos de escrita das DAOs de catálogo: quando o método
+    retorna um valor verdadeiro (escrita efetivada), registra a alteração.
+    """
+    @functools.wraps(metodo)
+    def envolvido(*args, **kwargs):
+        resultado = metodo(*args, **kwargs)
+        if resultado:
+            registrar_alteracao_catalogo()
+        return resultado
+    return envolvido
@@ -1,46 +1,41 @@
 # camada_dados/esporte_dao.py
 from .mongo_config import conectar_mongo
+from .catalogo import obter_catalogo, altera_catalogo
 from bson import ObjectId
 
+
+def id_esporte_canonico(valor, legados=None):
+    """
+    Converte uma referência de esporte (ObjectId, texto ou número antigo)
+    no ObjectId canônico; None se não for possível. 'legados' mapeia o
+    número antigo (em texto) para o ObjectId (ver normalizacao_ids.py).
+    """
+    if isinstance(valor, ObjectId):
+        return valor
+    if legados and str(valor) in legados:
+        return legados[str(valor)]
+    if isinstance(valor, str) and ObjectId.is_valid(valor):
+        return ObjectId(valor)
+    return None
+
+
 class EsporteDAO:
     # --- Mongo DB metodos alterados ---
     def buscar_todos(self):
         """
-        [MongoDB] Busca todos os documentos da coleção 'esportes', ordenados por nome.
+        [MongoDB] Busca todos os esportes, ordenados por nome (via catálogo em memória).
         """
-        db = conectar_mongo()
-        if db is None:
-            return []
-        
-        esportes = []
-        try:
-            # db.<colecao>.find({}).sort("campo", 1 para ascendente)
-            resultados = db.esportes.find({}).sort("nome", 1)
-            # É importante converter o cursor para uma lista
-            esportes = list(resultados)
-            print(f"DEBUG[DAO-Mongo]: {len(esportes)} esportes encontrados.")
-        except Exception as e:
-            print(f"Erro ao buscar esportes no MongoDB: {e}")
-            
-        return esportes
+        catalogo = obter_catalogo()
+        return catalogo.esportes() if catalogo else []
 
     def buscar_por_id(self, id_esporte):
         """
-        [MongoDB] Busca um único esporte pelo seu _id.
+        [MongoDB] Busca um único esporte pelo seu _id (via catálogo em memória).
         """
-        db = conectar_mongo()
-        if db is None:
-            return None
-            
-        try:
-            # Converte a string do ID para um objeto ObjectId do MongoDB
-            obj_id = ObjectId(id_esporte)
-            esporte = db.esportes.find_one({"_id": obj_id})
-            return esporte
-        except Exception as e:
-            print(f"Erro ao buscar esporte por ID no MongoDB: {e}")
-            return None
+        catalogo = obter_catalogo()
+        return catalogo.esporte(id_esporte) if catalogo else None
 
+    @altera_catalogo
     def criar(self, nome, max_jogadores):
         """
         [MongoDB] Insere um novo esporte na coleção 'esportes'.
@@ -62,6 +57,7 @@ class EsporteDAO:
             print(f"Erro ao criar esporte no MongoDB: {e}")
             return None
 
+    @altera_catalogo
     def atualizar(self, id_esporte, nome, max_jogadores):
         """
         [MongoDB] Atualiza os dados de um esporte existente.
@@ -84,6 +80,7 @@ class EsporteDAO:
             print(f"Erro ao atualizar esporte no MongoDB: {e}")
             return False
 
+    @altera_catalogo
     def excluir(self, id_esporte):
         """
         [MongoDB] Exclui um esporte da coleção.
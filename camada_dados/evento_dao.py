@@ -1,8 +1,56 @@
 # camada_dados/evento_dao.py
 
 from .mongo_config import conectar_mongo
+from .notificacoes import notificar_alteracao_evento
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, time
+from modelos.recorrencia import Recorrencia, segmentos_diarios
+
+
+def filtro_recorrentes_da_quadra(id_ginasio, num_quadra):
+    """Filtro base dos eventos recorrentes que bloqueiam uma quadra."""
+    return {
+        "tipo": "recorrente",
+        "quadras_bloqueadas": {
+            "$elemMatch": {"id_ginasio": int(id_ginasio), "num_quadra": int(num_quadra)}
+        }
+    }
+
+
+def filtro_recorrentes_sobrepostos(id_ginasio, num_quadra, dia_semana, minuto_inicio, minuto_fim, data_inicio, data_fim):
+    """
+    Filtro (indexado) dos eventos recorrentes da quadra que caem no mesmo dia
+    da semana, com horário sobreposto, e cuja validade cruza [data_inicio, data_fim].
+    """
+    filtro = filtro_recorrentes_da_quadra(id_ginasio, num_quadra)
+    filtro.update({
+        "recorrencia.dia_semana": dia_semana,
+        "recorrencia.minuto_inicio": {"$lt": minuto_fim},
+        "recorrencia.minuto_fim": {"$gt": minuto_inicio},
+        "recorrencia.data_inicio": {"$lte": data_fim},
+        "recorrencia.data_fim": {"$gte": data_inicio}
+    })
+    return filtro
+
+
+def condicoes_recorrentes_no_intervalo(inicio, fim):
+    """
+    Condições ($or) que casam as regras de recorrência com alguma ocorrência
+    dentro de [inicio, fim). O intervalo é quebrado em trechos diários e
+    cada trecho vira uma condição resolvida pelo índice de dia/horário.
+    """
+    condicoes = []
+    for dia, dia_semana, minuto_ini, minuto_fim in segmentos_diarios(inicio, fim):
+        data = datetime.combine(dia, time.min)
+        condicoes.append({
+            "recorrencia.dia_semana": dia_semana,
+            "recorrencia.minuto_inicio": {"$lt": minuto_fim},
+            "recorrencia.minuto_fim": {"$gt": minuto_ini},
+            "recorrencia.data_inicio": {"$lte": data},
+            "recorrencia.data_fim": {"$gte": data},
+            "recorrencia.excecoes": {"$ne": data}
+        })
+    return condicoes
 
 class EventoDAO:
         
@@ -64,9 +112,15 @@ class EventoDAO:
             # Converte a string do ID para um objeto ObjectId
             obj_id = ObjectId(id_evento)
             
-            resultado = db.eventos.delete_one({"_id": obj_id})
+            # find_one_and_delete devolve o evento removido, para avisar
+            # a alteração das quadras que ele bloqueava
+            removido = db.eventos.find_one_and_delete(
+                {"_id": obj_id},
+                projection={"tipo": 1, "quadras_bloqueadas": 1, "data_hora_inicio": 1, "data_hora_fim": 1}
+            )
             
-            if resultado.deleted_count > 0:
+            if removido is not None:
+                notificar_alteracao_evento(removido)
                 sucesso = True
                 print(f"DEBUG[DAO-Mongo]: Evento ID {id_evento} excluído.")
             else:
@@ -113,14 +167,28 @@ class EventoDAO:
                 documento_evento['data_hora_fim'] = datetime.fromisoformat(dados_tempo.get('fim'))
             
             elif tipo_evento == 'recorrente':
-                documento_evento['regra_recorrencia'] = dados_tempo.get('regra')
-                documento_evento['data_fim_recorrencia'] = datetime.combine(datetime.fromisoformat(dados_tempo.get('data_fim')), datetime.min.time())
+                recorrencia = dados_tempo.get('recorrencia')
+                if recorrencia is None:
+                    # Chamadores antigos ainda enviam apenas a frase da regra
+                    recorrencia = Recorrencia.da_regra_legada(
+                        dados_tempo.get('regra'), datetime.now(), dados_tempo.get('data_fim')
+                    )
+                if recorrencia is None:
+                    print("ERRO[DAO-Mongo]: Regra de recorrência inválida.")
+                    return False
+
+                # 'recorrencia' guarda os campos estruturados (indexados);
+                # a frase e a data de fim são mantidas para exibição.
+                documento_evento['recorrencia'] = recorrencia.get_document_mongo()
+                documento_evento['regra_recorrencia'] = recorrencia.formatar_regra()
+                documento_evento['data_fim_recorrencia'] = recorrencia.data_fim
 
             # --- Etapa 4: Inserir o documento final ---
             resultado = db.eventos.insert_one(documento_evento)
             
             if resultado.inserted_id:
                 print(f"DEBUG[DAO-Mongo]: Evento '{nome_evento}' criado com ID {resultado.inserted_id}.")
+                notificar_alteracao_evento(documento_evento)
                 return True
             else:
                 return False
@@ -169,12 +237,7 @@ class EventoDAO:
         try:
             # Filtro para encontrar eventos do tipo 'recorrente' E que contenham
             # a quadra específica no seu array 'quadras_bloqueadas'.
-            filtro = {
-                "tipo": "recorrente",
-                "quadras_bloqueadas": {
-                    "$elemMatch": {"id_ginasio": int(id_ginasio), "num_quadra": int(num_quadra)}
-                }
-            }
+            filtro = filtro_recorrentes_da_quadra(id_ginasio, num_quadra)
             
             resultados = db.eventos.find(filtro)
             recorrentes = list(resultados)
@@ -183,4 +246,84 @@ class EventoDAO:
             print(f"Erro ao buscar eventos recorrentes por quadra (MongoDB): {e}")
             
         return recorrentes
-    
\ No newline at end of file
+
+    def buscar_recorrentes_sobrepostos(self, id_ginasio, num_quadra, recorrencia):
+        """
+        [MongoDB] Busca os eventos recorrentes da quadra que conflitam com uma
+        nova regra de recorrência (mesmo dia da semana, horário sobreposto e
+        períodos de validade que se cruzam). Consulta resolvida pelo índice.
+        """
+        db = conectar_mongo()
+        if db is None:
+            return []
+
+        try:
+            filtro = filtro_recorrentes_sobrepostos(
+                id_ginasio, num_quadra, recorrencia.dia_semana,
+                recorrencia.minuto_inicio, recorrencia.minuto_fim,
+                recorrencia.data_inicio, recorrencia.data_fim
+            )
+            return list(db.eventos.find(filtro))
+        except Exception as e:
+            print(f"Erro ao buscar eventos recorrentes sobrepostos (MongoDB): {e}")
+            return []
+
+    def buscar_recorrentes_no_intervalo(self, id_ginasio, num_quadra, inicio, fim):
+        """
+        [MongoDB] Busca os eventos recorrentes da quadra que têm alguma
+        ocorrência dentro de [inicio, fim).
+        """
+        db = conectar_mongo()
+        if db is None:
+            return []
+
+        try:
+            condicoes = condicoes_recorrentes_no_intervalo(inicio, fim)
+            if not condicoes:
+                return []
+
+            filtro = filtro_recorrentes_da_quadra(id_ginasio, num_quadra)
+            filtro["$or"] = condicoes
+            return list(db.eventos.find(filtro))
+        except Exception as e:
+            print(f"Erro ao buscar eventos recorrentes no intervalo (MongoDB): {e}")
+            return []
+
+
+def migrar_regras_recorrencia(db=None):
+    """
+    [MongoDB] Migração: converte a frase 'regra_recorrencia' dos eventos
+    antigos no sub-documento estruturado 'recorrencia'. A validade começa na
+    data de criação do evento (data do ObjectId), como a grade semanal já
+    considerava. Retorna (quantidade_migrada, ids_nao_reconhecidos).
+    """
+    db = db if db is not None else conectar_mongo()
+    if db is None:
+        return 0, []
+
+    migrados = 0
+    nao_reconhecidos = []
+    for doc in db.eventos.find({"tipo": "recorrente", "recorrencia": {"$exists": False}}):
+        data_inicio = doc['_id'].generation_time.replace(tzinfo=None) if isinstance(doc['_id'], ObjectId) else datetime.now()
+        try:
+            recorrencia = Recorrencia.da_regra_legada(
+                doc.get('regra_recorrencia'), data_inicio, doc.get('data_fim_recorrencia') or data_inicio
+            )
+        except ValueError:
+            recorrencia = None  # ex.: terminou antes da data de criação
+        if recorrencia is None:
+            nao_reconhecidos.append(doc['_id'])
+            print(f"AVISO[Migração]: Regra não reconhecida no evento {doc['_id']}: {doc.get('regra_recorrencia')!r}")
+            continue
+
+        db.eventos.update_one(
+            {"_id": doc['_id']},
+            {"$set": {
+                "recorrencia": recorrencia.get_document_mongo(),
+                "regra_recorrencia": recorrencia.formatar_regra()
+            }}
+        )
+        migrados += 1
+
+    print(f"DEBUG[Migração]: {migrados} eventos recorrentes migrados; {len(nao_reconhecidos)} não reconhecidos.")
+    return migrados, nao_reconhecidos
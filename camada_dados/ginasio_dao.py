@@ -1,37 +1,24 @@
 # camada_dados/ginasio_dao.py
 from .mongo_config import conectar_mongo
+from .catalogo import obter_catalogo, altera_catalogo
+from .esporte_dao import id_esporte_canonico
 
 class GinasioDAO:
     # --- Metodos migrados para o MongoDB ---
     
     def buscar_todos(self):
         """
-        [MongoDB] Busca todos os ginásios na coleção 'ginasios'.
+        [MongoDB] Busca todos os ginásios, ordenados por nome (via catálogo em memória).
         """
-        db = conectar_mongo()
-        if db is None:
-            return []
-        
-        ginasios = []
-        try:
-            # Busca todos os documentos na coleção e ordena por nome
-            resultados = db.ginasios.find({}).sort("nome", 1)
-            ginasios = list(resultados)
-        except Exception as e:
-            print(f"Erro ao buscar todos os ginásios no MongoDB: {e}")
-            
-        return ginasios
+        catalogo = obter_catalogo()
+        return catalogo.ginasios() if catalogo else []
     
     def buscar_por_id(self, id_ginasio):
-        """[MongoDB] Busca um único ginásio pelo seu _id."""
-        db = conectar_mongo()
-        if db is None: return None
-        try:
-            return db.ginasios.find_one({"_id": int(id_ginasio)})
-        except Exception as e:
-            print(f"Erro ao buscar ginásio por ID no MongoDB: {e}")
-            return None
+        """[MongoDB] Busca um único ginásio pelo seu _id (via catálogo em memória)."""
+        catalogo = obter_catalogo()
+        return catalogo.ginasio(id_ginasio) if catalogo else None
 
+    @altera_catalogo
     def criar(self, nome, endereco, capacidade):
         """[MongoDB] Insere um novo ginásio com arrays vazios para quadras e materiais."""
         db = conectar_mongo()
@@ -55,6 +42,7 @@ class GinasioDAO:
             print(f"Erro ao criar ginásio no MongoDB: {e}")
             return None
 
+    @altera_catalogo
     def atualizar(self, id_ginasio, nome, endereco, capacidade):
         """[MongoDB] Atualiza os dados de um ginásio."""
         db = conectar_mongo()
@@ -73,6 +61,7 @@ class GinasioDAO:
             print(f"Erro ao atualizar ginásio no MongoDB: {e}")
             return False
 
+    @altera_catalogo
     def excluir(self, id_ginasio):
         """[MongoDB] Exclui um ginásio da coleção."""
         db = conectar_mongo()
@@ -87,29 +76,11 @@ class GinasioDAO:
     # --- MÉTODOS RELACIONADOS A QUADRAS (AGORA DENTRO DE GINASIODAO) ---
 
     def buscar_todas_as_quadras(self):
-        """[MongoDB] Busca todas as quadras de todos os ginásios."""
-        db = conectar_mongo()
-        if db is None: return []
-        quadras = []
-        try:
-            pipeline = [
-                {"$unwind": "$quadras"},
-                {"$project": {
-                    "_id": 0,
-                    "id_ginasio": "$_id",
-                    "nome_ginasio": "$nome",
-                    "num_quadra": "$quadras.num_quadra",
-                    "tipo_piso": "$quadras.tipo_piso",
-                    "cobertura": "$quadras.cobertura",
-                    "status": "$quadras.status"
-                }}
-            ]
-            resultados = db.ginasios.aggregate(pipeline)
-            quadras = list(resultados)
-        except Exception as e:
-            print(f"Erro ao buscar todas as quadras no MongoDB: {e}")
-        return quadras
+        """[MongoDB] Busca todas as quadras de todos os ginásios (via catálogo em memória)."""
+        catalogo = obter_catalogo()
+        return catalogo.todas_as_quadras() if catalogo else []
 
+    @altera_catalogo
     def criar_quadra(self, id_ginasio, num_quadra, capacidade, tipo_piso, cobertura):
         """[MongoDB] Adiciona uma nova quadra (sub-documento) a um ginásio."""
         db = conectar_mongo()
@@ -132,6 +103,7 @@ class GinasioDAO:
             print(f"Erro ao criar quadra no MongoDB: {e}")
             return False
 
+    @altera_catalogo
     def atualizar_status_quadra(self, id_ginasio, num_quadra, novo_status):
         """[MongoDB] Atualiza o status de uma quadra específica dentro de um ginásio."""
         db = conectar_mongo()
@@ -146,6 +118,7 @@ class GinasioDAO:
             print(f"Erro ao atualizar status da quadra no MongoDB: {e}")
             return False
 
+    @altera_catalogo
     def excluir_quadra(self, id_ginasio, num_quadra):
         """[MongoDB] Remove uma quadra (sub-documento) de um ginásio."""
         db = conectar_mongo()
@@ -187,32 +160,26 @@ class GinasioDAO:
     # --- MÉTODOS DE ASSOCIAÇÃO DE ESPORTES (AGORA DENTRO DE GINASIODAO) ---
     
     def buscar_esportes_da_quadra(self, id_ginasio, num_quadra):
-        """[MongoDB] Busca os IDs de esportes associados a uma quadra."""
-        db = conectar_mongo()
-        if db is None: return []
-        try:
-            # Busca o ginásio e a quadra específica, e projeta apenas o campo de esportes
-            resultado = db.ginasios.find_one(
-                {"_id": int(id_ginasio), "quadras.num_quadra": int(num_quadra)},
-                {"quadras.esportes_permitidos.$": 1}
-            )
-            if resultado and 'quadras' in resultado and resultado['quadras']:
-                return resultado['quadras'][0].get('esportes_permitidos', [])
-        except Exception as e:
-            print(f"Erro ao buscar esportes da quadra no MongoDB: {e}")
-        return []
+        """[MongoDB] Busca os IDs de esportes associados a uma quadra (via catálogo em memória)."""
+        catalogo = obter_catalogo()
+        quadra = catalogo.quadra(id_ginasio, num_quadra) if catalogo else None
+        return list(quadra.get('esportes_permitidos', [])) if quadra else []
 
+    @altera_catalogo
     def atualizar_esportes_da_quadra(self, id_ginasio, num_quadra, lista_ids_esportes):
         """[MongoDB] Atualiza a lista de esportes de uma quadra."""
         db = conectar_mongo()
         if db is None: return False
         try:
-            # Garante que os IDs são inteiros, se o seu EsporteDAO usa IDs numéricos
-            lista_ids_int = [int(id) for id in lista_ids_esportes]
+            # Os esportes são referenciados pelo ObjectId (tipo canônico)
+            ids_canonicos = [id_esporte_canonico(id_esporte) for id_esporte in lista_ids_esportes]
+            if None in ids_canonicos:
+                print(f"Erro ao atualizar esportes da quadra: ID de esporte inválido em {lista_ids_esportes}")
+                return False
 
             resultado = db.ginasios.update_one(
                 {"_id": int(id_ginasio), "quadras.num_quadra": int(num_quadra)},
-                {"$set": {"quadras.$.esportes_permitidos": lista_ids_int}}
+                {"$set": {"quadras.$.esportes_permitidos": ids_canonicos}}
             )
             return resultado.modified_count > 0
         except Exception as e:
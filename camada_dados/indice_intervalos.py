@@ -0,0 +1,211 @@
+# camada_dados/indice_intervalos.py
+"""
+Índice de intervalos em memória, por quadra (id_ginasio, num_quadra).
+
+Guarda as ocupações (agendamentos ativos, eventos extraordinários e
+ocorrências já expandidas dos eventos recorrentes) de uma janela de semanas
+em listas ordenadas, respondendo com busca binária (bisect):
+
+    tem_sobreposicao(inicio, fim)               O(log n)
+    ocupacoes_sobrepostas(inicio, fim)          O(log n + k)
+    lacunas_livres(inicio, fim)                 O(log n + k)
+    proximo_horario_livre(a_partir_de, duracao) O(log n + blocos saltados)
+
+Protocolo de invalidação e atualização:
+
+1. Os caminhos de escrita (inserir_com_reserva -> criar_agendamento,
+   reservar_agendamento, ServicoBolsista.fazer_agendamento_em_nome_de;
+   mudanças de status e exclusões de agendamentos; EventoDAO.criar e
+   EventoDAO.excluir) gravam no MongoDB e só então chamam
+   notificacoes.notificar_alteracao_quadra(), que incrementa a versão
+   compartilhada da quadra e avisa os ouvintes do processo.
+2. O gerenciador descarta o índice da quadra avisada; a próxima leitura o
+   reconstrói a partir do MongoDB (três consultas indexadas).
+3. Entre workers: cada índice guarda a versão compartilhada lida antes da
+   carga, e obter() a compara com a versão atual (ler_versao) antes de
+   responder; uma escrita feita por outro processo força a recarga. Se a
+   versão não puder ser lida, obter() devolve None.
+4. Consultas fora da janela indexada não usam o índice (obter() devolve
+   None e o chamador consulta o MongoDB).
+5. INDICE_INTERVALOS_VALIDADE_SEGUNDOS limita a vida de cada índice
+   (escritas feitas por fora das DAOs não incrementam a versão).
+
+O índice atende LEITURAS (grade semanal, disponibilidade). A reserva em si
+continua decidida pelo índice único de slots no MongoDB, então um índice
+defasado nunca causa reserva duplicada.
+"""
+
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+INDICE_INTERVALOS_VALIDADE_SEGUNDOS = int(os.environ.get('INDICE_INTERVALOS_VALIDADE_SEGUNDOS', 60))
+INDICE_INTERVALOS_SEMANAS_ATRAS = int(os.environ.get('INDICE_INTERVALOS_SEMANAS_ATRAS', 1))
+INDICE_INTERVALOS_SEMANAS_FRENTE = int(os.environ.get('INDICE_INTERVALOS_SEMANAS_FRENTE', 8))
+
+
+class IndiceIntervalosQuadra:
+    """Ocupações de uma quadra em [janela_inicio, janela_fim), ordenadas pelo início."""
+
+    def __init__(self, ocupacoes, janela_inicio, janela_fim, versao=None):
+        self.janela_inicio = janela_inicio
+        self.janela_fim = janela_fim
+        self.versao = versao
+        self.criado_em = time.monotonic()
+
+        self.ocupacoes = sorted(
+            (o for o in ocupacoes if o.get('hora_ini') is not None and o.get('hora_fim') is not None
+             and o['hora_fim'] > o['hora_ini']),
+            key=lambda o: o['hora_ini']
+        )
+        self._inicios = [o['hora_ini'] for o in self.ocupacoes]
+
+        # _max_fim[i]: maior fim entre as ocupações 0..i. Como a lista está
+        # ordenada pelo início, diz em O(1) se alguma ocupação que começa
+        # antes de um instante ainda não terminou.
+        self._max_fim = []
+        maior = None
+        for o in self.ocupacoes:
+            maior = o['hora_fim'] if maior is None or o['hora_fim'] > maior else maior
+            self._max_fim.append(maior)
+
+        # Blocos ocupados: união das ocupações em intervalos disjuntos
+        self._blocos_ini = []
+        self._blocos_fim = []
+        for o in self.ocupacoes:
+            if self._blocos_fim and o['hora_ini'] <= self._blocos_fim[-1]:
+                self._blocos_fim[-1] = max(self._blocos_fim[-1], o['hora_fim'])
+            else:
+                self._blocos_ini.append(o['hora_ini'])
+                self._blocos_fim.append(o['hora_fim'])
+
+    def __len__(self):
+        return len(self.ocupacoes)
+
+    def cobre(self, inicio, fim):
+        return self.janela_inicio <= inicio and fim <= self.janela_fim
+
+    def tem_sobreposicao(self, inicio, fim):
+        """True se algum trecho de [inicio, fim) estiver ocupado."""
+        # Último bloco que começa antes de 'fim'; blocos são disjuntos
+        i = bisect_left(self._blocos_ini, fim)
+        return i > 0 and self._blocos_fim[i - 1] > inicio
+
+    def ocupacoes_sobrepostas(self, inicio, fim):
+        """Ocupações que se sobrepõem a [inicio, fim), ordenadas pelo início."""
+        j = bisect_left(self._inicios, fim) - 1
+        encontradas = []
+        while j >= 0 and self._max_fim[j] > inicio:
+            if self.ocupacoes[j]['hora_fim'] > inicio:
+                encontradas.append(self.ocupacoes[j])
+            j -= 1
+        encontradas.reverse()
+        return encontradas
+
+    def lacunas_livres(self, inicio, fim, duracao_minima=None):
+        """
+        Trechos livres [(ini, fim), ...] dentro de [inicio, fim). Com
+        duracao_minima (timedelta), descarta lacunas mais curtas.
+        """
+        lacunas = []
+        cursor = inicio
+        k = bisect_right(self._blocos_fim, inicio)
+        while k < len(self._blocos_ini) and self._blocos_ini[k] < fim:
+            if self._blocos_ini[k] > cursor:
+                lacunas.append((cursor, self._blocos_ini[k]))
+            cursor = max(cursor, self._blocos_fim[k])
+            k += 1
+        if cursor < fim:
+            lacunas.append((cursor, fim))
+
+        if duracao_minima is not None:
+            lacunas = [(a, b) for a, b in lacunas if b - a >= duracao_minima]
+        return lacunas
+
+    def proximo_horario_livre(self, a_partir_de, duracao):
+        """
+        Início do primeiro trecho livre com a duração pedida a partir de
+        'a_partir_de', ou None se não houver dentro da janela.
+        """
+        cursor = max(a_partir_de, self.janela_inicio)
+        k = bisect_right(self._blocos_fim, cursor)
+        while k < len(self._blocos_ini) and self._blocos_ini[k] < cursor + duracao:
+            cursor = max(cursor, self._blocos_fim[k])
+            k += 1
+        return cursor if cursor + duracao <= self.janela_fim else None
+
+
+class GerenciadorIndicesIntervalos:
+    """
+    Mantém um IndiceIntervalosQuadra por quadra, construído sob demanda pela
+    função 'carregar(id_ginasio, num_quadra, inicio, fim)', que deve devolver
+    as ocupações da janela (ou levantar exceção em caso de erro).
+    'ler_versao(id_ginasio, num_quadra)' devolve a versão compartilhada da
+    quadra (ou None se não puder ser lida); sem ela, vale só a validade.
+    """
+
+    def __init__(self, carregar, ler_versao=None, validade_segundos=None, semanas_atras=None, semanas_frente=None):
+        self._carregar = carregar
+        self._ler_versao = ler_versao
+        self.validade_segundos = INDICE_INTERVALOS_VALIDADE_SEGUNDOS if validade_segundos is None else validade_segundos
+        self.semanas_atras = INDICE_INTERVALOS_SEMANAS_ATRAS if semanas_atras is None else semanas_atras
+        self.semanas_frente = INDICE_INTERVALOS_SEMANAS_FRENTE if semanas_frente is None else semanas_frente
+        self._indices = {}
+        # Contador de invalidações por quadra: um índice carregado enquanto
+        # uma escrita acontecia não é guardado (evita cache já defasado).
+        self._geracoes = {}
+        self._lock = threading.Lock()
+
+    def _janela_atual(self):
+        hoje = datetime.now().date()
+        segunda = datetime.combine(hoje - timedelta(days=hoje.weekday()), datetime.min.time())
+        return (segunda - timedelta(weeks=self.semanas_atras),
+                segunda + timedelta(weeks=self.semanas_frente + 1))
+
+    def obter(self, id_ginasio, num_quadra, inicio=None, fim=None):
+        """
+        Retorna o índice da quadra (reconstruindo se expirado, invalidado ou
+        de outra versão). Se [inicio, fim) não couber na janela, ou se a
+        versão ou a carga falharem, retorna None para que o chamador
+        consulte o MongoDB diretamente.
+        """
+        chave = (int(id_ginasio), int(num_quadra))
+        janela_inicio, janela_fim = self._janela_atual()
+        if inicio is not None and fim is not None and not (janela_inicio <= inicio and fim <= janela_fim):
+            return None
+
+        versao = None
+        if self._ler_versao is not None:
+            versao = self._ler_versao(chave[0], chave[1])
+            if versao is None:
+                return None
+
+        indice = self._indices.get(chave)
+
+        if (indice is None or indice.janela_inicio != janela_inicio or indice.versao != versao
+                or time.monotonic() - indice.criado_em > self.validade_segundos):
+            geracao = self._geracoes.get(chave, 0)
+            try:
+                ocupacoes = self._carregar(chave[0], chave[1], janela_inicio, janela_fim)
+            except Exception as e:
+                print(f"Erro ao carregar índice de intervalos da quadra {chave}: {e}")
+                return None
+            indice = IndiceIntervalosQuadra(ocupacoes, janela_inicio, janela_fim, versao)
+            with self._lock:
+                if self._geracoes.get(chave, 0) == geracao:
+                    self._indices[chave] = indice
+            print(f"DEBUG[Índice-Intervalos]: quadra {chave} carregada com {len(indice)} ocupações.")
+        return indice
+
+    def invalidar(self, id_ginasio, num_quadra, inicio=None, fim=None):
+        """Ouvinte de notificacoes: descarta o índice da quadra alterada."""
+        chave = (int(id_ginasio), int(num_quadra))
+        with self._lock:
+            self._geracoes[chave] = self._geracoes.get(chave, 0) + 1
+            self._indices.pop(chave, None)
+
+    def limpar(self):
+        with self._lock:
+            self._indices.clear()
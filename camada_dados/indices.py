@@ -0,0 +1,359 @@
+# camada_dados/indices.py
+"""
+Gerenciamento dos índices do MongoDB.
+
+- garantir_indices(): cria (de forma idempotente) todos os índices que as
+  consultas das DAOs precisam. Pode ser chamada a cada inicialização.
+- verificar_planos(): roda explain() sobre cada formato de consulta "quente"
+  das DAOs e falha (ConsultaSemIndiceError) se algum cair em COLLSCAN.
+
+Uso pela linha de comando:
+    python -m camada_dados.indices              # cria os índices
+    python -m camada_dados.indices --verificar  # cria e verifica os planos
+    python -m camada_dados.indices --somente-verificar
+
+Observação: os índices parciais usam "$in" na partialFilterExpression,
+recurso disponível a partir do MongoDB 6.0.
+"""
+
+import sys
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from .mongo_config import conectar_mongo
+from .agendamento_dao import (
+    STATUS_QUE_OCUPAM,
+    ORDENACAO_LISTAGEM,
+    filtro_apos_cursor,
+    filtro_agendamentos_sobrepostos,
+    filtro_eventos_extraordinarios_sobrepostos,
+    preencher_slots_reservados,
+)
+from .evento_dao import filtro_recorrentes_da_quadra, filtro_recorrentes_sobrepostos
+from .reserva_materiais import filtro_reservas_sobrepostas
+
+
+class ConsultaSemIndiceError(Exception):
+    """Levantada quando algum formato de consulta das DAOs usa COLLSCAN."""
+
+
+# Especificação dos índices por coleção. Os nomes são fixos para que a
+# criação seja idempotente e para facilitar a leitura do explain().
+INDICES = {
+    "agendamentos": [
+        # Sobreposição de horários por quadra (verificar_conflito_de_horario,
+        # buscar_agendamentos_por_quadra). Parcial: cancelados não ocupam a quadra.
+        IndexModel(
+            [("id_ginasio", ASCENDING), ("num_quadra", ASCENDING),
+             ("hora_ini", ASCENDING), ("hora_fim", ASCENDING)],
+            name="agendamentos_quadra_horario_ativos",
+            partialFilterExpression={"status_agendamento": {"$in": STATUS_QUE_OCUPAM}},
+        ),
+        # Reserva atômica: cada fatia de horário de uma quadra só pode
+        # pertencer a um agendamento ativo (ver inserir_com_reserva).
+        IndexModel(
+            [("slots_reservados", ASCENDING)],
+            name="agendamentos_slots_reservados_unico",
+            unique=True,
+            partialFilterExpression={"slots_reservados": {"$exists": True}},
+        ),
+        # Meus agendamentos (buscar_agendamentos_por_usuario)
+        IndexModel(
+            [("cpf_usuario", ASCENDING), ("hora_ini", DESCENDING)],
+            name="agendamentos_usuario_horario",
+        ),
+        # Listagem geral paginada por (hora_ini, _id) e relatório de uso por período
+        IndexModel(
+            [("hora_ini", DESCENDING), ("_id", DESCENDING)],
+            name="agendamentos_horario_id",
+        ),
+        # Listagem administrativa filtrada por ginásio/quadra (todos os status)
+        IndexModel(
+            [("id_ginasio", ASCENDING), ("num_quadra", ASCENDING),
+             ("hora_ini", DESCENDING), ("_id", DESCENDING)],
+            name="agendamentos_quadra_horario_id",
+        ),
+        # Listagem administrativa filtrada por status
+        IndexModel(
+            [("status_agendamento", ASCENDING), ("hora_ini", DESCENDING), ("_id", DESCENDING)],
+            name="agendamentos_status_horario_id",
+        ),
+        # Agendamentos do dia para confirmação pelo bolsista
+        IndexModel(
+            [("id_bolsista_operador", ASCENDING), ("status_agendamento", ASCENDING),
+             ("hora_ini", ASCENDING)],
+            name="agendamentos_bolsista_status_horario",
+            partialFilterExpression={"id_bolsista_operador": {"$exists": True}},
+        ),
+    ],
+    "eventos": [
+        # Multikey sobre quadras_bloqueadas: conflitos com eventos extraordinários
+        IndexModel(
+            [("quadras_bloqueadas.id_ginasio", ASCENDING), ("quadras_bloqueadas.num_quadra", ASCENDING),
+             ("data_hora_inicio", ASCENDING), ("data_hora_fim", ASCENDING)],
+            name="eventos_extraordinarios_quadra_horario",
+            partialFilterExpression={"tipo": "extraordinario"},
+        ),
+        # Multikey sobre quadras_bloqueadas: eventos recorrentes de uma quadra
+        # por dia da semana e faixa de horário (sub-documento 'recorrencia')
+        IndexModel(
+            [("quadras_bloqueadas.id_ginasio", ASCENDING), ("quadras_bloqueadas.num_quadra", ASCENDING),
+             ("recorrencia.dia_semana", ASCENDING), ("recorrencia.minuto_inicio", ASCENDING),
+             ("recorrencia.minuto_fim", ASCENDING)],
+            name="eventos_recorrentes_quadra_dia_horario",
+            partialFilterExpression={"tipo": "recorrente"},
+        ),
+    ],
+    "usuarios": [
+        # Login (buscar_por_email). Único: impede emails duplicados.
+        IndexModel([("email", ASCENDING)], name="usuarios_email_unico", unique=True),
+        # Dropdown de servidores (buscar_todos_os_servidores)
+        IndexModel([("tipo", ASCENDING), ("nome", ASCENDING)], name="usuarios_tipo_nome"),
+        # Autocomplete do bolsista: apenas usuários ativos, ordenados por nome
+        IndexModel(
+            [("nome", ASCENDING)],
+            name="usuarios_ativos_nome",
+            partialFilterExpression={"status": "ativo"},
+        ),
+    ],
+    "ginasios": [
+        # Edição/exclusão de material por id_material (texto, ver normalizacao_ids)
+        IndexModel([("materiais_esportivos.id_material", ASCENDING)], name="ginasios_materiais_id"),
+    ],
+    "uso_diario": [
+        # Relatório de uso por período (buscar_uso_por_quadra)
+        IndexModel(
+            [("dia", ASCENDING), ("id_ginasio", ASCENDING), ("num_quadra", ASCENDING)],
+            name="uso_diario_dia_quadra",
+        ),
+    ],
+    "reservas_materiais": [
+        # Disponibilidade de materiais por intervalo (reserva_materiais)
+        IndexModel(
+            [("id_ginasio", ASCENDING), ("id_material", ASCENDING),
+             ("hora_ini", ASCENDING), ("hora_fim", ASCENDING)],
+            name="reservas_materiais_material_horario",
+        ),
+        # Liberação ao cancelar/excluir o agendamento
+        IndexModel([("id_agendamento", ASCENDING)], name="reservas_materiais_agendamento"),
+    ],
+    "sessoes": [
+        # Remoção automática das sessões expiradas (ver sessoes.py); a
+        # leitura é por _id
+        IndexModel([("expira_em", ASCENDING)], name="sessoes_expiracao_ttl", expireAfterSeconds=0),
+    ],
+    "chamados": [
+        IndexModel([("data", DESCENDING)], name="chamados_data"),
+    ],
+    "esportes": [
+        IndexModel([("nome", ASCENDING)], name="esportes_nome"),
+    ],
+}
+
+# Índices substituídos por versões novas; removidos por garantir_indices().
+INDICES_OBSOLETOS = {
+    # agendamentos_id_agendamento: o campo foi removido pela normalização de IDs
+    "agendamentos": ["agendamentos_horario", "agendamentos_id_agendamento"],
+    "eventos": ["eventos_recorrentes_quadra"],
+}
+
+
+def valores_duplicados(colecao, modelo, limite=10):
+    """
+    Valores repetidos das chaves de um índice único (respeitando a
+    partialFilterExpression), que impedem a sua criação:
+    [{"_id": {campo: valor}, "quantidade": n}, ...], os mais repetidos primeiro.
+    """
+    documento = modelo.document
+    campos = list(documento['key'].keys())
+    pipeline = [{"$match": documento.get('partialFilterExpression', {})}]
+    # Campos multikey (ex.: slots_reservados) repetem por elemento
+    pipeline += [{"$unwind": f"${campo}"} for campo in campos]
+    pipeline += [
+        {"$group": {"_id": {campo.replace('.', '_'): f"${campo}" for campo in campos}, "quantidade": {"$sum": 1}}},
+        {"$match": {"quantidade": {"$gt": 1}}},
+        {"$sort": {"quantidade": -1}},
+        {"$limit": limite},
+    ]
+    return list(colecao.aggregate(pipeline, allowDiskUse=True))
+
+
+def _criar_indices_da_colecao(colecao, modelos):
+    """
+    Cria os índices de uma coleção. Os únicos vão cada um em uma chamada
+    própria: se os dados já existentes violarem um deles (ex.: emails
+    duplicados), só ele deixa de ser criado, e os valores repetidos são
+    informados. Retorna os nomes dos índices criados ou já existentes.
+    """
+    comuns = [m for m in modelos if not m.document.get('unique')]
+    criados = colecao.create_indexes(comuns) if comuns else []
+    for modelo in modelos:
+        if not modelo.document.get('unique'):
+            continue
+        try:
+            criados += colecao.create_indexes([modelo])
+        except OperationFailure as e:  # inclui DuplicateKeyError
+            nome = modelo.document.get('name')
+            print(f"⚠️  {colecao.name}: índice único {nome} NÃO criado: {e}")
+            try:
+                for duplicado in valores_duplicados(colecao, modelo):
+                    print(f"    repetido {duplicado['quantidade']}x: {duplicado['_id']}")
+            except Exception as erro:
+                print(f"    (não foi possível listar os valores repetidos: {erro})")
+    return criados
+
+
+def garantir_indices(db=None):
+    """
+    Cria todos os índices definidos em INDICES. É idempotente: índices já
+    existentes com a mesma especificação são ignorados pelo servidor. Um
+    índice único que os dados existentes violam é informado (com os valores
+    repetidos) sem impedir a criação dos demais. Em seguida preenche os
+    slots dos agendamentos ativos que ainda não os têm.
+    Retorna um dicionário {colecao: [nomes_dos_indices]}.
+    """
+    db = db if db is not None else conectar_mongo()
+    if db is None:
+        raise RuntimeError("Não foi possível conectar ao MongoDB para criar os índices.")
+
+    for colecao, nomes in INDICES_OBSOLETOS.items():
+        existentes = db[colecao].index_information()
+        for nome in nomes:
+            if nome in existentes:
+                db[colecao].drop_index(nome)
+                print(f"DEBUG[Índices]: {colecao}: índice obsoleto {nome} removido")
+
+    criados = {}
+    for colecao, modelos in INDICES.items():
+        criados[colecao] = _criar_indices_da_colecao(db[colecao], modelos)
+        print(f"DEBUG[Índices]: {colecao}: {', '.join(criados[colecao])}")
+
+    # Agendamentos antigos sem slots ficam fora do índice único de slots;
+    # recebem as chaves agora que o índice existe (migração 'slots').
+    preencher_slots_reservados(db)
+    return criados
+
+
+def _formatos_de_consulta():
+    """
+    Formatos das consultas "quentes" das DAOs, com valores de exemplo.
+    Cada item: (descrição, coleção, filtro, ordenação).
+    """
+    agora = datetime.now()
+    daqui_uma_hora = agora + timedelta(hours=1)
+    inicio_hoje = datetime.combine(agora.date(), datetime.min.time())
+
+    return [
+        ("AgendamentoDAO.verificar_conflito_de_horario (agendamentos)", "agendamentos",
+         filtro_agendamentos_sobrepostos(1, 1, agora, daqui_uma_hora), None),
+        ("AgendamentoDAO.verificar_conflito_de_horario (eventos)", "eventos",
+         filtro_eventos_extraordinarios_sobrepostos(1, 1, agora, daqui_uma_hora), None),
+        ("AgendamentoDAO.buscar_agendamentos_por_quadra (recorrentes)", "eventos",
+         dict(filtro_recorrentes_da_quadra(1, 1),
+              **{"recorrencia.data_inicio": {"$lt": daqui_uma_hora},
+                 "recorrencia.data_fim": {"$gte": inicio_hoje}}), None),
+        ("EventoDAO.buscar_recorrentes_sobrepostos", "eventos",
+         filtro_recorrentes_sobrepostos(1, 1, 0, 18 * 60, 20 * 60, inicio_hoje,
+                                        inicio_hoje + timedelta(days=120)), None),
+        ("EventoDAO.buscar_recorrentes_por_quadra", "eventos",
+         filtro_recorrentes_da_quadra(1, 1), None),
+        ("AgendamentoDAO.buscar_agendamentos_por_usuario", "agendamentos",
+         {"cpf_usuario": "00000000000"}, [("hora_ini", DESCENDING)]),
+        ("AgendamentoDAO.buscar_todos_os_agendamentos", "agendamentos",
+         {}, [("hora_ini", DESCENDING)]),
+        ("AgendamentoDAO.buscar_pagina_agendamentos (sem filtros)", "agendamentos",
+         filtro_apos_cursor(agora, ObjectId()), ORDENACAO_LISTAGEM),
+        ("AgendamentoDAO.buscar_pagina_agendamentos (quadra)", "agendamentos",
+         {"id_ginasio": 1, "num_quadra": 1, "hora_ini": {"$gte": inicio_hoje}}, ORDENACAO_LISTAGEM),
+        ("AgendamentoDAO.buscar_pagina_agendamentos (status)", "agendamentos",
+         {"status_agendamento": "confirmado"}, ORDENACAO_LISTAGEM),
+        ("ServicoBolsista.gerar_relatorio_uso", "uso_diario",
+         {"dia": {"$gte": inicio_hoje - timedelta(days=365), "$lte": inicio_hoje}, "id_ginasio": 1}, None),
+        ("ServicoBolsista.buscar_agendamentos_para_confirmacao", "agendamentos",
+         {"id_bolsista_operador": "00000000000", "status_agendamento": "confirmado",
+          "hora_ini": {"$gte": inicio_hoje, "$lt": inicio_hoje + timedelta(days=1)}}, None),
+        ("ServicoBolsista.buscar_agendamentos_bolsista_por_status", "agendamentos",
+         {"id_bolsista_operador": "00000000000",
+          "status_agendamento": {"$in": ["confirmado", "realizado", "cancelado"]}}, None),
+        ("reserva_materiais.disponibilidade_materiais", "reservas_materiais",
+         filtro_reservas_sobrepostas(1, [101, 102], agora, daqui_uma_hora), None),
+        ("reserva_materiais.liberar_materiais", "reservas_materiais",
+         {"id_agendamento": ObjectId()}, None),
+        ("MaterialDAO.atualizar / MaterialDAO.excluir", "ginasios",
+         {"materiais_esportivos.id_material": "101"}, None),
+        ("UsuarioDAO.buscar_por_email", "usuarios",
+         {"email": "exemplo@udesc.br"}, None),
+        ("UsuarioDAO.buscar_todos_os_servidores", "usuarios",
+         {"tipo": {"$in": ["admin", "funcionario", "servidor"]}}, [("nome", ASCENDING)]),
+    ]
+
+
+def _estagios_do_plano(plano):
+    """Percorre recursivamente um plano do explain() e devolve os nomes dos estágios."""
+    if not isinstance(plano, dict):
+        return []
+    estagios = []
+    if 'stage' in plano:
+        estagios.append(plano['stage'])
+    # Planos do motor SBE (MongoDB 7+) vêm aninhados em 'queryPlan'
+    for chave in ('queryPlan', 'inputStage'):
+        if chave in plano:
+            estagios.extend(_estagios_do_plano(plano[chave]))
+    for sub in plano.get('inputStages', []):
+        estagios.extend(_estagios_do_plano(sub))
+    return estagios
+
+
+def verificar_planos(db=None):
+    """
+    Executa explain() em cada formato de consulta das DAOs. Levanta
+    ConsultaSemIndiceError se algum plano vencedor contiver COLLSCAN.
+    Retorna a lista [(descrição, estágios)] quando tudo estiver indexado.
+    """
+    db = db if db is not None else conectar_mongo()
+    if db is None:
+        raise RuntimeError("Não foi possível conectar ao MongoDB para verificar os planos.")
+
+    resultados = []
+    falhas = []
+    for descricao, colecao, filtro, ordenacao in _formatos_de_consulta():
+        comando = {"find": colecao, "filter": filtro}
+        if ordenacao:
+            comando["sort"] = dict(ordenacao)
+        explain = db.command("explain", comando, verbosity="queryPlanner")
+        estagios = _estagios_do_plano(explain.get('queryPlanner', {}).get('winningPlan', {}))
+        resultados.append((descricao, estagios))
+
+        if 'COLLSCAN' in estagios:
+            falhas.append(f"{descricao}: {' <- '.join(estagios)}")
+            print(f"❌ [Índices] {descricao} usa COLLSCAN: {estagios}")
+        else:
+            print(f"✅ [Índices] {descricao}: {' <- '.join(estagios)}")
+
+    if falhas:
+        raise ConsultaSemIndiceError(
+            "Consultas sem índice (COLLSCAN):\n  " + "\n  ".join(falhas)
+        )
+    return resultados
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    try:
+        if '--somente-verificar' not in argv:
+            garantir_indices()
+        if '--verificar' in argv or '--somente-verificar' in argv:
+            verificar_planos()
+    except ConsultaSemIndiceError as e:
+        print(e)
+        return 1
+    except Exception as e:
+        print(f"❌ Erro ao gerenciar índices: {e}")
+        return 2
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
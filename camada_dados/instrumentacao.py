@@ -0,0 +1,324 @@
+# camada_dados/instrumentacao.py
+"""
+Instrumentação dos comandos enviados ao MongoDB, por requisição.
+
+Um CommandListener do PyMongo (OuvinteConsultas) é passado a todos os
+clientes pelas opções do pool (mongo_config.GerenciadorConexao e, por
+reuso das opções, o cliente assíncrono). Cada comando é somado à medição
+ativa no contexto atual (contextvars: vale para a thread da requisição e
+para as tarefas asyncio criadas a partir dela):
+
+- comandos: quantidade de comandos (find, aggregate, insert, getMore, ...);
+- tempo_ms: soma das durações medidas pelo driver (ida e volta ao servidor);
+- bytes_enviados / bytes_recebidos: tamanho BSON dos comandos e respostas.
+  Custa uma serialização a mais por comando e por resposta (lotes grandes
+  das exportações inclusive), então só é medido quando pedido: pelo
+  middleware com cabeçalhos ou log ligados, por medir_consultas(...,
+  medir_bytes=True), ou em todas as requisições com
+  MONGO_INSTRUMENTACAO_BYTES=1;
+- por_metodo: o mesmo, por método de DAO ou serviço que emitiu o comando
+  (primeiro quadro da pilha em camada_dados ou camada_negocio).
+
+Fora de uma medição o ouvinte não faz nada além de ler a variável de
+contexto. Medições podem ser aninhadas: a interna também soma na externa.
+
+Uso:
+- MiddlewareConsultasMongo (app.py) mede cada requisição, inclusive a
+  leitura e a gravação da sessão; com cabeçalhos ligados (modo debug ou
+  MONGO_INSTRUMENTACAO_CABECALHOS=1) responde X-Mongo-*; com
+  MONGO_INSTRUMENTACAO_LOG=1 imprime uma linha JSON por requisição; acima
+  do orçamento da rota (ORCAMENTOS_POR_ROTA) imprime sempre um aviso.
+- medir_consultas() / orcamento_consultas() para ferramentas e testes:
+
+      with orcamento_consultas(3, rota='tabela_agendamento'):
+          cliente.get('/tabela_agendamento/1/1')
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+
+import bson
+from pymongo import monitoring
+
+MONGO_INSTRUMENTACAO = os.environ.get('MONGO_INSTRUMENTACAO', '1') == '1'
+MONGO_INSTRUMENTACAO_BYTES = os.environ.get('MONGO_INSTRUMENTACAO_BYTES', '0') == '1'
+MONGO_INSTRUMENTACAO_CABECALHOS = os.environ.get('MONGO_INSTRUMENTACAO_CABECALHOS', '0') == '1'
+MONGO_INSTRUMENTACAO_LOG = os.environ.get('MONGO_INSTRUMENTACAO_LOG', '0') == '1'
+
+# Máximo de comandos por requisição de cada rota (endpoint do Flask), com
+# a sessão incluída. Verificados por ferramentas/verificar_orcamentos.py e
+# avisados em tempo de execução pelo middleware.
+ORCAMENTOS_POR_ROTA = {
+    'login': 4,
+    'index': 2,
+    'novo_agendamento': 3,
+    'selecionar_quadra': 3,
+    'tabela_agendamento': 10,
+    'fazer_agendamento': 10,
+    'meus_agendamentos': 3,
+    'bolsista_agendamentos': 4,
+    'admin_verificar_conflitos_evento': 3,
+    # POST /admin/eventos/novo: sessão, verificação de conflitos, nome do
+    # admin, inserção, versão compartilhada da quadra (uma por quadra
+    # bloqueada) e gravação da sessão (flash). Não depende do número de
+    # ocorrências da recorrência.
+    'admin_form_evento': 7,
+}
+
+_PACOTES_RASTREADOS = ('camada_dados.', 'camada_negocio.')
+
+_medicao_atual = contextvars.ContextVar('medicao_consultas_mongo', default=None)
+
+
+class OrcamentoConsultasExcedido(AssertionError):
+    """Uma rota ou trecho de código fez mais comandos do que o orçamento."""
+
+    def __init__(self, medicao, maximo):
+        self.medicao = medicao
+        self.maximo = maximo
+        super().__init__(f"{medicao.rota or 'trecho'}: {medicao.comandos} comandos no MongoDB "
+                         f"(orçamento {maximo}); por método: {medicao.resumo_por_metodo()}")
+
+
+def _metodo_chamador():
+    """'modulo.Classe.metodo' do primeiro quadro da pilha nas camadas de dados/negócio."""
+    quadro = sys._getframe(2)
+    while quadro is not None:
+        modulo = quadro.f_globals.get('__name__', '')
+        if modulo.startswith(_PACOTES_RASTREADOS) and modulo != __name__:
+            codigo = quadro.f_code
+            return f"{modulo.split('.', 1)[1]}.{getattr(codigo, 'co_qualname', codigo.co_name)}"
+        quadro = quadro.f_back
+    return None
+
+
+def _tamanho_bson(documento):
+    try:
+        return len(bson.encode(documento))
+    except Exception:
+        return 0
+
+
+class MedicaoConsultas:
+    """Totais dos comandos de uma requisição (ou de um trecho de código)."""
+
+    def __init__(self, rota=None, pai=None, medir_bytes=False):
+        self.rota = rota
+        self.pai = pai
+        # Uma medição interna mede bytes se a externa medir (e vice-versa não)
+        self.medir_bytes = medir_bytes or (pai is not None and pai.medir_bytes)
+        self.comandos = 0
+        self.tempo_ms = 0.0
+        self.bytes_enviados = 0
+        self.bytes_recebidos = 0
+        self.por_metodo = {}  # método -> {"comandos", "tempo_ms"}
+        self._pendentes = {}  # request_id do comando -> método
+        self._lock = threading.Lock()
+
+    def _iniciado(self, id_comando, metodo, bytes_enviados):
+        with self._lock:
+            self.comandos += 1
+            self.bytes_enviados += bytes_enviados
+            self._pendentes[id_comando] = metodo
+            totais = self.por_metodo.setdefault(metodo or '?', {"comandos": 0, "tempo_ms": 0.0})
+            totais["comandos"] += 1
+        if self.pai is not None:
+            self.pai._iniciado(id_comando, metodo, bytes_enviados)
+
+    def _concluido(self, id_comando, duracao_us, bytes_recebidos):
+        ms = duracao_us / 1000
+        with self._lock:
+            self.tempo_ms += ms
+            self.bytes_recebidos += bytes_recebidos
+            metodo = self._pendentes.pop(id_comando, None)
+            self.por_metodo.setdefault(metodo or '?', {"comandos": 0, "tempo_ms": 0.0})["tempo_ms"] += ms
+        if self.pai is not None:
+            self.pai._concluido(id_comando, duracao_us, bytes_recebidos)
+
+    def resumo_por_metodo(self):
+        return {metodo: totais["comandos"] for metodo, totais in
+                sorted(self.por_metodo.items(), key=lambda item: -item[1]["comandos"])}
+
+    def como_dict(self):
+        dados = {
+            "rota": self.rota,
+            "comandos": self.comandos,
+            "tempo_ms": round(self.tempo_ms, 3),
+            "por_metodo": {metodo: {"comandos": t["comandos"], "tempo_ms": round(t["tempo_ms"], 3)}
+                           for metodo, t in self.por_metodo.items()},
+        }
+        if self.medir_bytes:
+            dados.update(bytes_enviados=self.bytes_enviados, bytes_recebidos=self.bytes_recebidos)
+        return dados
+
+    def cabecalhos(self):
+        cabecalhos = [
+            ('X-Mongo-Comandos', str(self.comandos)),
+            ('X-Mongo-Tempo-Ms', f"{self.tempo_ms:.2f}"),
+        ]
+        if self.medir_bytes:
+            cabecalhos += [
+                ('X-Mongo-Bytes-Enviados', str(self.bytes_enviados)),
+                ('X-Mongo-Bytes-Recebidos', str(self.bytes_recebidos)),
+            ]
+        cabecalhos.append(('X-Mongo-Metodos', ";".join(f"{m}={n}" for m, n in self.resumo_por_metodo().items())))
+        return cabecalhos
+
+
+class OuvinteConsultas(monitoring.CommandListener):
+    """Soma cada comando à medição ativa no contexto (se houver)."""
+
+    def started(self, event):
+        medicao = _medicao_atual.get()
+        if medicao is None:
+            return
+        enviados = _tamanho_bson(event.command) if medicao.medir_bytes else 0
+        medicao._iniciado(event.request_id, _metodo_chamador(), enviados)
+
+    def succeeded(self, event):
+        medicao = _medicao_atual.get()
+        if medicao is None:
+            return
+        recebidos = _tamanho_bson(event.reply) if medicao.medir_bytes else 0
+        medicao._concluido(event.request_id, event.duration_micros, recebidos)
+
+    def failed(self, event):
+        medicao = _medicao_atual.get()
+        if medicao is not None:
+            medicao._concluido(event.request_id, event.duration_micros, 0)
+
+
+ouvinte_consultas = OuvinteConsultas()
+
+
+def ouvintes_de_eventos():
+    """Listeners para o parâmetro 'event_listeners' do MongoClient."""
+    return [ouvinte_consultas] if MONGO_INSTRUMENTACAO else []
+
+
+def iniciar_medicao(rota=None, medir_bytes=False):
+    """Ativa uma medição no contexto atual. Retorna (medicao, token) para encerrar_medicao."""
+    medicao = MedicaoConsultas(rota, pai=_medicao_atual.get(), medir_bytes=medir_bytes)
+    return medicao, _medicao_atual.set(medicao)
+
+
+def encerrar_medicao(token):
+    _medicao_atual.reset(token)
+
+
+def medicao_atual():
+    return _medicao_atual.get()
+
+
+def definir_rota(rota):
+    """Marca a medição ativa com a rota (endpoint) da requisição."""
+    medicao = _medicao_atual.get()
+    if medicao is not None:
+        medicao.rota = rota
+
+
+@contextlib.contextmanager
+def medir_consultas(rota=None, medir_bytes=False):
+    """Mede os comandos emitidos dentro do bloco: 'with medir_consultas() as m: ...; m.comandos'."""
+    medicao, token = iniciar_medicao(rota, medir_bytes)
+    try:
+        yield medicao
+    finally:
+        encerrar_medicao(token)
+
+
+@contextlib.contextmanager
+def orcamento_consultas(maximo=None, rota=None):
+    """
+    Como medir_consultas, mas levanta OrcamentoConsultasExcedido ao sair se
+    o bloco fizer mais de 'maximo' comandos (sem 'maximo', o orçamento da
+    rota em ORCAMENTOS_POR_ROTA). A rota pode ser definida dentro do bloco
+    (o middleware usa o endpoint da requisição).
+    """
+    with medir_consultas(rota) as medicao:
+        yield medicao
+    limite = maximo if maximo is not None else ORCAMENTOS_POR_ROTA.get(medicao.rota)
+    if limite is not None and medicao.comandos > limite:
+        raise OrcamentoConsultasExcedido(medicao, limite)
+
+
+class MiddlewareConsultasMongo:
+    """
+    Middleware WSGI: uma medição por requisição, da abertura da sessão ao
+    fim da resposta. A rota é definida pelo app (definir_rota no
+    before_request); sem ela, fica o caminho da URL.
+
+    exibir_cabecalhos: função sem argumentos (ex.: lambda: app.debug) que diz
+    se os cabeçalhos X-Mongo-* devem ser enviados. Comandos feitos durante
+    uma resposta em streaming entram no log, mas não nos cabeçalhos.
+    """
+
+    def __init__(self, aplicacao_wsgi, exibir_cabecalhos=None, orcamentos=None):
+        self.aplicacao_wsgi = aplicacao_wsgi
+        self.exibir_cabecalhos = exibir_cabecalhos or (lambda: MONGO_INSTRUMENTACAO_CABECALHOS)
+        self.orcamentos = ORCAMENTOS_POR_ROTA if orcamentos is None else orcamentos
+
+    def __call__(self, environ, start_response):
+        exibir = self.exibir_cabecalhos()
+        medicao, token = iniciar_medicao(environ.get('PATH_INFO'),
+                                         MONGO_INSTRUMENTACAO_BYTES or MONGO_INSTRUMENTACAO_LOG or exibir)
+
+        def start_response_medido(status, cabecalhos, exc_info=None):
+            if exibir:
+                cabecalhos = list(cabecalhos) + medicao.cabecalhos()
+            return start_response(status, cabecalhos, exc_info)
+
+        try:
+            resposta = self.aplicacao_wsgi(environ, start_response_medido)
+        finally:
+            encerrar_medicao(token)
+        return _RespostaMedida(resposta, medicao, self, environ)
+
+    def ao_encerrar(self, medicao, environ):
+        limite = self.orcamentos.get(medicao.rota)
+        excedeu = limite is not None and medicao.comandos > limite
+        if MONGO_INSTRUMENTACAO_LOG or excedeu:
+            registro = dict(medicao.como_dict(), metodo_http=environ.get('REQUEST_METHOD'),
+                            caminho=environ.get('PATH_INFO'))
+            if excedeu:
+                registro["orcamento"] = limite
+            print(json.dumps({"instrumentacao_mongo": registro}, ensure_ascii=False), flush=True)
+
+
+class _RespostaMedida:
+    """
+    Iterável da resposta. A medição só fica ativa durante cada passo da
+    iteração e no close(), nunca entre eles: o servidor pode atender outra
+    requisição na mesma thread sem herdar a medição desta.
+    """
+
+    def __init__(self, resposta, medicao, middleware, environ):
+        self._resposta = resposta
+        self._medicao = medicao
+        self._middleware = middleware
+        self._environ = environ
+
+    def __iter__(self):
+        iterador = iter(self._resposta)
+        while True:
+            token = _medicao_atual.set(self._medicao)
+            try:
+                parte = next(iterador)
+            except StopIteration:
+                return
+            finally:
+                _medicao_atual.reset(token)
+            yield parte
+
+    def close(self):
+        token = _medicao_atual.set(self._medicao)
+        try:
+            if hasattr(self._resposta, 'close'):
+                self._resposta.close()
+        finally:
+            _medicao_atual.reset(token)
+            self._middleware.ao_encerrar(self._medicao, self._environ)
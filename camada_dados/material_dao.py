@@ -1,6 +1,7 @@
 # camada_dados/material_dao.py
 
 from .mongo_config import conectar_mongo
+from .catalogo import obter_catalogo, altera_catalogo
 from bson import ObjectId
 
 class MaterialDAO:
@@ -9,58 +10,21 @@ class MaterialDAO:
         
     def buscar_todos(self):
         """
-        [MongoDB] Busca todos os materiais de todos os ginásios.
-        Desagrupa (unwind) os materiais embutidos para retornar uma lista plana.
+        [MongoDB] Busca todos os materiais de todos os ginásios como uma lista
+        plana (via catálogo em memória, que já guarda os materiais desagrupados).
         """
-        db = conectar_mongo()
-        if db is None:
-            return []
-        
-        materiais = []
-        try:
-            # A 'agregação' é uma ferramenta poderosa do MongoDB.
-            # $unwind: "desmonta" o array de materiais, criando um documento para cada material.
-            # $project: formata o documento de saída.
-            pipeline = [
-                {"$unwind": "$materiais_esportivos"},
-                {"$project": {
-                    "_id": 0,
-                    "id_material": "$materiais_esportivos.id_material",
-                    "nome": "$materiais_esportivos.nome",
-                    "descricao": "$materiais_esportivos.descricao",
-                    "marca": "$materiais_esportivos.marca",
-                    "status": "$materiais_esportivos.status",
-                    "qnt_total": "$materiais_esportivos.qnt_total",
-                    "qnt_disponivel": "$materiais_esportivos.qnt_disponivel",
-                    "id_ginasio": "$_id",
-                    "nome_ginasio": "$nome"
-                }}
-            ]
-            resultados = db.ginasios.aggregate(pipeline)
-            materiais = list(resultados)
-            print(f"DEBUG[DAO-Mongo]: {len(materiais)} materiais encontrados em todos os ginásios.")
-        except Exception as e:
-            print(f"Erro ao buscar todos os materiais no MongoDB: {e}")
-            
-        return materiais
+        catalogo = obter_catalogo()
+        return catalogo.todos_os_materiais() if catalogo else []
 
     def buscar_por_ginasio(self, id_ginasio):
         """
-        [MongoDB] Busca todos os materiais esportivos de um ginásio específico.
+        [MongoDB] Busca todos os materiais esportivos de um ginásio específico
+        (via catálogo em memória).
         """
-        db = conectar_mongo()
-        if db is None:
-            return []
-            
-        try:
-            ginasio = db.ginasios.find_one({"_id": id_ginasio}, {"materiais_esportivos": 1})
-            if ginasio and 'materiais_esportivos' in ginasio:
-                return ginasio['materiais_esportivos']
-        except Exception as e:
-            print(f"Erro ao buscar materiais por ginásio no MongoDB: {e}")
-            
-        return []
+        catalogo = obter_catalogo()
+        return catalogo.materiais_do_ginasio(id_ginasio) if catalogo else []
 
+    @altera_catalogo
     def criar(self, id_ginasio, nome, descricao, marca, status, qnt_total):
         db = conectar_mongo()
         if db is None: return False
@@ -94,6 +58,7 @@ class MaterialDAO:
             print(f"ERRO[DAO-Mongo] ao criar material: {e}")
             return False
 
+    @altera_catalogo
     def atualizar(self, id_material, nome, descricao, marca, status, qnt_total, qnt_disponivel):
         db = conectar_mongo()
         if db is None: return False
@@ -104,14 +69,10 @@ class MaterialDAO:
             
             print(f"DEBUG[DAO-Mongo]: Tentando ATUALIZAR material ID {id_material}")
             
-            # --- CORREÇÃO 2: Conversão de tipo no filtro ---
-            # Tenta encontrar o material tanto como string quanto como número para cobrir ambos os casos
+            # id_material é sempre texto (ver camada_dados/normalizacao_ids.py):
+            # uma única chave, resolvida pelo índice ginasios_materiais_id
             resultado = db.ginasios.update_one(
-                {"$or": [
-                    {"materiais_esportivos.id_material": id_material},
-                    {"materiais_esportivos.id_material": int(id_material) if id_material.isdigit() else -1}
-                ]},
-                # --- FIM CORREÇÃO ---
+                {"materiais_esportivos.id_material": str(id_material)},
                 {"$set": {
                     "materiais_esportivos.$.nome": nome,
                     "materiais_esportivos.$.descricao": descricao,
@@ -127,6 +88,7 @@ class MaterialDAO:
             print(f"ERRO[DAO-Mongo] ao atualizar material: {e}")
             return False
 
+    @altera_catalogo
     def excluir(self, id_material):
         db = conectar_mongo()
         if db is None: return False
@@ -134,18 +96,12 @@ class MaterialDAO:
         try:
             print(f"DEBUG[DAO-Mongo]: Tentando EXCLUIR material ID {id_material}")
             
-            # --- CORREÇÃO 2: Conversão de tipo no filtro ---
-            # Tenta remover o material tanto como string quanto como número
+            # Filtra o ginásio que contém o material (índice ginasios_materiais_id)
+            # em vez de aplicar o $pull a um ginásio qualquer
             resultado = db.ginasios.update_one(
-                {}, 
-                {"$pull": {"materiais_esportivos": {
-                    "$or": [
-                        {"id_material": id_material},
-                        {"id_material": int(id_material) if id_material.isdigit() else -1}
-                    ]
-                }}}
+                {"materiais_esportivos.id_material": str(id_material)},
+                {"$pull": {"materiais_esportivos": {"id_material": str(id_material)}}}
             )
-            # --- FIM CORREÇÃO ---
             print(f"DEBUG[DAO-Mongo]: Resultado da exclusão: Matched={resultado.matched_count}, Modified={resultado.modified_count}")
             return resultado.modified_count > 0
         except Exception as e:
@@ -0,0 +1,118 @@
+# camada_dados/migracoes.py
+"""
+Migrações de dados do MongoDB, executadas pela linha de comando:
+
+    python -m camada_dados.migracoes <nome_da_migracao>
+
+Todas as migrações são idempotentes: podem ser executadas novamente sem
+efeito sobre documentos já migrados.
+"""
+
+import sys
+from datetime import date
+
+from .mongo_config import conectar_mongo
+from .agendamento_dao import STATUS_QUE_OCUPAM, preencher_slots_reservados, preencher_dados_embutidos
+from .evento_dao import migrar_regras_recorrencia
+from .uso_diario import reconstruir_uso_diario
+from .reserva_materiais import liberar_reservas_orfas
+from .normalizacao_ids import normalizar_ids, verificar_normalizacao
+
+
+def migrar_slots_reservados(db, *args):
+    """Preenche as chaves de reserva atômica dos agendamentos antigos."""
+    atualizados, conflitos = preencher_slots_reservados(db)
+    if conflitos:
+        print("Agendamentos já conflitantes (resolva manualmente):")
+        for id_agendamento in conflitos:
+            print(f"  - {id_agendamento}")
+    return 0
+
+
+def migrar_recorrencias(db, *args):
+    """Converte a frase 'regra_recorrencia' no sub-documento 'recorrencia'."""
+    migrados, nao_reconhecidos = migrar_regras_recorrencia(db)
+    print(f"Eventos recorrentes migrados: {migrados}")
+    if nao_reconhecidos:
+        print("Regras não reconhecidas (corrija manualmente):")
+        for id_evento in nao_reconhecidos:
+            print(f"  - {id_evento}")
+    return 0
+
+
+def migrar_dados_embutidos(db, *args):
+    """Embute os nomes de usuário/ginásio nos agendamentos que não os têm."""
+    atualizados = preencher_dados_embutidos(db)
+    print(f"Agendamentos atualizados: {atualizados}")
+    return 0
+
+
+def migrar_uso_diario(db, *args):
+    """
+    Recalcula os contadores de uso diário a partir dos agendamentos.
+    Opcionalmente, só o período: uso_diario AAAA-MM-DD AAAA-MM-DD.
+    """
+    data_inicio = date.fromisoformat(args[0]) if len(args) > 0 else None
+    data_fim = date.fromisoformat(args[1]) if len(args) > 1 else None
+    gravados = reconstruir_uso_diario(db, data_inicio, data_fim)
+    print(f"Documentos de uso diário gravados: {gravados}")
+    return 0
+
+
+def migrar_reservas_materiais(db, *args):
+    """Remove reservas de materiais de agendamentos inexistentes ou cancelados."""
+    removidas = liberar_reservas_orfas(db, STATUS_QUE_OCUPAM)
+    print(f"Reservas de materiais órfãs removidas: {removidas}")
+    return 0
+
+
+def migrar_normalizar_ids(db, *args):
+    """
+    Converte os IDs para o tipo canônico (ver normalizacao_ids.py) e mostra a
+    verificação. Retomável; opcionalmente: normalizar_ids <tamanho_do_lote>.
+    """
+    tamanho_lote = int(args[0]) if args else 500
+    corrigidos = normalizar_ids(db, tamanho_lote)
+    for etapa, quantidade in corrigidos.items():
+        print(f"  {etapa}: {quantidade} documento(s) corrigido(s)")
+    return migrar_verificar_ids(db)
+
+
+def migrar_verificar_ids(db, *args):
+    """Lista os documentos que ainda misturam tipos de ID. Sai com 1 se houver algum."""
+    relatorio = verificar_normalizacao(db)
+    pendentes = 0
+    for etapa, item in relatorio.items():
+        pendentes += item['restantes']
+        situacao = "ok" if not item['restantes'] else f"{item['restantes']} restante(s), ex.: {item['exemplos']}"
+        print(f"  [{item['colecao']}] {etapa}: {situacao}")
+    print("✅ IDs normalizados." if not pendentes else f"❌ {pendentes} documento(s) fora do formato canônico.")
+    return 1 if pendentes else 0
+
+
+MIGRACOES = {
+    'slots': migrar_slots_reservados,
+    'recorrencias': migrar_recorrencias,
+    'dados_embutidos': migrar_dados_embutidos,
+    'uso_diario': migrar_uso_diario,
+    'reservas_materiais': migrar_reservas_materiais,
+    'normalizar_ids': migrar_normalizar_ids,
+    'verificar_ids': migrar_verificar_ids,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in MIGRACOES:
+        print(f"Uso: python -m camada_dados.migracoes {{{'|'.join(MIGRACOES)}}}")
+        return 2
+
+    db = conectar_mongo()
+    if db is None:
+        print("❌ Não foi possível conectar ao MongoDB.")
+        return 2
+    return MIGRACOES[argv[0]](db, *argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
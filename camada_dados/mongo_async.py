@@ -0,0 +1,87 @@
+# camada_dados/mongo_async.py
+"""
+Conexão assíncrona com o MongoDB, para o modo ASGI (asgi.py).
+
+Usa o cliente assíncrono do próprio PyMongo (AsyncMongoClient, PyMongo 4.9+)
+ou, em versões anteriores, o Motor. As opções de pool são as mesmas do
+cliente síncrono (mongo_config.GerenciadorConexao), que continua sendo o
+usado pelas rotas Flask.
+
+O cliente assíncrono fica preso ao event loop em que foi criado: o
+gerenciador guarda um cliente por (processo, loop).
+"""
+
+import asyncio
+import os
+import threading
+
+from .mongo_config import gerenciador_conexao
+
+try:
+    from pymongo import AsyncMongoClient
+except ImportError:  # PyMongo < 4.9
+    try:
+        from motor.motor_asyncio import AsyncIOMotorClient as AsyncMongoClient
+    except ImportError:
+        AsyncMongoClient = None
+
+
+class GerenciadorConexaoAsync:
+    """Um cliente assíncrono por event loop, com as opções do cliente síncrono."""
+
+    def __init__(self, gerenciador_sincrono=None):
+        self.gerenciador_sincrono = gerenciador_sincrono or gerenciador_conexao
+        self._clientes = {}  # (pid, id do loop) -> cliente
+        self._lock = threading.Lock()
+
+    def obter_cliente(self):
+        if AsyncMongoClient is None:
+            raise RuntimeError("Modo assíncrono indisponível: instale pymongo>=4.9 (ou motor).")
+        chave = (os.getpid(), id(asyncio.get_running_loop()))
+        cliente = self._clientes.get(chave)
+        if cliente is not None:
+            return cliente
+
+        with self._lock:
+            cliente = self._clientes.get(chave)
+            if cliente is None:
+                cliente = AsyncMongoClient(self.gerenciador_sincrono.uri, **self.gerenciador_sincrono.opcoes_pool)
+                self._clientes[chave] = cliente
+                print(f"✅ Pool de conexões MongoDB assíncrono criado (PID {chave[0]}, "
+                      f"maxPoolSize={self.gerenciador_sincrono.opcoes_pool['maxPoolSize']}).")
+        return cliente
+
+    def obter_banco(self):
+        return self.obter_cliente()[self.gerenciador_sincrono.nome_banco]
+
+    async def fechar(self):
+        """Fecha o cliente do loop atual (encerramento do servidor ASGI)."""
+        chave = (os.getpid(), id(asyncio.get_running_loop()))
+        with self._lock:
+            cliente = self._clientes.pop(chave, None)
+        if cliente is not None:
+            resultado = cliente.close()
+            if asyncio.iscoroutine(resultado):  # AsyncMongoClient.close() é corrotina; a do Motor não
+                await resultado
+
+    def descartar_apos_fork(self):
+        self._lock = threading.Lock()
+        self._clientes = {}
+
+
+gerenciador_conexao_async = GerenciadorConexaoAsync()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=gerenciador_conexao_async.descartar_apos_fork)
+
+
+def conectar_mongo_async():
+    """
+    Banco de dados do cliente assíncrono do loop atual (deve ser chamada de
+    dentro de uma corrotina). Retorna None se o cliente não puder ser criado.
+    """
+    try:
+        return gerenciador_conexao_async.obter_banco()
+    except Exception as e:
+        print(f"❌ Erro ao conectar ao MongoDB (assíncrono): {e}")
+        return None
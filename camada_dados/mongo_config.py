@@ -1,19 +1,103 @@
+import os
+import threading
 from pymongo import MongoClient
 
+from .instrumentacao import ouvintes_de_eventos
+
+# Configuração da conexão. Todos os valores podem ser sobrescritos por
+# variáveis de ambiente, o que permite ajustar o pool em produção sem
+# alterar o código.
+MONGO_URI = os.environ.get('MONGO_URI', 'mongodb://localhost:27017/')
+MONGO_DB_NAME = os.environ.get('MONGO_DB_NAME', 'udesc_quadras')
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 50))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 0))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 60000))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+MONGO_SOCKET_TIMEOUT_MS = int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', 10000))
+
+
+class GerenciadorConexao:
+    """
+    Mantém UM único MongoClient por processo. O MongoClient já possui um
+    pool de conexões interno e é thread-safe, então todas as DAOs devem
+    compartilhar a mesma instância em vez de abrir um cliente novo a cada
+    chamada.
+
+    O cliente NÃO é seguro após um fork(): servidores pré-fork (gunicorn,
+    uwsgi) criam os workers copiando o processo mestre. Por isso guardamos
+    o PID de quem criou o cliente e recriamos o cliente quando o PID muda.
+    """
+
+    def __init__(self, uri=None, nome_banco=None, **opcoes_pool):
+        self.uri = uri or MONGO_URI
+        self.nome_banco = nome_banco or MONGO_DB_NAME
+        self.opcoes_pool = {
+            'maxPoolSize': MONGO_MAX_POOL_SIZE,
+            'minPoolSize': MONGO_MIN_POOL_SIZE,
+            'maxIdleTimeMS': MONGO_MAX_IDLE_TIME_MS,
+            'connectTimeoutMS': MONGO_CONNECT_TIMEOUT_MS,
+            'serverSelectionTimeoutMS': MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            'socketTimeoutMS': MONGO_SOCKET_TIMEOUT_MS,
+            # Contagem de comandos por requisição (camada_dados.instrumentacao)
+            'event_listeners': ouvintes_de_eventos(),
+        }
+        self.opcoes_pool.update(opcoes_pool)
+        self._cliente = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def obter_cliente(self):
+        """Retorna o MongoClient do processo atual, criando-o se necessário."""
+        pid_atual = os.getpid()
+        if self._cliente is not None and self._pid == pid_atual:
+            return self._cliente
+
+        with self._lock:
+            if self._cliente is None or self._pid != pid_atual:
+                # connect=False: a conexão só é aberta no primeiro comando,
+                # então importar o módulo no processo mestre é inofensivo.
+                self._cliente = MongoClient(self.uri, connect=False, **self.opcoes_pool)
+                self._pid = pid_atual
+                print(f"✅ Pool de conexões MongoDB criado (PID {pid_atual}, maxPoolSize={self.opcoes_pool['maxPoolSize']}).")
+        return self._cliente
+
+    def obter_banco(self):
+        """Retorna a instância do banco de dados usando o cliente compartilhado."""
+        return self.obter_cliente()[self.nome_banco]
+
+    def descartar_apos_fork(self):
+        """
+        Chamado no processo filho logo após um fork. Apenas esquece o cliente
+        herdado (sem fechá-lo, pois os sockets pertencem ao processo pai).
+        """
+        self._lock = threading.Lock()
+        self._cliente = None
+        self._pid = None
+
+    def fechar(self):
+        """Fecha o cliente do processo atual (usado no encerramento da aplicação)."""
+        with self._lock:
+            if self._cliente is not None and self._pid == os.getpid():
+                self._cliente.close()
+            self._cliente = None
+            self._pid = None
+
+
+gerenciador_conexao = GerenciadorConexao()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=gerenciador_conexao.descartar_apos_fork)
+
+
 def conectar_mongo():
     """
-    Estabelece a conexão com o banco de dados MongoDB.
-    Retorna a instância do banco de dados (db).
+    Retorna a instância do banco de dados (db) a partir do cliente
+    compartilhado do processo. Não feche o cliente retornado em db.client:
+    ele pertence ao pool do processo inteiro.
     """
     try:
-        # String de conexão padrão para um MongoDB local
-        client = MongoClient('mongodb://localhost:27017/')
-        
-        # Seleciona o banco de dados 'udesc_quadras'
-        db = client['udesc_quadras']
-        
-        print("✅ Conexão com o MongoDB estabelecida com sucesso.")
-        return db
+        return gerenciador_conexao.obter_banco()
     except Exception as e:
         print(f"❌ Erro ao conectar ao MongoDB: {e}")
         return None
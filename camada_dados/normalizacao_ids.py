@@ -0,0 +1,205 @@
+# camada_dados/normalizacao_ids.py
+"""
+Normalização dos identificadores para um único tipo canônico, para que as
+DAOs busquem por uma só chave (e um só índice) em vez de "$or" entre tipos.
+
+Tipos canônicos:
+- id_material (ginasios.materiais_esportivos, agendamentos.materiais_solicitados,
+  reservas_materiais): texto. Os materiais antigos usavam números (101).
+- esportes._id e quadras.esportes_permitidos: ObjectId. Os esportes antigos
+  tinham _id numérico; eles recebem um ObjectId novo (o número antigo fica
+  em 'id_legado') e as referências nas quadras são trocadas.
+- agendamentos: só o _id. O campo 'id_agendamento' (texto com OUTRO
+  ObjectId, gravado nos agendamentos feitos por bolsistas) é removido.
+
+A migração roda em etapas, cada uma em lotes ordenados por _id, e grava o
+progresso no documento {_id: 'normalizacao_ids'} da coleção 'metadados':
+se for interrompida, a próxima execução continua da etapa e do lote em que
+parou. Os filtros só selecionam documentos ainda fora do formato canônico,
+então rodar de novo é seguro.
+
+Uso pela linha de comando:
+    python -m camada_dados.migracoes normalizar_ids [tamanho_do_lote]
+    python -m camada_dados.migracoes verificar_ids
+"""
+
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from .catalogo import registrar_alteracao_catalogo
+from .esporte_dao import id_esporte_canonico
+
+_ID_PROGRESSO = 'normalizacao_ids'
+
+# Documentos fora do formato canônico, por etapa: (coleção, filtro).
+# Em caminhos de array, "$type" casa se QUALQUER elemento tiver o tipo, então
+# os filtros listam os tipos errados em vez de negar o tipo certo.
+_TIPOS_NAO_TEXTO = ["number", "objectId"]
+
+FILTROS_NAO_CANONICOS = {
+    "materiais_ginasios": ("ginasios", {"materiais_esportivos.id_material": {"$type": _TIPOS_NAO_TEXTO}}),
+    "materiais_agendamentos": ("agendamentos", {"materiais_solicitados.id_material": {"$type": _TIPOS_NAO_TEXTO}}),
+    "materiais_reservas": ("reservas_materiais", {"id_material": {"$type": _TIPOS_NAO_TEXTO}}),
+    "esportes": ("esportes", {"_id": {"$not": {"$type": "objectId"}}}),
+    "esportes_permitidos": ("ginasios", {"quadras.esportes_permitidos": {"$type": ["number", "string"]}}),
+    "agendamentos_id_texto": ("agendamentos", {"id_agendamento": {"$exists": True}}),
+}
+
+
+def _ids_materiais_em_texto(campo):
+    """Update em pipeline: converte o id_material de cada item do array em texto."""
+    return [{"$set": {campo: {"$map": {
+        "input": f"${campo}",
+        "in": {"$mergeObjects": ["$$this", {"id_material": {"$toString": "$$this.id_material"}}]},
+    }}}}]
+
+
+def _corrigir_materiais_ginasios(db, docs):
+    operacoes = [UpdateOne({"_id": d['_id']}, _ids_materiais_em_texto("materiais_esportivos")) for d in docs]
+    return db.ginasios.bulk_write(operacoes, ordered=False).modified_count
+
+
+def _corrigir_materiais_agendamentos(db, docs):
+    operacoes = [UpdateOne({"_id": d['_id']}, _ids_materiais_em_texto("materiais_solicitados")) for d in docs]
+    return db.agendamentos.bulk_write(operacoes, ordered=False).modified_count
+
+
+def _corrigir_materiais_reservas(db, docs):
+    operacoes = [UpdateOne({"_id": d['_id']}, [{"$set": {"id_material": {"$toString": "$id_material"}}}])
+                 for d in docs]
+    return db.reservas_materiais.bulk_write(operacoes, ordered=False).modified_count
+
+
+def _corrigir_esportes(db, docs):
+    """
+    Recria cada esporte de _id numérico com um ObjectId e troca as
+    referências nas quadras. Cada passo é idempotente: o esporte novo é
+    achado pelo 'id_legado' se a execução anterior parou no meio.
+    """
+    corrigidos = 0
+    for antigo in docs:
+        id_antigo = antigo['_id']
+        novo = db.esportes.find_one({"id_legado": id_antigo}, {"_id": 1})
+        if novo is None:
+            documento = dict(antigo, _id=ObjectId(), id_legado=id_antigo)
+            db.esportes.insert_one(documento)
+            novo = documento
+
+        referencias = [id_antigo, str(id_antigo)]
+        db.ginasios.update_many(
+            {"quadras.esportes_permitidos": {"$in": referencias}},
+            {"$set": {"quadras.$[q].esportes_permitidos.$[e]": novo['_id']}},
+            array_filters=[{"q.esportes_permitidos": {"$in": referencias}}, {"e": {"$in": referencias}}],
+        )
+        db.esportes.delete_one({"_id": id_antigo})
+        corrigidos += 1
+    return corrigidos
+
+
+def _mapa_esportes_legados(db):
+    """{'1': ObjectId(...)}: número antigo (em texto) -> _id canônico."""
+    return {str(doc['id_legado']): doc['_id']
+            for doc in db.esportes.find({"id_legado": {"$exists": True}}, {"id_legado": 1})}
+
+
+def _corrigir_esportes_permitidos(db, docs):
+    legados = _mapa_esportes_legados(db)
+    operacoes = []
+    for ginasio in docs:
+        for quadra in ginasio.get('quadras', []):
+            atuais = quadra.get('esportes_permitidos', [])
+            # Referências que não podem ser convertidas ficam como estão e
+            # aparecem na verificação
+            canonicos = [id_esporte_canonico(v, legados) or v for v in atuais]
+            if canonicos != atuais:
+                operacoes.append(UpdateOne(
+                    {"_id": ginasio['_id']},
+                    {"$set": {"quadras.$[q].esportes_permitidos": canonicos}},
+                    array_filters=[{"q.num_quadra": quadra.get('num_quadra')}],
+                ))
+    if not operacoes:
+        return 0
+    return db.ginasios.bulk_write(operacoes, ordered=False).modified_count
+
+
+def _corrigir_agendamentos_id_texto(db, docs):
+    operacoes = [UpdateOne({"_id": d['_id']}, {"$unset": {"id_agendamento": ""}}) for d in docs]
+    return db.agendamentos.bulk_write(operacoes, ordered=False).modified_count
+
+
+# Etapas na ordem de execução: os esportes ganham o _id novo antes das
+# referências das quadras serem convertidas.
+ETAPAS = [
+    ("materiais_ginasios", _corrigir_materiais_ginasios),
+    ("materiais_agendamentos", _corrigir_materiais_agendamentos),
+    ("materiais_reservas", _corrigir_materiais_reservas),
+    ("esportes", _corrigir_esportes),
+    ("esportes_permitidos", _corrigir_esportes_permitidos),
+    ("agendamentos_id_texto", _corrigir_agendamentos_id_texto),
+]
+
+
+def _carregar_progresso(db):
+    """Progresso da execução interrompida, ou um novo se a última terminou."""
+    progresso = db.metadados.find_one({"_id": _ID_PROGRESSO})
+    if progresso is None or progresso.get('concluido_em') is not None:
+        progresso = {"_id": _ID_PROGRESSO, "iniciado_em": datetime.now(), "concluido_em": None,
+                     "etapas_concluidas": [], "ultimo_id": {}}
+        db.metadados.replace_one({"_id": _ID_PROGRESSO}, progresso, upsert=True)
+    elif progresso.get('etapas_concluidas') or progresso.get('ultimo_id'):
+        print(f"DEBUG[Migração]: retomando a normalização iniciada em {progresso.get('iniciado_em')}.")
+    return progresso
+
+
+def _executar_etapa(db, etapa, corrigir, progresso, tamanho_lote):
+    colecao, filtro = FILTROS_NAO_CANONICOS[etapa]
+    ultimo_id = progresso['ultimo_id'].get(etapa)
+    vistos = corrigidos = 0
+    while True:
+        filtro_lote = dict(filtro)
+        if ultimo_id is not None:
+            filtro_lote["$and"] = [{"_id": {"$gt": ultimo_id}}]
+        lote = list(db[colecao].find(filtro_lote).sort("_id", 1).limit(tamanho_lote))
+        if not lote:
+            break
+        corrigidos += corrigir(db, lote)
+        vistos += len(lote)
+        ultimo_id = lote[-1]['_id']
+        db.metadados.update_one({"_id": _ID_PROGRESSO}, {"$set": {f"ultimo_id.{etapa}": ultimo_id}})
+
+    db.metadados.update_one({"_id": _ID_PROGRESSO}, {"$addToSet": {"etapas_concluidas": etapa}})
+    print(f"DEBUG[Migração]: etapa {etapa}: {vistos} documento(s) lido(s), {corrigidos} corrigido(s).")
+    return corrigidos
+
+
+def normalizar_ids(db, tamanho_lote=500):
+    """
+    [MongoDB] Executa (ou retoma) todas as etapas de normalização.
+    Retorna {etapa: documentos corrigidos nesta execução}.
+    """
+    progresso = _carregar_progresso(db)
+    resultado = {}
+    for etapa, corrigir in ETAPAS:
+        if etapa in progresso['etapas_concluidas']:
+            print(f"DEBUG[Migração]: etapa {etapa} já concluída, pulando.")
+            continue
+        resultado[etapa] = _executar_etapa(db, etapa, corrigir, progresso, tamanho_lote)
+
+    db.metadados.update_one({"_id": _ID_PROGRESSO}, {"$set": {"concluido_em": datetime.now()}})
+    # Materiais e esportes ficam no catálogo em memória dos processos
+    registrar_alteracao_catalogo(db)
+    return resultado
+
+
+def verificar_normalizacao(db, exemplos=5):
+    """
+    [MongoDB] Conta os documentos que ainda estão fora do formato canônico.
+    Retorna {etapa: {"colecao", "restantes", "exemplos": [_ids]}}.
+    """
+    relatorio = {}
+    for etapa, (colecao, filtro) in FILTROS_NAO_CANONICOS.items():
+        restantes = db[colecao].count_documents(filtro)
+        amostra = [doc['_id'] for doc in db[colecao].find(filtro, {"_id": 1}).limit(exemplos)] if restantes else []
+        relatorio[etapa] = {"colecao": colecao, "restantes": restantes, "exemplos": amostra}
+    return relatorio
@@ -0,0 +1,101 @@
+# camada_dados/notificacoes.py
+"""
+Avisos de alteração na ocupação das quadras.
+
+Todo caminho de escrita que muda a ocupação de uma quadra (novo
+agendamento, mudança de status, exclusão, criação/remoção de evento) chama
+notificar_alteracao_quadra() DEPOIS de gravar no MongoDB. Os caches em
+memória se inscrevem com registrar_ouvinte() e invalidam apenas o trecho
+afetado.
+
+Os ouvintes são locais ao processo. Para os demais workers, cada aviso
+também incrementa a versão da quadra no documento
+{_id: 'ocupacao:<id_ginasio>:<num_quadra>'} da coleção 'metadados' (como a
+versão do catálogo, camada_dados/catalogo.py); os caches guardam a versão
+lida antes da consulta e comparam com ler_versao_quadra() antes de servir.
+"""
+
+import threading
+
+from .mongo_config import conectar_mongo
+
+_ouvintes = []
+_lock = threading.Lock()
+
+
+def registrar_ouvinte(ouvinte):
+    """
+    Inscreve uma função ouvinte(id_ginasio, num_quadra, inicio, fim).
+    inicio/fim delimitam o trecho alterado; None significa "qualquer horário"
+    (ex.: eventos recorrentes). Retorna o próprio ouvinte.
+    """
+    with _lock:
+        if ouvinte not in _ouvintes:
+            _ouvintes.append(ouvinte)
+    return ouvinte
+
+
+def remover_ouvinte(ouvinte):
+    with _lock:
+        if ouvinte in _ouvintes:
+            _ouvintes.remove(ouvinte)
+
+
+def id_versao_quadra(id_ginasio, num_quadra):
+    """_id, em 'metadados', do documento com a versão da ocupação da quadra."""
+    return f"ocupacao:{int(id_ginasio)}:{int(num_quadra)}"
+
+
+def ler_versao_quadra(id_ginasio, num_quadra, db=None):
+    """
+    Versão compartilhada da ocupação da quadra (0 se nunca foi alterada), ou
+    None se o banco não responder: nesse caso nada deve ser servido do cache.
+    """
+    db = db if db is not None else conectar_mongo()
+    if db is None:
+        return None
+    try:
+        doc = db.metadados.find_one({"_id": id_versao_quadra(id_ginasio, num_quadra)}, {"versao": 1})
+    except Exception as e:
+        print(f"Erro ao ler a versão da quadra {num_quadra} (Gin. {id_ginasio}): {e}")
+        return None
+    return doc.get('versao', 0) if doc else 0
+
+
+def registrar_alteracao_quadra(id_ginasio, num_quadra, db=None):
+    """Incrementa a versão compartilhada da ocupação da quadra."""
+    db = db if db is not None else conectar_mongo()
+    if db is None:
+        return
+    try:
+        db.metadados.update_one(
+            {"_id": id_versao_quadra(id_ginasio, num_quadra)}, {"$inc": {"versao": 1}}, upsert=True
+        )
+    except Exception as e:
+        print(f"Erro ao registrar alteração da quadra {num_quadra} (Gin. {id_ginasio}): {e}")
+
+
+def notificar_alteracao_quadra(id_ginasio, num_quadra, inicio=None, fim=None):
+    """
+    Incrementa a versão compartilhada da quadra (outros processos) e avisa
+    os ouvintes deste processo de que a ocupação mudou.
+    """
+    registrar_alteracao_quadra(id_ginasio, num_quadra)
+    with _lock:
+        ouvintes = list(_ouvintes)
+    for ouvinte in ouvintes:
+        try:
+            ouvinte(int(id_ginasio), int(num_quadra), inicio, fim)
+        except Exception as e:
+            print(f"Erro ao notificar alteração da quadra {num_quadra} (Gin. {id_ginasio}): {e}")
+
+
+def notificar_alteracao_evento(evento):
+    """
+    Avisa a alteração de todas as quadras bloqueadas por um documento de
+    evento. Eventos recorrentes afetam a quadra em qualquer horário.
+    """
+    inicio = evento.get('data_hora_inicio') if evento.get('tipo') == 'extraordinario' else None
+    fim = evento.get('data_hora_fim') if evento.get('tipo') == 'extraordinario' else None
+    for quadra in evento.get('quadras_bloqueadas', []):
+        notificar_alteracao_quadra(quadra['id_ginasio'], quadra['num_quadra'], inicio, fim)
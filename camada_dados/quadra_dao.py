@@ -2,39 +2,20 @@
 
 from bson import ObjectId
 from .mongo_config import conectar_mongo
+from .catalogo import obter_catalogo, altera_catalogo
+from .esporte_dao import id_esporte_canonico
 
 class QuadraDAO:
     # --- metodos do MongoDB ---
     def buscar_todas_as_quadras(self):
         """
-        [MongoDB] Busca todas as quadras de todos os ginásios, simulando um JOIN.
+        [MongoDB] Busca todas as quadras de todos os ginásios, com o nome do
+        ginásio (via catálogo em memória, que já guarda a lista "desmontada").
         """
-        db = conectar_mongo()
-        if db is None:
-            return []
-        
-        quadras = []
-        try:
-            pipeline = [
-                {"$unwind": "$quadras"}, # "Desmonta" o array de quadras
-                {"$project": {
-                    "_id": 0, # Exclui o _id do ginásio do resultado final
-                    "id_ginasio": "$_id",
-                    "nome_ginasio": "$nome",
-                    "num_quadra": "$quadras.num_quadra",
-                    "tipo_piso": "$quadras.tipo_piso",
-                    "cobertura": "$quadras.cobertura",
-                    "status": "$quadras.status"
-                }}
-            ]
-            resultados = db.ginasios.aggregate(pipeline)
-            quadras = list(resultados)
-            print(f"DEBUG[DAO-Mongo]: {len(quadras)} quadras encontradas via agregação.")
-        except Exception as e:
-            print(f"Erro ao buscar todas as quadras no MongoDB: {e}")
-            
-        return quadras
+        catalogo = obter_catalogo()
+        return catalogo.todas_as_quadras() if catalogo else []
 
+    @altera_catalogo
     def criar_quadra(self, id_ginasio, num_quadra, capacidade, tipo_piso, cobertura):
         """
         [MongoDB] Adiciona uma nova quadra (sub-documento) a um ginásio.
@@ -61,6 +42,7 @@ class QuadraDAO:
             print(f"Erro ao criar quadra no MongoDB: {e}")
             return False
 
+    @altera_catalogo
     def atualizar_status_quadra(self, id_ginasio, num_quadra, novo_status):
         """
         [MongoDB] Atualiza o status de uma quadra específica dentro de um ginásio.
@@ -84,6 +66,7 @@ class QuadraDAO:
             print(f"Erro ao atualizar status da quadra no MongoDB: {e}")
             return False
 
+    @altera_catalogo
     def excluir_quadra(self, id_ginasio, num_quadra):
         """
         [MongoDB] Remove uma quadra (sub-documento) do array de um ginásio.
@@ -105,28 +88,17 @@ class QuadraDAO:
 
     def buscar_esportes_da_quadra(self, id_ginasio, num_quadra):
         """
-        [MongoDB] Busca os IDs de esportes associados a uma quadra.
+        [MongoDB] Busca os IDs de esportes associados a uma quadra (via catálogo em memória).
         """
-        db = conectar_mongo()
-        if db is None:
-            return []
-            
-        try:
-            resultado = db.ginasios.find_one(
-                {"_id": int(id_ginasio), "quadras.num_quadra": int(num_quadra)},
-                # Projeção para retornar apenas o campo de esportes da quadra encontrada
-                {"_id": 0, "quadras.esportes_permitidos.$": 1}
-            )
-            if resultado and 'quadras' in resultado and resultado['quadras']:
-                return resultado['quadras'][0].get('esportes_permitidos', [])
-        except Exception as e:
-            print(f"Erro ao buscar esportes da quadra no MongoDB: {e}")
-            
-        return []
+        catalogo = obter_catalogo()
+        quadra = catalogo.quadra(id_ginasio, num_quadra) if catalogo else None
+        return list(quadra.get('esportes_permitidos', [])) if quadra else []
 
+    @altera_catalogo
     def atualizar_esportes_da_quadra(self, id_ginasio, num_quadra, lista_ids_esportes):
         """
-        [MongoDB] Atualiza a lista de strings de IDs de esportes de uma quadra.
+        [MongoDB] Atualiza a lista de IDs de esportes de uma quadra. Os IDs
+        (texto do formulário) são gravados como ObjectId, o tipo canônico.
         """
         db = conectar_mongo()
         if db is None:
@@ -139,9 +111,14 @@ class QuadraDAO:
             print(f"  -> Quadra Nº: {num_quadra} (tipo: {type(num_quadra)})")
             print(f"  -> Lista de IDs de Esportes: {lista_ids_esportes} (tipo do primeiro item: {type(lista_ids_esportes[0]) if lista_ids_esportes else 'N/A'})")
 
+            ids_canonicos = [id_esporte_canonico(id_esporte) for id_esporte in lista_ids_esportes]
+            if None in ids_canonicos:
+                print(f"  -> ERRO[DAO]: ID de esporte inválido em {lista_ids_esportes}")
+                return False
+
             # Monta o filtro e a operação de atualização
             filtro = {"_id": int(id_ginasio), "quadras.num_quadra": int(num_quadra)}
-            operacao_update = {"$set": {"quadras.$.esportes_permitidos": lista_ids_esportes}}
+            operacao_update = {"$set": {"quadras.$.esportes_permitidos": ids_canonicos}}
             
             # --- DEBUG: Ver o comando exato que será enviado ao Mongo ---
             print(f"  -> Filtro Mongo: {filtro}")
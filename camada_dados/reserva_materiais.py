@@ -0,0 +1,273 @@
+# camada_dados/reserva_materiais.py
+"""
+Reserva de materiais esportivos por intervalo de tempo (coleção
+'reservas_materiais').
+
+O estoque de cada material vem do catálogo (qnt_disponivel: unidades em
+condições de uso, mantidas pelo administrador). Cada agendamento que pede
+materiais grava uma reserva por material:
+
+    {"id_ginasio": 1, "id_material": 101, "quantidade": 2,
+     "hora_ini": <início>, "hora_fim": <fim>, "id_agendamento": <_id>,
+     "criado_em": <datetime>}
+
+e a disponibilidade de um material em [inicio, fim) é o estoque menos o
+PICO de unidades reservadas ao mesmo tempo dentro do intervalo, calculado
+por uma varredura (sweep) sobre as reservas sobrepostas: reservas que se
+sobrepõem ao intervalo mas não entre si não somam.
+
+Concorrência (sem transações): a reserva é gravada ANTES da verificação.
+Depois de inserir, a varredura é refeita com as reservas do banco, já
+incluindo a própria; se o pico passar do estoque, a reserva é desfeita.
+Dois pedidos simultâneos sempre enxergam um ao outro na segunda leitura,
+então o estoque nunca é excedido; no pior caso ambos desistem e tentam de
+novo (até MATERIAIS_TENTATIVAS vezes).
+
+Ligação com o agendamento (agendamento_dao.inserir_com_reserva): as
+reservas são gravadas com o _id do agendamento antes dele ser inserido e
+removidas se o horário já estiver ocupado. Ao cancelar ou excluir o
+agendamento, liberar_materiais() apaga as reservas. Reservas órfãs (queda
+do processo entre os dois passos) são removidas por
+liberar_reservas_orfas():
+
+    python -m camada_dados.migracoes reservas_materiais
+"""
+
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from .catalogo import obter_catalogo
+
+MATERIAIS_TENTATIVAS = int(os.environ.get('MATERIAIS_TENTATIVAS', 3))
+
+# Status de material que não pode ser reservado
+STATUS_MATERIAL_INDISPONIVEL = ('danificado', 'manutencao')
+
+
+class MateriaisIndisponiveisError(Exception):
+    """Algum material não tem unidades livres no intervalo pedido."""
+
+    def __init__(self, faltas):
+        # faltas: {id_material: unidades livres no intervalo}
+        self.faltas = faltas
+        super().__init__(f"Materiais indisponíveis no horário: {faltas}")
+
+
+def capacidade_material(material):
+    """Unidades reserváveis de um material do catálogo."""
+    if material.get('status') in STATUS_MATERIAL_INDISPONIVEL:
+        return 0
+    quantidade = material.get('qnt_disponivel')
+    if quantidade is None:
+        quantidade = material.get('qnt_total')
+    return int(quantidade or 0)
+
+
+def _material_do_catalogo(id_ginasio, id_material):
+    # id_material pode estar gravado como número ou como texto
+    catalogo = obter_catalogo()
+    if catalogo is None:
+        return None
+    for material in catalogo.materiais_do_ginasio(id_ginasio):
+        if str(material.get('id_material')) == str(id_material):
+            return material
+    return None
+
+
+def montar_materiais_solicitados(id_ginasio, pedidos):
+    """
+    Converte {id_material: quantidade} (ex.: do formulário) na lista
+    'materiais_solicitados' do agendamento, [{id_material, nome, quantidade}],
+    ignorando quantidades zeradas. Levanta ValueError para materiais que
+    não existem no ginásio ou quantidades inválidas.
+    """
+    solicitados = []
+    for id_material, quantidade in pedidos.items():
+        quantidade = int(quantidade or 0)
+        if quantidade < 0:
+            raise ValueError(f"Quantidade inválida para o material {id_material}: {quantidade}")
+        if quantidade == 0:
+            continue
+        material = _material_do_catalogo(id_ginasio, id_material)
+        if material is None:
+            raise ValueError(f"Material {id_material} não encontrado no ginásio {id_ginasio}.")
+        solicitados.append({"id_material": material['id_material'], "nome": material.get('nome'),
+                            "quantidade": quantidade})
+    return solicitados
+
+
+def filtro_reservas_sobrepostas(id_ginasio, ids_materiais, inicio, fim):
+    """Reservas dos materiais que se sobrepõem a [inicio, fim) no ginásio."""
+    return {
+        "id_ginasio": int(id_ginasio),
+        "id_material": {"$in": list(ids_materiais)},
+        "hora_ini": {"$lt": fim},
+        "hora_fim": {"$gt": inicio},
+    }
+
+
+def pico_de_uso(reservas, inicio, fim):
+    """
+    Maior quantidade reservada ao mesmo tempo dentro de [inicio, fim).
+    Varredura: cada reserva vira +quantidade no início e -quantidade no fim
+    (recortados ao intervalo); com os fins antes dos inícios no mesmo
+    instante, intervalos encostados não se somam. O(k log k).
+    """
+    marcos = []
+    for reserva in reservas:
+        ini = max(reserva['hora_ini'], inicio)
+        fim_reserva = min(reserva['hora_fim'], fim)
+        if fim_reserva > ini:
+            marcos.append((ini, reserva['quantidade']))
+            marcos.append((fim_reserva, -reserva['quantidade']))
+    marcos.sort(key=lambda marco: (marco[0], marco[1]))
+
+    em_uso = pico = 0
+    for _, variacao in marcos:
+        em_uso += variacao
+        pico = max(pico, em_uso)
+    return pico
+
+
+PROJECAO_RESERVAS = {"id_material": 1, "quantidade": 1, "hora_ini": 1, "hora_fim": 1, "id_agendamento": 1}
+
+
+def agrupar_por_material(reservas):
+    agrupadas = {}
+    for reserva in reservas:
+        agrupadas.setdefault(reserva['id_material'], []).append(reserva)
+    return agrupadas
+
+
+def _reservas_por_material(db, id_ginasio, ids_materiais, inicio, fim):
+    return agrupar_por_material(db.reservas_materiais.find(
+        filtro_reservas_sobrepostas(id_ginasio, ids_materiais, inicio, fim), PROJECAO_RESERVAS
+    ))
+
+
+def aplicar_disponibilidade(materiais, reservas, inicio, fim):
+    """
+    Acrescenta 'qnt_reservada' (pico em [inicio, fim)) e 'qnt_livre' a cada
+    material, a partir das reservas sobrepostas já agrupadas por material.
+    """
+    for material in materiais:
+        reservado = pico_de_uso(reservas.get(material.get('id_material'), []), inicio, fim)
+        material['qnt_reservada'] = reservado
+        material['qnt_livre'] = max(capacidade_material(material) - reservado, 0)
+    return materiais
+
+
+def disponibilidade_materiais(db, id_ginasio, inicio, fim):
+    """
+    [MongoDB] Materiais do ginásio (catálogo) com a disponibilidade real em
+    [inicio, fim) (ver aplicar_disponibilidade). Uma única consulta para
+    todos os materiais.
+    """
+    catalogo = obter_catalogo()
+    materiais = catalogo.materiais_do_ginasio(id_ginasio) if catalogo else []
+    if not materiais:
+        return []
+
+    reservas = _reservas_por_material(db, id_ginasio, [m.get('id_material') for m in materiais], inicio, fim)
+    return aplicar_disponibilidade(materiais, reservas, inicio, fim)
+
+
+def _faltas(db, id_ginasio, solicitados, inicio, fim, ignorar_agendamento=None):
+    """{id_material: livres} dos materiais sem unidades suficientes."""
+    reservas = _reservas_por_material(db, id_ginasio, [s['id_material'] for s in solicitados], inicio, fim)
+    faltas = {}
+    for item in solicitados:
+        material = _material_do_catalogo(id_ginasio, item['id_material'])
+        capacidade = capacidade_material(material) if material else 0
+        outras = [r for r in reservas.get(item['id_material'], [])
+                  if ignorar_agendamento is None or r.get('id_agendamento') != ignorar_agendamento]
+        livres = capacidade - pico_de_uso(outras, inicio, fim)
+        if livres < item['quantidade']:
+            faltas[item['id_material']] = max(livres, 0)
+    return faltas
+
+
+def reservar_materiais(db, id_ginasio, solicitados, inicio, fim, id_agendamento):
+    """
+    [MongoDB] Reserva os 'materiais_solicitados' de um agendamento em
+    [inicio, fim), tudo ou nada. Levanta MateriaisIndisponiveisError se algum
+    material não tiver unidades livres; outros erros são propagados.
+    """
+    if not solicitados:
+        return
+    faltas = _faltas(db, id_ginasio, solicitados, inicio, fim)
+    if faltas:
+        raise MateriaisIndisponiveisError(faltas)
+
+    agora = datetime.now()
+    reservas = [{
+        "id_ginasio": int(id_ginasio),
+        "id_material": item['id_material'],
+        "quantidade": item['quantidade'],
+        "hora_ini": inicio,
+        "hora_fim": fim,
+        "id_agendamento": id_agendamento,
+        "criado_em": agora,
+    } for item in solicitados]
+
+    for tentativa in range(1, MATERIAIS_TENTATIVAS + 1):
+        db.reservas_materiais.insert_many([dict(r) for r in reservas])
+        # Verificação depois de gravar: as demais reservas lidas agora mais a
+        # nossa (que cobre todo o intervalo) cabem no estoque?
+        faltas = _faltas(db, id_ginasio, solicitados, inicio, fim, ignorar_agendamento=id_agendamento)
+        if not faltas:
+            print(f"DEBUG[Materiais]: {len(reservas)} material(is) reservado(s) para o agendamento {id_agendamento}.")
+            return
+        liberar_materiais(db, id_agendamento)
+
+        # Se, sem a nossa reserva, ainda falta estoque, desistir; senão, era
+        # um pedido concorrente em andamento: tentar de novo.
+        faltas = _faltas(db, id_ginasio, solicitados, inicio, fim)
+        if faltas:
+            break
+        print(f"DEBUG[Materiais]: reserva concorrente detectada, tentativa {tentativa}/{MATERIAIS_TENTATIVAS}.")
+        time.sleep(random.uniform(0.005, 0.05) * tentativa)
+
+    raise MateriaisIndisponiveisError(faltas)
+
+
+def liberar_materiais(db, id_agendamento):
+    """[MongoDB] Apaga as reservas de materiais de um agendamento."""
+    removidas = db.reservas_materiais.delete_many({"id_agendamento": id_agendamento}).deleted_count
+    if removidas:
+        print(f"DEBUG[Materiais]: {removidas} reserva(s) liberada(s) do agendamento {id_agendamento}.")
+    return removidas
+
+
+def liberar_reservas_orfas(db, status_que_ocupam, idade_minima_minutos=10):
+    """
+    [MongoDB] Remove reservas cujo agendamento não existe ou não ocupa mais
+    a quadra (status fora de 'status_que_ocupam'). Só considera reservas com
+    mais de 'idade_minima_minutos', para não pegar uma reserva cujo
+    agendamento ainda está sendo inserido.
+    Retorna a quantidade de reservas removidas.
+    """
+    limite = datetime.now() - timedelta(minutes=idade_minima_minutos)
+    pipeline = [
+        {"$match": {"criado_em": {"$lt": limite}}},
+        {"$lookup": {
+            "from": "agendamentos",
+            "localField": "id_agendamento",
+            "foreignField": "_id",
+            "pipeline": [{"$project": {"status_agendamento": 1}}],
+            "as": "agendamento",
+        }},
+        {"$match": {"$nor": [{"agendamento.status_agendamento": {"$in": list(status_que_ocupam)}}]}},
+        {"$project": {"_id": 1}},
+    ]
+    try:
+        orfas = [doc['_id'] for doc in db.reservas_materiais.aggregate(pipeline)]
+        removidas = db.reservas_materiais.delete_many({"_id": {"$in": orfas}}).deleted_count if orfas else 0
+    except Exception as e:
+        print(f"Erro ao remover reservas de materiais órfãs: {e}")
+        return 0
+
+    print(f"DEBUG[Migração]: {removidas} reserva(s) de materiais órfã(s) removida(s).")
+    return removidas
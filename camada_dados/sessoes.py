@@ -0,0 +1,208 @@
+# camada_dados/sessoes.py
+"""
+Sessões do Flask guardadas no MongoDB (coleção 'sessoes'), para que
+qualquer worker ou máquina atenda qualquer requisição.
+
+O cookie leva só o identificador da sessão, assinado com a chave secreta da
+aplicação; os dados ficam no banco:
+
+    {"_id": <identificador>, "dados": {"usuario_logado": {...}, ...},
+     "expira_em": <datetime UTC>, "atualizado_em": <datetime UTC>}
+
+- Expiração: índice TTL em 'expira_em' (ver indices.py). A validade é
+  PERMANENT_SESSION_LIFETIME e é renovada a cada uso, mas só é regravada
+  quando passa de SESSAO_RENOVAR_FRACAO da validade (uma sessão lida em toda
+  requisição não gera uma escrita por requisição).
+- Cache de leitura em memória (CacheTTL) por SESSAO_CACHE_SEGUNDOS: as
+  escritas do próprio processo atualizam o cache; em OUTROS processos, um
+  logout ou alteração leva no máximo esse tempo para ser visto.
+  SESSAO_CACHE_SEGUNDOS=0 desativa o cache.
+- Fixação de sessão: no login, SessaoMongo.regenerar() troca o
+  identificador; ao salvar, o documento do identificador anterior é apagado
+  e o cookie passa a levar o novo.
+- Chave secreta estável (obter_chave_secreta): SECRET_KEY do ambiente ou,
+  na falta dela, uma chave gerada uma única vez e guardada no documento
+  {_id: 'chave_secreta'} da coleção 'metadados', compartilhada por todos os
+  workers.
+"""
+
+import copy
+import os
+import secrets
+from datetime import datetime, timedelta, timezone
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from pymongo import ReturnDocument
+from werkzeug.datastructures import CallbackDict
+
+from .cache_ttl import CacheTTL
+from .mongo_config import conectar_mongo
+
+SESSAO_COLECAO = os.environ.get('SESSAO_COLECAO', 'sessoes')
+SESSAO_CACHE_SEGUNDOS = int(os.environ.get('SESSAO_CACHE_SEGUNDOS', 5))
+SESSAO_CACHE_MAX_ENTRADAS = int(os.environ.get('SESSAO_CACHE_MAX_ENTRADAS', 10000))
+SESSAO_RENOVAR_FRACAO = float(os.environ.get('SESSAO_RENOVAR_FRACAO', 0.5))
+
+_ID_CHAVE_SECRETA = 'chave_secreta'
+_SALT_COOKIE = 'sessao-mongo'
+
+
+def _agora_utc():
+    # O PyMongo devolve datas sem fuso (em UTC); as comparações usam o mesmo formato
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def obter_chave_secreta(db=None):
+    """
+    Chave secreta da aplicação, a mesma em todos os processos: SECRET_KEY do
+    ambiente ou a chave compartilhada do banco (criada na primeira chamada,
+    de forma atômica). Sem banco, gera uma chave local e avisa: as sessões
+    só valerão neste processo.
+    """
+    chave = os.environ.get('SECRET_KEY')
+    if chave:
+        return chave
+
+    db = db if db is not None else conectar_mongo()
+    if db is not None:
+        try:
+            doc = db.metadados.find_one_and_update(
+                {"_id": _ID_CHAVE_SECRETA},
+                {"$setOnInsert": {"valor": secrets.token_hex(32), "criado_em": _agora_utc()}},
+                upsert=True, return_document=ReturnDocument.AFTER,
+            )
+            return doc['valor']
+        except Exception as e:
+            print(f"Erro ao obter a chave secreta compartilhada: {e}")
+
+    print("⚠️  SECRET_KEY não definida e banco indisponível: usando uma chave local a este processo.")
+    return secrets.token_hex(32)
+
+
+class SessaoMongo(CallbackDict, SessionMixin):
+    """Dicionário da sessão; 'modified' é ligado por qualquer alteração."""
+
+    def __init__(self, inicial=None, sid=None, nova=False, expira_em=None):
+        def ao_alterar(sessao):
+            sessao.modified = True
+
+        CallbackDict.__init__(self, inicial, ao_alterar)
+        self.sid = sid
+        self.new = nova
+        self.expira_em = expira_em
+        self.modified = False
+        self.sid_anterior = None
+
+    def regenerar(self):
+        """Troca o identificador da sessão (ex.: no login); o anterior é apagado ao salvar."""
+        if not self.new and self.sid_anterior is None:
+            self.sid_anterior = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.new = True
+        self.modified = True
+
+
+class InterfaceSessaoMongo(SessionInterface):
+    """SessionInterface do Flask com os dados no MongoDB (ver o topo do módulo)."""
+
+    def __init__(self, nome_colecao=None, cache=None):
+        self.nome_colecao = nome_colecao or SESSAO_COLECAO
+        self.cache = cache if cache is not None else CacheTTL(SESSAO_CACHE_MAX_ENTRADAS, SESSAO_CACHE_SEGUNDOS)
+
+    def _colecao(self):
+        db = conectar_mongo()
+        return db[self.nome_colecao] if db is not None else None
+
+    def _assinador(self, app):
+        return Signer(app.secret_key, salt=_SALT_COOKIE)
+
+    def _nova_sessao(self):
+        return SessaoMongo(sid=secrets.token_urlsafe(32), nova=True)
+
+    def _ler_documento(self, sid):
+        doc = self.cache.obter(sid)
+        if doc is not None:
+            return doc
+        colecao = self._colecao()
+        if colecao is None:
+            return None
+        # O TTL do MongoDB apaga os expirados a cada ~60s; o filtro cobre o intervalo
+        doc = colecao.find_one({"_id": sid, "expira_em": {"$gt": _agora_utc()}}, {"dados": 1, "expira_em": 1})
+        if doc is not None:
+            self.cache.guardar(sid, doc)
+        return doc
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if not cookie or not app.secret_key:
+            return self._nova_sessao()
+        try:
+            sid = self._assinador(app).unsign(cookie).decode('utf-8')
+        except BadSignature:
+            return self._nova_sessao()
+
+        try:
+            doc = self._ler_documento(sid)
+        except Exception as e:
+            print(f"Erro ao ler a sessão no MongoDB: {e}")
+            return self._nova_sessao()
+        if doc is None or doc['expira_em'] <= _agora_utc():
+            return self._nova_sessao()
+        return SessaoMongo(copy.deepcopy(doc.get('dados', {})), sid=sid, expira_em=doc['expira_em'])
+
+    def _apagar(self, sid):
+        self.cache.invalidar(sid)
+        try:
+            colecao = self._colecao()
+            if colecao is not None:
+                colecao.delete_one({"_id": sid})
+        except Exception as e:
+            print(f"Erro ao apagar a sessão no MongoDB: {e}")
+
+    def save_session(self, app, session, response):
+        nome = self.get_cookie_name(app)
+        dominio = self.get_cookie_domain(app)
+        caminho = self.get_cookie_path(app)
+
+        if session.sid_anterior is not None:
+            # Identificador regenerado: o anterior deixa de valer
+            self._apagar(session.sid_anterior)
+            session.sid_anterior = None
+
+        if not session:
+            # Sessão esvaziada (logout): apaga do banco e do navegador
+            if session.modified and not session.new:
+                self._apagar(session.sid)
+                response.delete_cookie(nome, domain=dominio, path=caminho)
+            return
+
+        agora = _agora_utc()
+        validade = app.permanent_session_lifetime
+        renovar = session.expira_em is None or session.expira_em - agora < validade * SESSAO_RENOVAR_FRACAO
+        if not (session.modified or session.new or renovar):
+            return
+
+        doc = {"dados": dict(session), "expira_em": agora + validade}
+        try:
+            colecao = self._colecao()
+            if colecao is None:
+                return
+            colecao.replace_one({"_id": session.sid}, dict(doc, atualizado_em=agora), upsert=True)
+        except Exception as e:
+            print(f"Erro ao gravar a sessão no MongoDB: {e}")
+            return
+        self.cache.guardar(session.sid, copy.deepcopy(doc))
+
+        if session.new or session.modified:
+            response.set_cookie(
+                nome, self._assinador(app).sign(session.sid.encode('utf-8')).decode('utf-8'),
+                expires=self.get_expiration_time(app, session),
+                httponly=self.get_cookie_httponly(app),
+                domain=dominio, path=caminho,
+                secure=self.get_cookie_secure(app),
+                samesite=self.get_cookie_samesite(app),
+            )
+
+    def estatisticas(self):
+        return self.cache.estatisticas()
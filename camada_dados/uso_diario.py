@@ -0,0 +1,231 @@
+# camada_dados/uso_diario.py
+"""
+Contadores diários de uso por quadra (coleção 'uso_diario').
+
+Um documento por (ginásio, quadra, dia), com _id "gin:quadra:AAAAMMDD":
+
+    {"_id": "1:2:20250310", "id_ginasio": 1, "num_quadra": 2, "dia": <00:00>,
+     "total": 12, "realizado": 7, "cancelado": 3, "nao_compareceu": 1,
+     "minutos_reservados": 540}
+
+- total: agendamentos que começam no dia (qualquer status);
+- realizado / cancelado / nao_compareceu: quantos estão nesse status;
+- minutos_reservados: soma das durações dos que ainda ocupam a quadra
+  (status diferente de cancelado).
+
+Os contadores são mantidos com $inc (upsert) pelas mesmas funções da
+agendamento_dao que gravam os agendamentos: inserir_com_reserva,
+alterar_status_agendamento e excluir_agendamento. O $inc é atômico no
+documento de contadores, mas não na mesma transação da escrita do
+agendamento; reconstruir_uso_diario() recalcula um período a partir dos
+agendamentos (carga inicial e correção de desvios).
+
+Uso pela linha de comando (carga inicial):
+    python -m camada_dados.migracoes uso_diario [AAAA-MM-DD AAAA-MM-DD]
+"""
+
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+
+from .mongo_config import conectar_mongo
+
+# Status com contador próprio
+STATUS_CONTADOS = ('realizado', 'cancelado', 'nao_compareceu')
+# Status cujo horário não conta como reservado
+STATUS_LIBERADOS = ('cancelado',)
+
+
+def _dia(momento):
+    return datetime.combine(momento.date(), datetime.min.time())
+
+
+def _chave(id_ginasio, num_quadra, momento):
+    return f"{int(id_ginasio)}:{int(num_quadra)}:{momento:%Y%m%d}"
+
+
+def _minutos(doc):
+    return int((doc['hora_fim'] - doc['hora_ini']).total_seconds() // 60)
+
+
+def _contribuicao(doc, status):
+    """Quanto um agendamento no 'status' soma em cada contador do seu dia."""
+    incrementos = {}
+    if status in STATUS_CONTADOS:
+        incrementos[status] = 1
+    if status not in STATUS_LIBERADOS:
+        incrementos["minutos_reservados"] = _minutos(doc)
+    return incrementos
+
+
+def _operacao(doc, incrementos):
+    incrementos = {campo: valor for campo, valor in incrementos.items() if valor}
+    if not incrementos:
+        return None
+    return UpdateOne(
+        {"_id": _chave(doc['id_ginasio'], doc['num_quadra'], doc['hora_ini'])},
+        {"$inc": incrementos,
+         "$setOnInsert": {"id_ginasio": int(doc['id_ginasio']), "num_quadra": int(doc['num_quadra']),
+                          "dia": _dia(doc['hora_ini'])}},
+        upsert=True,
+    )
+
+
+def _montar(doc, montar_incrementos):
+    """
+    Operação de contadores de um agendamento. Roda depois que o agendamento
+    já foi gravado, então um documento malformado (ex.: id_ginasio não
+    numérico, horário ausente) é só ignorado aqui, em vez de transformar a
+    escrita bem-sucedida em erro; o desvio é corrigido por
+    reconstruir_uso_diario().
+    """
+    try:
+        return _operacao(doc, montar_incrementos(doc))
+    except Exception as e:
+        print(f"Agendamento {doc.get('_id')} ignorado nos contadores de uso diário: {e}")
+        return None
+
+
+def _aplicar(db, operacoes):
+    operacoes = [op for op in operacoes if op is not None]
+    if not operacoes:
+        return
+    try:
+        db.uso_diario.bulk_write(operacoes, ordered=False)
+    except Exception as e:
+        # O agendamento já foi gravado; o desvio é corrigido por reconstruir_uso_diario()
+        print(f"Erro ao atualizar os contadores de uso diário: {e}")
+
+
+def registrar_insercoes(db, documentos):
+    """Soma os agendamentos recém-inseridos aos contadores dos seus dias."""
+    def incrementos(doc):
+        return dict(_contribuicao(doc, doc.get('status_agendamento')), total=1)
+
+    _aplicar(db, [_montar(doc, incrementos) for doc in documentos])
+
+
+def registrar_insercao(db, documento):
+    registrar_insercoes(db, [documento])
+
+
+def registrar_transicao(db, anterior, novo_status):
+    """
+    Move o agendamento do status anterior para o novo. 'anterior' é o
+    documento antes da alteração (com id_ginasio, num_quadra, hora_ini,
+    hora_fim e status_agendamento).
+    """
+    def incrementos(doc):
+        antes = _contribuicao(doc, doc.get('status_agendamento'))
+        depois = _contribuicao(doc, novo_status)
+        return {campo: depois.get(campo, 0) - antes.get(campo, 0) for campo in set(antes) | set(depois)}
+
+    _aplicar(db, [_montar(anterior, incrementos)])
+
+
+def registrar_remocao(db, removido):
+    """Retira dos contadores um agendamento excluído."""
+    def incrementos(doc):
+        return dict({campo: -valor for campo, valor in _contribuicao(doc, doc.get('status_agendamento')).items()},
+                    total=-1)
+
+    _aplicar(db, [_montar(removido, incrementos)])
+
+
+def reconstruir_uso_diario(db=None, data_inicio=None, data_fim=None):
+    """
+    [MongoDB] Recalcula os contadores a partir dos agendamentos, para os
+    dias em [data_inicio, data_fim] (datas; sem elas, todo o histórico).
+    Os documentos do período são removidos e regravados via $merge.
+    Deve rodar sem agendamentos sendo gravados no período: um $inc feito
+    durante a reconstrução pode ser sobrescrito.
+    Retorna a quantidade de documentos de contadores gravados.
+    """
+    db = db if db is not None else conectar_mongo()
+    if db is None:
+        return 0
+
+    faixa = {}
+    if data_inicio is not None:
+        faixa["$gte"] = datetime.combine(data_inicio, datetime.min.time())
+    if data_fim is not None:
+        faixa["$lt"] = datetime.combine(data_fim + timedelta(days=1), datetime.min.time())
+
+    filtro_agendamentos = {"hora_ini": dict(faixa, **{"$type": "date"}), "hora_fim": {"$type": "date"}}
+    filtro_contadores = {"dia": faixa} if faixa else {}
+
+    def conta_status(status):
+        return {"$sum": {"$cond": [{"$eq": ["$status_agendamento", status]}, 1, 0]}}
+
+    pipeline = [
+        {"$match": filtro_agendamentos},
+        {"$group": {
+            "_id": {"$concat": [
+                {"$toString": "$id_ginasio"}, ":", {"$toString": "$num_quadra"}, ":",
+                {"$dateToString": {"format": "%Y%m%d", "date": "$hora_ini"}},
+            ]},
+            "id_ginasio": {"$first": "$id_ginasio"},
+            "num_quadra": {"$first": "$num_quadra"},
+            "dia": {"$first": {"$dateTrunc": {"date": "$hora_ini", "unit": "day"}}},
+            "total": {"$sum": 1},
+            **{status: conta_status(status) for status in STATUS_CONTADOS},
+            "minutos_reservados": {"$sum": {"$cond": [
+                {"$in": ["$status_agendamento", list(STATUS_LIBERADOS)]},
+                0,
+                {"$dateDiff": {"startDate": "$hora_ini", "endDate": "$hora_fim", "unit": "minute"}},
+            ]}},
+        }},
+        {"$merge": {"into": "uso_diario", "on": "_id", "whenMatched": "replace", "whenNotMatched": "insert"}},
+    ]
+
+    try:
+        db.uso_diario.delete_many(filtro_contadores)
+        db.agendamentos.aggregate(pipeline)
+        gravados = db.uso_diario.count_documents(filtro_contadores)
+    except Exception as e:
+        print(f"Erro ao reconstruir os contadores de uso diário: {e}")
+        return 0
+
+    print(f"DEBUG[Migração]: {gravados} documentos de uso diário recalculados.")
+    return gravados
+
+
+def buscar_uso_por_quadra(db, data_inicio, data_fim, id_ginasio=None):
+    """
+    [MongoDB] Soma os contadores diários por quadra para os dias em
+    [data_inicio, data_fim] (datas inclusivas). Lê um documento por
+    quadra/dia, sem tocar nos agendamentos.
+    """
+    filtro = {"dia": {"$gte": datetime.combine(data_inicio, datetime.min.time()),
+                      "$lte": datetime.combine(data_fim, datetime.min.time())}}
+    if id_ginasio is not None:
+        filtro["id_ginasio"] = int(id_ginasio)
+
+    pipeline = [
+        {"$match": filtro},
+        {"$group": {
+            "_id": {"id_ginasio": "$id_ginasio", "num_quadra": "$num_quadra"},
+            "total": {"$sum": "$total"},
+            **{status: {"$sum": f"${status}"} for status in STATUS_CONTADOS},
+            "minutos_reservados": {"$sum": "$minutos_reservados"},
+        }},
+        {"$sort": {"_id.id_ginasio": 1, "_id.num_quadra": 1}},
+    ]
+    return list(db.uso_diario.aggregate(pipeline))
+
+
+def iterar_uso_diario(db, data_inicio, data_fim, id_ginasio=None, tamanho_lote=1000):
+    """
+    [MongoDB] Gerador com os documentos de contadores de cada quadra/dia em
+    [data_inicio, data_fim], ordenados por dia, ginásio e quadra.
+    """
+    filtro = {"dia": {"$gte": datetime.combine(data_inicio, datetime.min.time()),
+                      "$lte": datetime.combine(data_fim, datetime.min.time())}}
+    if id_ginasio is not None:
+        filtro["id_ginasio"] = int(id_ginasio)
+
+    cursor = (db.uso_diario.find(filtro, {"_id": 0})
+              .sort([("dia", 1), ("id_ginasio", 1), ("num_quadra", 1)]).batch_size(tamanho_lote))
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
@@ -1,12 +1,84 @@
 from camada_dados.mongo_config import conectar_mongo
+from camada_dados.cache_ttl import CacheTTL
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
 from modelos.usuario import Aluno, Funcionario, Admin, Servidor
 from datetime import datetime
+import os
+
+# Perfis (papel do usuário) lidos nas checagens de autorização, em memória.
+# Invalidados por salvar / atualizar_status_usuario / excluir_usuario; em
+# outros processos, ficam no máximo PERFIS_VALIDADE_SEGUNDOS defasados.
+PERFIS_VALIDADE_SEGUNDOS = int(os.environ.get('PERFIS_VALIDADE_SEGUNDOS', 60))
+PERFIS_MAX_ENTRADAS = int(os.environ.get('PERFIS_MAX_ENTRADAS', 4096))
+
+cache_perfis = CacheTTL(PERFIS_MAX_ENTRADAS, PERFIS_VALIDADE_SEGUNDOS)
 
 class AlunoDao:
     def salvar(self, aluno: Aluno):
         return UsuarioDAO().salvar(aluno) 
 
+
+def montar_documento_usuario(usuario):
+    """
+    Documento do MongoDB para um objeto de usuário (qualquer tipo). Usado
+    por UsuarioDAO.salvar e pela importação em lote, para que os dois
+    caminhos gravem exatamente o mesmo formato.
+    """
+    usuario_dict = {}
+
+    # 1. Tenta usar o método do Modelo (Recomendado se você aplicou a correção anterior)
+    if hasattr(usuario, 'get_document_mongo'):
+        usuario_dict = usuario.get_document_mongo()
+    
+    # 2. Fallback: Constrói manualmente se o modelo não tiver o método
+    else:
+        usuario_dict = {
+            "_id": usuario.cpf,
+            "nome": usuario.nome,
+            "email": usuario.email,
+            "senha": usuario.senha,
+            # Converte date para datetime para o Mongo aceitar sem reclamar
+            "data_nasc": datetime.combine(usuario.data_nasc, datetime.min.time()) if hasattr(usuario.data_nasc, 'day') else usuario.data_nasc,
+            "status": usuario.status,
+            "tipo": usuario.tipo
+        }
+        
+        if usuario.tipo == 'aluno':
+            usuario_dict['detalhes_aluno'] = {
+                "matricula": getattr(usuario, 'matricula', None),
+                "curso": getattr(usuario, 'curso', None),
+                "ano_inicio": getattr(usuario, 'ano_inicio', None),
+                "categoria": getattr(usuario, 'categoria', 'nao_bolsista')
+            }
+            # Se for bolsista, adiciona campos extras no mesmo sub-documento
+            if getattr(usuario, 'is_bolsista', False) or getattr(usuario, 'categoria', '') == 'bolsista':
+                usuario_dict['detalhes_aluno'].update({
+                    "valor_remuneracao": getattr(usuario, 'valor_remuneracao', None),
+                    "carga_horaria": getattr(usuario, 'carga_horaria', None),
+                    "horario_inicio": getattr(usuario, 'horario_inicio', None),
+                    "horario_fim": getattr(usuario, 'horario_fim', None),
+                    "id_supervisor_servidor": getattr(usuario, 'id_supervisor_servidor', None)
+                })
+
+        elif hasattr(usuario, 'id_servidor'):
+            usuario_dict['detalhes_servidor'] = {
+                "id_servidor": usuario.id_servidor,
+                "data_admissao": datetime.combine(usuario.data_admissao, datetime.min.time()) if hasattr(usuario.data_admissao, 'day') else usuario.data_admissao
+            }
+            if usuario.tipo == 'admin':
+                usuario_dict['detalhes_admin'] = {
+                    "nivel_acesso": getattr(usuario, 'nivel_acesso', 1),
+                    "area_responsabilidade": getattr(usuario, 'area_responsabilidade', None)
+                }
+            elif usuario.tipo == 'funcionario':
+                usuario_dict['detalhes_funcionario'] = {
+                    "departamento": getattr(usuario, 'departamento', None),
+                    "cargo": getattr(usuario, 'cargo', None)
+                }
+    return usuario_dict
+
+
 class UsuarioDAO:
     
     def buscar_por_email(self, email):
@@ -56,6 +128,43 @@ class UsuarioDAO:
             print(f"Erro ao buscar usuário por CPF no MongoDB: {e}")
             return None
 
+    def buscar_perfil(self, cpf):
+        """
+        [MongoDB] Perfil resumido do usuário para checagens de papel:
+        {'cpf', 'nome', 'tipo', 'status', 'eh_bolsista'}. Servido do cache em
+        memória; só consulta o banco (com projeção) em caso de falta.
+        Retorna None se o usuário não existir.
+        """
+        perfil = cache_perfis.obter(cpf)
+        if perfil is not None:
+            return perfil
+
+        db = conectar_mongo()
+        if db is None:
+            return None
+
+        try:
+            doc = db.usuarios.find_one(
+                {"_id": cpf},
+                {"nome": 1, "tipo": 1, "status": 1, "detalhes_aluno.categoria": 1}
+            )
+        except Exception as e:
+            print(f"Erro ao buscar perfil do usuário no MongoDB: {e}")
+            return None
+
+        if not doc:
+            return None
+        perfil = {
+            "cpf": doc["_id"],
+            "nome": doc.get("nome"),
+            "tipo": doc.get("tipo"),
+            "status": doc.get("status", "ativo"),
+            "eh_bolsista": doc.get("tipo") == "aluno"
+                           and doc.get("detalhes_aluno", {}).get("categoria") == "bolsista",
+        }
+        cache_perfis.guardar(cpf, perfil)
+        return perfil
+
     def _criar_objeto_usuario_do_dict(self, usuario_dict):
         """
         Método auxiliar para converter o dicionário do Mongo de volta para Objeto Python.
@@ -129,66 +238,53 @@ class UsuarioDAO:
             return False
             
         try:
-            usuario_dict = {}
-
-            # 1. Tenta usar o método do Modelo (Recomendado se você aplicou a correção anterior)
-            if hasattr(usuario, 'get_document_mongo'):
-                usuario_dict = usuario.get_document_mongo()
-            
-            # 2. Fallback: Constrói manualmente se o modelo não tiver o método
-            else:
-                usuario_dict = {
-                    "_id": usuario.cpf,
-                    "nome": usuario.nome,
-                    "email": usuario.email,
-                    "senha": usuario.senha,
-                    # Converte date para datetime para o Mongo aceitar sem reclamar
-                    "data_nasc": datetime.combine(usuario.data_nasc, datetime.min.time()) if hasattr(usuario.data_nasc, 'day') else usuario.data_nasc,
-                    "status": usuario.status,
-                    "tipo": usuario.tipo
-                }
-                
-                if usuario.tipo == 'aluno':
-                    usuario_dict['detalhes_aluno'] = {
-                        "matricula": getattr(usuario, 'matricula', None),
-                        "curso": getattr(usuario, 'curso', None),
-                        "ano_inicio": getattr(usuario, 'ano_inicio', None),
-                        "categoria": getattr(usuario, 'categoria', 'nao_bolsista')
-                    }
-                    # Se for bolsista, adiciona campos extras no mesmo sub-documento
-                    if getattr(usuario, 'is_bolsista', False) or getattr(usuario, 'categoria', '') == 'bolsista':
-                        usuario_dict['detalhes_aluno'].update({
-                            "valor_remuneracao": getattr(usuario, 'valor_remuneracao', None),
-                            "carga_horaria": getattr(usuario, 'carga_horaria', None),
-                            "horario_inicio": getattr(usuario, 'horario_inicio', None),
-                            "horario_fim": getattr(usuario, 'horario_fim', None),
-                            "id_supervisor_servidor": getattr(usuario, 'id_supervisor_servidor', None)
-                        })
-
-                elif hasattr(usuario, 'id_servidor'):
-                    usuario_dict['detalhes_servidor'] = {
-                        "id_servidor": usuario.id_servidor,
-                        "data_admissao": datetime.combine(usuario.data_admissao, datetime.min.time()) if hasattr(usuario.data_admissao, 'day') else usuario.data_admissao
-                    }
-                    if usuario.tipo == 'admin':
-                        usuario_dict['detalhes_admin'] = {
-                            "nivel_acesso": getattr(usuario, 'nivel_acesso', 1),
-                            "area_responsabilidade": getattr(usuario, 'area_responsabilidade', None)
-                        }
-                    elif usuario.tipo == 'funcionario':
-                        usuario_dict['detalhes_funcionario'] = {
-                            "departamento": getattr(usuario, 'departamento', None),
-                            "cargo": getattr(usuario, 'cargo', None)
-                        }
+            usuario_dict = montar_documento_usuario(usuario)
 
             # Insere no banco
             db.usuarios.insert_one(usuario_dict)
+            cache_perfis.invalidar(usuario_dict["_id"])
             print(f"DEBUG[DAO-Mongo]: Usuário '{usuario.nome}' salvo com sucesso.")
             return True
             
         except Exception as e:
             print(f"Erro ao salvar usuário no MongoDB: {e}")
             return False
+
+    def inserir_em_lote(self, documentos):
+        """
+        [MongoDB] Insere um lote de documentos (já montados com
+        montar_documento_usuario) com insert_many(ordered=False): um CPF ou
+        email duplicado não interrompe o restante do lote.
+        Retorna a lista de falhas [(posição_no_lote, campo_duplicado, mensagem)];
+        campo_duplicado é '_id', 'email' ou None para outros erros.
+        """
+        if not documentos:
+            return []
+        db = conectar_mongo()
+        if db is None:
+            return [(i, None, "Sem conexão com o MongoDB.") for i in range(len(documentos))]
+
+        falhas = []
+        try:
+            db.usuarios.insert_many(documentos, ordered=False)
+        except BulkWriteError as e:
+            for erro in e.details.get('writeErrors', []):
+                campo = None
+                if erro.get('code') == 11000:
+                    campo = next(iter(erro.get('keyPattern') or {}), None)
+                    if campo is None:  # Servidores antigos não informam keyPattern
+                        campo = 'email' if 'email' in erro.get('errmsg', '') else '_id'
+                falhas.append((erro['index'], campo, erro.get('errmsg')))
+        except Exception as e:
+            print(f"Erro ao inserir lote de usuários no MongoDB: {e}")
+            return [(i, None, str(e)) for i in range(len(documentos))]
+
+        com_falha = {indice for indice, _, _ in falhas}
+        for i, documento in enumerate(documentos):
+            if i not in com_falha:
+                cache_perfis.invalidar(documento["_id"])
+        print(f"DEBUG[DAO-Mongo]: lote de {len(documentos)} usuários: {len(documentos) - len(falhas)} inseridos, {len(falhas)} falhas.")
+        return falhas
     
     def buscar_todos_os_usuarios(self):
         """
@@ -261,6 +357,7 @@ class UsuarioDAO:
                 {"_id": cpf},
                 {"$set": {"status": novo_status}}
             )
+            cache_perfis.invalidar(cpf)
             return resultado.modified_count > 0
         except Exception as e:
             print(f"Erro ao atualizar status: {e}")
@@ -272,6 +369,7 @@ class UsuarioDAO:
         
         try:
             resultado = db.usuarios.delete_one({"_id": cpf})
+            cache_perfis.invalidar(cpf)
             return resultado.deleted_count > 0
         except Exception as e:
             print(f"Erro ao excluir usuário: {e}")
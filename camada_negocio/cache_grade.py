@@ -0,0 +1,175 @@
+# camada_negocio/cache_grade.py
+"""
+Cache da grade semanal de ocupação, por (id_ginasio, num_quadra, semana ISO).
+
+- Remoção LRU quando passa de CACHE_GRADE_MAX_ENTRADAS entradas ou de
+  CACHE_GRADE_MAX_BYTES bytes (tamanho estimado com sys.getsizeof).
+- Invalidação precisa: inscrito em camada_dados.notificacoes, descarta só
+  as semanas da quadra tocadas pela escrita (criação de agendamento,
+  cancelamento, mudança de status, criação/remoção de evento). Eventos
+  recorrentes descartam todas as semanas da quadra.
+- Entre processos: cada entrada guarda a versão compartilhada da quadra
+  (notificacoes.ler_versao_quadra) lida antes da consulta, e só é servida
+  se o chamador informar a mesma versão. Escritas feitas por outro worker
+  incrementam a versão e tornam a entrada obsoleta na leitura seguinte.
+- CACHE_GRADE_VALIDADE_SEGUNDOS limita a vida de cada entrada (escritas
+  feitas por fora das DAOs não incrementam a versão).
+- Contadores de acertos/falhas em estatisticas().
+"""
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, time as hora, timedelta
+
+from camada_dados.notificacoes import registrar_ouvinte
+
+CACHE_GRADE_MAX_ENTRADAS = int(os.environ.get('CACHE_GRADE_MAX_ENTRADAS', 512))
+CACHE_GRADE_MAX_BYTES = int(os.environ.get('CACHE_GRADE_MAX_BYTES', 32 * 1024 * 1024))
+CACHE_GRADE_VALIDADE_SEGUNDOS = int(os.environ.get('CACHE_GRADE_VALIDADE_SEGUNDOS', 60))
+
+
+def semana_iso(momento):
+    """(ano, semana) ISO de uma data/datetime."""
+    ano, semana, _ = momento.isocalendar()
+    return ano, semana
+
+
+def semanas_do_intervalo(inicio, fim):
+    """Semanas ISO tocadas por [inicio, fim)."""
+    semanas = []
+    atual = datetime.combine(inicio.date() - timedelta(days=inicio.weekday()), hora.min)
+    while atual < fim:
+        semanas.append(semana_iso(atual))
+        atual += timedelta(weeks=1)
+    return semanas
+
+
+def _estimar_bytes(valor, vistos=None):
+    """Tamanho aproximado de um valor e de tudo que ele referencia."""
+    vistos = set() if vistos is None else vistos
+    if id(valor) in vistos:
+        return 0
+    vistos.add(id(valor))
+    tamanho = sys.getsizeof(valor)
+    if isinstance(valor, dict):
+        tamanho += sum(_estimar_bytes(k, vistos) + _estimar_bytes(v, vistos) for k, v in valor.items())
+    elif isinstance(valor, (list, tuple, set)):
+        tamanho += sum(_estimar_bytes(v, vistos) for v in valor)
+    return tamanho
+
+
+class CacheGradeSemanal:
+    """LRU com limite de entradas e de memória para as grades semanais."""
+
+    def __init__(self, max_entradas=None, max_bytes=None, validade_segundos=None):
+        self.max_entradas = CACHE_GRADE_MAX_ENTRADAS if max_entradas is None else max_entradas
+        self.max_bytes = CACHE_GRADE_MAX_BYTES if max_bytes is None else max_bytes
+        self.validade_segundos = CACHE_GRADE_VALIDADE_SEGUNDOS if validade_segundos is None else validade_segundos
+
+        # chave -> (valor, bytes, criado_em, versao)
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        # Contador de invalidações por quadra: uma grade calculada enquanto
+        # uma escrita acontecia na mesma quadra não é guardada.
+        self._geracoes = {}
+        self._lock = threading.Lock()
+
+        self.acertos = 0
+        self.falhas = 0
+        self.invalidacoes = 0
+        self.remocoes_lru = 0
+
+    @staticmethod
+    def chave(id_ginasio, num_quadra, inicio_semana):
+        return (int(id_ginasio), int(num_quadra)) + semana_iso(inicio_semana)
+
+    def geracao(self, id_ginasio, num_quadra):
+        return self._geracoes.get((int(id_ginasio), int(num_quadra)), 0)
+
+    def obter(self, chave, versao):
+        """
+        Valor guardado para a chave, ou None (conta acerto/falha). 'versao'
+        é a versão compartilhada atual da quadra; uma entrada gravada com
+        outra versão é descartada, e com versao None nada é servido.
+        """
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada is not None and (versao is None or entrada[3] != versao
+                                        or time.monotonic() - entrada[2] > self.validade_segundos):
+                self._remover(chave)
+                entrada = None
+            if entrada is None:
+                self.falhas += 1
+                return None
+            self._entradas.move_to_end(chave)
+            self.acertos += 1
+            return entrada[0]
+
+    def guardar(self, chave, valor, geracao, versao):
+        """
+        Guarda o valor calculado. 'geracao' e 'versao' são os valores de
+        geracao() e da versão compartilhada lidos ANTES de consultar o
+        banco; se a quadra foi alterada no meio tempo, o valor já nasce
+        defasado e é descartado (localmente) ou não volta a ser servido.
+        """
+        if versao is None:
+            return
+        tamanho = _estimar_bytes(valor)
+        with self._lock:
+            if self._geracoes.get(chave[:2], 0) != geracao or tamanho > self.max_bytes:
+                return
+            if chave in self._entradas:
+                self._remover(chave)
+            self._entradas[chave] = (valor, tamanho, time.monotonic(), versao)
+            self._bytes += tamanho
+            while self._entradas and (len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes):
+                self._remover(next(iter(self._entradas)))
+                self.remocoes_lru += 1
+
+    def _remover(self, chave):
+        valor, tamanho, _, _ = self._entradas.pop(chave)
+        self._bytes -= tamanho
+
+    def invalidar(self, id_ginasio, num_quadra, inicio=None, fim=None):
+        """
+        Ouvinte de notificacoes. Com inicio/fim descarta só as semanas
+        tocadas; sem eles, todas as semanas da quadra.
+        """
+        quadra = (int(id_ginasio), int(num_quadra))
+        with self._lock:
+            self._geracoes[quadra] = self._geracoes.get(quadra, 0) + 1
+            if inicio is not None and fim is not None:
+                chaves = [quadra + semana for semana in semanas_do_intervalo(inicio, fim)]
+            else:
+                chaves = [c for c in self._entradas if c[:2] == quadra]
+            for chave in chaves:
+                if chave in self._entradas:
+                    self._remover(chave)
+                    self.invalidacoes += 1
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estatisticas(self):
+        with self._lock:
+            consultas = self.acertos + self.falhas
+            return {
+                "acertos": self.acertos,
+                "falhas": self.falhas,
+                "taxa_acerto": round(self.acertos / consultas, 3) if consultas else None,
+                "invalidacoes": self.invalidacoes,
+                "remocoes_lru": self.remocoes_lru,
+                "entradas": len(self._entradas),
+                "bytes": self._bytes,
+                "max_entradas": self.max_entradas,
+                "max_bytes": self.max_bytes,
+            }
+
+
+cache_grade_semanal = CacheGradeSemanal()
+registrar_ouvinte(cache_grade_semanal.invalidar)
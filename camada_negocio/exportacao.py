@@ -0,0 +1,97 @@
+# camada_negocio/exportacao.py
+"""
+Exportação de agendamentos e relatórios de uso em CSV e NDJSON.
+
+Tudo aqui é gerador: os registros vêm de um cursor do MongoDB (buscado em
+lotes) e saem em blocos de texto, então a memória usada não depende da
+quantidade de linhas. Os mesmos geradores alimentam as rotas de exportação
+(app.py, resposta HTTP em streaming) e a linha de comando
+(ferramentas/exportar.py).
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+
+from bson import ObjectId
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+# Linhas acumuladas antes de entregar um bloco de texto
+LINHAS_POR_BLOCO = 500
+
+COLUNAS_AGENDAMENTOS = [
+    'id_agendamento', 'hora_ini', 'hora_fim', 'status_agendamento', 'id_ginasio', 'nome_ginasio',
+    'num_quadra', 'cpf_usuario', 'nome_usuario', 'motivo', 'data_solicitacao', 'id_bolsista_operador',
+]
+
+COLUNAS_RELATORIO_USO = [
+    'ginasio', 'num_quadra', 'total_agendamentos', 'confirmados', 'cancelados',
+    'nao_compareceu', 'horas_reservadas',
+]
+
+COLUNAS_USO_DIARIO = [
+    'dia', 'id_ginasio', 'ginasio', 'num_quadra', 'total', 'realizado', 'cancelado',
+    'nao_compareceu', 'minutos_reservados',
+]
+
+
+def _valor_texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _valor_json(valor):
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    if isinstance(valor, ObjectId):
+        return str(valor)
+    raise TypeError(f"Tipo não serializável: {type(valor).__name__}")
+
+
+def gerar_csv(registros, colunas):
+    """Cabeçalho + uma linha por registro (dict), em blocos de texto."""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(colunas)
+    linhas = 0
+    for registro in registros:
+        escritor.writerow([_valor_texto(registro.get(coluna)) for coluna in colunas])
+        linhas += 1
+        if linhas % LINHAS_POR_BLOCO == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+    yield buffer.getvalue()
+
+
+def gerar_ndjson(registros, colunas):
+    """Um objeto JSON por linha, só com as colunas informadas."""
+    bloco = []
+    for registro in registros:
+        bloco.append(json.dumps({coluna: registro.get(coluna) for coluna in colunas},
+                                default=_valor_json, ensure_ascii=False))
+        if len(bloco) == LINHAS_POR_BLOCO:
+            yield "\n".join(bloco) + "\n"
+            bloco = []
+    if bloco:
+        yield "\n".join(bloco) + "\n"
+
+
+def gerar_exportacao(registros, colunas, formato):
+    """Gerador de texto no formato pedido ('csv' ou 'ndjson')."""
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportação desconhecido: {formato!r}")
+    gerador = gerar_csv if formato == 'csv' else gerar_ndjson
+    return gerador(registros, colunas)
+
+
+def nome_arquivo(prefixo, formato):
+    return f"{prefixo}_{datetime.now():%Y%m%d_%H%M%S}.{formato}"
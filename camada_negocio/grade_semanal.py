@@ -0,0 +1,140 @@
+# camada_negocio/grade_semanal.py
+"""
+Montagem da grade semanal de horários (tela tabela_agendamento).
+
+Cada ocupação é convertida em um intervalo de índices de slots por conta
+aritmética (minutos desde o início da semana // granularidade) e gravada
+na matriz de slots com uma única atribuição de fatia, em vez de percorrer o
+intervalo hora a hora. A matriz é um array('i') de dias x slots que guarda
+a posição da ocupação; ao final, cada célula ocupada recebe uma referência
+compacta (RefOcupacao), e ocorrências do mesmo evento compartilham a mesma
+referência.
+
+Horário de funcionamento e granularidade podem ser configurados por
+variáveis de ambiente ou por parâmetro.
+"""
+
+import os
+from array import array
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+GRADE_HORA_ABERTURA = int(os.environ.get('GRADE_HORA_ABERTURA', 7))
+GRADE_HORA_FECHAMENTO = int(os.environ.get('GRADE_HORA_FECHAMENTO', 23))
+GRADE_GRANULARIDADE_MINUTOS = int(os.environ.get('GRADE_GRANULARIDADE_MINUTOS', 60))
+
+MINUTOS_POR_DIA = 24 * 60
+_LIVRE = -1
+
+# O que a célula precisa para ser desenhada (o template usa tipo_ocupacao
+# e nome_evento), sem carregar o documento inteiro.
+RefOcupacao = namedtuple('RefOcupacao', ['id', 'tipo_ocupacao', 'status', 'nome_evento'])
+
+
+class GradeSemanal:
+    """Matriz dias x slots de uma semana, preenchida a partir das ocupações."""
+
+    def __init__(self, dias, hora_abertura=None, hora_fechamento=None, granularidade_minutos=None):
+        self.dias = list(dias)
+        self.hora_abertura = GRADE_HORA_ABERTURA if hora_abertura is None else hora_abertura
+        self.hora_fechamento = GRADE_HORA_FECHAMENTO if hora_fechamento is None else hora_fechamento
+        self.granularidade = GRADE_GRANULARIDADE_MINUTOS if granularidade_minutos is None else granularidade_minutos
+
+        minutos_abertos = (self.hora_fechamento - self.hora_abertura) * 60
+        if self.granularidade <= 0 or minutos_abertos <= 0 or minutos_abertos % self.granularidade:
+            raise ValueError("O horário de funcionamento deve ser múltiplo da granularidade.")
+
+        self.inicio = datetime.combine(self.dias[0], time.min)
+        self.minuto_abertura = self.hora_abertura * 60
+        self.slots_por_dia = minutos_abertos // self.granularidade
+        self.horarios = [self._hhmm(self.minuto_abertura + i * self.granularidade) for i in range(self.slots_por_dia)]
+
+        self.celulas = array('i', [_LIVRE]) * (len(self.dias) * self.slots_por_dia)
+        self.ocupacoes = []
+
+    @staticmethod
+    def _hhmm(minutos):
+        return f"{(minutos // 60) % 24:02d}:{minutos % 60:02d}"
+
+    def marcar_todas(self, ocupacoes):
+        """
+        Grava cada ocupação em todos os slots que [hora_ini, hora_fim) toca.
+        A matriz guarda a posição da ocupação na lista; as referências
+        compactas só são criadas, em por_dia(), para as que ficaram visíveis.
+        """
+        self.ocupacoes = ocupacoes if isinstance(ocupacoes, list) else list(ocupacoes)
+        celulas = self.celulas
+        inicio = self.inicio
+        granularidade = self.granularidade
+        slots_por_dia = self.slots_por_dia
+        abertura = self.minuto_abertura
+        ultimo_dia_semana = len(self.dias) - 1
+        um_minuto = timedelta(minutes=1)
+
+        for posicao, ocupacao in enumerate(self.ocupacoes):
+            hora_ini, hora_fim = ocupacao.get('hora_ini'), ocupacao.get('hora_fim')
+            if hora_ini is None or hora_fim is None or hora_fim <= hora_ini:
+                continue
+
+            # Minutos desde o início da semana (fim arredondado para cima)
+            minuto_ini = (hora_ini - inicio) // um_minuto
+            minuto_fim = -((inicio - hora_fim) // um_minuto)
+            primeiro_dia = max(0, minuto_ini // MINUTOS_POR_DIA)
+            ultimo_dia = min(ultimo_dia_semana, (minuto_fim - 1) // MINUTOS_POR_DIA)
+
+            for dia in range(primeiro_dia, ultimo_dia + 1):
+                deslocamento = dia * MINUTOS_POR_DIA + abertura
+                slot_ini = (minuto_ini - deslocamento) // granularidade
+                slot_fim = -((deslocamento - minuto_fim) // granularidade)
+                if slot_ini < 0:
+                    slot_ini = 0
+                if slot_fim > slots_por_dia:
+                    slot_fim = slots_por_dia
+                if slot_ini < slot_fim:
+                    base = dia * slots_por_dia
+                    celulas[base + slot_ini:base + slot_fim] = array('i', (posicao,)) * (slot_fim - slot_ini)
+        return self
+
+    def _referencias_visiveis(self):
+        """RefOcupacao de cada posição presente na matriz (mesmo _id -> mesma referência)."""
+        por_posicao = {}
+        por_id = {}
+        for posicao in set(self.celulas):
+            if posicao == _LIVRE:
+                continue
+            ocupacao = self.ocupacoes[posicao]
+            chave = (ocupacao.get('tipo_ocupacao'), ocupacao.get('_id'))
+            referencia = por_id.get(chave) if chave[1] is not None else None
+            if referencia is None:
+                referencia = RefOcupacao(
+                    ocupacao.get('_id'),
+                    ocupacao.get('tipo_ocupacao'),
+                    ocupacao.get('status'),
+                    ocupacao.get('nome_evento'),
+                )
+                por_id[chave] = referencia
+            por_posicao[posicao] = referencia
+        return por_posicao
+
+    def por_dia(self):
+        """Estrutura usada pelo template: {data: {'HH:MM': RefOcupacao | None}}."""
+        referencias = self._referencias_visiveis()
+        grade = {}
+        for d, dia in enumerate(self.dias):
+            linha = self.celulas[d * self.slots_por_dia:(d + 1) * self.slots_por_dia]
+            grade[dia] = {hora: referencias.get(c) for hora, c in zip(self.horarios, linha)}
+        return grade
+
+    def fim_dos_horarios(self):
+        """Horário de término de cada slot ({'07:00': '08:00', ...})."""
+        return {hora: self._hhmm(self.minuto_abertura + (i + 1) * self.granularidade)
+                for i, hora in enumerate(self.horarios)}
+
+
+def montar_grade_semanal(dias, ocupacoes, **configuracao):
+    """
+    Monta a grade da semana e devolve (horarios, agendamentos_por_dia,
+    fim_dos_horarios), no formato esperado por tabela_agendamento.html.
+    """
+    grade = GradeSemanal(dias, **configuracao).marcar_todas(ocupacoes)
+    return grade.horarios, grade.por_dia(), grade.fim_dos_horarios()
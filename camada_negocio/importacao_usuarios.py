@@ -0,0 +1,186 @@
+# camada_negocio/importacao_usuarios.py
+"""
+Importação de usuários em lote (CSV ou JSON), usada pela tela
+/admin/usuarios/importar e por ferramentas/importar_usuarios.py.
+
+O arquivo é lido registro a registro. Cada registro é validado e
+convertido no mesmo documento do cadastro individual
+(servicos.construir_usuario + usuario_dao.montar_documento_usuario), e os
+documentos vão para o banco em lotes de IMPORTACAO_TAMANHO_LOTE com
+insert_many(ordered=False). Só o lote atual fica em memória, além dos CPFs
+e emails já vistos (para apontar duplicatas dentro do próprio arquivo).
+
+Formatos aceitos:
+- CSV com cabeçalho, com as colunas do formulário de cadastro
+  (tipo_usuario, cpf, nome, email, senha, data_nasc, matricula, curso, ...);
+- JSON: uma lista de objetos, ou um objeto por linha (NDJSON). Só o NDJSON
+  é lido em streaming; a lista é carregada inteira.
+"""
+
+import csv
+import itertools
+import json
+import os
+import re
+
+IMPORTACAO_TAMANHO_LOTE = int(os.environ.get('IMPORTACAO_TAMANHO_LOTE', 1000))
+
+CAMPOS_OBRIGATORIOS = {
+    'aluno': ('cpf', 'nome', 'email', 'senha', 'matricula', 'curso'),
+    'bolsista': ('cpf', 'nome', 'email', 'senha', 'matricula', 'curso'),
+    'funcionario': ('cpf', 'nome', 'email', 'senha', 'id_servidor'),
+    'admin': ('cpf', 'nome', 'email', 'senha', 'id_servidor'),
+}
+
+_EMAIL_VALIDO = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+def ler_csv(arquivo):
+    """Gerador de (número_da_linha, registro) de um arquivo CSV em texto."""
+    leitor = csv.DictReader(arquivo)
+    for registro in leitor:
+        yield leitor.line_num, registro
+
+
+def ler_json(arquivo):
+    """Gerador de (número_do_registro, registro) de uma lista JSON ou de NDJSON."""
+    primeira = arquivo.readline()
+    if primeira.lstrip().startswith('['):
+        for numero, registro in enumerate(json.loads(primeira + arquivo.read()), start=1):
+            yield numero, registro
+        return
+
+    linhas = itertools.chain([primeira] if primeira else [], arquivo)
+    for numero, texto in enumerate(linhas, start=1):
+        if not texto.strip():
+            continue
+        try:
+            yield numero, json.loads(texto)
+        except json.JSONDecodeError as e:
+            yield numero, ValueError(f"JSON inválido: {e.msg}")
+
+
+def ler_registros(arquivo, formato):
+    if formato == 'csv':
+        return ler_csv(arquivo)
+    if formato in ('json', 'ndjson'):
+        return ler_json(arquivo)
+    raise ValueError(f"Formato de importação desconhecido: {formato!r}")
+
+
+def normalizar_registro(registro):
+    """Tira espaços, descarta campos vazios e deixa o CPF só com dígitos."""
+    normalizado = {}
+    for campo, valor in registro.items():
+        if campo is None:
+            continue
+        if isinstance(valor, str):
+            valor = valor.strip()
+        if valor in ('', None):
+            continue
+        normalizado[campo.strip()] = valor
+    normalizado['tipo_usuario'] = str(normalizado.get('tipo_usuario', 'aluno')).lower()
+    if 'cpf' in normalizado:
+        normalizado['cpf'] = re.sub(r"\D", "", str(normalizado['cpf']))
+    return normalizado
+
+
+def validar_registro(registro):
+    """Mensagem de erro do registro normalizado, ou None se estiver válido."""
+    tipo = registro.get('tipo_usuario')
+    if tipo not in CAMPOS_OBRIGATORIOS:
+        return f"Tipo de usuário desconhecido: {registro.get('tipo_usuario')!r}"
+    faltando = [campo for campo in CAMPOS_OBRIGATORIOS[tipo] if campo not in registro]
+    if faltando:
+        return f"Campos obrigatórios ausentes: {', '.join(faltando)}"
+    if len(registro['cpf']) != 11:
+        return f"CPF inválido: {registro['cpf']!r}"
+    if not _EMAIL_VALIDO.match(str(registro['email'])):
+        return f"Email inválido: {registro['email']!r}"
+    return None
+
+
+class RelatorioImportacao:
+    """Resultado da importação: contadores e um erro por registro rejeitado."""
+
+    def __init__(self):
+        self.total = 0
+        self.inseridos = 0
+        self.erros = []
+
+    def adicionar_erro(self, linha, registro, mensagem):
+        self.erros.append({
+            "linha": linha,
+            "cpf": registro.get('cpf') if isinstance(registro, dict) else None,
+            "email": registro.get('email') if isinstance(registro, dict) else None,
+            "erro": mensagem,
+        })
+
+    def como_dict(self):
+        return {"total": self.total, "inseridos": self.inseridos,
+                "rejeitados": len(self.erros), "erros": sorted(self.erros, key=lambda e: e["linha"])}
+
+
+def importar_em_lotes(registros, montar_documento, inserir_lote, tamanho_lote=None):
+    """
+    Valida e insere os registros em lotes.
+
+    registros: iterável de (linha, registro) (ver ler_registros);
+    montar_documento: registro normalizado -> documento do MongoDB;
+    inserir_lote: lista de documentos -> [(posição, campo_duplicado, mensagem)]
+                  (ver UsuarioDAO.inserir_em_lote).
+    Retorna um RelatorioImportacao.
+    """
+    tamanho_lote = tamanho_lote or IMPORTACAO_TAMANHO_LOTE
+    relatorio = RelatorioImportacao()
+    cpfs_vistos = {}
+    emails_vistos = {}
+    lote = []  # [(linha, registro, documento)]
+
+    def gravar():
+        falhas = inserir_lote([documento for _, _, documento in lote])
+        for posicao, campo, mensagem in falhas:
+            linha, registro, _ = lote[posicao]
+            if campo == '_id':
+                mensagem = "CPF já cadastrado"
+            elif campo == 'email':
+                mensagem = "Email já cadastrado"
+            relatorio.adicionar_erro(linha, registro, mensagem)
+        relatorio.inseridos += len(lote) - len(falhas)
+        lote.clear()
+
+    for linha, registro in registros:
+        relatorio.total += 1
+        if isinstance(registro, Exception):
+            relatorio.adicionar_erro(linha, {}, str(registro))
+            continue
+        if not isinstance(registro, dict):
+            relatorio.adicionar_erro(linha, {}, "Registro não é um objeto")
+            continue
+
+        registro = normalizar_registro(registro)
+        erro = validar_registro(registro)
+        if erro is None and registro['cpf'] in cpfs_vistos:
+            erro = f"CPF repetido no arquivo (linha {cpfs_vistos[registro['cpf']]})"
+        if erro is None and registro['email'] in emails_vistos:
+            erro = f"Email repetido no arquivo (linha {emails_vistos[registro['email']]})"
+        if erro is None:
+            try:
+                documento = montar_documento(registro)
+            except Exception as e:
+                erro = f"Dados inválidos: {e}"
+        if erro is not None:
+            relatorio.adicionar_erro(linha, registro, erro)
+            continue
+
+        cpfs_vistos[registro['cpf']] = linha
+        emails_vistos[registro['email']] = linha
+        lote.append((linha, registro, documento))
+        if len(lote) >= tamanho_lote:
+            gravar()
+
+    if lote:
+        gravar()
+
+    print(f"DEBUG[Importação]: {relatorio.total} registros, {relatorio.inseridos} inseridos, {len(relatorio.erros)} rejeitados.")
+    return relatorio
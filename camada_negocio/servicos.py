@@ -1,18 +1,127 @@
 # camada_negocio/servicos.py
 
-from camada_dados.usuario_dao import UsuarioDAO
+from camada_dados.usuario_dao import UsuarioDAO, montar_documento_usuario
 from camada_dados.quadra_dao import QuadraDAO
 from modelos.usuario import Usuario, Aluno, Servidor, Funcionario, Admin
 from camada_dados.material_dao import MaterialDAO
 from camada_dados.ginasio_dao import GinasioDAO
-from camada_dados.agendamento_dao import AgendamentoDAO
+from camada_dados.agendamento_dao import (
+    AgendamentoDAO, inserir_com_reserva, inserir_lote_com_reserva, alterar_status_agendamento, get_ginasio_por_id,
+    ocupado_fora_do_indice_de_slots,
+)
+from camada_dados.catalogo import obter_catalogo
 from camada_dados.chamado_dao import ChamadoDAO
 from camada_dados.esporte_dao import EsporteDAO
 from camada_dados.evento_dao import EventoDAO
 from datetime import datetime, timedelta, time, date
 from camada_dados.mongo_config import conectar_mongo
+from camada_dados.uso_diario import buscar_uso_por_quadra, iterar_uso_diario
+from camada_negocio.importacao_usuarios import importar_em_lotes, ler_registros
+from camada_negocio.exportacao import (
+    gerar_exportacao, COLUNAS_AGENDAMENTOS, COLUNAS_RELATORIO_USO, COLUNAS_USO_DIARIO,
+)
 from bson import ObjectId
-import re
+from modelos.recorrencia import Recorrencia
+import os
+
+# Seções da página /bolsista/agendamentos e tamanho de página de cada uma
+STATUS_SECOES_BOLSISTA = ('confirmado', 'realizado', 'cancelado')
+TAMANHO_SECAO_BOLSISTA = int(os.environ.get('TAMANHO_SECAO_BOLSISTA', 20))
+
+# Limite de pedidos por chamada de ServicoAdmin.reservar_em_lote
+LOTE_MAX_PEDIDOS = int(os.environ.get('LOTE_MAX_PEDIDOS', 500))
+
+
+def _quadra_do_catalogo(id_ginasio, num_quadra):
+    catalogo = obter_catalogo()
+    return catalogo.quadra(id_ginasio, num_quadra) if catalogo else None
+
+
+def _resumo_ocupacao(ocupacao):
+    """Ocupação conflitante em formato serializável (resposta JSON)."""
+    resumo = {
+        "tipo_ocupacao": ocupacao.get("tipo_ocupacao"),
+        "id_ginasio": ocupacao.get("id_ginasio"),
+        "num_quadra": ocupacao.get("num_quadra"),
+        "nome": ocupacao.get("nome"),
+    }
+    if ocupacao.get("hora_ini") is not None:
+        resumo["hora_ini"] = ocupacao["hora_ini"].isoformat()
+        resumo["hora_fim"] = ocupacao["hora_fim"].isoformat()
+    if ocupacao.get("recorrencia"):
+        resumo["regra_recorrencia"] = ocupacao.get("regra_recorrencia") or Recorrencia.do_documento(ocupacao["recorrencia"]).formatar_regra()
+    return resumo
+
+def _quadras_do_formulario(lista_quadras_str):
+    """Converte ['1-2', '1-3', ...] do formulário em [(1, 2), (1, 3), ...]."""
+    lista_quadras_ids = []
+    for quadra_str in lista_quadras_str or []:
+        partes = quadra_str.split('-')
+        if len(partes) == 2:
+            lista_quadras_ids.append((int(partes[0]), int(partes[1])))
+    return lista_quadras_ids
+
+def construir_usuario(dados):
+    """
+    Cria o objeto de usuário (Aluno, Funcionario ou Admin) a partir de um
+    dicionário com os campos do formulário de cadastro ('tipo_usuario',
+    'cpf', 'nome', ...). Compartilhado pelo cadastro individual e pela
+    importação em lote. Retorna None se o tipo for desconhecido.
+    """
+    tipo_usuario = dados.get('tipo_usuario')
+
+    # Dados comuns a todos os usuários
+    dados_comuns = {
+        'cpf': dados.get('cpf'),
+        'nome': dados.get('nome'),
+        'email': dados.get('email'),
+        'senha': dados.get('senha'),
+        'data_nasc': dados.get('data_nasc'),
+        'status': 'ativo' # Novos usuários sempre começam como ativos
+    }
+
+    # Unifica a lógica de Aluno e Bolsista
+    if tipo_usuario in ['aluno', 'Bolsista', 'bolsista']:
+        # Argumentos base para qualquer aluno
+        args_aluno = {
+            **dados_comuns,
+            'matricula': dados.get('matricula'),
+            'curso': dados.get('curso'),
+            'ano_inicio': dados.get('ano_inicio')
+        }
+
+        # Se for um bolsista, adiciona os campos extras
+        if str(tipo_usuario).lower() == 'bolsista':
+            args_aluno['is_bolsista'] = True
+            args_aluno['categoria'] = 'bolsista'
+            args_aluno['valor_remuneracao'] = dados.get('valor_remuneracao')
+            args_aluno['carga_horaria'] = dados.get('carga_horaria')
+            args_aluno['horario_inicio'] = dados.get('horario_inicio')
+            args_aluno['horario_fim'] = dados.get('horario_fim')
+            args_aluno['id_supervisor_servidor'] = dados.get('id_supervisor_servidor')
+
+        return Aluno(**args_aluno)
+
+    if tipo_usuario == 'funcionario':
+        return Funcionario(
+            **dados_comuns,
+            id_servidor=dados.get('id_servidor'),
+            data_admissao=dados.get('data_admissao'),
+            departamento=dados.get('departamento'),
+            cargo=dados.get('cargo')
+        )
+
+    if tipo_usuario == 'admin':
+        return Admin(
+            **dados_comuns,
+            id_servidor=dados.get('id_servidor'),
+            data_admissao=dados.get('data_admissao'),
+            nivel_acesso=dados.get('nivel_acesso', 1), # Usa 1 como padrão
+            area_responsabilidade=dados.get('area_responsabilidade')
+        )
+
+    return None
+
 
 class ServicoLogin:
     def __init__(self, nome_banco="udesc_quadras"):
@@ -20,7 +129,7 @@ class ServicoLogin:
         self.usuario_dao = UsuarioDAO()
 
     def _get_client_db(self):
-        # Recupera o objeto Database e extrai o client dele para poder fechar depois
+        # Empresta o cliente compartilhado do pool (não deve ser fechado aqui)
         db = conectar_mongo()
         if db is None:
             return None, None
@@ -71,6 +180,7 @@ class ServicoAdmin:
         self.evento_dao = EventoDAO()
 
     def _get_client_db(self):
+        # Empresta o cliente compartilhado do pool (não deve ser fechado aqui)
         db = conectar_mongo()
         if db is None:
             return None, None
@@ -137,72 +247,37 @@ class ServicoAdmin:
         tipo_usuario = dados_formulario.get('tipo_usuario')
         print(f"DEBUG[Serviço]: Tentando criar um novo usuário do tipo '{tipo_usuario}'.")
 
-        novo_usuario = None
         try:
-            # Dados comuns a todos os usuários
-            dados_comuns = {
-                'cpf': dados_formulario.get('cpf'),
-                'nome': dados_formulario.get('nome'),
-                'email': dados_formulario.get('email'),
-                'senha': dados_formulario.get('senha'),
-                'data_nasc': dados_formulario.get('data_nasc'),
-                'status': 'ativo' # Novos usuários sempre começam como ativos
-            }
-
-            # Unifica a lógica de Aluno e Bolsista
-            if tipo_usuario in ['aluno', 'Bolsista', 'bolsista']:
-                # Argumentos base para qualquer aluno
-                args_aluno = {
-                    **dados_comuns,
-                    'matricula': dados_formulario.get('matricula'),
-                    'curso': dados_formulario.get('curso'),
-                    'ano_inicio': dados_formulario.get('ano_inicio')
-                }
-                
-                # Se for um bolsista, adiciona os campos extras
-                if str(tipo_usuario).lower() == 'bolsista':
-                    args_aluno['is_bolsista'] = True
-                    args_aluno['categoria'] = 'bolsista'
-                    args_aluno['valor_remuneracao'] = dados_formulario.get('valor_remuneracao')
-                    args_aluno['carga_horaria'] = dados_formulario.get('carga_horaria')
-                    args_aluno['horario_inicio'] = dados_formulario.get('horario_inicio')
-                    args_aluno['horario_fim'] = dados_formulario.get('horario_fim')
-                    args_aluno['id_supervisor_servidor'] = dados_formulario.get('id_supervisor_servidor')
-                
-                # Cria o objeto Aluno com os argumentos corretos
-                novo_usuario = Aluno(**args_aluno)
-            
-            elif tipo_usuario == 'funcionario':
-                novo_usuario = Funcionario(
-                    **dados_comuns,
-                    id_servidor=dados_formulario.get('id_servidor'),
-                    data_admissao=dados_formulario.get('data_admissao'),
-                    departamento=dados_formulario.get('departamento'),
-                    cargo=dados_formulario.get('cargo')
-                )
-
-            elif tipo_usuario == 'admin':
-                novo_usuario = Admin(
-                    **dados_comuns,
-                    id_servidor=dados_formulario.get('id_servidor'),
-                    data_admissao=dados_formulario.get('data_admissao'),
-                    nivel_acesso=dados_formulario.get('nivel_acesso', 1), # Usa 1 como padrão
-                    area_responsabilidade=dados_formulario.get('area_responsabilidade')
-                )
-
-            else:
-                print(f"Erro[Serviço]: Tipo de usuário '{tipo_usuario}' desconhecido.")
-                return False
+            novo_usuario = construir_usuario(dados_formulario)
 
             # Se um objeto foi criado com sucesso, chama o DAO para salvá-lo
             if novo_usuario:
                 return self.usuario_dao.salvar(novo_usuario)
+            print(f"Erro[Serviço]: Tipo de usuário '{tipo_usuario}' desconhecido.")
 
         except Exception as e:
             print(f"Erro[Serviço]: Falha ao instanciar o objeto de usuário. Detalhes: {e}")
             return False
             
         return False
+
+    def importar_usuarios(self, arquivo, formato, tamanho_lote=None):
+        """
+        Importa usuários de um arquivo de texto (CSV ou JSON/NDJSON) em lotes.
+        Retorna o relatório {'total', 'inseridos', 'rejeitados', 'erros'},
+        com um erro por linha rejeitada (validação, CPF/email duplicado).
+        """
+        print(f"DEBUG[Serviço]: Importando usuários ({formato}).")
+
+        def montar_documento(registro):
+            usuario = construir_usuario(registro)
+            if usuario is None:
+                raise ValueError(f"tipo de usuário '{registro.get('tipo_usuario')}' desconhecido")
+            return montar_documento_usuario(usuario)
+
+        relatorio = importar_em_lotes(ler_registros(arquivo, formato), montar_documento,
+                                      self.usuario_dao.inserir_em_lote, tamanho_lote)
+        return relatorio.como_dict()
     
     def listar_materiais(self):
         """
@@ -267,6 +342,134 @@ class ServicoAdmin:
         print("DEBUG[Serviço]: Solicitando a lista de todos os agendamentos ao DAO.")
         return self.agendamento_dao.buscar_todos_os_agendamentos()
 
+    def listar_agendamentos_paginados(self, filtros=None, cursor=None, tamanho=None):
+        """
+        Busca uma página da listagem de agendamentos, com filtros aplicados
+        no banco. Retorna (agendamentos, proximo_cursor).
+        """
+        print(f"DEBUG[Serviço]: Solicitando página de agendamentos ao DAO (filtros={filtros}).")
+        return self.agendamento_dao.buscar_pagina_agendamentos(filtros, cursor, tamanho)
+
+    def exportar_agendamentos(self, filtros=None, formato='csv'):
+        """
+        Exporta os agendamentos que casam com os filtros da listagem
+        administrativa. Retorna um gerador de blocos de texto (CSV/NDJSON).
+        """
+        print(f"DEBUG[Serviço]: Exportando agendamentos em {formato} (filtros={filtros}).")
+        return gerar_exportacao(self.agendamento_dao.iterar_agendamentos(filtros), COLUNAS_AGENDAMENTOS, formato)
+
+    def reservar_em_lote(self, cpf_usuario, pedidos, motivo=None, cpf_bolsista_operador=None):
+        """
+        Reserva vários horários de uma vez (ex.: uma turma/equipe no semestre).
+        'pedidos' é uma lista de {'id_ginasio', 'num_quadra', 'inicio', 'fim'}
+        (datetimes ou texto ISO). Todos os pedidos são verificados em uma
+        única agregação de conflitos e os aceitos são gravados em um único
+        bulk_write; cada pedido é aceito ou recusado individualmente.
+
+        Retorna {'aceitos', 'recusados', 'resultados'}, com um resultado por
+        pedido, na mesma ordem: {'indice', 'status': 'aceito'|'recusado',
+        'id_agendamento' | 'motivo' + 'conflitos'}.
+        """
+        print(f"DEBUG[Serviço]: Reserva em lote de {len(pedidos)} horário(s) para {cpf_usuario}.")
+        resultados = [None] * len(pedidos)
+
+        def recusar(indice, motivo_recusa, conflitos=()):
+            resultados[indice] = {
+                "indice": indice, "status": "recusado", "motivo": motivo_recusa,
+                "conflitos": [_resumo_ocupacao(c) for c in conflitos],
+            }
+
+        if len(pedidos) > LOTE_MAX_PEDIDOS:
+            raise ValueError(f"No máximo {LOTE_MAX_PEDIDOS} pedidos por lote.")
+
+        client, db = self._get_client_db()
+        if client is None:
+            raise RuntimeError("Sem conexão com o MongoDB.")
+        usuario = db.usuarios.find_one({"_id": cpf_usuario}, {"nome": 1})
+        if not usuario:
+            raise ValueError(f"Usuário {cpf_usuario} não encontrado.")
+
+        # 1. Validação individual (formato, quadra existente e disponível)
+        validos = []  # [(indice, id_ginasio, num_quadra, inicio, fim)]
+        for indice, pedido in enumerate(pedidos):
+            try:
+                id_ginasio, num_quadra = int(pedido['id_ginasio']), int(pedido['num_quadra'])
+                inicio, fim = pedido['inicio'], pedido['fim']
+                inicio = inicio if isinstance(inicio, datetime) else datetime.fromisoformat(inicio)
+                fim = fim if isinstance(fim, datetime) else datetime.fromisoformat(fim)
+            except (KeyError, TypeError, ValueError):
+                recusar(indice, "Pedido inválido: informe id_ginasio, num_quadra, inicio e fim.")
+                continue
+            if fim <= inicio:
+                recusar(indice, "O fim deve ser posterior ao início.")
+                continue
+            catalogo_quadra = _quadra_do_catalogo(id_ginasio, num_quadra)
+            if catalogo_quadra is None:
+                recusar(indice, "Quadra inexistente.")
+                continue
+            if catalogo_quadra.get('status') not in (None, 'disponivel'):
+                recusar(indice, f"Quadra {catalogo_quadra.get('status')}.")
+                continue
+            validos.append((indice, id_ginasio, num_quadra, inicio, fim))
+
+        # 2. Conflitos entre pedidos do próprio lote: vale o primeiro
+        aceitos_por_quadra = {}
+        sem_sobreposicao = []
+        for item in validos:
+            indice, g, q, inicio, fim = item
+            anteriores = aceitos_por_quadra.setdefault((g, q), [])
+            repetido = next((j for j, ini, fi in anteriores if ini < fim and fi > inicio), None)
+            if repetido is not None:
+                recusar(indice, f"Sobrepõe o pedido {repetido} do mesmo lote.")
+                continue
+            anteriores.append((indice, inicio, fim))
+            sem_sobreposicao.append(item)
+
+        # 3. Conflitos com o banco: uma única agregação para todos os pedidos
+        conflitos = self.agendamento_dao.buscar_conflitos_por_pedido([item[1:] for item in sem_sobreposicao])
+        if conflitos is None:
+            raise RuntimeError("Não foi possível verificar os conflitos.")
+
+        a_gravar = []
+        for item, conflitos_do_item in zip(sem_sobreposicao, conflitos):
+            if conflitos_do_item:
+                recusar(item[0], "Horário ocupado.", conflitos_do_item)
+            else:
+                a_gravar.append(item)
+
+        # 4. Gravação: um único bulk_write; o índice de slots ainda recusa
+        #    o que for reservado por outra requisição neste meio tempo
+        documentos = []
+        for indice, g, q, inicio, fim in a_gravar:
+            ginasio = get_ginasio_por_id(g)
+            documento = {
+                "cpf_usuario": cpf_usuario,
+                "id_ginasio": g,
+                "num_quadra": q,
+                "data_solicitacao": datetime.now(),
+                "hora_ini": inicio,
+                "hora_fim": fim,
+                "status_agendamento": "confirmado",
+                "usuario_info": {"nome": usuario.get("nome")},
+                "local_info": {"nome_ginasio": ginasio.nome if ginasio else None},
+            }
+            if motivo:
+                documento["motivo"] = f"Evento: {motivo}"
+            if cpf_bolsista_operador:
+                documento["id_bolsista_operador"] = cpf_bolsista_operador
+                documento["data_operacao_bolsista"] = datetime.now()
+            documentos.append(documento)
+
+        ids = inserir_lote_com_reserva(db, documentos)
+        for (indice, *_), id_inserido in zip(a_gravar, ids):
+            if id_inserido is None:
+                recusar(indice, "Horário reservado por outra requisição.")
+            else:
+                resultados[indice] = {"indice": indice, "status": "aceito", "id_agendamento": str(id_inserido)}
+
+        aceitos = sum(1 for r in resultados if r["status"] == "aceito")
+        return {"aceitos": aceitos, "recusados": len(resultados) - aceitos, "resultados": resultados}
+
     def cancelar_agendamento_admin(self, id_agendamento):
         """
         Cancela um agendamento específico em nome de um administrador.
@@ -327,8 +530,10 @@ class ServicoAdmin:
         # Busca todos os esportes que existem (usando o EsporteDAO)
         todos_os_esportes = self.esporte_dao.buscar_todos()
         
-        # Busca os IDs dos esportes que já estão marcados para esta quadra (usando o QuadraDAO)
-        esportes_ja_associados = self.quadra_dao.buscar_esportes_da_quadra(id_ginasio, num_quadra)
+        # Busca os IDs dos esportes que já estão marcados para esta quadra (usando o QuadraDAO),
+        # em texto para comparar com os _id da página
+        esportes_ja_associados = [str(id_esporte) for id_esporte in
+                                  self.quadra_dao.buscar_esportes_da_quadra(id_ginasio, num_quadra)]
         
         return {
             'todos_esportes': todos_os_esportes,
@@ -348,168 +553,99 @@ class ServicoAdmin:
         print("DEBUG[Serviço]: Solicitando a lista de todos os eventos ao DAO.")
         return self.evento_dao.buscar_todos()
     
-    def adicionar_evento(self, cpf_admin_organizador, nome_evento, desc_evento, tipo_evento, dados_tempo, lista_quadras_str):
+    def buscar_conflitos_evento(self, tipo_evento, dados_tempo, lista_quadras_ids):
         """
-        Verifica conflitos para todos os cenários antes de criar um novo evento.
+        Conflitos de um evento ainda não criado com agendamentos, eventos
+        extraordinários e eventos recorrentes, em todas as quadras de uma vez
+        (uma única agregação, ver AgendamentoDAO.buscar_conflitos_em_lote).
+        Para eventos recorrentes, guarda a Recorrencia em dados_tempo['recorrencia'].
+        Retorna a lista de ocupações conflitantes ou None se a verificação
+        falhar; dados de tempo inválidos levantam ValueError.
         """
-        print(f"\n--- INICIANDO PROCESSO DE CRIAÇÃO DE EVENTO ---")
-        print(f"DEBUG[Serviço]: Tentando adicionar novo evento do tipo '{tipo_evento}'.")
-        
-        # --- ETAPA 1: Processar a lista de quadras ---
-        lista_quadras_ids = []
-        if lista_quadras_str:
-            for quadra_str in lista_quadras_str:
-                partes = quadra_str.split('-')
-                if len(partes) == 2:
-                    lista_quadras_ids.append((int(partes[0]), int(partes[1])))
-        
-        # --- ETAPA 2: Lógica de Validação de Conflitos ---
-        
-        # CENÁRIO A: Adicionando um Evento Extraordinário
+        # CENÁRIO A: Evento Extraordinário (um único intervalo em todas as quadras)
         if tipo_evento == 'extraordinario':
             inicio_str = dados_tempo.get('inicio')
             fim_str = dados_tempo.get('fim')
             if not inicio_str or not fim_str:
-                print("ERRO[Serviço]: Data de início ou fim do evento extraordinário não fornecida.")
-                return False
-
+                raise ValueError("Data de início ou fim do evento extraordinário não fornecida.")
             inicio_novo_evento = datetime.fromisoformat(inicio_str)
             fim_novo_evento = datetime.fromisoformat(fim_str)
-            
-            print(f"\n[CENÁRIO: EXTRAORDINÁRIO] Verificando conflitos de {inicio_novo_evento} a {fim_novo_evento}")
+            if fim_novo_evento <= inicio_novo_evento:
+                raise ValueError("O fim do evento deve ser posterior ao início.")
 
-            for id_ginasio, num_quadra in lista_quadras_ids:
-                print(f"\n  Verificando Quadra: {num_quadra} (Ginásio: {id_ginasio})")
-                
-                # 2.1 - Verifica contra agendamentos e outros eventos extraordinários
-                if self.agendamento_dao.verificar_conflito_de_horario(id_ginasio, num_quadra, inicio_novo_evento, fim_novo_evento):
-                    print(f"    [X] CONFLITO ENCONTRADO (Agendamento ou Evento Extraordinário).")
-                    return False
-                print(f"    [✓] Sem conflitos com agendamentos ou eventos extraordinários.")
-
-                # 2.2 - Verifica contra eventos recorrentes
-                eventos_recorrentes_existentes = self.evento_dao.buscar_recorrentes_por_quadra(id_ginasio, num_quadra)
-                if not eventos_recorrentes_existentes:
-                    print("    [✓] Sem eventos recorrentes para esta quadra. Verificação concluída para esta quadra.")
-                    continue
-
-                dia_da_semana_novo_evento_num = inicio_novo_evento.weekday() # Python: segunda=0, ..., domingo=6
-                
-                for ev_rec in eventos_recorrentes_existentes:
-                    regra = ev_rec['regra_recorrencia']
-                    print(f"    - Comparando com a regra existente: '{regra}'")
-                    
-                    match = re.search(r"Toda ([\w\s-]+), das (\d{2}:\d{2}) às (\d{2}:\d{2})", regra)
-                    if not match:
-                        print("      -> Aviso: Regra existente não correspondeu ao padrão, pulando.")
-                        continue
+            print(f"\n[CENÁRIO: EXTRAORDINÁRIO] Verificando {len(lista_quadras_ids)} quadra(s) de {inicio_novo_evento} a {fim_novo_evento}")
+            return self.agendamento_dao.buscar_conflitos_em_lote(
+                lista_quadras_ids, intervalos=[(inicio_novo_evento, fim_novo_evento)]
+            )
 
-                    dia_pt_existente, hora_ini_str_existente, hora_fim_str_existente = match.groups()
-                    
-                    dias_map_pt_para_num = { 'Segunda-feira': 0, 'Terça-feira': 1, 'Quarta-feira': 2, 'Quinta-feira': 3, 'Sexta-feira': 4, 'Sábado': 5, 'Domingo': 6 }
-                    dia_existente_num = dias_map_pt_para_num.get(dia_pt_existente.strip())
-                    
-                    print(f"      -> Dia da regra: {dia_existente_num} vs Dia do novo evento: {dia_da_semana_novo_evento_num}")
-                    
-                    if dia_existente_num == dia_da_semana_novo_evento_num:
-                        print("      -> DIAS DA SEMANA COINCIDEM! Verificando horários...")
-                        hora_ini_existente = time.fromisoformat(hora_ini_str_existente)
-                        hora_fim_existente = time.fromisoformat(hora_fim_str_existente)
-                        hora_ini_novo = inicio_novo_evento.time()
-                        hora_fim_novo = fim_novo_evento.time()
-                        
-                        print(f"        - Novo Evento: {hora_ini_novo} -> {hora_fim_novo}")
-                        print(f"        - Regra Existente: {hora_ini_existente} -> {hora_fim_existente}")
-
-                        if max(hora_ini_novo, hora_ini_existente) < min(hora_fim_novo, hora_fim_existente):
-                            print(f"        [X] CONFLITO DE HORÁRIO COM EVENTO RECORRENTE ENCONTRADO!")
-                            return False
-                        
-                        print("        [✓] Sem conflito de horário.")
-                    else:
-                        print("      -> Dias da semana não coincidem. Sem conflito.")
-
-        # CENÁRIO B: Adicionando um Evento Recorrente
-        elif tipo_evento == 'recorrente':
-            print(f"\n[CENÁRIO: RECORRENTE] Verificando conflitos...")
-            
-            # --- Dados do NOVO evento recorrente ---
-            dia_novo_evento_en = dados_tempo.get('dia_semana') # Ex: 'Monday'
-            hora_ini_novo_evento = time.fromisoformat(dados_tempo.get('hora_inicio_recorrente'))
-            hora_fim_novo_evento = time.fromisoformat(dados_tempo.get('hora_fim_recorrente'))
-            data_fim_recorrencia = datetime.fromisoformat(dados_tempo.get('data_fim')).date()
-            
-            # Dicionários de mapeamento
-            dias_en_para_num = {'Monday': 0, 'Tuesday': 1, 'Wednesday': 2, 'Thursday': 3, 'Friday': 4, 'Saturday': 5, 'Sunday': 6}
-            dia_novo_evento_num = dias_en_para_num.get(dia_novo_evento_en)
+        # CENÁRIO B: Evento Recorrente (todas as quadras x todas as ocorrências)
+        if tipo_evento == 'recorrente':
+            try:
+                nova_recorrencia = Recorrencia.do_formulario(
+                    dados_tempo.get('dia_semana'),            # Ex: 'Monday'
+                    dados_tempo.get('hora_inicio_recorrente'),
+                    dados_tempo.get('hora_fim_recorrente'),
+                    dados_tempo.get('data_fim')
+                )
+            except TypeError as e:
+                raise ValueError(f"Dados de recorrência inválidos: {e}")
+            dados_tempo['recorrencia'] = nova_recorrencia
 
-            if dia_novo_evento_num is None:
-                print("ERRO[Serviço]: Dia da semana inválido para novo evento recorrente.")
-                return False
+            print(f"\n[CENÁRIO: RECORRENTE] Verificando {len(lista_quadras_ids)} quadra(s) de "
+                  f"{nova_recorrencia.data_inicio.date()} a {nova_recorrencia.data_fim.date()}...")
+            return self.agendamento_dao.buscar_conflitos_em_lote(lista_quadras_ids, recorrencia=nova_recorrencia)
 
-            # --- Início da verificação para cada quadra ---
-            for id_ginasio, num_quadra in lista_quadras_ids:
-                print(f"\n  Verificando Quadra: {num_quadra} (Ginásio: {id_ginasio})")
-                
-                # 2.1 - VERIFICAÇÃO contra outros eventos recorrentes (lógica existente)
-                eventos_recorrentes_existentes = self.evento_dao.buscar_recorrentes_por_quadra(id_ginasio, num_quadra)
-                for ev_rec in eventos_recorrentes_existentes:
-                    regra_existente = ev_rec['regra_recorrencia']
-                    match = re.search(r"Toda ([\w\s-]+), das (\d{2}:\d{2}) às (\d{2}:\d{2})", regra_existente)
-                    if match:
-                        dia_pt_existente, hora_ini_str_existente, hora_fim_str_existente = match.groups()
-                        dias_pt_map = { 'Toda Segunda-feira': 'Monday', 'Toda Terça-feira': 'Tuesday', 'Toda Quarta-feira': 'Wednesday', 'Toda Quinta-feira': 'Thursday', 'Toda Sexta-feira': 'Friday', 'Todo Sábado': 'Saturday', 'Todo Domingo': 'Sunday' }
-                        dia_en_existente = dias_pt_map.get(f"Toda {dia_pt_existente.strip()}")
-                        if dia_en_existente == dia_novo_evento_en:
-                            hora_ini_existente = time.fromisoformat(hora_ini_str_existente)
-                            hora_fim_existente = time.fromisoformat(hora_fim_str_existente)
-                            if max(hora_ini_novo_evento, hora_ini_existente) < min(hora_fim_novo_evento, hora_fim_existente):
-                                print(f"    [X] CONFLITO ENCONTRADO com outro evento recorrente.")
-                                return False
-                print(f"    [✓] Sem conflitos com outros eventos recorrentes.")
-
-                # ======================= INÍCIO DA NOVA LÓGICA =======================
-                # 2.2 - VERIFICAÇÃO contra agendamentos e eventos extraordinários
-                
-                # Simula o futuro: calcula todas as datas em que o evento vai ocorrer
-                datas_da_recorrencia = []
-                hoje = date.today()
-                data_inicial_busca = hoje - timedelta(days=hoje.weekday())
-                
-                data_atual = data_inicial_busca
-                print(f"    - Simulando ocorrências a partir de {data_atual} até {data_fim_recorrencia}...")
-                while data_atual <= data_fim_recorrencia:
-                    if data_atual.weekday() == dia_novo_evento_num:
-                        datas_da_recorrencia.append(data_atual)
-                    data_atual += timedelta(days=1)
-                
-                print(f"    - Simulando {len(datas_da_recorrencia)} ocorrências futuras para o evento recorrente...")
+        raise ValueError(f"Tipo de evento desconhecido: {tipo_evento!r}")
 
-                for data_ocorrencia in datas_da_recorrencia:
-                    # Monta o intervalo de tempo completo para cada ocorrência
-                    inicio_ocorrencia = datetime.combine(data_ocorrencia, hora_ini_novo_evento)
-                    fim_ocorrencia = datetime.combine(data_ocorrencia, hora_fim_novo_evento)
-                    
-                    print(f"      -> Verificando data {data_ocorrencia} das {hora_ini_novo_evento} às {hora_fim_novo_evento}...")
+    def verificar_conflitos_evento(self, tipo_evento, dados_tempo, lista_quadras_str):
+        """
+        Simulação (dry-run) usada pelo formulário de eventos antes do envio:
+        faz a mesma verificação de adicionar_evento, sem gravar nada.
+        Retorna {"livre", "total", "conflitos": [...]}. Levanta ValueError
+        para dados inválidos e RuntimeError se a verificação falhar.
+        """
+        lista_quadras_ids = _quadras_do_formulario(lista_quadras_str)
+        if not lista_quadras_ids:
+            raise ValueError("Selecione ao menos uma quadra.")
 
-                    # Reutiliza o método do AgendamentoDAO para verificar conflitos nesta data/hora específica
-                    if self.agendamento_dao.verificar_conflito_de_horario(id_ginasio, num_quadra, inicio_ocorrencia, fim_ocorrencia):
-                        print(f"      [X] CONFLITO ENCONTRADO com agendamento/evento extraordinário na data {data_ocorrencia}!")
-                        return False # Conflito encontrado, aborta a criação
-                
-                print(f"    [✓] Sem conflitos com agendamentos ou eventos extraordinários para esta quadra.")
-                # ======================== FIM DA NOVA LÓGICA =========================
+        conflitos = self.buscar_conflitos_evento(tipo_evento, dict(dados_tempo), lista_quadras_ids)
+        if conflitos is None:
+            raise RuntimeError("Não foi possível verificar os conflitos agora.")
+        return {
+            "livre": not conflitos,
+            "total": len(conflitos),
+            "conflitos": [_resumo_ocupacao(c) for c in conflitos],
+        }
+
+    def adicionar_evento(self, cpf_admin_organizador, nome_evento, desc_evento, tipo_evento, dados_tempo, lista_quadras_str):
+        """
+        Verifica conflitos para todos os cenários antes de criar um novo evento.
+        """
+        print(f"\n--- INICIANDO PROCESSO DE CRIAÇÃO DE EVENTO ---")
+        print(f"DEBUG[Serviço]: Tentando adicionar novo evento do tipo '{tipo_evento}'.")
+        
+        # --- ETAPA 1: Processar a lista de quadras ---
+        lista_quadras_ids = _quadras_do_formulario(lista_quadras_str)
+        
+        # --- ETAPA 2: Verificação de conflitos (uma única agregação) ---
+        try:
+            conflitos = self.buscar_conflitos_evento(tipo_evento, dados_tempo, lista_quadras_ids)
+        except ValueError as e:
+            print(f"ERRO[Serviço]: {e}")
+            return False
+        if conflitos is None:
+            print("    [X] Não foi possível verificar os conflitos.")
+            return False
+        if conflitos:
+            for conflito in conflitos[:5]:
+                quando = conflito.get('hora_ini') or conflito.get('regra_recorrencia')
+                print(f"    [X] CONFLITO ENCONTRADO ({conflito['tipo_ocupacao']}) na quadra {conflito['num_quadra']} "
+                      f"(Gin. {conflito['id_ginasio']}): {quando}")
+            return False
+        print(f"    [✓] Sem conflitos com agendamentos ou eventos.")
 
         # --- ETAPA 3: Se não houve conflitos, prossegue para a criação ---
         print("\n[✓] Todas as verificações de conflito passaram. Prosseguindo para a criação do evento.")
-        if tipo_evento == 'recorrente':
-            dia_semana = dados_tempo.get('dia_semana')
-            hora_inicio = dados_tempo.get('hora_inicio_recorrente')
-            hora_fim = dados_tempo.get('hora_fim_recorrente')
-            dias_pt = { 'Monday': 'Toda Segunda-feira', 'Tuesday': 'Toda Terça-feira', 'Wednesday': 'Toda Quarta-feira', 'Thursday': 'Toda Quinta-feira', 'Friday': 'Toda Sexta-feira', 'Saturday': 'Todo Sábado', 'Sunday': 'Todo Domingo' }
-            dia_formatado = dias_pt.get(dia_semana, dia_semana)
-            dados_tempo['regra'] = f"{dia_formatado}, das {hora_inicio} às {hora_fim}"
-            
         return self.evento_dao.criar(
             cpf_admin_organizador, nome_evento, desc_evento, tipo_evento,
             dados_tempo, lista_quadras_ids
@@ -558,32 +694,22 @@ class ServicoBolsista:
         self.agendamento_dao = AgendamentoDAO()
 
     def _get_client_db(self):
-        """Helper para obter cliente e banco e fechar corretamente depois"""
+        """Helper para obter o cliente compartilhado do pool e o banco"""
         db = conectar_mongo()
         if db is None:
             return None, None
         return db.client, db
 
-    def _buscar_agendamento_por_id_hibrido(self, db, id_agendamento):
+    def _buscar_agendamento_por_id(self, db, id_agendamento):
         """
-        Método auxiliar INTELIGENTE para achar o agendamento.
-        Tenta buscar pelo _id (ObjectId) OU pelo campo string id_agendamento.
+        Busca o agendamento pelo _id. O ID exibido nas telas é sempre o _id
+        em texto (o antigo campo 'id_agendamento' foi removido pela
+        normalização de IDs, camada_dados/normalizacao_ids.py).
         """
-        # Lista de filtros possíveis
-        filtros = []
-        
-        # 1. Tenta buscar como string exata no campo personalizado
-        filtros.append({"id_agendamento": str(id_agendamento)})
-        
-        # 2. Se parecer um ObjectId válido, tenta buscar no _id
-        if ObjectId.is_valid(id_agendamento):
-            filtros.append({"_id": ObjectId(id_agendamento)})
-            
-        # Busca com OR (ou um ou outro)
-        query = {"$or": filtros}
-        
-        print(f"DEBUG[BUSCA]: Tentando encontrar agendamento com query: {query}")
-        return db.agendamentos.find_one(query)
+        if not ObjectId.is_valid(str(id_agendamento)):
+            print(f"DEBUG[BUSCA]: ID de agendamento inválido: {id_agendamento}")
+            return None
+        return db.agendamentos.find_one({"_id": ObjectId(str(id_agendamento))})
 
     def buscar_usuarios_para_agendamento(self, termo_busca):
         client, db = self._get_client_db()
@@ -612,8 +738,6 @@ class ServicoBolsista:
 
         except Exception as e:
             print(f"Erro ao buscar usuários: {e}")
-        finally:
-            client.close()
         return usuarios
 
     def fazer_agendamento_em_nome_de(self, cpf_bolsista, cpf_beneficiario, id_ginasio,
@@ -625,11 +749,12 @@ class ServicoBolsista:
             if isinstance(hora_ini, str): hora_ini = datetime.fromisoformat(hora_ini)
             if isinstance(hora_fim, str): hora_fim = datetime.fromisoformat(hora_fim)
 
-            # Gera um ID string para garantir compatibilidade futura
-            custom_id = str(ObjectId())
+            # Nomes embutidos, como em reservar_agendamento: as listagens
+            # não precisam de $lookup por documento
+            beneficiario = db.usuarios.find_one({"_id": cpf_beneficiario}, {"nome": 1})
+            ginasio = get_ginasio_por_id(id_ginasio)
 
             novo_agendamento = {
-                "id_agendamento": custom_id, 
                 "cpf_usuario": cpf_beneficiario,
                 "id_ginasio": int(id_ginasio),
                 "num_quadra": int(num_quadra),
@@ -638,30 +763,34 @@ class ServicoBolsista:
                 "motivo": motivo,
                 "status_agendamento": "confirmado",
                 "id_bolsista_operador": cpf_bolsista,
-                "data_operacao_bolsista": datetime.now()
+                "data_operacao_bolsista": datetime.now(),
+                "usuario_info": {"nome": beneficiario.get("nome") if beneficiario else None},
+                "local_info": {"nome_ginasio": ginasio.nome if ginasio else None}
             }
 
-            db.agendamentos.insert_one(novo_agendamento)
-            return True
+            if ocupado_fora_do_indice_de_slots(db, id_ginasio, num_quadra, hora_ini, hora_fim):
+                return False
+            # Reserva atômica: falha se o horário já estiver ocupado
+            return inserir_com_reserva(db, novo_agendamento) is not None
         except Exception as e:
             print(f"Erro ao fazer agendamento: {e}")
             return False
-        finally:
-            client.close()
 
     def buscar_agendamentos_para_confirmacao(self, cpf_bolsista):
         client, db = self._get_client_db()
         if client is None: return []
 
         try:
-            hoje = datetime.now().date()
-            hoje_str = hoje.strftime("%Y-%m-%d")
+            # Intervalo [hoje 00:00, amanhã 00:00) em vez de $dateToString,
+            # para que o $match use o índice (id_bolsista_operador, status, hora_ini)
+            inicio_hoje = datetime.combine(datetime.now().date(), time.min)
+            inicio_amanha = inicio_hoje + timedelta(days=1)
             
             pipeline = [
                 {"$match": {
                     "id_bolsista_operador": cpf_bolsista,
                     "status_agendamento": "confirmado",
-                    "$expr": {"$eq": [{"$dateToString": {"format": "%Y-%m-%d", "date": "$hora_ini"}}, hoje_str]}
+                    "hora_ini": {"$gte": inicio_hoje, "$lt": inicio_amanha}
                 }},
                 {"$lookup": {"from": "ginasios", "localField": "id_ginasio", "foreignField": "_id", "as": "ginasio"}},
                 {"$unwind": "$ginasio"},
@@ -669,8 +798,8 @@ class ServicoBolsista:
                 {"$unwind": "$usuario"},
                 {"$project": {
                     "_id": 0,
-                    # Garante que sempre tenhamos um ID string para o HTML
-                    "id_agendamento": {"$ifNull": ["$id_agendamento", {"$toString": "$_id"}]},
+                    # ID em texto para o HTML
+                    "id_agendamento": {"$toString": "$_id"},
                     "hora_ini": 1,
                     "hora_fim": 1,
                     "status_agendamento": 1,
@@ -685,8 +814,6 @@ class ServicoBolsista:
         except Exception as e:
             print(f"Erro buscar confirmação: {e}")
             return []
-        finally:
-            client.close()
 
     def confirmar_comparecimento(self, id_agendamento, cpf_bolsista):
         """Confirma o comparecimento (usado no painel principal do bolsista)"""
@@ -695,7 +822,7 @@ class ServicoBolsista:
 
         try:
             # 1. Busca o documento
-            agendamento = self._buscar_agendamento_por_id_hibrido(db, id_agendamento)
+            agendamento = self._buscar_agendamento_por_id(db, id_agendamento)
 
             if agendamento:
                 # Verifica propriedade
@@ -704,19 +831,14 @@ class ServicoBolsista:
                     # return False # Descomente se quiser restringir estritamente
 
                 # 2. Atualiza usando o _id único encontrado
-                result = db.agendamentos.update_one(
-                    {"_id": agendamento["_id"]},
-                    {"$set": {"status_agendamento": "realizado"}}
-                )
-                return result.modified_count > 0
+                anterior = alterar_status_agendamento(db, {"_id": agendamento["_id"]}, "realizado")
+                return anterior is not None and anterior.get("status_agendamento") != "realizado"
             
             print(f"DEBUG: Agendamento {id_agendamento} não encontrado.")
             return False
         except Exception as e:
             print(f"Erro confirmar: {e}")
             return False
-        finally:
-            client.close()
 
     def cancelar_agendamento_bolsista(self, id_agendamento, cpf_bolsista):
         """Cancela um agendamento"""
@@ -726,16 +848,13 @@ class ServicoBolsista:
 
         try:
             # 1. Busca Híbrida
-            agendamento = self._buscar_agendamento_por_id_hibrido(db, id_agendamento)
+            agendamento = self._buscar_agendamento_por_id(db, id_agendamento)
 
             if agendamento:
-                # 2. Atualiza status
-                result = db.agendamentos.update_one(
-                    {"_id": agendamento["_id"]},
-                    {"$set": {"status_agendamento": "cancelado"}}
-                )
+                # 2. Atualiza status (liberando os slots reservados)
+                anterior = alterar_status_agendamento(db, {"_id": agendamento["_id"]}, "cancelado")
                 
-                if result.modified_count > 0:
+                if anterior is not None and anterior.get("status_agendamento") != "cancelado":
                     print("DEBUG[CANCELAR]: Sucesso!")
                     return True
             
@@ -745,40 +864,92 @@ class ServicoBolsista:
             print(f"ERRO ao cancelar: {e}")
             import traceback; traceback.print_exc()
             return False
-        finally:
-            client.close()
 
-    def buscar_todos_agendamentos_bolsista(self, cpf_bolsista):
+    def buscar_agendamentos_bolsista_por_status(self, cpf_bolsista, paginas=None, tamanho=None):
+        """
+        Agendamentos operados pelo bolsista, já separados por status e
+        paginados por seção, em uma única agregação:
+        - $match primeiro (id_bolsista_operador + status), servido pelo
+          índice agendamentos_bolsista_status_horario;
+        - $facet com uma seção por status, cada uma com sua própria
+          ordenação/$skip/$limit, e um total por status.
+        Os nomes vêm de usuario_info/local_info embutidos; documentos
+        antigos sem eles são completados com uma busca em lote (usuários)
+        e pelo catálogo em memória (ginásios), só para a página exibida.
+
+        'paginas' é {status: número da página (1..)}. Retorna
+        {status: {'itens', 'total', 'pagina', 'total_paginas'}}.
+        """
+        paginas = paginas or {}
+        tamanho = tamanho or TAMANHO_SECAO_BOLSISTA
+        resultado = {status: {"itens": [], "total": 0, "pagina": 1, "total_paginas": 1}
+                     for status in STATUS_SECOES_BOLSISTA}
+
         client, db = self._get_client_db()
-        if client is None: return []
+        if client is None: return resultado
+
+        projecao = {
+            "_id": 0,
+            "id_agendamento": {"$toString": "$_id"},
+            "hora_ini": 1,
+            "hora_fim": 1,
+            "status_agendamento": 1,
+            "id_ginasio": 1,
+            "num_quadra": 1,
+            "motivo": 1,
+            "data_solicitacao": 1,
+            "cpf_beneficiario": "$cpf_usuario",
+            "nome_beneficiario": "$usuario_info.nome",
+            "nome_ginasio": "$local_info.nome_ginasio",
+        }
+        secoes = {}
+        for status in STATUS_SECOES_BOLSISTA:
+            pagina = max(1, int(paginas.get(status) or 1))
+            resultado[status]["pagina"] = pagina
+            secoes[status] = [
+                {"$match": {"status_agendamento": status}},
+                {"$sort": {"hora_ini": -1, "_id": -1}},
+                {"$skip": (pagina - 1) * tamanho},
+                {"$limit": tamanho},
+                {"$project": projecao},
+            ]
+        secoes["totais"] = [{"$group": {"_id": "$status_agendamento", "total": {"$sum": 1}}}]
+
+        pipeline = [
+            {"$match": {
+                "id_bolsista_operador": cpf_bolsista,
+                "status_agendamento": {"$in": list(STATUS_SECOES_BOLSISTA)},
+            }},
+            {"$facet": secoes},
+        ]
 
         try:
-            pipeline = [
-                {"$sort": {"hora_ini": -1}},
-                {"$lookup": {"from": "usuarios", "localField": "cpf_usuario", "foreignField": "_id", "as": "usuario"}},
-                {"$unwind": "$usuario"},
-                {"$lookup": {"from": "ginasios", "localField": "id_ginasio", "foreignField": "_id", "as": "ginasio"}},
-                {"$unwind": "$ginasio"},
-                {"$project": {
-                    "_id": 0,
-                    "id_agendamento": {"$ifNull": ["$id_agendamento", {"$toString": "$_id"}]},
-                    "hora_ini": 1,
-                    "hora_fim": 1,
-                    "status_agendamento": 1,
-                    "num_quadra": 1,
-                    "motivo": 1,
-                    "data_solicitacao": 1,
-                    "nome_ginasio": "$ginasio.nome",
-                    "nome_beneficiario": "$usuario.nome",
-                    "cpf_beneficiario": "$usuario._id"
-                }}
-            ]
-            return list(db.agendamentos.aggregate(pipeline))
+            facetas = next(db.agendamentos.aggregate(pipeline), {})
+            for item in facetas.get("totais", []):
+                secao = resultado[item["_id"]]
+                secao["total"] = item["total"]
+                secao["total_paginas"] = max(1, -(-item["total"] // tamanho))
+            for status in STATUS_SECOES_BOLSISTA:
+                resultado[status]["itens"] = facetas.get(status, [])
+
+            self._completar_nomes(db, [a for secao in resultado.values() for a in secao["itens"]])
         except Exception as e:
-            print(f"Erro buscar todos: {e}")
-            return []
-        finally:
-            client.close()
+            print(f"Erro buscar agendamentos do bolsista: {e}")
+        return resultado
+
+    def _completar_nomes(self, db, agendamentos):
+        """Preenche nome_beneficiario/nome_ginasio que não estavam embutidos."""
+        cpfs_sem_nome = {a.get("cpf_beneficiario") for a in agendamentos if not a.get("nome_beneficiario")}
+        nomes = {}
+        if cpfs_sem_nome:
+            nomes = {u["_id"]: u.get("nome")
+                     for u in db.usuarios.find({"_id": {"$in": list(cpfs_sem_nome)}}, {"nome": 1})}
+        for a in agendamentos:
+            if not a.get("nome_beneficiario"):
+                a["nome_beneficiario"] = nomes.get(a.get("cpf_beneficiario"), "N/A")
+            if not a.get("nome_ginasio"):
+                ginasio = get_ginasio_por_id(a.get("id_ginasio"))
+                a["nome_ginasio"] = ginasio.nome if ginasio else "N/A"
 
     def marcar_como_concluido(self, id_agendamento, cpf_bolsista=None):
         """Marca como concluído (usado na lista geral de agendamentos)"""
@@ -787,70 +958,75 @@ class ServicoBolsista:
 
         try:
             # 1. Busca Híbrida
-            ag = self._buscar_agendamento_por_id_hibrido(db, id_agendamento)
+            ag = self._buscar_agendamento_por_id(db, id_agendamento)
             
             if not ag:
                 print(f"DEBUG: Agendamento {id_agendamento} não encontrado")
                 return False
 
             # 2. Atualiza
-            res = db.agendamentos.update_one(
-                {"_id": ag["_id"]}, 
-                {"$set": {"status_agendamento": "realizado"}}
-            )
-            return res.modified_count > 0
+            anterior = alterar_status_agendamento(db, {"_id": ag["_id"]}, "realizado")
+            return anterior is not None and anterior.get("status_agendamento") != "realizado"
         except Exception as e:
             print(f"ERRO ao concluir: {e}")
             return False
-        finally:
-            client.close()
+
+    def exportar_relatorio_uso(self, data_inicio, data_fim, id_ginasio=None, formato='csv', por_dia=False):
+        """
+        Exporta o relatório de uso com os mesmos filtros de gerar_relatorio_uso.
+        Com por_dia=True, exporta uma linha por quadra/dia, lida em streaming
+        dos contadores diários. Retorna um gerador de blocos de texto.
+        """
+        if not por_dia:
+            relatorio = self.gerar_relatorio_uso(data_inicio, data_fim, id_ginasio)
+            return gerar_exportacao(relatorio, COLUNAS_RELATORIO_USO, formato)
+
+        client, db = self._get_client_db()
+        if client is None:
+            raise RuntimeError("Sem conexão com o MongoDB.")
+
+        def to_date(v): return (v if isinstance(v, datetime) else datetime.fromisoformat(v)).date()
+        # Validados antes de começar a resposta
+        dia_inicio, dia_fim = to_date(data_inicio), to_date(data_fim)
+        id_ginasio = int(id_ginasio) if id_ginasio is not None else None
+
+        def linhas():
+            for doc in iterar_uso_diario(db, dia_inicio, dia_fim, id_ginasio):
+                ginasio = get_ginasio_por_id(doc.get("id_ginasio"))
+                doc["ginasio"] = ginasio.nome if ginasio else None
+                doc["dia"] = doc["dia"].date()
+                yield doc
+
+        return gerar_exportacao(linhas(), COLUNAS_USO_DIARIO, formato)
 
     def gerar_relatorio_uso(self, data_inicio, data_fim, id_ginasio=None):
+        """
+        Relatório de uso por quadra para os dias de data_inicio a data_fim
+        (inclusive). Lê os contadores diários (camada_dados/uso_diario.py):
+        um documento por quadra/dia, em vez de varrer os agendamentos.
+        """
         client, db = self._get_client_db()
         if client is None: return []
 
         try:
-            def to_dt(v): return v if isinstance(v, datetime) else datetime.fromisoformat(v)
-            dt_inicio = to_dt(data_inicio)
-            dt_fim = to_dt(data_fim)
-
-            match_stage = {"$match": {"hora_ini": {"$gte": dt_inicio, "$lte": dt_fim}}}
-            if id_ginasio is not None:
-                try: match_stage["$match"]["id_ginasio"] = int(id_ginasio)
-                except: match_stage["$match"]["id_ginasio"] = id_ginasio
+            def to_date(v): return (v if isinstance(v, datetime) else datetime.fromisoformat(v)).date()
+            resultados = buscar_uso_por_quadra(db, to_date(data_inicio), to_date(data_fim),
+                                               int(id_ginasio) if id_ginasio is not None else None)
 
-            pipeline = [
-                match_stage,
-                {
-                    "$group": {
-                        "_id": {"ginasio": "$local_info.nome_ginasio", "num_quadra": "$num_quadra", "id_ginasio": "$id_ginasio"},
-                        "total_agendamentos": {"$sum": 1},
-                        "confirmados": {"$sum": {"$cond": [{"$eq": ["$status_agendamento", "realizado"]}, 1, 0]}},
-                        "cancelados": {"$sum": {"$cond": [{"$eq": ["$status_agendamento", "cancelado"]}, 1, 0]}}
-                    }
-                },
-                {"$lookup": {"from": "ginasios", "localField": "_id.id_ginasio", "foreignField": "_id", "as": "info_ginasio"}},
-                {"$unwind": {"path": "$info_ginasio", "preserveNullAndEmptyArrays": True}},
-                {"$sort": {"_id.ginasio": 1, "_id.num_quadra": 1}}
-            ]
-
-            resultados = list(db.agendamentos.aggregate(pipeline))
             relatorio = []
             for item in resultados:
-                nome_gin = item["_id"].get("ginasio")
-                if not nome_gin and item.get("info_ginasio"):
-                    nome_gin = item["info_ginasio"].get("nome")
-
+                ginasio = get_ginasio_por_id(item["_id"]["id_ginasio"])
                 relatorio.append({
-                    "ginasio": nome_gin or f"Ginásio {item['_id']['id_ginasio']}",
+                    "ginasio": ginasio.nome if ginasio else f"Ginásio {item['_id']['id_ginasio']}",
                     "num_quadra": item["_id"]["num_quadra"],
-                    "total_agendamentos": item.get("total_agendamentos", 0),
-                    "confirmados": item.get("confirmados", 0),
-                    "cancelados": item.get("cancelados", 0)
+                    "total_agendamentos": item.get("total", 0),
+                    "confirmados": item.get("realizado", 0),
+                    "cancelados": item.get("cancelado", 0),
+                    "nao_compareceu": item.get("nao_compareceu", 0),
+                    "horas_reservadas": round(item.get("minutos_reservados", 0) / 60, 1)
                 })
+            relatorio.sort(key=lambda r: (r["ginasio"], r["num_quadra"]))
             return relatorio
         except Exception as e:
             print(f"Erro relatorio: {e}")
             return []
-        finally:
-            client.close()
\ No newline at end of file
@@ -0,0 +1,297 @@
+# ferramentas/benchmark.py
+"""
+Benchmark dos caminhos mais acessados, contra um mongod local carregado
+pelo gerador de dados sintéticos (ferramentas/gerar_dados.py).
+
+Cenários:
+    conflito        AgendamentoDAO.verificar_conflito_de_horario
+    grade           AgendamentoDAO.buscar_agendamentos_por_quadra + montar_grade_semanal
+                    (a grade de tabela_agendamento, sem o cache)
+    evento          ServicoAdmin.adicionar_evento (recorrente; na massa gerada
+                    boa parte é recusada por conflito, o que também é medido)
+    relatorio       ServicoBolsista.gerar_relatorio_uso (30 dias)
+    busca_usuarios  ServicoBolsista.buscar_usuarios_para_agendamento
+    login           ServicoLogin.verificar_credenciais
+
+Para cada cenário: latência p50/p95/p99 (ms), comandos enviados ao MongoDB
+por operação (contados por um CommandListener), vazão (operações/s, em
+série) e a fração de chamadas que retornaram valor verdadeiro. Os
+parâmetros de cada chamada vêm de um gerador com semente fixa, então duas
+execuções sobre a mesma massa fazem exatamente as mesmas chamadas.
+
+    python -m ferramentas.gerar_dados --limpar
+    python -m ferramentas.benchmark --salvar baseline.json
+    python -m ferramentas.benchmark --comparar baseline.json       # retorna 1 se houver regressão
+    python -m ferramentas.benchmark --cenarios conflito grade --iteracoes 500
+
+Os eventos criados pelo cenário 'evento' são apagados no fim.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import threading
+import time as relogio
+from datetime import date, datetime, time, timedelta
+
+from pymongo import monitoring
+
+from camada_dados.agendamento_dao import AgendamentoDAO
+from camada_dados.catalogo import obter_catalogo
+from camada_dados.mongo_config import conectar_mongo
+from camada_negocio.grade_semanal import montar_grade_semanal
+from camada_negocio.servicos import ServicoAdmin, ServicoBolsista, ServicoLogin
+from modelos.recorrencia import DIAS_SEMANA_EN
+from ferramentas.gerar_dados import NOMES, PerfilUsuarios
+
+PREFIXO_EVENTOS = '[benchmark]'
+
+# Regressão: p95 acima de (1 + tolerância) x baseline, ou mais comandos por operação
+TOLERANCIA_PADRAO = 0.2
+
+
+class ContadorComandos(monitoring.CommandListener):
+    """Conta os comandos enviados ao servidor (exceto o encerramento de sessões)."""
+
+    def __init__(self):
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        if event.command_name != 'endSessions':
+            with self._lock:
+                self.total += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+class Massa:
+    """O que os cenários precisam saber da massa de dados carregada."""
+
+    def __init__(self, db):
+        catalogo = obter_catalogo()
+        self.quadras = [(q['id_ginasio'], q['num_quadra']) for q in catalogo.todas_as_quadras()] if catalogo else []
+        primeiro = db.agendamentos.find_one({}, {"hora_ini": 1}, sort=[("hora_ini", 1)])
+        ultimo = db.agendamentos.find_one({}, {"hora_ini": 1}, sort=[("hora_ini", -1)])
+        if not self.quadras or primeiro is None:
+            raise RuntimeError("Banco sem dados: rode antes 'python -m ferramentas.gerar_dados --limpar'.")
+        self.primeiro_dia = primeiro['hora_ini'].date()
+        self.ultimo_dia = ultimo['hora_ini'].date()
+        self.perfil = PerfilUsuarios(db.usuarios.estimated_document_count())
+        admin = db.usuarios.find_one({"tipo": "admin"}, {"_id": 1})
+        self.cpf_admin = admin['_id'] if admin else None
+
+    def dia(self, aleatorio):
+        return self.primeiro_dia + timedelta(days=aleatorio.randrange((self.ultimo_dia - self.primeiro_dia).days + 1))
+
+
+# --- Cenários: cada um recebe (massa, aleatorio) e devolve a chamada a medir ---
+
+def cenario_conflito(massa, aleatorio):
+    g, q = aleatorio.choice(massa.quadras)
+    inicio = datetime.combine(massa.dia(aleatorio), time(aleatorio.randint(7, 21)))
+    dao = AgendamentoDAO()
+    return lambda: dao.verificar_conflito_de_horario(g, q, inicio, inicio + timedelta(hours=1))
+
+
+def cenario_grade(massa, aleatorio):
+    g, q = aleatorio.choice(massa.quadras)
+    dia = massa.dia(aleatorio)
+    segunda = dia - timedelta(days=dia.weekday())
+    dias = [segunda + timedelta(days=i) for i in range(7)]
+    inicio, fim = datetime.combine(dias[0], time.min), datetime.combine(dias[-1] + timedelta(days=1), time.min)
+    dao = AgendamentoDAO()
+    return lambda: montar_grade_semanal(dias, dao.buscar_agendamentos_por_quadra(g, q, inicio, fim))
+
+
+def cenario_evento(massa, aleatorio):
+    g, q = aleatorio.choice(massa.quadras)
+    hora = aleatorio.randint(7, 21)
+    dados_tempo = {
+        'dia_semana': aleatorio.choice(DIAS_SEMANA_EN),
+        'hora_inicio_recorrente': f"{hora:02d}:00",
+        'hora_fim_recorrente': f"{hora + 1:02d}:00",
+        'data_fim': (date.today() + timedelta(weeks=aleatorio.randint(4, 16))).isoformat(),
+    }
+    servico = ServicoAdmin()
+    return lambda: servico.adicionar_evento(massa.cpf_admin, f"{PREFIXO_EVENTOS} treino", "benchmark",
+                                            'recorrente', dict(dados_tempo), [f"{g}-{q}"])
+
+
+def cenario_relatorio(massa, aleatorio):
+    fim = massa.dia(aleatorio)
+    servico = ServicoBolsista()
+    return lambda: servico.gerar_relatorio_uso(datetime.combine(fim - timedelta(days=30), time.min),
+                                               datetime.combine(fim, time.min))
+
+
+def cenario_busca_usuarios(massa, aleatorio):
+    termo = aleatorio.choice(NOMES)[:aleatorio.randint(3, 5)]
+    servico = ServicoBolsista()
+    return lambda: servico.buscar_usuarios_para_agendamento(termo)
+
+
+def cenario_login(massa, aleatorio):
+    i = aleatorio.randrange(massa.perfil.total)
+    servico = ServicoLogin()
+    return lambda: servico.verificar_credenciais(f"usuario{i}@sintetico.udesc.br", 'senha123')
+
+
+CENARIOS = {
+    'conflito': cenario_conflito,
+    'grade': cenario_grade,
+    'evento': cenario_evento,
+    'relatorio': cenario_relatorio,
+    'busca_usuarios': cenario_busca_usuarios,
+    'login': cenario_login,
+}
+
+
+# --- Medição ---
+
+def percentil(valores_ordenados, p):
+    """Percentil pelo método do posto mais próximo."""
+    if not valores_ordenados:
+        return None
+    posicao = max(0, min(len(valores_ordenados) - 1, round(p / 100 * len(valores_ordenados) + 0.5) - 1))
+    return valores_ordenados[posicao]
+
+
+def executar_cenario(nome, massa, contador, iteracoes, aquecimento, semente):
+    aleatorio = random.Random(f"{semente}:{nome}")
+    chamadas = [CENARIOS[nome](massa, aleatorio) for _ in range(aquecimento + iteracoes)]
+    latencias = []
+    sucessos = 0
+    # Os DEBUG das DAOs e serviços continuam sendo formatados, mas não poluem a saída
+    with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+        for chamada in chamadas[:aquecimento]:
+            chamada()
+        comandos_antes = contador.total
+        comeco = relogio.perf_counter()
+        for chamada in chamadas[aquecimento:]:
+            inicio = relogio.perf_counter()
+            resultado = chamada()
+            latencias.append((relogio.perf_counter() - inicio) * 1000)
+            sucessos += bool(resultado)
+        duracao = relogio.perf_counter() - comeco
+        comandos = contador.total - comandos_antes
+
+    latencias.sort()
+    return {
+        "iteracoes": iteracoes,
+        "p50_ms": round(percentil(latencias, 50), 3),
+        "p95_ms": round(percentil(latencias, 95), 3),
+        "p99_ms": round(percentil(latencias, 99), 3),
+        "media_ms": round(sum(latencias) / len(latencias), 3),
+        "comandos_por_op": round(comandos / iteracoes, 2),
+        "ops_por_segundo": round(iteracoes / duracao, 1),
+        "fracao_verdadeiro": round(sucessos / iteracoes, 3),
+    }
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def comparar(resultados, baseline, tolerancia):
+    """Lista de regressões [(cenário, descrição)] em relação ao baseline."""
+    regressoes = []
+    for nome, atual in resultados.items():
+        anterior = baseline.get('resultados', {}).get(nome)
+        if anterior is None:
+            continue
+        if atual['p95_ms'] > anterior['p95_ms'] * (1 + tolerancia):
+            regressoes.append((nome, f"p95 {anterior['p95_ms']:.2f} -> {atual['p95_ms']:.2f} ms"))
+        if atual['comandos_por_op'] > anterior['comandos_por_op']:
+            regressoes.append((nome, f"comandos/op {anterior['comandos_por_op']} -> {atual['comandos_por_op']}"))
+    return regressoes
+
+
+def imprimir(resultados, baseline=None):
+    print(f"{'cenário':<15} | {'p50':>8} | {'p95':>8} | {'p99':>8} | {'cmd/op':>6} | {'ops/s':>8} | {'verdadeiro':>10}")
+    print("-" * 81)
+    for nome, r in resultados.items():
+        linha = (f"{nome:<15} | {r['p50_ms']:>8.2f} | {r['p95_ms']:>8.2f} | {r['p99_ms']:>8.2f} | "
+                 f"{r['comandos_por_op']:>6} | {r['ops_por_segundo']:>8.1f} | {r['fracao_verdadeiro']:>10.1%}")
+        anterior = (baseline or {}).get('resultados', {}).get(nome)
+        if anterior:
+            linha += f"  (p95 baseline {anterior['p95_ms']:.2f})"
+        print(linha)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos quentes contra o MongoDB local.")
+    parser.add_argument('--cenarios', nargs='+', choices=list(CENARIOS), default=list(CENARIOS))
+    parser.add_argument('--iteracoes', type=int, default=200)
+    parser.add_argument('--aquecimento', type=int, default=20)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--salvar', help="grava os resultados (JSON) neste arquivo")
+    parser.add_argument('--comparar', help="baseline (JSON gerado com --salvar) para comparar")
+    parser.add_argument('--tolerancia', type=float, default=TOLERANCIA_PADRAO,
+                        help="aumento de p95 aceito antes de acusar regressão (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    # O listener precisa estar registrado antes da criação do MongoClient
+    contador = ContadorComandos()
+    monitoring.register(contador)
+    db = conectar_mongo()
+    if db is None:
+        return 1
+    massa = Massa(db)
+    print(f"Massa: {len(massa.quadras)} quadras, {massa.perfil.total} usuários, "
+          f"agendamentos de {massa.primeiro_dia} a {massa.ultimo_dia}")
+
+    resultados = {}
+    try:
+        for nome in args.cenarios:
+            resultados[nome] = executar_cenario(nome, massa, contador, args.iteracoes, args.aquecimento, args.semente)
+    finally:
+        removidos = db.eventos.delete_many({"nome": {"$regex": "^" + re.escape(PREFIXO_EVENTOS)}})
+        if removidos.deleted_count:
+            print(f"{removidos.deleted_count} evento(s) de benchmark removido(s).")
+
+    baseline = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            baseline = json.load(arquivo)
+    imprimir(resultados, baseline)
+
+    if args.salvar:
+        with open(args.salvar, 'w', encoding='utf-8') as saida:
+            json.dump({
+                "commit": _commit_atual(),
+                "data": datetime.now().isoformat(timespec='seconds'),
+                "python": platform.python_version(),
+                "parametros": {"iteracoes": args.iteracoes, "aquecimento": args.aquecimento,
+                               "semente": args.semente, "agendamentos_de": massa.primeiro_dia.isoformat(),
+                               "agendamentos_ate": massa.ultimo_dia.isoformat(),
+                               "quadras": len(massa.quadras), "usuarios": massa.perfil.total},
+                "resultados": resultados,
+            }, saida, ensure_ascii=False, indent=2)
+        print(f"Resultados gravados em {args.salvar}")
+
+    if baseline is not None:
+        regressoes = comparar(resultados, baseline, args.tolerancia)
+        for nome, descricao in regressoes:
+            print(f"❌ regressão em {nome}: {descricao}")
+        if regressoes:
+            return 1
+        print(f"Sem regressões em relação a {baseline.get('commit') or args.comparar}.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
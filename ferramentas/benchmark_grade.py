@@ -0,0 +1,89 @@
+# ferramentas/benchmark_grade.py
+"""
+Benchmark da montagem da grade semanal (tabela_agendamento).
+
+Compara o laço antigo (passo de uma hora por ocupação) com
+camada_negocio.grade_semanal em semanas sintéticas com milhares de
+ocupações. Não precisa de banco de dados.
+
+    python -m ferramentas.benchmark_grade
+    python -m ferramentas.benchmark_grade --ocupacoes 1000 5000 20000 --repeticoes 5 --granularidade 30
+"""
+
+import argparse
+import random
+import time as relogio
+from datetime import date, datetime, time, timedelta
+
+from camada_negocio.grade_semanal import montar_grade_semanal
+
+
+def gerar_semana(quantidade, semente=42):
+    """Dias da semana atual e 'quantidade' ocupações aleatórias (07h-23h)."""
+    aleatorio = random.Random(semente)
+    hoje = date.today()
+    dias = [hoje - timedelta(days=hoje.weekday()) + timedelta(days=i) for i in range(7)]
+    ocupacoes = []
+    for i in range(quantidade):
+        dia = aleatorio.choice(dias)
+        inicio = datetime.combine(dia, time(7)) + timedelta(minutes=15 * aleatorio.randrange(0, 60))
+        duracao = timedelta(minutes=15 * aleatorio.randint(2, 12))
+        ocupacoes.append({
+            '_id': i,
+            'tipo_ocupacao': aleatorio.choice(['agendamento', 'evento']),
+            'status': 'confirmado',
+            'nome_evento': f"Evento {i}",
+            'hora_ini': inicio,
+            'hora_fim': inicio + duracao,
+        })
+    return dias, ocupacoes
+
+
+def grade_laco_antigo(dias, ocupacoes):
+    """Reprodução do algoritmo anterior de app.tabela_agendamento (sem os prints)."""
+    horarios = [f"{h:02d}:00" for h in range(7, 23)]
+    agendamentos_por_dia = {dia: {hora: None for hora in horarios} for dia in dias}
+    for ocup in ocupacoes:
+        if ocup['hora_fim'] <= ocup['hora_ini']:
+            continue
+        hora_atual = ocup['hora_ini']
+        while hora_atual < ocup['hora_fim']:
+            data = hora_atual.date()
+            hora_str = f"{hora_atual.hour:02d}:00"
+            if data in agendamentos_por_dia and hora_str in agendamentos_por_dia[data]:
+                agendamentos_por_dia[data][hora_str] = ocup
+            hora_atual += timedelta(hours=1)
+    return horarios, agendamentos_por_dia
+
+
+def medir(funcao, repeticoes):
+    """Melhor tempo (ms) entre as repetições."""
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = relogio.perf_counter()
+        funcao()
+        decorrido = (relogio.perf_counter() - inicio) * 1000
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    return melhor
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark da grade semanal.")
+    parser.add_argument('--ocupacoes', type=int, nargs='+', default=[100, 1000, 5000, 20000])
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--granularidade', type=int, default=60, help="minutos por slot da grade nova")
+    args = parser.parse_args(argv)
+
+    print(f"{'ocupações':>10} | {'laço antigo (ms)':>16} | {'grade nova (ms)':>15} | {'ganho':>6}")
+    print("-" * 58)
+    for quantidade in args.ocupacoes:
+        dias, ocupacoes = gerar_semana(quantidade)
+        antigo = medir(lambda: grade_laco_antigo(dias, ocupacoes), args.repeticoes)
+        novo = medir(lambda: montar_grade_semanal(dias, ocupacoes, granularidade_minutos=args.granularidade),
+                     args.repeticoes)
+        print(f"{quantidade:>10} | {antigo:>16.2f} | {novo:>15.2f} | {antigo / novo:>5.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,57 @@
+# ferramentas/exportar.py
+"""
+Exportação de agendamentos e relatórios de uso pela linha de comando,
+com os mesmos filtros das telas /admin/agendamentos e /bolsista/relatorios.
+Os registros são lidos do banco em lotes e escritos à medida que chegam.
+
+    python -m ferramentas.exportar agendamentos --formato csv --saida agendamentos.csv
+    python -m ferramentas.exportar agendamentos --formato ndjson --data-inicio 2025-03-01 --status realizado
+    python -m ferramentas.exportar relatorio --data-inicio 2025-01-01 --data-fim 2025-12-31 --por-dia
+"""
+
+import argparse
+import sys
+from contextlib import nullcontext
+from datetime import date
+
+from camada_negocio.exportacao import FORMATOS
+from camada_negocio.servicos import ServicoAdmin, ServicoBolsista
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta agendamentos e relatórios de uso.")
+    parser.add_argument('tipo', choices=['agendamentos', 'relatorio'])
+    parser.add_argument('--formato', choices=sorted(FORMATOS), default='csv')
+    parser.add_argument('--saida', help="arquivo de saída (padrão: saída padrão)")
+    parser.add_argument('--data-inicio', type=date.fromisoformat)
+    parser.add_argument('--data-fim', type=date.fromisoformat)
+    parser.add_argument('--id-ginasio', type=int)
+    parser.add_argument('--num-quadra', type=int, help="apenas para agendamentos")
+    parser.add_argument('--status', help="apenas para agendamentos")
+    parser.add_argument('--cpf-usuario', help="apenas para agendamentos")
+    parser.add_argument('--por-dia', action='store_true', help="relatório: uma linha por quadra/dia")
+    args = parser.parse_args(argv)
+
+    if args.tipo == 'agendamentos':
+        filtros = {
+            'data_inicio': args.data_inicio, 'data_fim': args.data_fim,
+            'id_ginasio': args.id_ginasio, 'num_quadra': args.num_quadra,
+            'status': args.status, 'cpf_usuario': args.cpf_usuario,
+        }
+        blocos = ServicoAdmin().exportar_agendamentos(filtros, args.formato)
+    else:
+        if args.data_inicio is None or args.data_fim is None:
+            parser.error("o relatório exige --data-inicio e --data-fim")
+        blocos = ServicoBolsista().exportar_relatorio_uso(
+            args.data_inicio.isoformat(), args.data_fim.isoformat(), args.id_ginasio, args.formato, args.por_dia
+        )
+
+    destino = open(args.saida, 'w', encoding='utf-8', newline='') if args.saida else nullcontext(sys.stdout)
+    with destino as saida:
+        for bloco in blocos:
+            saida.write(bloco)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
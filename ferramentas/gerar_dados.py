@@ -0,0 +1,469 @@
+# ferramentas/gerar_dados.py
+"""
+Gerador de dados sintéticos em volume de produção (setup_mongo.js só cria
+alguns documentos de exemplo).
+
+Os documentos têm exatamente o formato gravado pela aplicação:
+- usuários por servicos.construir_usuario + usuario_dao.montar_documento_usuario
+  (alunos, bolsistas com os campos de bolsa, funcionários e admins);
+- ginásios com quadras e materiais embutidos (formato do catálogo) e
+  esportes com _id ObjectId;
+- agendamentos como em reservar_agendamento / fazer_agendamento_em_nome_de:
+  usuario_info e local_info embutidos, slots_reservados nos que ocupam a
+  quadra, id_bolsista_operador nos feitos por bolsistas, materiais_solicitados
+  com as reservas correspondentes em 'reservas_materiais';
+- eventos extraordinários e recorrentes como em EventoDAO.criar (sub-documento
+  'recorrencia' de modelos.recorrencia.Recorrencia);
+- chamados como em setup_mongo.js.
+
+Distribuição dos agendamentos: mais procura de segunda a quinta e à noite
+(pico das 18h às 21h), movimento no almoço e pouco de manhã cedo e no
+domingo. Os agendamentos de uma quadra nunca se sobrepõem entre si nem aos
+eventos (o índice único de slots é criado depois da carga). Status de
+acordo com a data: no passado realizado/cancelado/nao_compareceu, no
+futuro confirmado/pendente/cancelado.
+
+Carga: usuários e agendamentos são gerados e gravados por vários processos
+em paralelo, cada um com insert_many(ordered=False) em lotes; cada quadra é
+gerada por um único processo, a partir da semente, então o resultado é o
+mesmo para a mesma semente. No fim, os índices são criados, os contadores
+de uso diário reconstruídos e o catálogo recarregado.
+
+    python -m ferramentas.gerar_dados --limpar
+    python -m ferramentas.gerar_dados --limpar --usuarios 50000 --ginasios 30 --agendamentos 2000000 --processos 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import time as relogio
+from datetime import date, datetime, time, timedelta
+
+from bson import ObjectId
+
+from camada_dados.agendamento_dao import STATUS_QUE_OCUPAM, calcular_slots_reserva
+from camada_dados.catalogo import registrar_alteracao_catalogo
+from camada_dados.indices import garantir_indices
+from camada_dados.mongo_config import conectar_mongo
+from camada_dados.usuario_dao import UsuarioDAO, montar_documento_usuario
+from camada_dados.uso_diario import reconstruir_uso_diario
+from camada_negocio.servicos import construir_usuario
+from modelos.recorrencia import Recorrencia
+
+COLECOES = ('usuarios', 'ginasios', 'esportes', 'agendamentos', 'eventos', 'chamados',
+            'reservas_materiais', 'uso_diario')
+
+HORA_ABERTURA = 7
+HORA_FECHAMENTO = 23
+
+# Peso relativo de cada hora de início (7h a 22h) e de cada dia (segunda a domingo)
+PESOS_HORA = {7: 2, 8: 3, 9: 3, 10: 3, 11: 4, 12: 6, 13: 6, 14: 4, 15: 4, 16: 5,
+              17: 7, 18: 10, 19: 10, 20: 9, 21: 7, 22: 3}
+PESOS_DIA = [1.0, 1.0, 1.0, 0.95, 0.8, 0.5, 0.3]
+
+STATUS_PASSADO = (('realizado', 70), ('cancelado', 18), ('nao_compareceu', 12))
+STATUS_FUTURO = (('confirmado', 82), ('pendente', 8), ('cancelado', 10))
+
+# Frações dos usuários
+FRACAO_BOLSISTAS = 0.02
+FRACAO_FUNCIONARIOS = 0.03
+ADMINS = 5
+
+FRACAO_OPERADOS_POR_BOLSISTA = 0.1
+FRACAO_COM_MATERIAIS = 0.2
+
+ESPORTES = [('Futsal', 10), ('Basquete', 10), ('Vôlei', 12), ('Handebol', 14), ('Badminton', 4),
+            ('Tênis de Mesa', 4), ('Futevôlei', 4), ('Vôlei de Praia', 4)]
+MATERIAIS = [('Bola de Futsal', 'Penalty'), ('Bola de Basquete', 'Spalding'), ('Bola de Vôlei', 'Mikasa'),
+             ('Bola de Handebol', 'Molten'), ('Kit de Raquetes', 'Yonex'), ('Rede de Vôlei', 'Master Rede'),
+             ('Coletes (10 un.)', 'Kanxa'), ('Cones (20 un.)', 'Pista')]
+PISOS = ['Madeira', 'Cimento', 'Sintético', 'Areia']
+NOMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela', 'João',
+         'Larissa', 'Marcelo', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Thiago', 'Vitória', 'William']
+SOBRENOMES = ['Silva', 'Souza', 'Oliveira', 'Santos', 'Pereira', 'Lima', 'Carvalho', 'Ferreira', 'Rodrigues',
+              'Almeida', 'Costa', 'Gomes', 'Martins', 'Araújo', 'Ribeiro', 'Schmidt', 'Müller', 'Becker']
+CURSOS = ['Ciência da Computação', 'Engenharia Elétrica', 'Engenharia Mecânica', 'Engenharia Civil',
+          'Educação Física', 'Física', 'Matemática', 'Química', 'Engenharia de Produção']
+MOTIVOS = ['Treino', 'Pelada', 'Treino da atlética', 'Aula prática', 'Jogo amistoso', None, None, None]
+DESCRICOES_CHAMADO = ['Rede rasgada', 'Lâmpada queimada', 'Piso solto', 'Tabela danificada',
+                      'Vazamento no teto', 'Marcação apagada', 'Porta do vestiário quebrada']
+
+
+# --- Usuários ---
+# O usuário de índice i é calculado a partir de i (sem estado): os processos
+# que geram agendamentos obtêm CPF e nome sem consultar o banco.
+
+class PerfilUsuarios:
+
+    def __init__(self, total):
+        self.total = max(total, ADMINS + 2)
+        self.admins = ADMINS
+        self.funcionarios = int(self.total * FRACAO_FUNCIONARIOS)
+        self.bolsistas = max(int(self.total * FRACAO_BOLSISTAS), 1)
+        self.inicio_bolsistas = self.admins + self.funcionarios
+        self.inicio_alunos = self.inicio_bolsistas + self.bolsistas
+
+    def tipo(self, i):
+        if i < self.admins:
+            return 'admin'
+        if i < self.inicio_bolsistas:
+            return 'funcionario'
+        if i < self.inicio_alunos:
+            return 'bolsista'
+        return 'aluno'
+
+    @staticmethod
+    def cpf(i):
+        return f"9{i:010d}"
+
+    @staticmethod
+    def nome(i):
+        return f"{NOMES[i % len(NOMES)]} {SOBRENOMES[(i // len(NOMES)) % len(SOBRENOMES)]} {i}"
+
+    def aluno_aleatorio(self, aleatorio):
+        return aleatorio.randrange(self.inicio_alunos, self.total)
+
+    def bolsista_aleatorio(self, aleatorio):
+        return aleatorio.randrange(self.inicio_bolsistas, self.inicio_alunos)
+
+
+def registro_usuario(perfil, i):
+    """Campos do formulário de cadastro do usuário i (entrada de construir_usuario)."""
+    aleatorio = random.Random(i)
+    tipo = perfil.tipo(i)
+    registro = {
+        'tipo_usuario': tipo,
+        'cpf': perfil.cpf(i),
+        'nome': perfil.nome(i),
+        'email': f"usuario{i}@sintetico.udesc.br",
+        'senha': 'senha123',
+        'data_nasc': datetime(aleatorio.randint(1965, 2006), aleatorio.randint(1, 12), aleatorio.randint(1, 28)),
+    }
+    if tipo in ('aluno', 'bolsista'):
+        registro.update(matricula=f"{2015 + i % 11}{i:07d}", curso=aleatorio.choice(CURSOS),
+                        ano_inicio=2015 + i % 11)
+    if tipo == 'bolsista':
+        inicio = aleatorio.choice([8, 13, 18])
+        registro.update(valor_remuneracao=700.0, carga_horaria=20, horario_inicio=f"{inicio:02d}:00",
+                        horario_fim=f"{inicio + 4:02d}:00",
+                        id_supervisor_servidor=f"SERV{aleatorio.randrange(perfil.admins):03d}")
+    if tipo in ('admin', 'funcionario'):
+        registro.update(id_servidor=f"SERV{i:03d}",
+                        data_admissao=datetime(aleatorio.randint(2000, 2024), aleatorio.randint(1, 12), 1))
+    if tipo == 'funcionario':
+        registro.update(departamento='Centro de Educação Física', cargo='Técnico Esportivo')
+    if tipo == 'admin':
+        registro.update(nivel_acesso=1, area_responsabilidade='Gestão de Quadras')
+    return registro
+
+
+def _gravar_usuarios(tarefa):
+    perfil, inicio, fim = tarefa
+    documentos = [montar_documento_usuario(construir_usuario(registro_usuario(perfil, i))) for i in range(inicio, fim)]
+    falhas = UsuarioDAO().inserir_em_lote(documentos)
+    return len(documentos) - len(falhas)
+
+
+# --- Ginásios, esportes e eventos (gerados no processo principal) ---
+
+def gerar_esportes():
+    return [{"_id": ObjectId(), "nome": nome, "max_jogadores": jogadores} for nome, jogadores in ESPORTES]
+
+
+def gerar_ginasios(quantidade, quadras_por_ginasio, esportes, aleatorio):
+    ginasios = []
+    for g in range(1, quantidade + 1):
+        quadras = [{
+            "num_quadra": q,
+            "capacidade": aleatorio.choice([50, 80, 100, 150]),
+            "tipo_piso": aleatorio.choice(PISOS),
+            "cobertura": aleatorio.random() < 0.8,
+            "status": 'disponivel' if aleatorio.random() < 0.9 else 'manutencao',
+            "esportes_permitidos": [e['_id'] for e in aleatorio.sample(esportes, aleatorio.randint(1, 3))],
+        } for q in range(1, quadras_por_ginasio + 1)]
+        # Estoque suficiente para todas as quadras pedirem o mesmo material ao mesmo tempo
+        materiais = [{
+            "id_material": str(g * 100 + m),
+            "nome": nome, "descricao": f"{nome} - ginásio {g}", "marca": marca, "status": 'bom',
+            "qnt_total": 3 * quadras_por_ginasio, "qnt_disponivel": 2 * quadras_por_ginasio,
+        } for m, (nome, marca) in enumerate(MATERIAIS, start=1)]
+        ginasios.append({"_id": g, "nome": f"Ginásio {g}", "endereco": f"Rua dos Esportes, {g * 10}",
+                         "capacidade": aleatorio.choice([300, 500, 1000]),
+                         "quadras": quadras, "materiais_esportivos": materiais})
+    return ginasios
+
+
+def _admin_info(perfil, aleatorio):
+    i = aleatorio.randrange(perfil.admins)
+    return perfil.cpf(i), {"nome": perfil.nome(i)}
+
+
+def gerar_eventos(ginasios, perfil, dias, extraordinarios, recorrentes, aleatorio):
+    """Eventos no formato de EventoDAO.criar, cada um bloqueando 1 a 3 quadras de um ginásio."""
+    eventos = []
+    for i in range(extraordinarios):
+        ginasio = aleatorio.choice(ginasios)
+        dia = aleatorio.choice(dias)
+        inicio = datetime.combine(dia, time(aleatorio.randint(8, 18)))
+        cpf_admin, admin_info = _admin_info(perfil, aleatorio)
+        quadras = aleatorio.sample(ginasio['quadras'], min(len(ginasio['quadras']), aleatorio.randint(1, 3)))
+        eventos.append({
+            "nome": f"Evento extraordinário {i + 1}", "descricao": "Gerado pelo gerador de dados sintéticos.",
+            "cpf_admin_organizador": cpf_admin, "admin_info": admin_info, "tipo": 'extraordinario',
+            "quadras_bloqueadas": [{"id_ginasio": ginasio['_id'], "num_quadra": q['num_quadra']} for q in quadras],
+            "data_hora_inicio": inicio, "data_hora_fim": inicio + timedelta(hours=aleatorio.randint(2, 5)),
+        })
+    for i in range(recorrentes):
+        ginasio = aleatorio.choice(ginasios)
+        hora = aleatorio.randint(8, 20)
+        recorrencia = Recorrencia(aleatorio.randrange(7), hora * 60, (hora + aleatorio.randint(1, 2)) * 60,
+                                  aleatorio.choice(dias[:len(dias) // 2]), aleatorio.choice(dias[len(dias) // 2:]))
+        cpf_admin, admin_info = _admin_info(perfil, aleatorio)
+        quadras = aleatorio.sample(ginasio['quadras'], min(len(ginasio['quadras']), aleatorio.randint(1, 2)))
+        eventos.append({
+            "nome": f"Treino semanal {i + 1}", "descricao": "Gerado pelo gerador de dados sintéticos.",
+            "cpf_admin_organizador": cpf_admin, "admin_info": admin_info, "tipo": 'recorrente',
+            "quadras_bloqueadas": [{"id_ginasio": ginasio['_id'], "num_quadra": q['num_quadra']} for q in quadras],
+            "recorrencia": recorrencia.get_document_mongo(),
+            "regra_recorrencia": recorrencia.formatar_regra(),
+            "data_fim_recorrencia": recorrencia.data_fim,
+        })
+    return eventos
+
+
+def bloqueios_por_quadra(eventos):
+    """{(id_ginasio, num_quadra): [(tipo, dados)]} para não gerar agendamentos sobre os eventos."""
+    bloqueios = {}
+    for evento in eventos:
+        if evento['tipo'] == 'extraordinario':
+            bloqueio = ('extraordinario', (evento['data_hora_inicio'], evento['data_hora_fim']))
+        else:
+            bloqueio = ('recorrente', evento['recorrencia'])
+        for quadra in evento['quadras_bloqueadas']:
+            bloqueios.setdefault((quadra['id_ginasio'], quadra['num_quadra']), []).append(bloqueio)
+    return bloqueios
+
+
+def _bloqueado(bloqueios, inicio, fim):
+    # Minutos desde a meia-noite do dia do início: um horário que termina à
+    # meia-noite vale 1440, não 0
+    meia_noite = datetime.combine(inicio.date(), time.min)
+    minuto_ini = (inicio - meia_noite).total_seconds() // 60
+    minuto_fim = (fim - meia_noite).total_seconds() // 60
+    for tipo, dados in bloqueios:
+        if tipo == 'extraordinario':
+            if dados[0] < fim and dados[1] > inicio:
+                return True
+        elif (inicio.weekday() == dados['dia_semana'] and dados['data_inicio'] <= inicio <= dados['data_fim'] + timedelta(days=1)
+              and dados['minuto_inicio'] < minuto_fim and dados['minuto_fim'] > minuto_ini):
+            return True
+    return False
+
+
+def gerar_chamados(ginasios, perfil, quantidade, dias, aleatorio):
+    chamados = []
+    for _ in range(quantidade):
+        ginasio = aleatorio.choice(ginasios)
+        i = perfil.aluno_aleatorio(aleatorio)
+        chamados.append({
+            "cpf_usuario_abriu": perfil.cpf(i), "usuario_info": {"nome": perfil.nome(i)},
+            "id_ginasio": ginasio['_id'], "num_quadra": aleatorio.choice(ginasio['quadras'])['num_quadra'],
+            "local_info": {"nome_ginasio": ginasio['nome']},
+            "data": datetime.combine(aleatorio.choice(dias), time(aleatorio.randint(7, 22), aleatorio.randrange(60))),
+            "descricao": aleatorio.choice(DESCRICOES_CHAMADO),
+            "status": aleatorio.choice(['aberto', 'aberto', 'em_atendimento', 'resolvido']),
+        })
+    return chamados
+
+
+# --- Agendamentos (gerados e gravados pelos processos, uma quadra por tarefa) ---
+
+def _escolher(aleatorio, opcoes):
+    return aleatorio.choices([o for o, _ in opcoes], weights=[p for _, p in opcoes])[0]
+
+
+def _horas_do_dia(aleatorio, quantidade):
+    """'quantidade' horas de início distintas, sorteadas pelos pesos de PESOS_HORA."""
+    horas = list(PESOS_HORA)
+    pesos = [PESOS_HORA[h] for h in horas]
+    escolhidas = set()
+    while len(escolhidas) < quantidade:
+        escolhidas.add(aleatorio.choices(horas, weights=pesos)[0])
+    return sorted(escolhidas)
+
+
+def gerar_agendamentos_da_quadra(contexto, ginasio, num_quadra):
+    """Gerador de (agendamento, [reservas de materiais]) de uma quadra em todos os dias do período."""
+    aleatorio = random.Random(f"{contexto['semente']}:{ginasio['_id']}:{num_quadra}")
+    perfil = contexto['perfil']
+    agora = contexto['agora']
+    bloqueios = contexto['bloqueios'].get((ginasio['_id'], num_quadra), [])
+    materiais = ginasio['materiais_esportivos']
+    maximo = len(PESOS_HORA)
+
+    for dia in contexto['dias']:
+        esperado = contexto['media_por_quadra_dia'] * PESOS_DIA[dia.weekday()] / (sum(PESOS_DIA) / 7)
+        quantidade = min(maximo, max(0, round(aleatorio.gauss(esperado, esperado * 0.25))))
+        fim_anterior = None
+        for hora in _horas_do_dia(aleatorio, quantidade):
+            inicio = datetime.combine(dia, time(hora))
+            if fim_anterior is not None and inicio < fim_anterior:
+                continue
+            duracao = 2 if hora + 1 < HORA_FECHAMENTO and aleatorio.random() < 0.25 else 1
+            fim = inicio + timedelta(hours=duracao)
+            if _bloqueado(bloqueios, inicio, fim):
+                continue
+            fim_anterior = fim
+
+            i = perfil.aluno_aleatorio(aleatorio)
+            status = _escolher(aleatorio, STATUS_PASSADO if fim <= agora else STATUS_FUTURO)
+            documento = {
+                "_id": ObjectId(),
+                "cpf_usuario": perfil.cpf(i),
+                "id_ginasio": ginasio['_id'],
+                "num_quadra": num_quadra,
+                "data_solicitacao": inicio - timedelta(days=aleatorio.randint(0, 14), minutes=aleatorio.randrange(1440)),
+                "hora_ini": inicio,
+                "hora_fim": fim,
+                "status_agendamento": status,
+                "usuario_info": {"nome": perfil.nome(i)},
+                "local_info": {"nome_ginasio": ginasio['nome']},
+            }
+            motivo = aleatorio.choice(MOTIVOS)
+            if motivo:
+                documento['motivo'] = motivo
+            if aleatorio.random() < FRACAO_OPERADOS_POR_BOLSISTA:
+                documento['id_bolsista_operador'] = perfil.cpf(perfil.bolsista_aleatorio(aleatorio))
+                documento['data_operacao_bolsista'] = documento['data_solicitacao']
+            if status in STATUS_QUE_OCUPAM:
+                documento['slots_reservados'] = calcular_slots_reserva(ginasio['_id'], num_quadra, inicio, fim)
+
+            reservas = []
+            if materiais and aleatorio.random() < FRACAO_COM_MATERIAIS:
+                escolhidos = aleatorio.sample(materiais, aleatorio.randint(1, 2))
+                documento['materiais_solicitados'] = [
+                    {"id_material": m['id_material'], "nome": m['nome'], "quantidade": aleatorio.randint(1, 2)}
+                    for m in escolhidos
+                ]
+                if status in STATUS_QUE_OCUPAM:
+                    reservas = [{"id_ginasio": ginasio['_id'], "id_material": item['id_material'],
+                                 "quantidade": item['quantidade'], "hora_ini": inicio, "hora_fim": fim,
+                                 "id_agendamento": documento['_id'], "criado_em": documento['data_solicitacao']}
+                                for item in documento['materiais_solicitados']]
+            yield documento, reservas
+
+
+_CONTEXTO = {}
+
+
+def _iniciar_processo(contexto):
+    _CONTEXTO.update(contexto)
+
+
+def _gravar_agendamentos_da_quadra(tarefa):
+    ginasio, num_quadra = tarefa
+    db = conectar_mongo()
+    tamanho_lote = _CONTEXTO['tamanho_lote']
+    agendamentos, reservas = [], []
+    total = 0
+
+    def gravar():
+        if agendamentos:
+            db.agendamentos.insert_many(agendamentos, ordered=False)
+        if reservas:
+            db.reservas_materiais.insert_many(reservas, ordered=False)
+        agendamentos.clear()
+        reservas.clear()
+
+    for documento, reservas_do_agendamento in gerar_agendamentos_da_quadra(_CONTEXTO, ginasio, num_quadra):
+        agendamentos.append(documento)
+        reservas.extend(reservas_do_agendamento)
+        total += 1
+        if len(agendamentos) >= tamanho_lote:
+            gravar()
+    gravar()
+    return total
+
+
+# --- Execução ---
+
+def _faixas(total, tamanho):
+    return [(inicio, min(inicio + tamanho, total)) for inicio in range(0, total, tamanho)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera e carrega dados sintéticos no MongoDB.")
+    parser.add_argument('--usuarios', type=int, default=20000)
+    parser.add_argument('--ginasios', type=int, default=12)
+    parser.add_argument('--quadras-por-ginasio', type=int, default=4)
+    parser.add_argument('--agendamentos', type=int, default=500000,
+                        help="total aproximado (limitado pelas horas livres das quadras no período)")
+    parser.add_argument('--eventos-extraordinarios', type=int, default=300)
+    parser.add_argument('--eventos-recorrentes', type=int, default=40)
+    parser.add_argument('--chamados', type=int, default=2000)
+    parser.add_argument('--dias-passados', type=int, default=365)
+    parser.add_argument('--dias-futuros', type=int, default=30)
+    parser.add_argument('--processos', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--lote', type=int, default=5000, help="documentos por insert_many")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--limpar', action='store_true', help="apaga as coleções antes de gerar")
+    args = parser.parse_args(argv)
+
+    db = conectar_mongo()
+    if db is None:
+        return 1
+    if args.limpar:
+        for colecao in COLECOES:
+            db[colecao].drop()
+        print(f"Coleções apagadas: {', '.join(COLECOES)}")
+    elif db.agendamentos.estimated_document_count():
+        print("⚠️  A coleção 'agendamentos' não está vazia: os dados gerados podem sobrepor os existentes "
+              "(use --limpar).")
+
+    aleatorio = random.Random(args.semente)
+    hoje = date.today()
+    dias = [hoje + timedelta(days=d) for d in range(-args.dias_passados, args.dias_futuros + 1)]
+    perfil = PerfilUsuarios(args.usuarios)
+    comeco = relogio.perf_counter()
+
+    esportes = gerar_esportes()
+    ginasios = gerar_ginasios(args.ginasios, args.quadras_por_ginasio, esportes, aleatorio)
+    eventos = gerar_eventos(ginasios, perfil, dias, args.eventos_extraordinarios, args.eventos_recorrentes, aleatorio)
+    db.esportes.insert_many(esportes)
+    db.ginasios.insert_many(ginasios)
+    if eventos:
+        db.eventos.insert_many(eventos)
+    if args.chamados:
+        db.chamados.insert_many(gerar_chamados(ginasios, perfil, args.chamados, dias, aleatorio))
+    print(f"Ginásios: {len(ginasios)}, esportes: {len(esportes)}, eventos: {len(eventos)}, chamados: {args.chamados}")
+
+    quadras = [(g, q['num_quadra']) for g in ginasios for q in g['quadras']]
+    media = args.agendamentos / (len(quadras) * len(dias))
+    if media > len(PESOS_HORA) / 2:
+        print(f"⚠️  {media:.1f} agendamentos por quadra/dia é mais do que cabe sem sobreposição; "
+              "o total gerado será menor.")
+    contexto = {
+        'semente': args.semente, 'perfil': perfil, 'dias': dias, 'agora': datetime.now(),
+        'media_por_quadra_dia': media, 'bloqueios': bloqueios_por_quadra(eventos), 'tamanho_lote': args.lote,
+    }
+
+    with multiprocessing.Pool(args.processos, initializer=_iniciar_processo, initargs=(contexto,)) as pool:
+        usuarios = sum(pool.imap_unordered(_gravar_usuarios,
+                                           [(perfil, i, f) for i, f in _faixas(perfil.total, args.lote)]))
+        print(f"Usuários: {usuarios} ({relogio.perf_counter() - comeco:.1f}s)")
+        agendamentos = 0
+        for feitos, total in enumerate(pool.imap_unordered(_gravar_agendamentos_da_quadra, quadras), start=1):
+            agendamentos += total
+            print(f"  quadras {feitos}/{len(quadras)}, agendamentos: {agendamentos}", end='\r')
+    print(f"\nAgendamentos: {agendamentos} ({relogio.perf_counter() - comeco:.1f}s)")
+
+    garantir_indices(db)
+    reconstruir_uso_diario(db, dias[0], dias[-1])
+    registrar_alteracao_catalogo(db)
+    print(f"Concluído em {relogio.perf_counter() - comeco:.1f}s.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,46 @@
+# ferramentas/importar_usuarios.py
+"""
+Importação de usuários em lote pela linha de comando (início de semestre).
+Mesmo fluxo da tela /admin/usuarios/importar: validação registro a
+registro, insert_many(ordered=False) em lotes e relatório por linha.
+
+    python -m ferramentas.importar_usuarios alunos.csv
+    python -m ferramentas.importar_usuarios alunos.ndjson --lote 2000 --relatorio erros.json
+"""
+
+import argparse
+import json
+
+from camada_negocio.servicos import ServicoAdmin
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Importa usuários de um arquivo CSV ou JSON.")
+    parser.add_argument('arquivo')
+    parser.add_argument('--formato', choices=['csv', 'json'],
+                        help="padrão: deduzido da extensão do arquivo")
+    parser.add_argument('--lote', type=int, help="documentos por insert_many (padrão: IMPORTACAO_TAMANHO_LOTE)")
+    parser.add_argument('--relatorio', help="grava o relatório completo (JSON) neste arquivo")
+    args = parser.parse_args(argv)
+
+    formato = args.formato or ('csv' if args.arquivo.lower().endswith('.csv') else 'json')
+    with open(args.arquivo, encoding='utf-8-sig', newline='') as arquivo:
+        relatorio = ServicoAdmin().importar_usuarios(arquivo, formato, args.lote)
+
+    print(f"Registros lidos: {relatorio['total']}")
+    print(f"Importados:      {relatorio['inseridos']}")
+    print(f"Rejeitados:      {relatorio['rejeitados']}")
+    for erro in relatorio['erros'][:20]:
+        print(f"  linha {erro['linha']}: {erro['erro']} (CPF {erro['cpf']}, email {erro['email']})")
+    if len(relatorio['erros']) > 20:
+        print(f"  ... e mais {len(relatorio['erros']) - 20} erro(s)")
+
+    if args.relatorio:
+        with open(args.relatorio, 'w', encoding='utf-8') as saida:
+            json.dump(relatorio, saida, ensure_ascii=False, indent=2)
+        print(f"Relatório completo em {args.relatorio}")
+    return 0 if not relatorio['rejeitados'] else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,311 @@
+# ferramentas/teste_carga.py
+"""
+Teste de carga do "horário de pico": a abertura de uma semana nova, com
+centenas de alunos abrindo a grade e reservando ao mesmo tempo.
+
+Dirige o app em execução (python app.py, gunicorn ou uvicorn asgi:aplicacao)
+por HTTP, com N usuários virtuais simultâneos, cada um com o próprio cookie
+de sessão, fazendo jornadas completas:
+
+    aluno     login -> ginásios -> quadras -> grade da semana -> reserva -> logout
+    bolsista  login -> agendamentos do bolsista -> check-in (concluir) -> logout
+
+Os alunos disputam as mesmas quadras (--quadras-alvo) e preferem os
+horários da noite, como na abertura real. Os usuários são os da massa
+sintética (ferramentas/gerar_dados.py, senha 'senha123').
+
+Relatório: requisições por etapa com p50/p95/p99 e erros, vazão total,
+reservas confirmadas/recusadas (lidas da mensagem exibida após o POST) e os
+incidentes de reserva dupla encontrados no banco depois da carga:
+agendamentos ativos sobrepostos na mesma quadra, agendamentos sobre eventos
+extraordinários e diferença entre reservas confirmadas pelo app e
+gravadas.
+
+    python -m ferramentas.teste_carga --usuarios 200 --jornadas 3
+    python -m ferramentas.teste_carga --url http://127.0.0.1:8000 --usuarios 500 --rampa 10 --relatorio carga.json
+
+Retorna 1 se houver reserva dupla.
+"""
+
+import argparse
+import http.cookiejar
+import json
+import random
+import re
+import threading
+import time as relogio
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+
+from camada_dados.agendamento_dao import STATUS_QUE_OCUPAM, filtro_agendamentos_sobrepostos
+from camada_dados.catalogo import obter_catalogo
+from camada_dados.mongo_config import conectar_mongo
+from ferramentas.benchmark import percentil
+from ferramentas.gerar_dados import PerfilUsuarios
+
+SENHA_SINTETICA = 'senha123'
+
+_SLOT_LIVRE = re.compile(
+    r'name="id_ginasio" value="(\d+)">\s*<input type="hidden" name="num_quadra" value="(\d+)">\s*'
+    r'<input type="hidden" name="data" value="([\d-]+)">\s*<input type="hidden" name="hora_ini" value="([\d:]+)">\s*'
+    r'<input type="hidden" name="hora_fim" value="([\d:]+)">'
+)
+_CONCLUIR = re.compile(r'/bolsista/concluir_agendamento/([0-9a-f]{24})')
+
+# Resultado da reserva pela mensagem exibida depois do POST
+MENSAGENS_RESERVA = (
+    ('confirmada', 'Agendamento realizado com sucesso'),
+    ('indisponivel', 'Horário indisponível'),
+    ('materiais', 'materiais pedidos'),
+)
+
+# Preferência por hora de início na corrida pela semana nova
+PESOS_HORA_PICO = {18: 10, 19: 10, 20: 8, 21: 5, 17: 4, 12: 3, 13: 3}
+
+
+class Metricas:
+    """Latências e erros por etapa, compartilhados pelas threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = {}
+        self.erros = {}
+        self.reservas = {}
+        self.exemplos_erro = []
+
+    def registrar(self, etapa, ms, erro=None):
+        with self._lock:
+            self.latencias.setdefault(etapa, []).append(ms)
+            if erro is not None:
+                self.erros[etapa] = self.erros.get(etapa, 0) + 1
+                if len(self.exemplos_erro) < 20:
+                    self.exemplos_erro.append(f"{etapa}: {erro}")
+
+    def registrar_reserva(self, resultado):
+        with self._lock:
+            self.reservas[resultado] = self.reservas.get(resultado, 0) + 1
+
+    def por_etapa(self):
+        resumo = {}
+        for etapa, valores in self.latencias.items():
+            ordenados = sorted(valores)
+            resumo[etapa] = {
+                "requisicoes": len(ordenados),
+                "erros": self.erros.get(etapa, 0),
+                "p50_ms": round(percentil(ordenados, 50), 1),
+                "p95_ms": round(percentil(ordenados, 95), 1),
+                "p99_ms": round(percentil(ordenados, 99), 1),
+            }
+        return resumo
+
+
+class ErroEtapa(Exception):
+    pass
+
+
+class UsuarioVirtual:
+    """Um navegador: cookies próprios, redirecionamentos seguidos."""
+
+    def __init__(self, url_base, metricas, timeout):
+        self.url_base = url_base.rstrip('/')
+        self.metricas = metricas
+        self.timeout = timeout
+        self.abridor = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def requisitar(self, etapa, caminho, dados=None):
+        corpo = urllib.parse.urlencode(dados).encode() if dados is not None else None
+        inicio = relogio.perf_counter()
+        try:
+            with self.abridor.open(self.url_base + caminho, data=corpo, timeout=self.timeout) as resposta:
+                html = resposta.read().decode('utf-8', errors='replace')
+        except urllib.error.HTTPError as e:
+            self.metricas.registrar(etapa, (relogio.perf_counter() - inicio) * 1000, f"HTTP {e.code}")
+            raise ErroEtapa(etapa)
+        except Exception as e:
+            self.metricas.registrar(etapa, (relogio.perf_counter() - inicio) * 1000, repr(e))
+            raise ErroEtapa(etapa)
+        self.metricas.registrar(etapa, (relogio.perf_counter() - inicio) * 1000)
+        return html
+
+    def login(self, email):
+        self.requisitar('login_form', '/login')
+        html = self.requisitar('login', '/login', {'email': email, 'senha': SENHA_SINTETICA})
+        if 'Bem-vindo' not in html:
+            self.metricas.registrar('login_recusado', 0, email)
+            raise ErroEtapa('login')
+
+
+def _escolher_slot(slots, aleatorio):
+    pesos = [PESOS_HORA_PICO.get(int(slot[3][:2]), 1) for slot in slots]
+    return aleatorio.choices(slots, weights=pesos)[0]
+
+
+def jornada_aluno(usuario, email, quadras_alvo, semana, aleatorio):
+    usuario.login(email)
+    id_ginasio, num_quadra = aleatorio.choice(quadras_alvo)
+    usuario.requisitar('ginasios', '/novo_agendamento')
+    usuario.requisitar('quadras', f'/selecionar_quadra/{id_ginasio}')
+    html = usuario.requisitar('grade', f'/tabela_agendamento/{id_ginasio}/{num_quadra}?semana={semana}')
+
+    slots = _SLOT_LIVRE.findall(html)
+    if not slots:
+        usuario.metricas.registrar_reserva('sem_horario_livre')
+    else:
+        g, q, data, hora_ini, hora_fim = _escolher_slot(slots, aleatorio)
+        html = usuario.requisitar('reserva', '/fazer_agendamento', {
+            'id_ginasio': g, 'num_quadra': q, 'data': data, 'hora_ini': hora_ini, 'hora_fim': hora_fim,
+        })
+        resultado = next((nome for nome, texto in MENSAGENS_RESERVA if texto in html), 'erro')
+        usuario.metricas.registrar_reserva(resultado)
+    usuario.requisitar('logout', '/logout')
+
+
+def jornada_bolsista(usuario, email, aleatorio):
+    usuario.login(email)
+    html = usuario.requisitar('bolsista_agendamentos', '/bolsista/agendamentos')
+    ids = _CONCLUIR.findall(html)
+    if ids:
+        usuario.requisitar('check_in', f'/bolsista/concluir_agendamento/{aleatorio.choice(ids)}', {})
+    usuario.requisitar('logout', '/logout')
+
+
+def executar_usuario(indice, args, perfil, quadras_alvo, metricas, fim_permitido):
+    aleatorio = random.Random(f"{args.semente}:{indice}")
+    relogio.sleep(args.rampa * indice / max(args.usuarios, 1))
+    usuario = UsuarioVirtual(args.url, metricas, args.timeout)
+    eh_bolsista = aleatorio.random() < args.fracao_bolsistas
+    for _ in range(args.jornadas):
+        if relogio.perf_counter() > fim_permitido:
+            break
+        try:
+            if eh_bolsista:
+                jornada_bolsista(usuario, f"usuario{perfil.bolsista_aleatorio(aleatorio)}@sintetico.udesc.br", aleatorio)
+            else:
+                jornada_aluno(usuario, f"usuario{perfil.aluno_aleatorio(aleatorio)}@sintetico.udesc.br",
+                              quadras_alvo, args.semana, aleatorio)
+        except ErroEtapa:
+            pass
+
+
+def detectar_reservas_duplas(db, inicio, fim):
+    """
+    Incidentes no banco em [inicio, fim): agendamentos ativos sobrepostos na
+    mesma quadra e agendamentos ativos sobre eventos extraordinários.
+    """
+    incidentes = []
+    cursor = db.agendamentos.find(
+        {"status_agendamento": {"$in": STATUS_QUE_OCUPAM}, "hora_ini": {"$lt": fim}, "hora_fim": {"$gt": inicio}},
+        {"id_ginasio": 1, "num_quadra": 1, "hora_ini": 1, "hora_fim": 1},
+    ).sort([("id_ginasio", 1), ("num_quadra", 1), ("hora_ini", 1)])
+    anterior = None
+    for doc in cursor:
+        mesma_quadra = anterior is not None and (anterior['id_ginasio'], anterior['num_quadra']) == (doc['id_ginasio'], doc['num_quadra'])
+        if mesma_quadra and doc['hora_ini'] < anterior['hora_fim']:
+            incidentes.append({"tipo": "agendamentos_sobrepostos", "id_ginasio": doc['id_ginasio'],
+                               "num_quadra": doc['num_quadra'], "ids": [str(anterior['_id']), str(doc['_id'])],
+                               "hora_ini": doc['hora_ini'].isoformat()})
+        if not mesma_quadra or doc['hora_fim'] > anterior['hora_fim']:
+            anterior = doc
+
+    eventos = db.eventos.find({"tipo": "extraordinario", "data_hora_inicio": {"$lt": fim},
+                               "data_hora_fim": {"$gt": inicio}})
+    for evento in eventos:
+        for quadra in evento.get('quadras_bloqueadas', []):
+            filtro = filtro_agendamentos_sobrepostos(quadra['id_ginasio'], quadra['num_quadra'],
+                                                     evento['data_hora_inicio'], evento['data_hora_fim'])
+            for doc in db.agendamentos.find(filtro, {"_id": 1}):
+                incidentes.append({"tipo": "agendamento_sobre_evento", "id_ginasio": quadra['id_ginasio'],
+                                   "num_quadra": quadra['num_quadra'], "ids": [str(evento['_id']), str(doc['_id'])],
+                                   "hora_ini": evento['data_hora_inicio'].isoformat()})
+    return incidentes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga da abertura de uma semana de reservas.")
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--usuarios', type=int, default=100, help="usuários virtuais simultâneos")
+    parser.add_argument('--jornadas', type=int, default=3, help="jornadas por usuário virtual")
+    parser.add_argument('--duracao', type=float, default=600, help="limite de tempo (s)")
+    parser.add_argument('--rampa', type=float, default=0, help="segundos para todos os usuários entrarem (0 = todos juntos)")
+    parser.add_argument('--quadras-alvo', type=int, default=3, help="quantas quadras os alunos disputam")
+    parser.add_argument('--semana', type=int, default=1, help="semana disputada (deslocamento a partir da atual)")
+    parser.add_argument('--fracao-bolsistas', type=float, default=0.05)
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--relatorio', help="grava o relatório (JSON) neste arquivo")
+    args = parser.parse_args(argv)
+
+    db = conectar_mongo()
+    catalogo = obter_catalogo()
+    if db is None or catalogo is None:
+        return 1
+    perfil = PerfilUsuarios(db.usuarios.estimated_document_count())
+    quadras = [(q['id_ginasio'], q['num_quadra']) for q in catalogo.todas_as_quadras() if q.get('status') == 'disponivel']
+    quadras_alvo = quadras[:args.quadras_alvo]
+    if not quadras_alvo:
+        print("Nenhuma quadra disponível: rode antes 'python -m ferramentas.gerar_dados --limpar'.")
+        return 1
+
+    hoje = datetime.combine(datetime.now().date(), time.min)
+    inicio_semana = hoje - timedelta(days=hoje.weekday()) + timedelta(weeks=args.semana)
+    fim_semana = inicio_semana + timedelta(weeks=1)
+    confirmados_antes = db.agendamentos.count_documents(
+        {"status_agendamento": {"$in": STATUS_QUE_OCUPAM}, "hora_ini": {"$gte": inicio_semana, "$lt": fim_semana}})
+
+    print(f"{args.usuarios} usuários virtuais x {args.jornadas} jornadas contra {args.url}, "
+          f"quadras {quadras_alvo}, semana de {inicio_semana:%d/%m}")
+    metricas = Metricas()
+    comeco = relogio.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.usuarios) as executor:
+        for indice in range(args.usuarios):
+            executor.submit(executar_usuario, indice, args, perfil, quadras_alvo, metricas, comeco + args.duracao)
+    duracao = relogio.perf_counter() - comeco
+
+    confirmados_depois = db.agendamentos.count_documents(
+        {"status_agendamento": {"$in": STATUS_QUE_OCUPAM}, "hora_ini": {"$gte": inicio_semana, "$lt": fim_semana}})
+    incidentes = detectar_reservas_duplas(db, inicio_semana, fim_semana)
+    etapas = metricas.por_etapa()
+    requisicoes = sum(e['requisicoes'] for e in etapas.values())
+    erros = sum(e['erros'] for e in etapas.values())
+    confirmadas_app = metricas.reservas.get('confirmada', 0)
+    gravadas = confirmados_depois - confirmados_antes
+
+    print(f"\n{'etapa':<22} | {'req':>6} | {'erros':>5} | {'p50':>8} | {'p95':>8} | {'p99':>8}")
+    print("-" * 70)
+    for etapa, e in etapas.items():
+        print(f"{etapa:<22} | {e['requisicoes']:>6} | {e['erros']:>5} | {e['p50_ms']:>8.1f} | {e['p95_ms']:>8.1f} | {e['p99_ms']:>8.1f}")
+    print(f"\nDuração: {duracao:.1f}s, requisições: {requisicoes} ({requisicoes / duracao:.1f}/s), erros: {erros}")
+    print(f"Reservas: {metricas.reservas}")
+    print(f"Confirmadas pelo app: {confirmadas_app}, gravadas no banco na semana: {gravadas}")
+    print(f"Reservas duplas no banco: {len(incidentes)}")
+    for incidente in incidentes[:10]:
+        print(f"  ❌ {incidente}")
+    for exemplo in metricas.exemplos_erro[:10]:
+        print(f"  erro: {exemplo}")
+
+    if args.relatorio:
+        with open(args.relatorio, 'w', encoding='utf-8') as saida:
+            json.dump({
+                "data": datetime.now().isoformat(timespec='seconds'),
+                "parametros": {k: v for k, v in vars(args).items() if k != 'relatorio'},
+                "quadras_alvo": quadras_alvo,
+                "duracao_s": round(duracao, 2),
+                "requisicoes": requisicoes,
+                "requisicoes_por_segundo": round(requisicoes / duracao, 1),
+                "erros": erros,
+                "etapas": etapas,
+                "reservas": metricas.reservas,
+                "confirmadas_app": confirmadas_app,
+                "gravadas_banco": gravadas,
+                "reservas_duplas": incidentes,
+                "exemplos_erro": metricas.exemplos_erro,
+            }, saida, ensure_ascii=False, indent=2)
+        print(f"Relatório gravado em {args.relatorio}")
+    return 1 if incidentes else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
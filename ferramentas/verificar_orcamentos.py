@@ -0,0 +1,202 @@
+# ferramentas/verificar_orcamentos.py
+"""
+Verificação dos orçamentos de consultas por rota (camada_dados.instrumentacao).
+
+Percorre as rotas principais com o cliente de testes do Flask, logado como
+usuários da massa sintética (ferramentas/gerar_dados.py), e conta os
+comandos que cada requisição envia ao MongoDB, sessão incluída:
+
+    aluno     login, index, novo_agendamento, selecionar_quadra,
+              tabela_agendamento, fazer_agendamento, meus_agendamentos
+    bolsista  login, bolsista_agendamentos
+    admin     login, admin_verificar_conflitos_evento (recorrente),
+              admin_form_evento (cria um evento recorrente de 16 semanas;
+              o custo não pode crescer com o número de ocorrências)
+
+A primeira passada só aquece os caches (catálogo, grade, sessões); as
+seguintes são medidas e vale o pior caso de cada rota. As reservas feitas
+em fazer_agendamento são canceladas e os eventos criados são excluídos no
+fim de cada passada.
+
+    python -m ferramentas.gerar_dados --limpar
+    python -m ferramentas.verificar_orcamentos
+    python -m ferramentas.verificar_orcamentos --repeticoes 5 --json orcamentos.json
+
+Retorna 1 se alguma rota passar do orçamento (ORCAMENTOS_POR_ROTA): é o
+passo de CI que barra N+1 e consultas esquecidas em laço.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+from datetime import date, datetime, timedelta
+
+from camada_dados.agendamento_dao import STATUS_QUE_OCUPAM
+from camada_dados.catalogo import obter_catalogo
+from camada_dados.evento_dao import EventoDAO
+from camada_dados.instrumentacao import ORCAMENTOS_POR_ROTA, medir_consultas
+from camada_dados.mongo_config import conectar_mongo
+from camada_negocio.servicos import ServicoAdmin
+from modelos.recorrencia import DIAS_SEMANA_EN
+from ferramentas.gerar_dados import PerfilUsuarios
+from ferramentas.teste_carga import _SLOT_LIVRE
+
+NOME_EVENTO = '[verificar_orcamentos] treino'
+
+
+class Visita:
+    """Um usuário do cliente de testes; cada requisição é medida à parte."""
+
+    def __init__(self, app, email, medicoes):
+        self.cliente = app.test_client()
+        self.email = email
+        self.medicoes = medicoes
+
+    def requisitar(self, rota, caminho, dados=None):
+        with open(os.devnull, 'w') as nulo, contextlib.redirect_stdout(nulo):
+            with medir_consultas(rota, medir_bytes=True) as medicao:
+                if dados is None:
+                    resposta = self.cliente.get(caminho)
+                else:
+                    resposta = self.cliente.post(caminho, data=dados)
+                html = resposta.get_data(as_text=True)
+                resposta.close()
+        if resposta.status_code >= 500:
+            raise RuntimeError(f"{rota}: {caminho} respondeu {resposta.status_code}")
+        self.medicoes.setdefault(rota, []).append(medicao)
+        return html
+
+    def login(self):
+        self.requisitar('login', '/login', {'email': self.email, 'senha': 'senha123'})
+
+
+def passada(app, db, usuarios, quadra, semana, medicoes):
+    g, q = quadra
+    aluno = Visita(app, usuarios['aluno'], medicoes)
+    aluno.login()
+    aluno.requisitar('index', '/index')
+    aluno.requisitar('novo_agendamento', '/novo_agendamento')
+    aluno.requisitar('selecionar_quadra', f'/selecionar_quadra/{g}')
+    html = aluno.requisitar('tabela_agendamento', f'/tabela_agendamento/{g}/{q}?semana={semana}')
+    slot = _SLOT_LIVRE.search(html)
+    if slot:
+        _, _, data, hora_ini, hora_fim = slot.groups()
+        aluno.requisitar('fazer_agendamento', '/fazer_agendamento', {
+            'id_ginasio': g, 'num_quadra': q, 'data': data, 'hora_ini': hora_ini, 'hora_fim': hora_fim,
+        })
+        reserva = db.agendamentos.find_one({
+            "id_ginasio": g, "num_quadra": q, "status_agendamento": {"$in": STATUS_QUE_OCUPAM},
+            "hora_ini": datetime.strptime(f"{data} {hora_ini}", "%Y-%m-%d %H:%M"),
+        }, {"_id": 1})
+        if reserva:
+            ServicoAdmin().cancelar_agendamento_admin(str(reserva['_id']))
+    aluno.requisitar('meus_agendamentos', '/meus_agendamentos')
+
+    bolsista = Visita(app, usuarios['bolsista'], medicoes)
+    bolsista.login()
+    bolsista.requisitar('bolsista_agendamentos', '/bolsista/agendamentos')
+
+    admin = Visita(app, usuarios['admin'], medicoes)
+    admin.login()
+    admin.requisitar('admin_verificar_conflitos_evento', '/admin/eventos/verificar_conflitos', {
+        'tipo_evento': 'recorrente',
+        'dia_semana': DIAS_SEMANA_EN[0],
+        'hora_inicio_recorrente': '19:00',
+        'hora_fim_recorrente': '20:00',
+        'data_fim_recorrencia': (date.today() + timedelta(weeks=8)).isoformat(),
+        'quadras_selecionadas': f"{g}-{q}",
+    })
+    # Madrugada: fora do horário da massa gerada, então o evento é criado
+    admin.requisitar('admin_form_evento', '/admin/eventos/novo', {
+        'cpf_admin_organizador': usuarios['cpf_admin'],
+        'nome': NOME_EVENTO,
+        'descricao': 'verificação de orçamentos',
+        'tipo_evento': 'recorrente',
+        'dia_semana': DIAS_SEMANA_EN[0],
+        'hora_inicio_recorrente': '02:00',
+        'hora_fim_recorrente': '03:00',
+        'data_fim_recorrencia': (date.today() + timedelta(weeks=16)).isoformat(),
+        'quadras_selecionadas': f"{g}-{q}",
+    })
+    for evento in db.eventos.find({"nome": NOME_EVENTO}, {"_id": 1}):
+        EventoDAO().excluir(str(evento['_id']))
+    return bool(slot)
+
+
+def resumir(medicoes):
+    resumo = {}
+    for rota, lista in medicoes.items():
+        pior = max(lista, key=lambda m: m.comandos)
+        resumo[rota] = {
+            "comandos": pior.comandos,
+            "orcamento": ORCAMENTOS_POR_ROTA.get(rota),
+            "tempo_ms": round(sum(m.tempo_ms for m in lista) / len(lista), 3),
+            "bytes_enviados": round(sum(m.bytes_enviados for m in lista) / len(lista)),
+            "bytes_recebidos": round(sum(m.bytes_recebidos for m in lista) / len(lista)),
+            "por_metodo": pior.resumo_por_metodo(),
+        }
+    return resumo
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica o orçamento de comandos MongoDB de cada rota.")
+    parser.add_argument('--repeticoes', type=int, default=3, help="passadas medidas (depois do aquecimento)")
+    parser.add_argument('--semana', type=int, default=1, help="semana da grade e da reserva (deslocamento)")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--json', help="grava o resumo (JSON) neste arquivo")
+    args = parser.parse_args(argv)
+
+    db = conectar_mongo()
+    catalogo = obter_catalogo()
+    if db is None or catalogo is None:
+        return 1
+    quadras = [(q['id_ginasio'], q['num_quadra']) for q in catalogo.todas_as_quadras() if q.get('status') == 'disponivel']
+    if not quadras:
+        print("Nenhuma quadra disponível: rode antes 'python -m ferramentas.gerar_dados --limpar'.")
+        return 1
+
+    from app import app
+
+    aleatorio = random.Random(args.semente)
+    perfil = PerfilUsuarios(db.usuarios.estimated_document_count())
+    usuarios = {
+        'aluno': f"usuario{perfil.aluno_aleatorio(aleatorio)}@sintetico.udesc.br",
+        'bolsista': f"usuario{perfil.bolsista_aleatorio(aleatorio)}@sintetico.udesc.br",
+        'admin': "usuario0@sintetico.udesc.br",
+        'cpf_admin': perfil.cpf(0),
+    }
+
+    passada(app, db, usuarios, quadras[0], args.semana, {})
+    medicoes = {}
+    reservas = 0
+    for _ in range(args.repeticoes):
+        reservas += passada(app, db, usuarios, quadras[0], args.semana, medicoes)
+    resumo = resumir(medicoes)
+
+    excedidas = []
+    print(f"{'rota':<36}{'comandos':>9}{'orçam.':>8}{'tempo ms':>10}{'enviados':>10}{'recebidos':>11}")
+    for rota, r in resumo.items():
+        excedeu = r["orcamento"] is not None and r["comandos"] > r["orcamento"]
+        if excedeu:
+            excedidas.append(rota)
+        print(f"{rota:<36}{r['comandos']:>9}{r['orcamento'] if r['orcamento'] is not None else '-':>8}"
+              f"{r['tempo_ms']:>10.2f}{r['bytes_enviados']:>10}{r['bytes_recebidos']:>11}"
+              f"{'  ❌ ' + str(r['por_metodo']) if excedeu else ''}")
+    if not reservas:
+        print(f"⚠️ Nenhum horário livre na semana {args.semana}: fazer_agendamento não foi medido.")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as arquivo:
+            json.dump(resumo, arquivo, ensure_ascii=False, indent=2)
+
+    if excedidas:
+        print(f"❌ Acima do orçamento: {', '.join(excedidas)}")
+        return 1
+    print("✅ Todas as rotas dentro do orçamento.")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,119 @@
+# ferramentas/verificar_reservas.py
+"""
+Verificação da reativação de agendamentos cancelados (índice único de slots).
+
+Em uma quadra e horário livres (madrugada de um dia daqui a alguns anos,
+sorteado), contra o MongoDB configurado:
+
+    1. reserva A;
+    2. cancela A (as chaves de reserva são liberadas);
+    3. reserva B no mesmo horário: deve ser aceita;
+    4. reativa A: deve ser recusada, e A continua cancelado;
+    5. uma nova reserva no horário continua recusada (B ainda o ocupa).
+
+Os agendamentos criados são apagados no fim.
+
+    python -m ferramentas.verificar_reservas
+
+Retorna 1 se alguma etapa divergir.
+"""
+
+import argparse
+import random
+from datetime import date, datetime, timedelta
+
+from camada_dados.agendamento_dao import (
+    RESERVA_CONFIRMADA, RESERVA_INDISPONIVEL, STATUS_QUE_OCUPAM,
+    atualizar_status_agendamento, excluir_agendamento, reservar_agendamento,
+)
+from camada_dados.catalogo import obter_catalogo
+from camada_dados.mongo_config import conectar_mongo
+
+NOME_VERIFICACAO = '[verificacao] reservas'
+CPF_VERIFICACAO = '00000000000'
+
+
+class Verificacao:
+
+    def __init__(self, db, quadra, dia):
+        self.db = db
+        self.id_ginasio, self.num_quadra = quadra
+        self.dia = dia
+        self.criados = []
+        self.falhas = 0
+
+    def conferir(self, descricao, obtido, esperado):
+        if obtido != esperado:
+            self.falhas += 1
+            print(f"❌ {descricao}: esperado {esperado!r}, obtido {obtido!r}")
+        else:
+            print(f"✅ {descricao}")
+
+    def reservar(self, hora_ini, hora_fim, **kwargs):
+        resultado = reservar_agendamento(
+            CPF_VERIFICACAO, self.id_ginasio, self.num_quadra, self.dia.isoformat(), hora_ini, hora_fim,
+            nome_usuario=NOME_VERIFICACAO, nome_ginasio=NOME_VERIFICACAO, **kwargs
+        )
+        inicio = datetime.fromisoformat(f"{self.dia.isoformat()}T{hora_ini}")
+        doc = self.db.agendamentos.find_one({
+            "id_ginasio": self.id_ginasio, "num_quadra": self.num_quadra, "hora_ini": inicio,
+            "status_agendamento": {"$in": STATUS_QUE_OCUPAM}, "_id": {"$nin": self.criados},
+        }, {"_id": 1})
+        if doc:
+            self.criados.append(doc['_id'])
+        return resultado, doc['_id'] if doc else None
+
+    def status(self, id_agendamento):
+        doc = self.db.agendamentos.find_one({"_id": id_agendamento}, {"status_agendamento": 1})
+        return doc.get('status_agendamento') if doc else None
+
+    def limpar(self):
+        for id_agendamento in self.criados:
+            excluir_agendamento(str(id_agendamento))
+
+
+def verificar_reativacao(v):
+    resultado, id_a = v.reservar('03:00', '04:00')
+    v.conferir("reserva A", resultado, RESERVA_CONFIRMADA)
+    if id_a is None:
+        return
+    v.conferir("cancelamento de A", atualizar_status_agendamento(str(id_a), 'cancelado'), True)
+
+    resultado, id_b = v.reservar('03:00', '04:00')
+    v.conferir("reserva B no horário liberado", resultado, RESERVA_CONFIRMADA)
+
+    v.conferir("reativação de A recusada", atualizar_status_agendamento(str(id_a), 'confirmado'), False)
+    v.conferir("A continua cancelado", v.status(id_a), 'cancelado')
+
+    resultado, _ = v.reservar('03:30', '04:30')
+    v.conferir("nova reserva sobreposta recusada", resultado, RESERVA_INDISPONIVEL)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica a reativação de agendamentos cancelados.")
+    parser.add_argument('--semente', type=int)
+    args = parser.parse_args(argv)
+
+    db = conectar_mongo()
+    catalogo = obter_catalogo()
+    if db is None or catalogo is None:
+        return 1
+    quadras = [(q['id_ginasio'], q['num_quadra']) for q in catalogo.todas_as_quadras()]
+    if not quadras:
+        print("Nenhuma quadra cadastrada.")
+        return 1
+
+    aleatorio = random.Random(args.semente)
+    dia = date.today() + timedelta(days=aleatorio.randint(3 * 365, 6 * 365))
+    v = Verificacao(db, aleatorio.choice(quadras), dia)
+    try:
+        verificar_reativacao(v)
+    finally:
+        v.limpar()
+
+    print(f"Quadra {v.id_ginasio}-{v.num_quadra}, dia {dia:%d/%m/%Y}: {v.falhas} divergência(s).")
+    return 0 if not v.falhas else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
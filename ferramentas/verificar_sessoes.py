@@ -0,0 +1,140 @@
+# ferramentas/verificar_sessoes.py
+"""
+Verificação das sessões compartilhadas entre workers (camada_dados.sessoes).
+
+Sobe N processos independentes, cada um com o próprio app Flask, a própria
+chave secreta (obter_chave_secreta) e o próprio cache de sessões, todos
+apontando para o mesmo MongoDB. Um worker cria a sessão; a requisição
+seguinte, com o mesmo cookie, vai para cada um dos outros workers, que devem
+ver os mesmos dados. Depois um worker faz logout e, passado o tempo do cache
+(SESSAO_CACHE_SEGUNDOS), nenhum worker pode mais ver a sessão.
+
+Fixação de sessão: um cookie obtido antes do login (rota /anonimo) não pode
+dar acesso à sessão autenticada; o login regenera o identificador.
+
+    python -m ferramentas.verificar_sessoes
+    python -m ferramentas.verificar_sessoes --workers 8 --sessoes 50
+
+Retorna 1 se algum worker divergir.
+"""
+
+import argparse
+import multiprocessing
+import secrets
+import time
+
+from flask import Flask, jsonify, session
+
+from camada_dados.sessoes import SESSAO_CACHE_SEGUNDOS, InterfaceSessaoMongo, obter_chave_secreta
+
+
+def criar_app():
+    app = Flask(__name__)
+    app.secret_key = obter_chave_secreta()
+    app.session_interface = InterfaceSessaoMongo()
+
+    @app.route('/anonimo')
+    def anonimo():
+        session['visitas'] = 1
+        return jsonify({'ok': True})
+
+    @app.route('/entrar/<valor>')
+    def entrar(valor):
+        # Como no login do app.py
+        session.clear()
+        session.regenerar()
+        session['usuario_logado'] = {'cpf': valor, 'tipo': 'aluno'}
+        return jsonify({'ok': True})
+
+    @app.route('/ler')
+    def ler():
+        return jsonify(session.get('usuario_logado'))
+
+    @app.route('/sair')
+    def sair():
+        session.clear()
+        return jsonify({'ok': True})
+
+    return app
+
+
+def _worker(pedidos, respostas):
+    """Atende (rota, cookie) até receber None; responde (json, cookie_novo)."""
+    cliente = criar_app().test_client()
+    for rota, cookie in iter(pedidos.get, None):
+        cliente.delete_cookie('session')
+        if cookie:
+            cliente.set_cookie('session', cookie)
+        resposta = cliente.get(rota)
+        novo = cliente.get_cookie('session')
+        respostas.put((resposta.get_json(), novo.value if novo else cookie))
+
+
+class Workers:
+
+    def __init__(self, quantidade):
+        self.canais = []
+        self.processos = []
+        for _ in range(quantidade):
+            pedidos, respostas = multiprocessing.Queue(), multiprocessing.Queue()
+            processo = multiprocessing.Process(target=_worker, args=(pedidos, respostas), daemon=True)
+            processo.start()
+            self.canais.append((pedidos, respostas))
+            self.processos.append(processo)
+
+    def requisitar(self, indice, rota, cookie=None):
+        pedidos, respostas = self.canais[indice]
+        pedidos.put((rota, cookie))
+        return respostas.get(timeout=30)
+
+    def encerrar(self):
+        for pedidos, _ in self.canais:
+            pedidos.put(None)
+        for processo in self.processos:
+            processo.join(timeout=10)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verifica sessões compartilhadas entre vários workers.")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--sessoes', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    workers = Workers(args.workers)
+    divergencias = 0
+    try:
+        cookies = []
+        for i in range(args.sessoes):
+            valor = secrets.token_hex(6)
+            _, plantado = workers.requisitar(i % args.workers, '/anonimo')
+            _, cookie = workers.requisitar(i % args.workers, f'/entrar/{valor}', plantado)
+            cookies.append((valor, cookie))
+            dados, _ = workers.requisitar((i + 1) % args.workers, '/ler', plantado)
+            if cookie == plantado or dados is not None:
+                divergencias += 1
+                print(f"❌ o cookie anterior ao login ainda dá acesso à sessão {valor}: {dados}")
+            for outro in range(args.workers):
+                dados, _ = workers.requisitar(outro, '/ler', cookie)
+                if not dados or dados.get('cpf') != valor:
+                    divergencias += 1
+                    print(f"❌ worker {outro} não viu a sessão criada no worker {i % args.workers}: {dados}")
+
+        for i, (_, cookie) in enumerate(cookies):
+            workers.requisitar(i % args.workers, '/sair', cookie)
+        time.sleep(SESSAO_CACHE_SEGUNDOS + 0.5)
+        for i, (valor, cookie) in enumerate(cookies):
+            for outro in range(args.workers):
+                dados, _ = workers.requisitar(outro, '/ler', cookie)
+                if dados is not None:
+                    divergencias += 1
+                    print(f"❌ worker {outro} ainda vê a sessão {valor} depois do logout: {dados}")
+    finally:
+        workers.encerrar()
+
+    leituras = args.sessoes * args.workers * 2
+    print(f"Workers: {args.workers}, sessões: {args.sessoes}, leituras: {leituras}, divergências: {divergencias}")
+    return 0 if not divergencias else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+# modelos/recorrencia.py
+
+from datetime import datetime, date, time, timedelta
+import re
+
+# Dias da semana no padrão do Python (segunda=0, ..., domingo=6)
+DIAS_SEMANA_PT = ['Segunda-feira', 'Terça-feira', 'Quarta-feira', 'Quinta-feira', 'Sexta-feira', 'Sábado', 'Domingo']
+DIAS_SEMANA_EN = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+MINUTOS_POR_DIA = 24 * 60
+
+# Formato legado gravado em 'regra_recorrencia': "Toda Segunda-feira, das 18:00 às 20:00"
+_REGRA_LEGADA = re.compile(r"Tod[oa] ([\w\s-]+), das (\d{2}):(\d{2}) às (\d{2}):(\d{2})")
+
+
+def _para_datetime(valor):
+    """Normaliza date/datetime/str ISO para datetime à meia-noite (formato salvo no Mongo)."""
+    if valor is None:
+        return None
+    if isinstance(valor, str):
+        valor = datetime.fromisoformat(valor)
+    if isinstance(valor, datetime):
+        return datetime.combine(valor.date(), time.min)
+    return datetime.combine(valor, time.min)
+
+
+def minutos_do_horario(valor):
+    """Converte 'HH:MM' ou time em minutos desde a meia-noite."""
+    if isinstance(valor, str):
+        valor = time.fromisoformat(valor)
+    return valor.hour * 60 + valor.minute
+
+
+def segmentos_diarios(inicio, fim):
+    """
+    Quebra o intervalo [inicio, fim) em trechos de um único dia.
+    Retorna uma lista de (data, dia_semana, minuto_inicio, minuto_fim),
+    formato usado para consultar os eventos recorrentes pelo índice.
+    """
+    segmentos = []
+    atual = inicio
+    while atual < fim:
+        meia_noite_seguinte = datetime.combine(atual.date() + timedelta(days=1), time.min)
+        fim_trecho = min(fim, meia_noite_seguinte)
+        minuto_fim = MINUTOS_POR_DIA if fim_trecho == meia_noite_seguinte else minutos_do_horario(fim_trecho)
+        segmentos.append((atual.date(), atual.weekday(), minutos_do_horario(atual), minuto_fim))
+        atual = fim_trecho
+    return segmentos
+
+
+class Recorrencia:
+    """
+    Regra de recorrência semanal de um evento, armazenada em campos
+    estruturados (e indexáveis) no sub-documento 'recorrencia' do evento:
+
+        dia_semana     -> 0 (segunda) a 6 (domingo)
+        minuto_inicio  -> minutos desde a meia-noite
+        minuto_fim     -> minutos desde a meia-noite (1440 = 24:00)
+        data_inicio    -> primeiro dia de validade (datetime à meia-noite)
+        data_fim       -> último dia de validade, inclusive
+        excecoes       -> datas em que o evento NÃO ocorre
+
+    Uma regra nova exige data_fim, e data_fim não pode ser anterior a
+    data_inicio (ValueError). Regras já gravadas são reconstruídas como
+    estão (do_documento): uma validade invertida só não tem ocorrências.
+    """
+
+    def __init__(self, dia_semana, minuto_inicio, minuto_fim, data_inicio, data_fim, excecoes=None,
+                 validar_periodo=True):
+        self.dia_semana = int(dia_semana)
+        self.minuto_inicio = int(minuto_inicio)
+        self.minuto_fim = int(minuto_fim)
+        self.data_inicio = _para_datetime(data_inicio)
+        self.data_fim = _para_datetime(data_fim)
+        self.excecoes = sorted(_para_datetime(d) for d in (excecoes or []))
+
+        if not 0 <= self.dia_semana <= 6:
+            raise ValueError(f"Dia da semana inválido: {dia_semana}")
+        if not 0 <= self.minuto_inicio < self.minuto_fim <= MINUTOS_POR_DIA:
+            raise ValueError(f"Horário inválido: {minuto_inicio} -> {minuto_fim}")
+        if validar_periodo:
+            if self.data_inicio is None or self.data_fim is None:
+                raise ValueError("Informe a data de início e a data de fim da recorrência.")
+            if self.data_fim < self.data_inicio:
+                raise ValueError(f"Data de fim da recorrência ({self.data_fim:%d/%m/%Y}) anterior "
+                                 f"ao início ({self.data_inicio:%d/%m/%Y}).")
+
+    def __repr__(self):
+        return f"<Recorrencia {self.formatar_regra()} de {self.data_inicio:%Y-%m-%d} a {self.data_fim:%Y-%m-%d}>"
+
+    # --- Construção ---
+
+    @classmethod
+    def do_formulario(cls, dia_semana_en, hora_inicio, hora_fim, data_fim, data_inicio=None):
+        """
+        Cria a regra a partir dos campos do formulário de eventos
+        (dia em inglês, 'HH:MM', 'HH:MM', 'AAAA-MM-DD'). Um fim '00:00'
+        significa meia-noite do dia seguinte.
+        """
+        if dia_semana_en not in DIAS_SEMANA_EN:
+            raise ValueError(f"Dia da semana inválido: {dia_semana_en}")
+        minuto_fim = minutos_do_horario(hora_fim) or MINUTOS_POR_DIA
+        return cls(
+            DIAS_SEMANA_EN.index(dia_semana_en),
+            minutos_do_horario(hora_inicio),
+            minuto_fim,
+            data_inicio or date.today(),
+            data_fim,
+        )
+
+    @classmethod
+    def da_regra_legada(cls, regra, data_inicio, data_fim):
+        """
+        Converte a frase legada ("Toda Segunda-feira, das 18:00 às 20:00")
+        em uma Recorrencia. Retorna None se a frase não seguir o padrão.
+        """
+        match = _REGRA_LEGADA.search(regra or '')
+        if not match:
+            return None
+        dia_pt, h_ini, m_ini, h_fim, m_fim = match.groups()
+        dia_pt = dia_pt.strip()
+        if dia_pt not in DIAS_SEMANA_PT:
+            return None
+        minuto_fim = int(h_fim) * 60 + int(m_fim) or MINUTOS_POR_DIA
+        return cls(DIAS_SEMANA_PT.index(dia_pt), int(h_ini) * 60 + int(m_ini), minuto_fim, data_inicio, data_fim)
+
+    @classmethod
+    def do_documento(cls, doc):
+        """Reconstrói a regra a partir do sub-documento 'recorrencia' do Mongo."""
+        return cls(
+            doc['dia_semana'], doc['minuto_inicio'], doc['minuto_fim'],
+            doc['data_inicio'], doc['data_fim'], doc.get('excecoes', []),
+            validar_periodo=False,
+        )
+
+    def get_document_mongo(self):
+        """Prepara o sub-documento 'recorrencia' para salvar no MongoDB"""
+        return {
+            "dia_semana": self.dia_semana,
+            "minuto_inicio": self.minuto_inicio,
+            "minuto_fim": self.minuto_fim,
+            "data_inicio": self.data_inicio,
+            "data_fim": self.data_fim,
+            "excecoes": self.excecoes,
+        }
+
+    # --- Apresentação ---
+
+    @staticmethod
+    def _hhmm(minutos):
+        return f"{(minutos // 60) % 24:02d}:{minutos % 60:02d}"
+
+    def formatar_regra(self):
+        """Frase exibida nas telas (mesmo formato da antiga 'regra_recorrencia')."""
+        artigo = 'Todo' if self.dia_semana in (5, 6) else 'Toda'
+        return (f"{artigo} {DIAS_SEMANA_PT[self.dia_semana]}, "
+                f"das {self._hhmm(self.minuto_inicio)} às {self._hhmm(self.minuto_fim)}")
+
+    # --- Consultas ---
+
+    def sobrepoe_horario(self, minuto_inicio, minuto_fim):
+        return self.minuto_inicio < minuto_fim and minuto_inicio < self.minuto_fim
+
+    def expandir(self, inicio, fim):
+        """
+        Retorna as ocorrências [(hora_ini, hora_fim), ...] que se sobrepõem
+        ao intervalo [inicio, fim). As datas são calculadas aritmeticamente
+        (primeira ocorrência + k semanas), sem percorrer dia a dia.
+        """
+        # Ocorrências que começam até um dia antes ainda podem invadir o intervalo
+        primeiro_dia = max(self.data_inicio, _para_datetime(inicio) - timedelta(days=1))
+        ultimo_dia = min(self.data_fim, _para_datetime(fim))
+        if primeiro_dia > ultimo_dia:
+            return []
+
+        primeiro_dia += timedelta(days=(self.dia_semana - primeiro_dia.weekday()) % 7)
+        if primeiro_dia > ultimo_dia:
+            return []
+
+        quantidade = (ultimo_dia - primeiro_dia).days // 7 + 1
+        deslocamento_ini = timedelta(minutes=self.minuto_inicio)
+        deslocamento_fim = timedelta(minutes=self.minuto_fim)
+        excecoes = set(self.excecoes)
+
+        dias = (primeiro_dia + timedelta(weeks=k) for k in range(quantidade))
+        return [
+            (dia + deslocamento_ini, dia + deslocamento_fim)
+            for dia in dias
+            if dia not in excecoes and dia + deslocamento_ini < fim and dia + deslocamento_fim > inicio
+        ]
+
+
+def expandir_ocorrencias(recorrencias, inicio, fim):
+    """
+    Expande várias regras de uma vez para o intervalo [inicio, fim).
+    Recebe pares (chave, Recorrencia) e retorna [(chave, hora_ini, hora_fim)]
+    ordenados pelo início.
+    """
+    ocorrencias = [
+        (chave, ini, fim_ocorrencia)
+        for chave, regra in recorrencias
+        for ini, fim_ocorrencia in regra.expandir(inicio, fim)
+    ]
+    ocorrencias.sort(key=lambda o: o[1])
+    return ocorrencias
@@ -88,6 +88,12 @@ db.usuarios.insertMany([
 // Estrutura: Embutimos as quadras e os materiais esportivos dentro de cada ginásio.
 // Isso evita a necessidade de JOINs constantes.
 // ====================================================================
+// IDs canônicos (ver camada_dados/normalizacao_ids.py): esportes por
+// ObjectId, materiais por texto
+const idBasquete = ObjectId();
+const idFutsal = ObjectId();
+const idVolei = ObjectId();
+
 print("Criando a coleção 'ginasios' com quadras e materiais embutidos...");
 db.ginasios.insertMany([
     {
@@ -96,12 +102,12 @@ db.ginasios.insertMany([
         endereco: 'Rua UDESC, 123',
         capacidade: 1000,
         quadras: [
-            { num_quadra: 1, capacidade: 100, tipo_piso: 'Madeira', cobertura: true, status: 'disponivel', esportes_permitidos: [1, 3] }, // IDs da coleção 'esportes'
-            { num_quadra: 2, capacidade: 80, tipo_piso: 'Cimento', cobertura: true, status: 'manutencao', esportes_permitidos: [2] }
+            { num_quadra: 1, capacidade: 100, tipo_piso: 'Madeira', cobertura: true, status: 'disponivel', esportes_permitidos: [idBasquete, idVolei] }, // IDs da coleção 'esportes'
+            { num_quadra: 2, capacidade: 80, tipo_piso: 'Cimento', cobertura: true, status: 'manutencao', esportes_permitidos: [idFutsal] }
         ],
         materiais_esportivos: [
-            { id_material: 101, nome: 'Bola de Basquete', descricao: 'Tamanho oficial', marca: 'Spalding', status: 'bom', qnt_total: 10, qnt_disponivel: 8 },
-            { id_material: 102, nome: 'Bola de Vôlei', descricao: 'Couro sintético', marca: 'Penalty', status: 'bom', qnt_total: 15, qnt_disponivel: 15 }
+            { id_material: '101', nome: 'Bola de Basquete', descricao: 'Tamanho oficial', marca: 'Spalding', status: 'bom', qnt_total: 10, qnt_disponivel: 8 },
+            { id_material: '102', nome: 'Bola de Vôlei', descricao: 'Couro sintético', marca: 'Penalty', status: 'bom', qnt_total: 15, qnt_disponivel: 15 }
         ]
     },
     {
@@ -110,10 +116,10 @@ db.ginasios.insertMany([
         endereco: 'Rua dos Esportes, 456',
         capacidade: 500,
         quadras: [
-            { num_quadra: 1, capacidade: 50, tipo_piso: 'Areia', cobertura: false, status: 'disponivel', esportes_permitidos: [3] }
+            { num_quadra: 1, capacidade: 50, tipo_piso: 'Areia', cobertura: false, status: 'disponivel', esportes_permitidos: [idVolei] }
         ],
         materiais_esportivos: [
-            { id_material: 201, nome: 'Rede de Vôlei de Praia', marca: 'Master Rede', status: 'manutencao', qnt_total: 2, qnt_disponivel: 1 }
+            { id_material: '201', nome: 'Rede de Vôlei de Praia', marca: 'Master Rede', status: 'manutencao', qnt_total: 2, qnt_disponivel: 1 }
         ]
     }
 ]);
@@ -124,9 +130,9 @@ db.ginasios.insertMany([
 // ====================================================================
 print("Criando a coleção 'esportes'...");
 db.esportes.insertMany([
-    { _id: 1, nome: 'Basquete', max_jogadores: 10 },
-    { _id: 2, nome: 'Futsal', max_jogadores: 10 },
-    { _id: 3, nome: 'Vôlei', max_jogadores: 12 }
+    { _id: idBasquete, nome: 'Basquete', max_jogadores: 10 },
+    { _id: idFutsal, nome: 'Futsal', max_jogadores: 10 },
+    { _id: idVolei, nome: 'Vôlei', max_jogadores: 12 }
 ]);
 
 // ====================================================================
@@ -155,7 +161,7 @@ db.agendamentos.insertOne({
     // Campos opcionais podem simplesmente não existir
     // id_bolsista_operador: null,
     materiais_solicitados: [ // Exemplo de como a tabela de junção é representada
-        { id_material: 101, nome: 'Bola de Basquete', quantidade: 2 }
+        { id_material: '101', nome: 'Bola de Basquete', quantidade: 2 }
     ]
 });
 
@@ -203,4 +209,9 @@ db.chamados.insertOne({
 });
 
 
-print("\nConfiguração do banco de dados MongoDB concluída com sucesso!");
\ No newline at end of file
+print("\nConfiguração do banco de dados MongoDB concluída com sucesso!");
+// Os índices não são criados aqui: como as coleções acima foram recriadas,
+// execute em seguida "python -m camada_dados.indices --verificar" e
+// "python -m camada_dados.migracoes slots" (os agendamentos acima não têm
+// 'slots_reservados' e ficariam fora do índice único de reservas).
+print("Próximos passos: python -m camada_dados.indices --verificar && python -m camada_dados.migracoes slots");
\ No newline at end of file